@@ -0,0 +1,255 @@
+"""
+Element Index - precomputed search and planning context for one app's fDOM
+Element records, a token inverted index over element names/descriptions and
+compact per-state summaries are built once per fDOM and reused by the MCP tools
+and the LLM planner, so lookups and prompt size do not scale with app size.
+"""
+
+import bisect
+import difflib
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+NAME_WEIGHT = 2.0          # a token in the element name counts double vs the description
+PREFIX_WEIGHT = 0.7        # "sav" -> "save"
+FUZZY_CUTOFF = 0.75        # difflib ratio for typo matches ("fiel" -> "file" is 0.75)
+FUZZY_CANDIDATES = 3
+SUMMARY_BRIEF_CHARS = 60   # description length in planner summaries
+PLAN_CONTEXT_CHARS = 6000  # ~1.5k tokens of fDOM context per planning prompt
+RELATED_LIMIT = 40         # task matches from other states considered for the prompt
+
+# Task phrasing words that would otherwise match most descriptions
+STOPWORDS = frozenset("a an and the to of in on for with into from then this that it is".split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric words"""
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def element_record(state_id: str, node_id: str, node_data: Dict) -> Dict:
+    """Element dict as returned by the MCP tools"""
+    return {
+        "id": f"{state_id}::{node_id}",
+        "node_id": node_id,
+        "state_id": state_id,
+        "name": node_data.get("g_icon_name", "unknown"),
+        "description": node_data.get("g_brief", ""),
+        "type": node_data.get("g_type", "icon"),
+        "enabled": node_data.get("g_enabled", True),
+        "interactive": node_data.get("g_interactive", True),
+        "bbox": node_data.get("bbox", [0, 0, 0, 0]),
+        "status": node_data.get("status", "unknown")
+    }
+
+
+def is_actionable(element: Dict) -> bool:
+    """Analyzed, enabled and interactive: what the planner may target"""
+    return (element["name"].lower() != "unanalyzed" and
+            element["enabled"] and element["interactive"])
+
+
+def fdom_signature(fdom_data: Dict) -> Tuple:
+    """Cheap change check: new dict, added states/nodes/edges or a new store generation"""
+    states = fdom_data.get("states", {})
+    return (id(fdom_data), id(states), len(states),
+            sum(len(s.get("nodes", {})) for s in states.values()),
+            len(fdom_data.get("edges", [])), fdom_data.get("store_generation"))
+
+
+class ElementSearchIndex:
+    """
+    Search index and planner summaries for one fdom_data dict
+
+    Built in one pass over the nodes; rebuild() (or refresh(), which rebuilds
+    only when fdom_signature changed) after the fDOM is reloaded or extended.
+    Node fields edited in place are only picked up by an explicit rebuild().
+    """
+
+    def __init__(self, fdom_data: Dict):
+        self.fdom_data = fdom_data
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        self.elements: List[Dict] = []
+        self._by_id: Dict[str, int] = {}
+        self._by_state: Dict[str, List[int]] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+
+        for state_id, state_data in self.fdom_data.get("states", {}).items():
+            rows = self._by_state.setdefault(state_id, [])
+            for node_id, node_data in state_data.get("nodes", {}).items():
+                row = len(self.elements)
+                element = element_record(state_id, node_id, node_data)
+                self.elements.append(element)
+                self._by_id[element["id"]] = row
+                rows.append(row)
+                for token in tokenize(element["description"]):
+                    self._postings.setdefault(token, {})[row] = 1.0
+                for token in tokenize(element["name"]):
+                    self._postings.setdefault(token, {})[row] = NAME_WEIGHT
+
+        self._vocabulary = sorted(self._postings)
+        self._out: Dict[str, List[Dict]] = {}
+        for edge in self.fdom_data.get("edges", []):
+            if edge.get("from") and edge.get("to"):
+                self._out.setdefault(edge["from"], []).append(edge)
+        self._summaries: Dict[str, List[Tuple[str, str]]] = {}
+        self._paths: Dict[str, Dict[str, Optional[str]]] = {}
+        self._signature = fdom_signature(self.fdom_data)
+
+    def refresh(self, fdom_data: Dict = None) -> "ElementSearchIndex":
+        """Rebind to fdom_data (if given) and rebuild if it changed since the last build"""
+        if fdom_data is not None and fdom_data is not self.fdom_data:
+            self.fdom_data = fdom_data
+            self.rebuild()
+        elif fdom_signature(self.fdom_data) != self._signature:
+            self.rebuild()
+        return self
+
+    # ---------- lookups ----------
+
+    def get(self, element_id: str) -> Optional[Dict]:
+        row = self._by_id.get(element_id)
+        return self.elements[row] if row is not None else None
+
+    def elements_in_state(self, state_id: str) -> List[Dict]:
+        return [self.elements[row] for row in self._by_state.get(state_id, [])]
+
+    def edges_from(self, state_id: str) -> List[Dict]:
+        return self._out.get(state_id, [])
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Vocabulary terms for one query token: exact, else prefix and fuzzy matches"""
+        if token in self._postings:
+            return [(token, 1.0)]
+        terms = []
+        start = bisect.bisect_left(self._vocabulary, token)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(token):
+                break
+            terms.append((term, PREFIX_WEIGHT))
+        if not terms:
+            for term in difflib.get_close_matches(token, self._vocabulary, FUZZY_CANDIDATES, FUZZY_CUTOFF):
+                terms.append((term, difflib.SequenceMatcher(None, token, term).ratio() * PREFIX_WEIGHT))
+        return terms
+
+    def search(self, query: str, state_id: str = None, limit: int = None) -> List[Tuple[Dict, float]]:
+        """(element, score) best first; an element scores per matched query token"""
+        scores: Dict[int, float] = {}
+        for token in dict.fromkeys(tokenize(query)):
+            if token in STOPWORDS:
+                continue
+            for term, weight in self._expand(token):
+                for row, field_weight in self._postings[term].items():
+                    scores[row] = scores.get(row, 0.0) + weight * field_weight
+
+        if state_id is not None:
+            in_state = set(self._by_state.get(state_id, []))
+            scores = {row: score for row, score in scores.items() if row in in_state}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self.elements[row], score) for row, score in ranked]
+
+    def path_to(self, from_state: str, to_state: str) -> List[str]:
+        """Fewest-hop state path along recorded edges (BFS tree cached per start state)"""
+        if from_state == to_state:
+            return [from_state]
+        parents = self._paths.get(from_state)
+        if parents is None:
+            parents = {from_state: None}
+            queue = deque([from_state])
+            while queue:
+                current = queue.popleft()
+                for edge in self._out.get(current, []):
+                    if edge["to"] not in parents:
+                        parents[edge["to"]] = current
+                        queue.append(edge["to"])
+            self._paths[from_state] = parents
+        if to_state not in parents:
+            return []
+        path = [to_state]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+    # ---------- planner context ----------
+
+    @staticmethod
+    def _summary_line(element: Dict) -> str:
+        brief = " ".join(element["description"].split())
+        if len(brief) > SUMMARY_BRIEF_CHARS:
+            brief = brief[:SUMMARY_BRIEF_CHARS - 3] + "..."
+        return f"{element['id']} | {element['name']} | {element['type']} | {brief}"
+
+    def state_summary(self, state_id: str) -> List[str]:
+        """One compact line per actionable element of a state (cached until rebuild)"""
+        return [line for _, line in self._state_lines(state_id)]
+
+    def _state_lines(self, state_id: str) -> List[Tuple[str, str]]:
+        lines = self._summaries.get(state_id)
+        if lines is None:
+            lines = self._summaries[state_id] = [
+                (e["id"], self._summary_line(e)) for e in self.elements_in_state(state_id) if is_actionable(e)]
+        return lines
+
+    def planning_context(self, task: str, current_state: str, budget: int = PLAN_CONTEXT_CHARS) -> Dict:
+        """
+        fDOM context for a planning prompt, at most ~budget characters in total
+
+        Sections, filled in order with unused space rolling over: current-state
+        elements (task matches first), transitions out of the current state, and
+        task matches in other states with the state path that reaches them.
+        """
+        remaining = budget
+
+        def fill(lines: List[str], share: int) -> str:
+            nonlocal remaining
+            allowance, kept = min(share, remaining), []
+            for line in lines:
+                if len(line) + 1 > allowance:
+                    break
+                kept.append(line)
+                allowance -= len(line) + 1
+            if len(kept) < len(lines):
+                # The overflow marker counts against the allowance too
+                while kept and len(f"... (+{len(lines) - len(kept)} more not shown)") + 1 > allowance:
+                    allowance += len(kept.pop()) + 1
+                marker = f"... (+{len(lines) - len(kept)} more not shown)"
+                if len(marker) + 1 <= allowance:
+                    kept.append(marker)
+            text = "\n".join(kept) if kept else "(none)"
+            remaining -= len(text) + 1
+            return text
+
+        matches = self.search(task)
+        rank = {e["id"]: i for i, (e, _) in enumerate(matches) if e["state_id"] == current_state}
+        summary = self._state_lines(current_state)
+        current = sorted(summary, key=lambda item: rank.get(item[0], len(rank)))  # stable: rest keep fDOM order
+        current_text = fill([line for _, line in current], int(budget * 0.6))
+
+        edge_lines = [f"-> {e['to']} (via {e.get('action', '?')})" for e in self.edges_from(current_state)]
+        edges_text = fill(edge_lines, remaining - int(budget * 0.25))  # keep room for related matches
+
+        elsewhere = []
+        for element, _ in matches:
+            if element["state_id"] == current_state or not is_actionable(element):
+                continue
+            if len(elsewhere) == RELATED_LIMIT:
+                break
+            path = self.path_to(current_state, element["state_id"])
+            route = " -> ".join(path) if path else "no known path"
+            elsewhere.append(f"{self._summary_line(element)} | reach: {route}")
+        elsewhere_text = fill(elsewhere, remaining)
+
+        return {
+            "current_elements": current_text,
+            "navigation": edges_text,
+            "related_elements": elsewhere_text,
+            "state_count": len(self._by_state),
+        }
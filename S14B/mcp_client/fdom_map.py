@@ -5,12 +5,20 @@ Creates interactive visual representation of UI state navigation
 
 import json
 import os
+import sys
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from datetime import datetime
 import math
 
+try:
+    from utils.fdom.fdom_store import load_fdom
+except ImportError:
+    # Run directly as a script: make the S14B root importable
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from utils.fdom.fdom_store import load_fdom
+
 
 @dataclass
 class StateNode:
@@ -49,8 +57,7 @@ class FDOMMapGenerator:
     def load_fdom(self, fdom_path: str) -> bool:
         """Load fDOM data from JSON file"""
         try:
-            with open(fdom_path, 'r', encoding='utf-8') as f:
-                self.fdom_data = json.load(f)
+            self.fdom_data = load_fdom(fdom_path)
             self._parse_fdom()
             return True
         except Exception as e:
@@ -3,13 +3,15 @@ MCP Server - Model Context Protocol server for fDOM GUI automation
 Exposes fDOM state and actions as MCP tools
 """
 
-import json
 import asyncio
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 from datetime import datetime
 from pathlib import Path
 
+from .element_index import ElementSearchIndex
+from utils.fdom.fdom_store import FDOMStore, load_fdom
+
 
 @dataclass
 class MCPTool:
@@ -39,16 +41,21 @@ class FDOMContext:
         self.base_path = Path(base_path) if base_path else Path(__file__).parent.parent / "apps"
         self.fdom_data: Dict = {}
         self.current_state: str = "root"
+        self.index = ElementSearchIndex(self.fdom_data)
         self.load_fdom()
     
+    @property
+    def fdom_path(self) -> Path:
+        return self.base_path / self.app_name / "fdom.json"
+    
     def load_fdom(self) -> bool:
-        """Load fDOM data from JSON file"""
-        fdom_path = self.base_path / self.app_name / "fdom.json"
+        """Load fDOM data (fdom.json plus its change log) and rebuild the element index"""
+        fdom_path = self.fdom_path
         
         if fdom_path.exists():
             try:
-                with open(fdom_path, 'r', encoding='utf-8') as f:
-                    self.fdom_data = json.load(f)
+                self.fdom_data = load_fdom(fdom_path)
+                self.index.refresh(self.fdom_data)
                 return True
             except Exception as e:
                 print(f"Error loading fDOM: {e}")
@@ -56,13 +63,11 @@ class FDOMContext:
         return False
     
     def save_fdom(self) -> bool:
-        """Save fDOM data back to JSON file"""
-        fdom_path = self.base_path / self.app_name / "fdom.json"
-        
+        """Save fDOM data back to fdom.json (full rewrite under a new store generation)"""
         try:
-            fdom_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(fdom_path, 'w', encoding='utf-8') as f:
-                json.dump(self.fdom_data, f, indent=2, ensure_ascii=False)
+            # A plain rewrite would leave the explorer's change log replaying over it
+            FDOMStore(self.fdom_data, self.fdom_path).compact()
+            self.index.rebuild()
             return True
         except Exception as e:
             print(f"Error saving fDOM: {e}")
@@ -79,31 +84,16 @@ class FDOMContext:
     def get_elements_in_state(self, state_id: str = None) -> List[Dict]:
         """Get all elements in a state"""
         state_id = state_id or self.current_state
-        state_data = self.fdom_data.get("states", {}).get(state_id, {})
-        nodes = state_data.get("nodes", {})
-        
-        elements = []
-        for node_id, node_data in nodes.items():
-            elements.append({
-                "id": f"{state_id}::{node_id}",
-                "node_id": node_id,
-                "state_id": state_id,
-                "name": node_data.get("g_icon_name", "unknown"),
-                "description": node_data.get("g_brief", ""),
-                "type": node_data.get("g_type", "icon"),
-                "enabled": node_data.get("g_enabled", True),
-                "interactive": node_data.get("g_interactive", True),
-                "bbox": node_data.get("bbox", [0, 0, 0, 0]),
-                "status": node_data.get("status", "unknown")
-            })
-        
-        return elements
+        return self.index.refresh().elements_in_state(state_id)
+    
+    def find_elements(self, query: str, state_id: str = None, limit: int = None) -> List[Dict]:
+        """Elements matching query by name/description tokens (prefix and typo tolerant), best first"""
+        return [element for element, _ in self.index.refresh().search(query, state_id, limit)]
     
     def get_navigation_edges(self, from_state: str = None) -> List[Dict]:
         """Get navigation edges from a state"""
         from_state = from_state or self.current_state
-        edges = self.fdom_data.get("edges", [])
-        return [e for e in edges if e.get("from") == from_state]
+        return list(self.index.refresh().edges_from(from_state))
     
     def get_exploration_stats(self) -> Dict:
         """Get exploration statistics"""
@@ -160,7 +150,7 @@ class MCPServer:
             ),
             "find_element": MCPTool(
                 name="find_element",
-                description="Find an element by name or partial name match",
+                description="Find elements by name or description keywords (partial words and typos allowed)",
                 parameters={
                     "type": "object",
                     "properties": {
@@ -327,14 +317,7 @@ class MCPServer:
         if not self.context:
             return {"error": "No fDOM context loaded"}
         
-        search_name = args.get("name", "").lower()
-        matches = []
-        
-        for state_id in self.context.get_states():
-            elements = self.context.get_elements_in_state(state_id)
-            for elem in elements:
-                if search_name in elem["name"].lower():
-                    matches.append(elem)
+        matches = self.context.find_elements(args.get("name", ""))
         
         return {
             "search_term": args.get("name"),
@@ -393,12 +376,7 @@ class MCPServer:
             node_id = element_id
         
         # Find the element
-        elements = self.context.get_elements_in_state(state_id)
-        target_element = None
-        for elem in elements:
-            if elem["node_id"] == node_id:
-                target_element = elem
-                break
+        target_element = self.context.index.refresh().get(f"{state_id}::{node_id}")
         
         if not target_element:
             return {
@@ -407,10 +385,9 @@ class MCPServer:
             }
         
         # Check if click leads to new state
-        edges = self.context.fdom_data.get("edges", [])
         transition = None
-        for edge in edges:
-            if edge.get("from") == state_id and edge.get("action", "").endswith(node_id):
+        for edge in self.context.get_navigation_edges(state_id):
+            if edge.get("action", "").endswith(node_id):
                 transition = edge
                 break
         
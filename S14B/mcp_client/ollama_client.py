@@ -8,6 +8,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
+from .element_index import ElementSearchIndex, PLAN_CONTEXT_CHARS
+
 
 @dataclass
 class FDOMElement:
@@ -55,11 +57,19 @@ class OllamaClient:
     DEFAULT_MODEL = "llama3.2:latest"
     DEFAULT_HOST = "http://localhost:11434"
     
-    def __init__(self, model: str = None, host: str = None):
+    def __init__(self, model: str = None, host: str = None, context_budget: int = PLAN_CONTEXT_CHARS):
         self.model = model or self.DEFAULT_MODEL
         self.host = host or self.DEFAULT_HOST
+        self.context_budget = context_budget  # characters of fDOM context per planning prompt
         self.conversation_history: List[Dict] = []
         self.action_history: List[ComputerAction] = []
+        self._element_index: Optional[ElementSearchIndex] = None
+    
+    def _index_for(self, fdom_data: Dict) -> ElementSearchIndex:
+        """Element index for fdom_data, reused across calls until the fDOM changes"""
+        if self._element_index is None:
+            self._element_index = ElementSearchIndex(fdom_data)
+        return self._element_index.refresh(fdom_data)
         
     def _call_ollama(self, prompt: str, system_prompt: str = None) -> str:
         """Make a call to local Ollama instance"""
@@ -184,24 +194,8 @@ Provide a brief analysis of:
         Returns up to max_steps actions
         """
         
-        state_data = fdom_data.get("states", {}).get(current_state, {})
-        nodes = state_data.get("nodes", {})
-        
-        # Build element list
-        elements = []
-        for node_id, node_data in nodes.items():
-            name = node_data.get("g_icon_name", "unknown")
-            if name.lower() != "unanalyzed" and node_data.get("g_enabled", True) and node_data.get("g_interactive", True):
-                elements.append({
-                    "id": f"{current_state}::{node_id}",
-                    "name": name,
-                    "description": node_data.get("g_brief", ""),
-                    "type": node_data.get("g_type", "icon")
-                })
-        
-        # Get all states for context
-        all_states = list(fdom_data.get("states", {}).keys())
-        edges = fdom_data.get("edges", [])
+        # Compact, budgeted view of the fDOM: prompt size stays flat as the app grows
+        context = self._index_for(fdom_data).planning_context(task_description, current_state, self.context_budget)
         
         system_prompt = """You are an expert GUI automation planner. Given a task and available UI elements, you create step-by-step action plans.
 
@@ -232,14 +226,16 @@ IMPORTANT:
 
 **TASK:** {task_description}
 
-**Current State:** {current_state}
-**All Known States:** {all_states}
+**Current State:** {current_state} ({context['state_count']} known states)
+
+**Available Elements in Current State** (id | name | type | description):
+{context['current_elements']}
 
-**Available Elements in Current State:**
-{json.dumps(elements, indent=2)}
+**Transitions from Current State:**
+{context['navigation']}
 
-**Navigation Graph (edges):**
-{json.dumps(edges[:20], indent=2)}
+**Task-Related Elements in Other States** (id | name | type | description | state path):
+{context['related_elements']}
 
 Respond with ONLY valid JSON following the specified format."""
 
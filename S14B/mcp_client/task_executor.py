@@ -14,6 +14,7 @@ from enum import Enum
 
 from .ollama_client import OllamaClient, ComputerAction, FDOMElement
 from .mcp_server import MCPServer, FDOMContext
+from utils.fdom.exploration_scheduler import ExplorationScheduler, split_node_ref
 
 
 class TaskStatus(Enum):
@@ -360,6 +361,7 @@ class ExplorationExecutor:
         
         # Load initial pending nodes
         self._load_pending_nodes()
+        self.scheduler = ExplorationScheduler(self.context.fdom_data)
     
     def _load_pending_nodes(self):
         """Load pending nodes from fDOM"""
@@ -408,6 +410,7 @@ class ExplorationExecutor:
         iterations_completed = 0
         successful_explorations = 0
         state_changes = 0
+        state_transitions = 0  # state switches needed to reach each target
         errors = 0
         
         try:
@@ -424,6 +427,7 @@ class ExplorationExecutor:
                 print(f"📊 Pending: {len(self.pending_nodes)} | Explored: {len(self.explored_nodes)}")
                 
                 # Select next node to explore
+                self.scheduler.sync(self.pending_nodes)
                 if use_ollama_guidance:
                     action = self.ollama.decide_next_exploration_action(
                         self.context.fdom_data,
@@ -436,13 +440,17 @@ class ExplorationExecutor:
                         target_node = action.target_element
                         reasoning = action.reasoning
                     else:
-                        # Fallback to first pending
-                        target_node = next(iter(self.pending_nodes))
-                        reasoning = "Fallback selection"
+                        # Fallback to the scheduler's choice
+                        target_node = self.scheduler.next(self.context.current_state)
+                        reasoning = "Fallback selection (scheduler)"
                 else:
-                    # Simple sequential selection
-                    target_node = next(iter(self.pending_nodes))
-                    reasoning = "Sequential selection"
+                    # Nearest state first, most likely interactive element within it
+                    target_node = self.scheduler.next(self.context.current_state)
+                    reasoning = "Scheduled selection (state locality + interactivity)"
+                
+                state_transitions += self.scheduler.transitions(
+                    self.context.current_state, split_node_ref(target_node)[0]
+                )
                 
                 print(f"🎯 Target: {target_node}")
                 print(f"💭 Reason: {reasoning[:80]}...")
@@ -510,6 +518,8 @@ class ExplorationExecutor:
             "max_iterations": max_iterations,
             "successful_explorations": successful_explorations,
             "state_changes": state_changes,
+            "state_transitions": state_transitions,
+            "transitions_per_node": state_transitions / iterations_completed if iterations_completed else 0.0,
             "errors": errors,
             "pending_remaining": len(self.pending_nodes),
             "total_explored": len(self.explored_nodes),
@@ -525,6 +535,7 @@ class ExplorationExecutor:
         print(f"🔄 Iterations: {iterations_completed}/{max_iterations}")
         print(f"✅ Successful: {successful_explorations}")
         print(f"🔀 State Changes: {state_changes}")
+        print(f"🧭 Transitions/node: {summary['transitions_per_node']:.2f}")
         print(f"❌ Errors: {errors}")
         print(f"📊 Remaining: {len(self.pending_nodes)} pending nodes")
         print(f"⏱️ Duration: {duration:.1f}s ({summary['iterations_per_minute']:.1f} iter/min)")
@@ -0,0 +1,56 @@
+"""
+Tests for mcp_client/element_index.py (element search and planner context)
+Run with: pytest test_element_index.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mcp_client.element_index import ElementSearchIndex, PLAN_CONTEXT_CHARS
+
+
+def _node(name, brief="", node_type="icon"):
+    return {"g_icon_name": name, "g_brief": brief, "type": node_type, "g_enabled": True,
+            "interactive": True, "bbox": [0, 0, 10, 10]}
+
+
+def _fdom(states=30, per_state=40):
+    data = {"states": {}, "edges": []}
+    for s in range(states):
+        state_id = "root" if s == 0 else f"root_menu_{s}"
+        data["states"][state_id] = {"nodes": {
+            f"H{n}": _node(f"Item {s}-{n}", "Opens a dialog with several options for the document " * 2)
+            for n in range(per_state)}}
+        if s:
+            data["edges"].append({"from": "root", "to": state_id, "action": f"click:H{s}"})
+    data["states"]["root"]["nodes"]["H900"] = _node("File", "Open the file menu", "menu")
+    data["states"]["root"]["nodes"]["H901"] = _node("Save", "Save the current document")
+    data["states"]["root_menu_3"]["nodes"]["H902"] = _node("Save As", "Save a copy under a new name")
+    return data
+
+
+def test_prefix_and_typo_matching():
+    index = ElementSearchIndex(_fdom(states=4, per_state=2))
+    assert index.search("sav")[0][0]["name"] in ("Save", "Save As")
+    assert index.search("fiel")[0][0]["name"] == "File"
+    assert index.search("file")[0][0]["name"] == "File"
+    assert index.search("xyzzy") == []
+
+
+def test_state_filter():
+    index = ElementSearchIndex(_fdom(states=4, per_state=2))
+    names = [e["name"] for e, _ in index.search("save", state_id="root_menu_3")]
+    assert names == ["Save As"]
+
+
+def test_planning_context_stays_within_budget():
+    index = ElementSearchIndex(_fdom())
+    for budget in (PLAN_CONTEXT_CHARS, 2000, 300):
+        context = index.planning_context("save the document as a new file", "root", budget=budget)
+        used = sum(len(context[k]) for k in ("current_elements", "navigation", "related_elements"))
+        assert used <= budget, (budget, used)
+    context = index.planning_context("save the document", "root")
+    assert "Save" in context["current_elements"].splitlines()[0]
+    assert "root_menu_3::H902" in context["related_elements"]
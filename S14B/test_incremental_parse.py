@@ -0,0 +1,55 @@
+"""
+Tests for utils/fdom/incremental_parse.py (re-parse planning after a click)
+Run with: pytest test_incremental_parse.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.fdom.incremental_parse import plan_incremental_parse
+
+SCREEN = (1920, 1080)
+
+
+def _box(x1, y1, x2, y2):
+    """(x, y, w, h) change box as VisualDiffer reports it"""
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+def test_highlight_of_one_element_reuses_it():
+    parent = {"H1": {"bbox": [100, 100, 140, 130]}, "H2": {"bbox": [1500, 900, 1600, 940]}}
+    # Hover highlight of H1 plus a new popup elsewhere
+    plan = plan_incremental_parse([_box(98, 98, 142, 132), _box(900, 300, 1200, 700)], SCREEN, parent)
+    assert plan["regions"] == [(900, 300, 1200, 700)]
+    assert plan["split"] is False
+    assert plan["reused_nodes"] == ["H1", "H2"]
+    # H1 sits in the unified change crop, so the new state inherits it instead of re-detecting it
+    assert plan["inherited_nodes"] == ["H1"]
+
+
+def test_popup_inside_large_panel_is_parsed():
+    parent = {
+        "PANEL": {"bbox": [0, 80, 1920, 1080]},      # full-window pane
+        "H1": {"bbox": [100, 100, 140, 130]},
+    }
+    popup = _box(800, 400, 1100, 650)
+    highlight = _box(98, 98, 142, 132)
+    plan = plan_incremental_parse([highlight, popup], SCREEN, parent)
+    assert (800, 400, 1100, 650) in plan["regions"]
+    assert "PANEL" not in plan["reused_nodes"]
+    assert "H1" in plan["inherited_nodes"]
+
+
+def test_no_surviving_region_falls_back_to_unified_crop():
+    parent = {"H1": {"bbox": [100, 100, 140, 130]}}
+    plan = plan_incremental_parse([_box(100, 100, 140, 130)], SCREEN, parent)
+    assert plan["regions"] == [plan["unified_region"]]
+    assert plan["inherited_nodes"] == []
+
+
+def test_no_changes():
+    plan = plan_incremental_parse([], SCREEN, {"H1": {"bbox": [0, 0, 10, 10]}})
+    assert plan["regions"] == []
+    assert plan["reanalysed_fraction"] == 0.0
@@ -15,7 +15,6 @@ from rich.progress import Progress
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 import io
-import json
 
 from .screenshot_manager import ScreenshotManager
 from .visual_differ import VisualDiffer
@@ -218,22 +217,10 @@ class AutoCaptioner:
                 enable_debug=False
             )
             
-            # Generate properly formatted seraphine images
-            result = generator.create_grouped_images(
-                image_path=dummy_image_path,
-                seraphine_analysis=seraphine_analysis,
-                filename_base="caption_analysis",
-                return_direct_images=True
-            )
-            
-            # 🔧 FIX: Check if any images have "combined" in the name
-            combined_images = [(img, filename) for img, filename in result['direct_images'] if "combined" in filename]
-            
-            if not combined_images:
-                return
-            
             # 🔥 USE SERAPHINE'S GEMINI ANALYZER
             from utils.seraphine_pipeline.gemini_analyzer import GeminiIconAnalyzer
+            from utils.seraphine_pipeline.gemini_integration import analyze_with_caption_cache
+            from utils.seraphine_pipeline.caption_cache import CaptionCache
             
             analyzer = GeminiIconAnalyzer(
                 prompt_path=None,  # Use default prompt
@@ -242,12 +229,15 @@ class AutoCaptioner:
                 save_results=False
             )
             
-            # Use only the combined images
-            gemini_results = await analyzer.analyze_grouped_images(
-                grouped_image_paths=None,
-                filename_base="caption_analysis",
-                direct_images=combined_images  # Only send combined images
+            # Generate seraphine images for uncached captions only and send those to Gemini
+            gemini_results = await analyze_with_caption_cache(
+                analyzer, generator, seraphine_analysis, dummy_image_path, "caption_analysis",
+                app_name=self.app_info["app_name"],
+                cache=CaptionCache.shared()
             )
+            cache_stats = gemini_results['caption_cache']
+            self.console.print(f"[cyan]🗃️ Caption cache: {cache_stats['hits']}/{cache_stats['crops']} captions cached "
+                               f"({cache_stats['hit_rate']:.0%}), {cache_stats['model_calls_saved']} Gemini calls saved[/cyan]")
             
             # 🔧 NEW: Process Gemini results and map back to original fdom IDs
             self._process_gemini_results(gemini_results, discovered_captions)
@@ -681,13 +671,9 @@ class AutoCaptioner:
     def _update_fdom_with_results(self) -> None:
         """Update fdom.json with gemini results and mark all nodes as processed"""
         try:
-            # Load current fdom
-            if not self.fdom_path.exists():
-                self.console.print("[red]❌ fdom.json not found![/red]")
-                return
-            
-            with open(self.fdom_path, 'r', encoding='utf-8') as f:
-                fdom_data = json.load(f)
+            # Edit the live fDOM; the store logs only the touched nodes
+            state_manager = self.element_interactor.state_manager
+            fdom_data = state_manager.fdom_data
             
             updates_made = 0
             gemini_updates_made = 0
@@ -731,14 +717,13 @@ class AutoCaptioner:
                         new_usage = gemini_result.get("usage", "")
                         if new_usage:
                             node_data["g_brief"] = new_usage  # Direct overwrite, no comma
+                    
+                    state_manager.store.touch_node(state_name, actual_node_id)
             
             # Save updated fdom
             if updates_made > 0:
-                with open(self.fdom_path, 'w', encoding='utf-8') as f:
-                    json.dump(fdom_data, f, indent=2, ensure_ascii=False)
-                
-                self.element_interactor.state_manager.fdom_data = fdom_data
-                self.element_interactor.state_manager._rebuild_tracking_sets()
+                state_manager.save_fdom_to_file()
+                state_manager._rebuild_tracking_sets()
                 self.console.print(f"[green]✅ Updated fdom.json - {updates_made} nodes marked as processed, {gemini_updates_made} got Gemini updates[/green]")
             
         except Exception as e:
@@ -749,12 +734,8 @@ class AutoCaptioner:
     def _is_node_already_processed(self, node_id: str) -> bool:
         """Check if node already has autocaptioning done"""
         try:
-            # Load current fdom
-            if not self.fdom_path.exists():
-                return False
-            
-            with open(self.fdom_path, 'r', encoding='utf-8') as f:
-                fdom_data = json.load(f)
+            # The in-memory fDOM is never behind fdom.json (all writes go through the store)
+            fdom_data = self.element_interactor.state_manager.fdom_data
             
             # Parse node ID
             if "::" in node_id:
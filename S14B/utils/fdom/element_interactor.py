@@ -28,6 +28,7 @@ import psutil
 
 # Import our framework modules
 from config_manager import ConfigManager
+from fdom_store import load_fdom
 from screen_manager import ScreenManager
 from app_controller import AppController
 from state_manager import StateManager
@@ -156,8 +157,7 @@ class ElementInteractor:
         
         if fdom_path.exists():
             try:
-                with open(fdom_path, 'r', encoding='utf-8') as f:
-                    existing_fdom = json.load(f)
+                existing_fdom = load_fdom(fdom_path)
                 
                 self.state_manager.fdom_data = existing_fdom
                 
@@ -194,7 +194,8 @@ class ElementInteractor:
         if not before_screenshot:
             return ClickResult(success=False, state_changed=False, error_message="Could not take before screenshot")
         
-        # PHASE 1: Navigation
+        # PHASE 1: Navigation (first check which known state is really on screen)
+        self.navigation_engine.localize(before_screenshot)
         target_state = self._find_node_state(node_id)
         original_state = self.current_state_id
         
@@ -341,18 +342,7 @@ class ElementInteractor:
 
     def _find_node_in_fdom(self, node_id: str) -> Optional[Dict]:
         """Find node data in fDOM - handles both state::node_id and old format"""
-        # NEW FORMAT: state::node_id
-        if "::" in node_id:
-            state_name, actual_node_id = node_id.split("::", 1)
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            return state_data.get("nodes", {}).get(actual_node_id)
-        
-        # OLD FORMAT: search all states (fallback)
-        for state_data in self.state_manager.fdom_data.get("states", {}).values():
-            nodes = state_data.get("nodes", {})
-            if node_id in nodes:
-                return nodes[node_id]
-        return None
+        return self.state_manager.store.find_node(node_id)
 
     def _get_current_window_position(self) -> Optional[Dict]:
         """Get current app window position on screen"""
@@ -382,20 +372,7 @@ class ElementInteractor:
 
     def _find_node_state(self, unique_node_id: str) -> Optional[str]:
         """Find which state contains the node - handle state::node_id format"""
-        # NEW FORMAT: state::node_id
-        if "::" in unique_node_id:
-            state_name, node_id = unique_node_id.split("::", 1)
-            # Verify the node exists in that state
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            if node_id in state_data.get("nodes", {}):
-                return state_name
-            return None
-        
-        # OLD FORMAT: search all states (fallback)
-        for state_id, state_data in self.state_manager.fdom_data.get("states", {}).items():
-            if unique_node_id in state_data.get("nodes", {}):
-                return state_id
-        return None
+        return self.state_manager.store.find_node_state(unique_node_id)
 
     # =====================================================================
     # INTERACTIVE MODE (Delegate to InteractiveCLI)
@@ -0,0 +1,231 @@
+"""
+ExplorationScheduler - ordered pending-node selection for fDOM exploration
+Pending nodes sit in one priority queue per state. The next node comes from the
+state that is cheapest to reach from the current one (backtracking up the state
+tree costs more than a forward click), and within a state the most likely
+interactive element goes first, so each state is drained before moving on.
+
+Replay on recorded graphs (run from S14B):
+    python -m utils.fdom.exploration_scheduler apps/*/fdom.json
+"""
+import heapq
+import json
+import random
+import sys
+from itertools import count
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BACKTRACK_WEIGHT = 2.0   # leaving a state (ESC/close/click-outside) vs one forward click
+
+# Rough odds that clicking an element does something, by detector type
+TYPE_INTERACTIVITY = {"icon": 0.8, "text": 0.5}
+DEFAULT_INTERACTIVITY = 0.6
+
+
+def split_node_ref(node_ref: str) -> Tuple[str, str]:
+    """'state::node' -> (state, node); bare ids belong to root"""
+    if "::" in node_ref:
+        state_id, node_id = node_ref.split("::", 1)
+        return state_id, node_id
+    return "root", node_ref
+
+
+def estimate_interactivity(node_data: Dict) -> float:
+    """0..1 guess of whether clicking the node changes anything"""
+    if not node_data.get("g_enabled", True):
+        return 0.05
+    if not node_data.get("g_interactive", True):
+        return 0.2
+    score = TYPE_INTERACTIVITY.get(node_data.get("type"), DEFAULT_INTERACTIVITY)
+    if (node_data.get("g_icon_name") or "").lower() == "unanalyzed":
+        score *= 0.5
+    return score
+
+
+class ExplorationScheduler:
+    """Priority queue of pending "state::node" ids ordered by state locality and interactivity"""
+
+    def __init__(self, fdom_data: Dict, backtrack_weight: float = BACKTRACK_WEIGHT):
+        self.fdom_data = fdom_data
+        self.backtrack_weight = backtrack_weight
+        self._queues: Dict[str, List[Tuple[float, int, str]]] = {}
+        self._queued: set = set()
+        self._seq = count()
+        self._chains: Dict[str, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    def __contains__(self, node_ref: str) -> bool:
+        return node_ref in self._queued
+
+    # ---------- queue maintenance ----------
+
+    def add(self, node_ref: str) -> None:
+        if node_ref in self._queued:
+            return
+        state_id, node_id = split_node_ref(node_ref)
+        node_data = self.fdom_data.get("states", {}).get(state_id, {}).get("nodes", {}).get(node_id, {})
+        heapq.heappush(self._queues.setdefault(state_id, []),
+                       (-estimate_interactivity(node_data), next(self._seq), node_ref))
+        self._queued.add(node_ref)
+
+    def discard(self, node_ref: str) -> None:
+        self._queued.discard(node_ref)  # heap entry is dropped lazily
+
+    def sync(self, pending: Iterable[str]) -> None:
+        """Match the queue to a pending set that other code edits directly"""
+        pending = pending if isinstance(pending, (set, frozenset)) else set(pending)
+        for node_ref in self._queued - pending:
+            self.discard(node_ref)
+        for node_ref in pending:
+            self.add(node_ref)  # iteration order of new refs only breaks interactivity ties
+
+    def _head(self, state_id: str) -> Optional[Tuple[float, int, str]]:
+        queue = self._queues.get(state_id)
+        while queue and queue[0][2] not in self._queued:
+            heapq.heappop(queue)
+        if not queue:
+            self._queues.pop(state_id, None)
+            return None
+        return queue[0]
+
+    # ---------- navigation cost ----------
+
+    def _chain(self, state_id: str) -> Tuple[str, ...]:
+        """root ... state_id along parent links (cached; parents never change)"""
+        chain = self._chains.get(state_id)
+        if chain is None:
+            states = self.fdom_data.get("states", {})
+            path, seen, current = [], set(), state_id
+            while current and current not in seen:
+                seen.add(current)
+                path.append(current)
+                current = states.get(current, {}).get("parent") or ("root" if current != "root" else None)
+            chain = self._chains[state_id] = tuple(reversed(path))
+        return chain
+
+    def hops(self, from_state: str, to_state: str) -> Tuple[int, int]:
+        """(backtracks up, forward clicks down) to get from one state to another"""
+        if from_state == to_state:
+            return 0, 0
+        a, b = self._chain(from_state), self._chain(to_state)
+        common = 0
+        while common < min(len(a), len(b)) and a[common] == b[common]:
+            common += 1
+        return len(a) - common, len(b) - common
+
+    def transitions(self, from_state: str, to_state: str) -> int:
+        return sum(self.hops(from_state, to_state))
+
+    def cost(self, from_state: str, to_state: str) -> float:
+        up, down = self.hops(from_state, to_state)
+        return up * self.backtrack_weight + down
+
+    # ---------- selection ----------
+
+    def _best(self, current_state: str) -> Optional[Tuple[float, float, int, str]]:
+        best = None
+        for state_id in list(self._queues):
+            head = self._head(state_id)
+            if head is None:
+                continue
+            candidate = (self.cost(current_state, state_id),) + head
+            if best is None or candidate < best:
+                best = candidate
+        return best
+
+    def next(self, current_state: str = "root") -> Optional[str]:
+        """Best pending node from current_state, without removing it"""
+        best = self._best(current_state)
+        return best[-1] if best else None
+
+    def pop(self, current_state: str = "root") -> Optional[str]:
+        node_ref = self.next(current_state)
+        if node_ref:
+            self.discard(node_ref)
+        return node_ref
+
+    def ordered(self, current_state: str = "root") -> List[str]:
+        """All pending nodes, cheapest state first (for lists shown to the user)"""
+        entries = [entry for queue in self._queues.values() for entry in queue if entry[2] in self._queued]
+        return [node_ref for *_, node_ref in
+                sorted((self.cost(current_state, split_node_ref(e[2])[0]),) + e for e in entries)]
+
+
+# ---------- replay on recorded fDOM graphs ----------
+
+def _click_targets(fdom_data: Dict) -> Dict[Tuple[str, str], str]:
+    """(state, node) -> state its click opened, from the recorded edges"""
+    targets = {}
+    for edge in fdom_data.get("edges", []):
+        action = edge.get("action", "")
+        if edge.get("from") and edge.get("to") and action.startswith("click:"):
+            _, node_id = split_node_ref(action.split(":", 1)[1])
+            targets.setdefault((edge["from"], node_id), edge["to"])
+    return targets
+
+
+def replay(fdom_data: Dict, strategy: str = "scheduled", seed: int = 0) -> Dict:
+    """
+    Re-explore a recorded fDOM and count state transitions
+
+    Starts at root with root's nodes pending; clicking a node that opened a state
+    in the recording enters it and backtracks (2 transitions) and makes its nodes
+    pending, as the explorer does. strategy is "scheduled", "arbitrary" (set-order
+    stand-in: seeded shuffle of the pending set) or "discovery" (sorted states).
+    """
+    states = fdom_data.get("states", {})
+    targets = _click_targets(fdom_data)
+    scheduler = ExplorationScheduler(fdom_data)
+    rng = random.Random(seed)
+    pending = {f"root::{n}" for n in states.get("root", {}).get("nodes", {})}
+    current, explored, transitions, seen_states = "root", 0, 0, {"root"}
+
+    while pending:
+        if strategy == "scheduled":
+            scheduler.sync(pending)
+            node_ref = scheduler.pop(current)
+        elif strategy == "discovery":
+            node_ref = min(pending, key=lambda ref: (split_node_ref(ref)[0], ref))
+        else:
+            node_ref = rng.choice(sorted(pending))
+        pending.discard(node_ref)
+
+        state_id, node_id = split_node_ref(node_ref)
+        transitions += scheduler.transitions(current, state_id)
+        current = state_id
+        explored += 1
+
+        opened = targets.get((state_id, node_id))
+        if opened and opened in states:
+            transitions += 2  # into the new state and back again
+            if opened not in seen_states:
+                seen_states.add(opened)
+                pending.update(f"{opened}::{n}" for n in states[opened].get("nodes", {}))
+
+    return {
+        "strategy": strategy,
+        "nodes": explored,
+        "states": len(seen_states),
+        "transitions": transitions,
+        "transitions_per_node": transitions / explored if explored else 0.0,
+    }
+
+
+def main(paths: List[str]):
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            fdom_data = json.load(f)
+        arbitrary = [replay(fdom_data, "arbitrary", seed) for seed in range(5)]
+        discovery = replay(fdom_data, "discovery")
+        scheduled = replay(fdom_data, "scheduled")
+        before = sum(r["transitions_per_node"] for r in arbitrary) / len(arbitrary)
+        print(f"{path}: {scheduled['nodes']} nodes, {scheduled['states']} states")
+        print(f"  arbitrary (set order, 5 seeds): {before:.2f} transitions/node")
+        print(f"  discovery (sorted states):      {discovery['transitions_per_node']:.2f} transitions/node")
+        print(f"  scheduled:                      {scheduled['transitions_per_node']:.2f} transitions/node")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
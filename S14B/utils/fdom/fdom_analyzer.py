@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 import argparse
-import json
 from collections import Counter, defaultdict
 from pathlib import Path
 
-def load_fdom(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+try:
+    from .fdom_store import load_fdom  # replays fdom.changes.jsonl on top of fdom.json
+except ImportError:
+    from fdom_store import load_fdom   # run as a script from utils/fdom
 
 def node_signature(node):
     # Use a tuple of key fields to identify duplicates (customize as needed)
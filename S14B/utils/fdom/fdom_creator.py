@@ -2,7 +2,6 @@
 FDOMCreator - Main orchestrator for the fDOM Framework
 Integrates all modules into a single cohesive exploration service
 """
-import json
 import argparse
 from pathlib import Path
 from typing import Dict, Optional
@@ -16,6 +15,7 @@ from screen_manager import ScreenManager
 from app_controller import AppController
 from state_manager import StateManager
 from element_interactor import ElementInteractor
+from fdom_store import load_fdom
 
 class FDOMCreator:
     """
@@ -142,8 +142,7 @@ class FDOMCreator:
         fdom_file = self.apps_base_dir / self.current_app_name / "fdom.json"
         if fdom_file.exists():
             try:
-                with open(fdom_file, 'r', encoding='utf-8') as f:
-                    existing_fdom = json.load(f)
+                existing_fdom = load_fdom(fdom_file)
                 
                 self.state_manager.fdom_data = existing_fdom
                 self.state_manager._rebuild_tracking_sets()
@@ -224,6 +223,9 @@ class FDOMCreator:
             else:
                 self.console.print(f"[red]❌ {next_node}: Failed - {click_result.error_message}[/red]")
         
+        # Fold the session's change log into fdom.json for readers that only load the snapshot
+        self.state_manager.save_fdom_to_file(compact=True)
+        
         return {"nodes_explored": len(exploration_results), "results": exploration_results}
 
     def _interactive_node_selection(self) -> Optional[str]:
@@ -236,9 +238,11 @@ class FDOMCreator:
             self.console.print("[green]✅ No pending nodes - all explored![/green]")
             return None
         
-        # Collect all pending nodes with details
+        # Collect all pending nodes with details, cheapest to reach from the current state first
+        scheduler = self.state_manager.scheduler
+        scheduler.sync(self.state_manager.pending_nodes)
         pending_list = []
-        for node_id in sorted(self.state_manager.pending_nodes):
+        for node_id in scheduler.ordered(self.element_interactor.current_state_id):
             node_data = self._find_node_in_fdom(node_id)
             if node_data:
                 state_id = self._find_node_state(node_id)
@@ -324,51 +328,30 @@ class FDOMCreator:
         self.console.print(f"[blue]📝 {node_id}: Skipped - '{custom_description}'[/blue]")
 
     def _find_node_in_fdom(self, unique_node_id: str) -> Optional[Dict]:
-        """Find node data using state::node_id format"""
-        if "::" in unique_node_id:
-            state_name, node_id = unique_node_id.split("::", 1)
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            return state_data.get("nodes", {}).get(node_id)
-        
-        # Fallback for old format
-        return self._find_node_in_fdom_old(unique_node_id)
+        """Find node data using state::node_id format (bare ids fall back to their first state)"""
+        return self.state_manager.store.find_node(unique_node_id)
 
     def _find_node_state(self, unique_node_id: str) -> Optional[str]:
         """Find which state contains the node - handle state::node_id format"""
-        if "::" in unique_node_id:
-            state_name, node_id = unique_node_id.split("::", 1)
-            # Verify the node exists in that state
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            if node_id in state_data.get("nodes", {}):
-                return state_name
-            return None
-        
-        # Fallback for old format
-        for state_id, state_data in self.state_manager.fdom_data.get("states", {}).items():
-            if unique_node_id in state_data.get("nodes", {}):
-                return state_id
-        return None
+        return self.state_manager.store.find_node_state(unique_node_id)
 
 
     def _add_manual_description(self, node_id: str, description: str) -> None:
         """Add manual description to a node"""
-        for state_id, state_data in self.state_manager.fdom_data["states"].items():
-            if node_id in state_data.get("nodes", {}):
-                node = state_data["nodes"][node_id]
-                node["status"] = "manual_skip"
-                if "interactivity" not in node:
-                    node["interactivity"] = {}
-                node["interactivity"]["manual_description"] = description
-                node["interactivity"]["type"] = "manual_skip"
-                break
+        location = self.state_manager.store.resolve(node_id)
+        if location:
+            self.state_manager.store.update_node(
+                *location,
+                status="manual_skip",
+                interactivity={"manual_description": description, "type": "manual_skip"}
+            )
 
     def _force_reload_fdom_from_file(self) -> None:
         """Force reload fDOM data from JSON file to ensure latest state"""
         try:
             fdom_file = self.apps_base_dir / self.current_app_name / "fdom.json"
             if fdom_file.exists():
-                with open(fdom_file, 'r', encoding='utf-8') as f:
-                    latest_fdom = json.load(f)
+                latest_fdom = load_fdom(fdom_file)
                 
                 # Replace in-memory data with latest from file
                 self.state_manager.fdom_data = latest_fdom
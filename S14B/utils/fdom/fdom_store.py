@@ -0,0 +1,269 @@
+"""
+FDOMStore - indexed, incrementally persisted fDOM graph for fDOM Framework
+Keeps node->state and state->edges indexes next to the fdom_data dict, memoizes
+shortest navigation paths until the edge set changes, and persists changes as an
+append-only log next to fdom.json that is periodically compacted into it.
+"""
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+COMPACT_EVERY = 200          # logged changes before fdom.json is rewritten in full
+COMPACT_LOG_RATIO = 0.5      # ...or once the log is this large relative to fdom.json
+GENERATION_KEY = "store_generation"
+
+
+def log_path_for(fdom_path) -> Path:
+    """fdom.json -> fdom.changes.jsonl"""
+    fdom_path = Path(fdom_path)
+    return fdom_path.with_name(f"{fdom_path.stem}.changes.jsonl")
+
+
+def _apply_change(data: Dict, change: Dict) -> None:
+    op = change.get("op")
+    if op == "state":
+        data.setdefault("states", {})[change["state"]] = change["value"]
+    elif op == "node":
+        state = data.setdefault("states", {}).setdefault(change["state"], {"nodes": {}})
+        state.setdefault("nodes", {})[change["node"]] = change["value"]
+    elif op == "edge":
+        data.setdefault("edges", []).append(change["value"])
+    elif op == "meta":
+        data.update(change["value"])
+
+
+def load_fdom(fdom_path) -> Dict:
+    """Read fdom.json and replay the change log written since its last compaction"""
+    with open(fdom_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    generation = data.get(GENERATION_KEY)
+    log_path = log_path_for(fdom_path)
+    if generation is None or not log_path.exists():
+        return data  # written without the store (or nothing logged): the file is authoritative
+
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                change = json.loads(line)
+            except ValueError:
+                break  # torn final line from an interrupted append
+            if change.get("g") == generation:
+                _apply_change(data, change)
+    return data
+
+
+class FDOMStore:
+    """
+    Indexes and persistence for one app's fdom_data
+
+    The dict stays the single source of truth (callers still read it directly);
+    mutations made through the store keep the indexes and the change log current.
+    """
+
+    def __init__(self, data: Dict, path, compact_every: int = COMPACT_EVERY):
+        self.path = Path(path)
+        self.log_path = log_path_for(self.path)
+        self.compact_every = compact_every
+        self.rebind(data)
+
+    # ---------- binding / indexes ----------
+
+    def rebind(self, data: Dict) -> None:
+        """Point the store at a new fdom_data dict (e.g. reloaded from disk)"""
+        self.data = data
+        self.data.setdefault("states", {})
+        self.data.setdefault("edges", [])
+        self._dirty_states: Dict[str, None] = {}
+        self._dirty_nodes: Dict[Tuple[str, str], None] = {}
+        self._new_edges: List[Dict] = []
+        self._logged = 0
+        # Data the store never wrote (new session, pre-store fdom.json) has no generation
+        # for log lines to refer to, so its first save writes the full file
+        self._needs_compaction = GENERATION_KEY not in data
+        self._reindex()
+
+    def _signature(self) -> Tuple:
+        states, edges = self.data.get("states", {}), self.data.get("edges", [])
+        return id(states), len(states), id(edges), len(edges)
+
+    def _reindex(self) -> None:
+        self._node_states: Dict[str, List[str]] = {}
+        for state_id, state_data in self.data.get("states", {}).items():
+            for node_id in state_data.get("nodes", {}):
+                self._node_states.setdefault(node_id, []).append(state_id)
+
+        self._out: Dict[str, List[str]] = {}
+        self._edge_by_pair: Dict[Tuple[str, str], Dict] = {}
+        for edge in self.data.get("edges", []):
+            self._index_edge(edge)
+
+        self._bfs_parents: Dict[str, Dict[str, Optional[str]]] = {}
+        self._indexed = self._signature()
+
+    def _index_edge(self, edge: Dict) -> bool:
+        """Add one edge to the indexes; True if it connects a new state pair"""
+        from_state, to_state = edge.get("from"), edge.get("to")
+        if not (from_state and to_state):
+            return False
+        self._out.setdefault(from_state, []).append(to_state)
+        if (from_state, to_state) in self._edge_by_pair:
+            return False
+        self._edge_by_pair[(from_state, to_state)] = edge  # first edge wins, as in a linear scan
+        return True
+
+    def _fresh(self) -> None:
+        # States/edges added by code that bypasses the store: rebuild rather than go stale
+        if self._signature() != self._indexed:
+            self._reindex()
+
+    # ---------- lookups ----------
+
+    def resolve(self, node_ref: str) -> Optional[Tuple[str, str]]:
+        """'state::node' or bare node id -> (state_id, node_id) of an existing node"""
+        self._fresh()
+        if "::" in node_ref:
+            state_id, node_id = node_ref.split("::", 1)
+            if node_id in self.data["states"].get(state_id, {}).get("nodes", {}):
+                return state_id, node_id
+            return None
+        states = self._node_states.get(node_ref)
+        return (states[0], node_ref) if states else None
+
+    def find_node(self, node_ref: str) -> Optional[Dict]:
+        location = self.resolve(node_ref)
+        if not location:
+            return None
+        state_id, node_id = location
+        return self.data["states"][state_id]["nodes"][node_id]
+
+    def find_node_state(self, node_ref: str) -> Optional[str]:
+        location = self.resolve(node_ref)
+        return location[0] if location else None
+
+    def edge_between(self, from_state: str, to_state: str) -> Optional[Dict]:
+        self._fresh()
+        return self._edge_by_pair.get((from_state, to_state))
+
+    def edges_from(self, state_id: str) -> List[Dict]:
+        self._fresh()
+        return [self._edge_by_pair[(state_id, to)] for to in dict.fromkeys(self._out.get(state_id, []))]
+
+    def shortest_path(self, start_state: str, target_state: str) -> List[str]:
+        """Fewest-hop state path (BFS in edge order), memoized per start state"""
+        if start_state == target_state:
+            return [start_state]
+        self._fresh()
+        parents = self._bfs_parents.get(start_state)
+        if parents is None:
+            parents = {start_state: None}
+            queue = deque([start_state])
+            while queue:
+                current = queue.popleft()
+                for neighbor in self._out.get(current, []):
+                    if neighbor not in parents:
+                        parents[neighbor] = current
+                        queue.append(neighbor)
+            self._bfs_parents[start_state] = parents
+
+        if target_state not in parents:
+            return []
+        path = [target_state]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        return path[::-1]
+
+    # ---------- mutations ----------
+
+    def add_state(self, state_id: str, state_data: Dict) -> None:
+        self._fresh()
+        self.data["states"][state_id] = state_data
+        for node_id in state_data.get("nodes", {}):
+            self._node_states.setdefault(node_id, []).append(state_id)
+        self._indexed = self._signature()
+        self._dirty_states[state_id] = None
+
+    def add_edge(self, edge: Dict) -> None:
+        self._fresh()
+        self.data["edges"].append(edge)
+        if self._index_edge(edge):
+            self._bfs_parents.clear()  # reachability changed
+        self._indexed = self._signature()
+        self._new_edges.append(edge)
+
+    def update_node(self, state_id: str, node_id: str, interactivity: Optional[Dict] = None, **fields) -> Optional[Dict]:
+        """Set node fields (and merge interactivity keys) and log the node"""
+        node = self.data["states"].get(state_id, {}).get("nodes", {}).get(node_id)
+        if node is None:
+            return None
+        node.update(fields)
+        if interactivity:
+            node.setdefault("interactivity", {}).update(interactivity)
+        self.touch_node(state_id, node_id)
+        return node
+
+    def touch_node(self, state_id: str, node_id: str) -> None:
+        """Log a node that was edited in place"""
+        self._dirty_nodes[(state_id, node_id)] = None
+
+    def touch_state(self, state_id: str) -> None:
+        """Log a state whose own fields (not just nodes) were edited in place"""
+        self._fresh()
+        self._dirty_states[state_id] = None
+
+    # ---------- persistence ----------
+
+    def _pending_changes(self, generation: int) -> List[Dict]:
+        states = self.data["states"]
+        changes = [{"g": generation, "op": "state", "state": s, "value": states[s]}
+                   for s in self._dirty_states if s in states]
+        changes += [{"g": generation, "op": "node", "state": s, "node": n, "value": states[s]["nodes"][n]}
+                    for s, n in self._dirty_nodes
+                    if s not in self._dirty_states and n in states.get(s, {}).get("nodes", {})]
+        changes += [{"g": generation, "op": "edge", "value": edge} for edge in self._new_edges]
+        meta = {k: v for k, v in self.data.items() if k not in ("states", "edges")}
+        changes.append({"g": generation, "op": "meta", "value": meta})
+        return changes
+
+    def _clear_pending(self) -> None:
+        self._dirty_states.clear()
+        self._dirty_nodes.clear()
+        self._new_edges.clear()
+
+    def save(self, compact: bool = False) -> str:
+        """Append pending changes to the log, or rewrite fdom.json when compaction is due"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if compact or self._needs_compaction or self._compaction_due():
+            return self.compact()
+
+        changes = self._pending_changes(self.data.get(GENERATION_KEY, 0))
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(c, ensure_ascii=False) + "\n" for c in changes))
+        self._logged += len(changes)
+        self._clear_pending()
+        return str(self.path)
+
+    def _compaction_due(self) -> bool:
+        if self._logged >= self.compact_every:
+            return True
+        try:
+            return os.path.getsize(self.log_path) > COMPACT_LOG_RATIO * os.path.getsize(self.path)
+        except OSError:
+            return False
+
+    def compact(self) -> str:
+        """Write the full document under a new generation and drop the log"""
+        self.data[GENERATION_KEY] = self.data.get(GENERATION_KEY, 0) + 1
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        # Log lines left over from a crash here carry the old generation and are ignored
+        with open(self.log_path, 'w', encoding='utf-8'):
+            pass
+        self._logged = 0
+        self._needs_compaction = False
+        self._clear_pending()
+        return str(self.path)
@@ -0,0 +1,123 @@
+"""
+Incremental re-parse planning for fDOM state exploration
+Decides which changed regions of an after-click screenshot need a fresh Seraphine
+pass and which parent-state nodes are unchanged and can be reused as-is.
+Pure geometry (no OpenCV), so it is cheap to call on every exploration step.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+Box = Tuple[int, int, int, int]  # x1, y1, x2, y2
+
+REGION_MERGE_GAP = 40     # px; change boxes closer than this are parsed as one region
+OWNER_TOLERANCE = 12      # px; dilation slack when a change sits inside one parent element
+MIN_SPLIT_SAVING = 0.3    # parse regions separately only if that skips >=30% of the unified crop
+OWNER_MIN_COVERAGE = 0.5  # a change only counts as its owner re-rendering if it covers >=50% of it
+
+
+def _area(box: Box) -> int:
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+
+def _union(boxes: Iterable[Box]) -> Box:
+    boxes = list(boxes)
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def _near(a: Box, b: Box, gap: int) -> bool:
+    return (a[0] - gap <= b[2] and b[0] - gap <= a[2] and
+            a[1] - gap <= b[3] and b[1] - gap <= a[3])
+
+
+def _inside(box: Box, bbox: List[int], tolerance: int) -> bool:
+    return (box[0] >= bbox[0] - tolerance and box[1] >= bbox[1] - tolerance and
+            box[2] <= bbox[2] + tolerance and box[3] <= bbox[3] + tolerance)
+
+
+def _owned_by(box: Box, bbox: List[int]) -> bool:
+    """Change is one element re-rendering: inside it and covering most of it (not a container)"""
+    return _inside(box, bbox, OWNER_TOLERANCE) and _area(box) >= OWNER_MIN_COVERAGE * _area(tuple(bbox))
+
+
+def _overlaps(a: Box, bbox: List[int]) -> bool:
+    return a[0] < bbox[2] and bbox[0] < a[2] and a[1] < bbox[3] and bbox[1] < a[3]
+
+
+def merge_change_boxes(boxes: List[Box], gap: int = REGION_MERGE_GAP) -> List[Box]:
+    """Merge change boxes that touch or lie within `gap` px of each other"""
+    regions = list(boxes)
+    merged = True
+    while merged:
+        merged = False
+        out: List[Box] = []
+        for box in regions:
+            for i, region in enumerate(out):
+                if _near(region, box, gap):
+                    out[i] = _union((region, box))
+                    merged = True
+                    break
+            else:
+                out.append(box)
+        regions = out
+    return sorted(regions, key=lambda b: (b[1], b[0]))
+
+
+def plan_incremental_parse(change_boxes: List[Tuple[int, int, int, int]],
+                           image_size: Tuple[int, int],
+                           parent_nodes: Dict[str, Dict]) -> Dict:
+    """
+    Plan the re-parse of an after-click screenshot
+
+    Args:
+        change_boxes: (x, y, w, h) boxes from VisualDiffer.extract_change_regions
+        image_size: (width, height) of the screenshot
+        parent_nodes: nodes of the state the click was made in (full-screen bboxes)
+
+    Returns:
+        regions: (x1, y1, x2, y2) regions that need a Seraphine pass
+        split: True when regions should be parsed one by one instead of as one crop
+        reused_nodes: parent node ids whose pixels were not re-analysed
+        inherited_nodes: reused ids inside the unified change crop, i.e. nodes a
+            unified-crop parse would have detected again; the new state copies them
+        unified_region: (x1, y1, x2, y2) union of all change boxes
+        reanalysed_fraction: share of screenshot pixels sent to Seraphine
+    """
+    width, height = image_size
+    total_pixels = max(1, width * height)
+    boxes = [(x, y, x + w, y + h) for x, y, w, h in change_boxes]
+    if not boxes:
+        return {"regions": [], "split": False, "reused_nodes": sorted(parent_nodes),
+                "inherited_nodes": [], "unified_region": None, "reanalysed_fraction": 0.0}
+
+    unified = _union(boxes)
+    located = {nid: node.get("bbox", []) for nid, node in parent_nodes.items()}
+    located = {nid: bbox for nid, bbox in located.items() if len(bbox) == 4}
+
+    regions = []
+    for region in merge_change_boxes(boxes):
+        # A change confined to one existing element (hover/pressed highlight, checkbox
+        # toggle) is that element re-rendering, not new UI: keep the parent's node.
+        # Small changes inside a large container (popup over a panel) are still parsed
+        if any(_owned_by(region, bbox) for bbox in located.values()):
+            continue
+        regions.append(region)
+
+    if not regions:
+        # Nothing outside known elements changed; parse the unified crop as before
+        regions = [unified]
+
+    split = len(regions) > 1
+    if split and sum(_area(r) for r in regions) > (1 - MIN_SPLIT_SAVING) * _area(_union(regions)):
+        # Regions cover most of their bounding box anyway: one Seraphine call is cheaper
+        regions, split = [_union(regions)], False
+
+    reused = [nid for nid, bbox in located.items()
+              if not any(_overlaps(r, bbox) for r in regions)]
+    return {
+        "regions": regions,
+        "split": split,
+        "reused_nodes": sorted(reused),
+        "inherited_nodes": sorted(nid for nid in reused if _overlaps(unified, located[nid])),
+        "unified_region": unified,
+        "reanalysed_fraction": sum(_area(r) for r in regions) / total_pixels,
+    }
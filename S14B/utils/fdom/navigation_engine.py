@@ -5,6 +5,7 @@ from rich.console import Console
 from pathlib import Path
 
 from .interaction_types import BacktrackStrategy
+from .state_index import StateRecognitionIndex
 
 
 class NavigationEngine:
@@ -18,6 +19,8 @@ class NavigationEngine:
         self.console = Console()
         # ✅ Track navigation chain for backtracking
         self.navigation_chain = []  # [C1, C2, C3] in order of clicking
+        # Visual fingerprints of known states, to tell where we are after any action
+        self.state_index = StateRecognitionIndex(visual_differ)
     
     def navigate_to_state(self, target_state: str, current_state: str) -> bool:
         """Enhanced navigation with MULTI-HOP support"""
@@ -54,51 +57,13 @@ class NavigationEngine:
         return True
     
     def _find_navigation_path(self, start_state: str, target_state: str) -> List[str]:
-        """Find shortest path between states using BFS"""
-        if start_state == target_state:
-            return [start_state]
-        
-        # Build graph from edges
-        graph = {}
-        edges = self.state_manager.fdom_data.get("edges", [])
-        
-        for edge in edges:
-            from_state = edge.get("from")
-            to_state = edge.get("to")
-            if from_state and to_state:
-                if from_state not in graph:
-                    graph[from_state] = []
-                graph[from_state].append(to_state)
-        
-        # BFS to find shortest path
-        from collections import deque
-        
-        queue = deque([(start_state, [start_state])])
-        visited = {start_state}
-        
-        while queue:
-            current_state, path = queue.popleft()
-            
-            if current_state == target_state:
-                return path
-            
-            for neighbor in graph.get(current_state, []):
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append((neighbor, path + [neighbor]))
-        
-        return []  # No path found
+        """Find shortest path between states using BFS (memoized in the fDOM store until edges change)"""
+        return self.state_manager.store.shortest_path(start_state, target_state)
     
     def _execute_single_hop(self, from_state: str, to_state: str) -> bool:
         """Execute single navigation hop (original logic)"""
         # Find the edge that leads to to_state
-        edges = self.state_manager.fdom_data.get("edges", [])
-        target_edge = None
-        
-        for edge in edges:
-            if edge.get("from") == from_state and edge.get("to") == to_state:
-                target_edge = edge
-                break
+        target_edge = self.state_manager.store.edge_between(from_state, to_state)
         
         if not target_edge:
             self.console.print(f"[red]❌ No edge found: {from_state} → {to_state}[/red]")
@@ -153,6 +118,40 @@ class NavigationEngine:
             self.console.print(f"[red]❌ Single hop failed: {click_result.error_message}[/red]")
             return False
     
+    def localize(self, screenshot: Optional[str] = None) -> Optional[str]:
+        """Identify the fDOM state on screen and make it the current state (None if unrecognised)"""
+        self.state_index.sync(self.state_manager.store)
+        if not len(self.state_index):
+            return None
+        if screenshot is None:
+            screenshot = self.element_interactor.screenshot_manager.take_screenshot("localize")
+        match = self.state_index.identify(screenshot)
+        if not match:
+            self.console.print(f"[dim]🧭 Localization: screen not recognised among {len(self.state_index)} states[/dim]")
+            return None
+        
+        state_id, rms = match
+        if state_id != self.element_interactor.current_state_id:
+            self.console.print(f"[cyan]🧭 Localized: {state_id} (was tracking {self.element_interactor.current_state_id}, Δ{rms:.1f})[/cyan]")
+        self.element_interactor.current_state_id = state_id
+        return state_id
+    
+    def _recover_by_localization(self, target_state: str, screenshot: Optional[str] = None,
+                                 unknown_ok: bool = False) -> bool:
+        """Localize, then take the shortest known path from there to target_state"""
+        located = self.localize(screenshot)
+        if located is None:
+            return unknown_ok
+        if located == target_state:
+            return True
+        
+        path = self._find_navigation_path(located, target_state)
+        if not path:
+            self.console.print(f"[yellow]⚠️ No known path from {located} to {target_state}[/yellow]")
+            return False
+        self.console.print(f"[cyan]🗺️ Recovery path: {' → '.join(path)}[/cyan]")
+        return self.navigate_to_state(target_state, located)
+    
     def navigate_back_to_state(self, target_state_id: str, failure_reference_screenshot: str = None) -> bool:
         """NATURAL BACKTRACKING: 4-step strategy based on visual cues"""
         
@@ -620,6 +619,7 @@ class NavigationEngine:
             
             # Save the strategy
             state_data["exit_strategies"][to_state] = strategy
+            self.state_manager.store.touch_state(from_state)
             
             # Save to file
             self.state_manager.save_fdom_to_file()
@@ -640,24 +640,22 @@ class NavigationEngine:
             root_image = root_state_data.get("image")
             
             if root_image and Path(root_image).exists():
-                hash1 = self.visual_differ.calculate_image_hash(verification_screenshot)
-                hash2 = self.visual_differ.calculate_image_hash(root_image)
-                
-                if hash1 == hash2:
+                # Near-identical counts (cursor blink, hover highlight); an exact hash never matched
+                if self.visual_differ.match_screen(verification_screenshot, [("root_state", root_image)], 99.0):
                     self.console.print(f"[green]✅ Backtrack verification: Successfully reached {target_state_id}[/green]")
                     self.element_interactor.current_state_id = target_state_id
                     return True
                 else:
                     self.console.print(f"[yellow]⚠️ Backtrack verification: State mismatch for {target_state_id}[/yellow]")
-                    return False
+                    return self._recover_by_localization(target_state_id, verification_screenshot)
             else:
                 # Fallback for missing root image
                 self.console.print(f"[yellow]⚠️ Backtrack verification: No reference image for {target_state_id}[/yellow]")
                 self.element_interactor.current_state_id = target_state_id
                 return True
         
-        # For other states, similar comparison
-        return True
+        # For other states: trust the action unless the screen is recognisably another state
+        return self._recover_by_localization(target_state_id, verification_screenshot, unknown_ok=True)
     
     def smart_backtrack_to_state(self, target_state: str, reference_screenshot: str) -> bool:
         """Smart backtracking with ESSENTIAL first check"""
@@ -666,22 +664,14 @@ class NavigationEngine:
         self.console.print(f"[dim]📸 Reference screenshot: {reference_screenshot}[/dim]")
         
         # ✅ STEP 0: Are we ALREADY in the target state? (MOST IMPORTANT CHECK!)
-        target_state_screenshot = self._get_target_state_screenshot(target_state)
-        if target_state_screenshot:
-            current_screenshot = self.element_interactor.screenshot_manager.take_screenshot("backtrack_current_check")
-            current_similarity = self.visual_differ.calculate_similarity_percentage(
-                current_screenshot, target_state_screenshot)
-        else:
-            # Fallback logic
-            current_similarity = 0.0
-        
-        self.console.print(f"[cyan]🎯 STEP 0: Current vs target similarity: {current_similarity}%[/cyan]")
-        
-        if current_similarity >= 99.9:
-            self.console.print(f"[green]✅ ALREADY IN TARGET STATE! No backtracking needed ({current_similarity}%)[/green]")
+        # Recognise the current screen among all known states; from there a known
+        # forward path may reach the target without any exit strategy
+        current_screenshot = self.element_interactor.screenshot_manager.take_screenshot("backtrack_current_check")
+        if self._recover_by_localization(target_state, current_screenshot):
+            self.console.print(f"[green]✅ IN TARGET STATE via localization! No backtracking needed[/green]")
             return True
         
-        self.console.print(f"[yellow]⚠️ Need to backtrack: {current_similarity}% < 99.9%[/yellow]")
+        self.console.print(f"[yellow]⚠️ Need to backtrack from {self.element_interactor.current_state_id}[/yellow]")
         
         # Store reference for other strategies
         self.backtrack_reference = reference_screenshot
@@ -1054,24 +1044,19 @@ class NavigationEngine:
             
             self.console.print(f"[cyan]🎯 Multi-state verification: {len(candidate_references)} candidates[/cyan]")
             
-            # ✅ FIX: More reasonable threshold (99.0% instead of 99.99%)
-            for ref_name, ref_path in candidate_references:
-                similarity = self.visual_differ.calculate_similarity_percentage(
-                    verification_screenshot, ref_path
-                )
-                
-                self.console.print(f"[dim]📊 {ref_name}: {similarity}%[/dim]")
-                
-                # ✅ REASONABLE: 99.0% threshold (not 99.99%)
-                if similarity >= 99.0:
-                    self.console.print(f"[green]✅ Multi-state verification: Matched {ref_name} ({similarity}%)[/green]")
-                    self.element_interactor.current_state_id = target_state_id
-                    return True
+            # ✅ REASONABLE: 99.0% threshold (not 99.99%); closest perceptual hash first,
+            # low-res prefilter skips the full-size diff for clearly different screens
+            match = self.visual_differ.match_screen(verification_screenshot, candidate_references, 99.0)
+            if match:
+                ref_name, similarity = match
+                self.console.print(f"[green]✅ Multi-state verification: Matched {ref_name} ({similarity}%)[/green]")
+                self.element_interactor.current_state_id = target_state_id
+                return True
             
             self.console.print(f"[yellow]⚠️ Multi-state verification: No state matched ≥99.0%[/yellow]")
-            return False
+            return self._recover_by_localization(target_state_id, verification_screenshot)
         
-        return True
+        return self._recover_by_localization(target_state_id, verification_screenshot, unknown_ok=True)
     
     def _find_safe_click_areas(self, window_pos: Dict, margin: int = 20, debug: bool = True) -> List[Tuple[int, int]]:
         """Find safe click areas using improved strategies:
@@ -1319,6 +1304,7 @@ class NavigationEngine:
                         node_data["status"] = "explored"
                         node_data["exploration_result"] = "navigation_failed_restart_required"
                         node_data["exploration_timestamp"] = time.time()
+                        self.state_manager.store.touch_node(from_state, problematic_node)
                         
                         # Save to file
                         self.state_manager.save_fdom_to_file()
@@ -1337,13 +1323,4 @@ class NavigationEngine:
                 self.console.print(f"[yellow]⚠️ No navigation chain to identify problematic node[/yellow]")
                 
         except Exception as e:
-            self.console.print(f"[yellow]⚠️ Error marking node as explored: {e}[/yellow]") 
-    def _get_target_state_screenshot(self, target_state: str):
-        """Get screenshot of the target state"""
-        try:
-            # Implement the logic to get a screenshot of the target state
-            # This is a placeholder and should be replaced with the actual implementation
-            return None
-        except Exception as e:
-            self.console.print(f"[red]❌ Error getting target state screenshot: {e}[/red]")
-            return None 
+            self.console.print(f"[yellow]⚠️ Error marking node as explored: {e}[/yellow]")
@@ -58,6 +58,10 @@ class ScreenshotManager:
                 screenshot_path = screenshots_dir / custom_filename
                 img.save(screenshot_path)
                 
+                # Keep the decoded frame so diffs against this screenshot skip the disk
+                if self.visual_differ is not None:
+                    self.visual_differ.remember(str(screenshot_path), img)
+                
                 self.console.print(f"[green]📸 Screenshot saved: {custom_filename}[/green]")
                 return str(screenshot_path)
             
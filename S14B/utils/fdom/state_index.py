@@ -0,0 +1,126 @@
+"""
+StateRecognitionIndex - identify which fDOM state is on screen
+Each state keeps a compact fingerprint (64-bit perceptual hash plus a 32x32
+grayscale thumbnail) in fdom.json; the index holds them as NumPy arrays so one
+screenshot is matched against hundreds of states with a couple of vector ops.
+"""
+import base64
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+from .visual_differ import PerceptualHashIndex
+
+THUMB_SIZE = 32            # thumbnail side; a menu or dialog covers dozens of cells
+PHASH_SHORTLIST = 16       # bits; states further away are only scored if nothing is closer
+MATCH_RMS = 6.0            # gray levels; cursor/hover noise stays well below this
+MIN_MARGIN = 1.5           # best match must beat the runner-up by this much RMS
+
+
+def make_fingerprint(screen) -> Dict:
+    """Fingerprint of a VisualDiffer ScreenImage, in the JSON form stored on fDOM states"""
+    thumb = cv2.resize(screen.gray, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA)
+    return {
+        "phash": f"{screen.phash:016x}",
+        "thumb": base64.b64encode(thumb.tobytes()).decode("ascii"),
+        "size": [int(screen.shape[1]), int(screen.shape[0])],
+    }
+
+
+def _thumb_vector(fingerprint: Dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(fingerprint["thumb"]), dtype=np.uint8).astype(np.float32)
+
+
+class StateRecognitionIndex:
+    """fDOM state id -> fingerprint, with nearest-state lookup for a live screenshot"""
+
+    def __init__(self, visual_differ):
+        self.visual_differ = visual_differ
+        self._hashes = PerceptualHashIndex()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._thumbs = np.empty((0, THUMB_SIZE * THUMB_SIZE), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, state_id: str) -> bool:
+        return state_id in self._rows
+
+    def fingerprint(self, image) -> Optional[Dict]:
+        screen = self.visual_differ.load(image)
+        return make_fingerprint(screen) if screen is not None else None
+
+    def add(self, state_id: str, fingerprint: Dict) -> None:
+        vector = _thumb_vector(fingerprint)
+        if vector.size != self._thumbs.shape[1]:
+            return  # written with a different THUMB_SIZE
+        self._hashes.add(state_id, int(fingerprint["phash"], 16))
+        if state_id in self._rows:
+            self._thumbs[self._rows[state_id]] = vector
+        else:
+            self._rows[state_id] = len(self._ids)
+            self._ids.append(state_id)
+            self._thumbs = np.vstack([self._thumbs, vector])
+
+    def sync(self, store) -> int:
+        """
+        Index fingerprints of fDOM states not seen yet
+
+        The root state's image is a full screenshot, so a missing root fingerprint
+        is computed from it and saved; other states only carry the popup crop and
+        get fingerprints when they are created or first observed.
+        """
+        added = 0
+        for state_id, state_data in store.data.get("states", {}).items():
+            if state_id in self._rows:
+                continue
+            fingerprint = state_data.get("fingerprint")
+            if not fingerprint and state_id == "root" and state_data.get("image"):
+                fingerprint = self.fingerprint(state_data["image"])
+                if fingerprint:
+                    state_data["fingerprint"] = fingerprint
+                    store.touch_state(state_id)
+            if fingerprint:
+                self.add(state_id, fingerprint)
+                added += 1
+        return added
+
+    def observe(self, store, state_id: str, image) -> bool:
+        """Record the fingerprint of a state we know is on screen, if it has none yet"""
+        state_data = store.data.get("states", {}).get(state_id)
+        if state_data is None or state_data.get("fingerprint"):
+            return False
+        fingerprint = self.fingerprint(image)
+        if not fingerprint:
+            return False
+        state_data["fingerprint"] = fingerprint
+        store.touch_state(state_id)
+        self.add(state_id, fingerprint)
+        return True
+
+    def rank(self, image, limit: int = 3) -> List[Tuple[str, float, int]]:
+        """(state_id, thumbnail RMS difference, phash distance), best first"""
+        if not self._ids:
+            return []
+        screen = self.visual_differ.load(image)
+        if screen is None:
+            return []
+        query = make_fingerprint(screen)
+        hash_dist = self._hashes.distances(int(query["phash"], 16))
+        rows = np.flatnonzero(hash_dist <= PHASH_SHORTLIST)
+        if rows.size == 0:
+            rows = np.arange(len(self._ids))
+        diff = self._thumbs[rows] - _thumb_vector(query)
+        rms = np.sqrt(np.mean(diff * diff, axis=1))
+        order = np.argsort(rms, kind="stable")[:limit]
+        return [(self._ids[rows[i]], float(rms[i]), int(hash_dist[rows[i]])) for i in order]
+
+    def identify(self, image) -> Optional[Tuple[str, float]]:
+        """(state_id, RMS) of the state on screen, or None if nothing matches unambiguously"""
+        ranked = self.rank(image, limit=2)
+        if not ranked or ranked[0][1] > MATCH_RMS:
+            return None
+        if len(ranked) > 1 and ranked[1][1] - ranked[0][1] < MIN_MARGIN:
+            return None  # e.g. a tooltip-sized popup: too close to its parent to tell apart
+        return ranked[0][0], ranked[0][1]
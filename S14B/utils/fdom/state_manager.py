@@ -18,6 +18,8 @@ from rich import print as rprint
 
 from config_manager import ConfigManager
 from seraphine_integrator import SeraphineIntegrator
+from fdom_store import FDOMStore
+from exploration_scheduler import ExplorationScheduler
 
 
 @dataclass
@@ -93,15 +95,16 @@ class StateManager:
         # SEMANTIC NAMING: Start with root
         self.current_state_id = "root"  # ✅ Not "S001"
         
-        # Initialize fDOM with semantic structure
-        self.fdom_data = {
+        # Initialize fDOM with semantic structure (indexed + persisted through the store)
+        self.store = FDOMStore({
             "app_name": app_name,
             "loaded": False,
             "creation_timestamp": datetime.now().isoformat(),
             "navigation_tree": {},  # Track semantic hierarchy
             "states": {},
             "edges": []
-        }
+        }, self.fdom_path())
+        self.scheduler = ExplorationScheduler(self.store.data)
         
         # Tracking
         self.total_nodes = 0
@@ -111,6 +114,20 @@ class StateManager:
         
         self.console.print(f"[green]🧠 StateManager initialized for: {app_name}[/green]")
     
+    @property
+    def fdom_data(self) -> Dict:
+        return self.store.data
+    
+    @fdom_data.setter
+    def fdom_data(self, data: Dict) -> None:
+        # Whole-document replacement (fDOM reloaded from disk): reindex
+        self.store.rebind(data)
+        self.scheduler = ExplorationScheduler(data)
+    
+    def fdom_path(self) -> Path:
+        """apps/<app_name>/fdom.json"""
+        return Path(__file__).parent.parent.parent / "apps" / self.app_name / "fdom.json"
+    
     def create_initial_fdom_state(self, screenshot_path: str) -> Dict:
         """FIXED: Use semantic naming for root state"""
         self.console.print(f"\n[bold blue]🏗️ CREATING INITIAL ROOT STATE[/bold blue]")
@@ -132,7 +149,7 @@ class StateManager:
             "breadcrumb": "root",
             "image": screenshot_path,  # ✅ This should be current screenshot, not S001.png
             "creation_timestamp": datetime.now().isoformat(),
-            "analysis_time": seraphine_result.get('analysis_time', 0),
+            "analysis_time": seraphine_result.get('total_time', 0),  # full-screen parse cost, baseline for incremental parses
             "total_elements": len(seraphine_result['nodes']),
             "nodes": {}
         }
@@ -170,7 +187,7 @@ class StateManager:
             self.pending_nodes.add(f"root::{node_id}")
         
         # Save state to fDOM data
-        self.fdom_data["states"]["root"] = state_data
+        self.store.add_state("root", state_data)
         self.total_nodes = len(fdom_nodes)
         
         
@@ -179,18 +196,22 @@ class StateManager:
         
         return state_data
     
-    def get_next_pending_node(self) -> Optional[str]:
+    def get_next_pending_node(self, current_state: Optional[str] = None) -> Optional[str]:
         """
         Get the next node that needs to be explored (graph-based traversal)
         
+        Args:
+            current_state: State currently on screen (defaults to current_state_id)
+        
         Returns:
             Node ID to explore next, or None if all explored
         """
         if not self.pending_nodes:
             return None
             
-        # For now, return first pending node (can implement smarter strategies later)
-        return next(iter(self.pending_nodes))
+        # Cheapest state to reach first, most likely interactive element within it
+        self.scheduler.sync(self.pending_nodes)
+        return self.scheduler.next(current_state or self.current_state_id)
     
     def mark_node_explored(self, node_id: str, click_result: Optional[str] = None, 
                           interaction_type: Optional[str] = None) -> None:
@@ -213,16 +234,13 @@ class StateManager:
                 self.exploration_graph.nodes[node_id]['click_result'] = click_result
                 self.exploration_graph.nodes[node_id]['interaction_type'] = interaction_type
                 
-            # Update in fDOM data
-            for state_id, state_data in self.fdom_data["states"].items():
-                if node_id in state_data.get("nodes", {}):
-                    state_data["nodes"][node_id]["status"] = "explored"
-                    if "interactivity" not in state_data["nodes"][node_id]:
-                        state_data["nodes"][node_id]["interactivity"] = {}
-                    state_data["nodes"][node_id]["interactivity"]["click_result"] = click_result
-                    if interaction_type:
-                        state_data["nodes"][node_id]["interactivity"]["type"] = interaction_type
-                    break
+            # Update in fDOM data (node_id is "state::node"; bare ids resolve to their first state)
+            location = self.store.resolve(node_id)
+            if location:
+                interactivity = {"click_result": click_result}
+                if interaction_type:
+                    interactivity["type"] = interaction_type
+                self.store.update_node(*location, status="explored", interactivity=interactivity)
         else:
             self.non_interactive_nodes.add(node_id)
             # Update status to non_interactive
@@ -230,26 +248,24 @@ class StateManager:
                 self.exploration_graph.nodes[node_id]['status'] = 'non_interactive'
                 
             # Update in fDOM data
-            for state_id, state_data in self.fdom_data["states"].items():
-                if node_id in state_data.get("nodes", {}):
-                    state_data["nodes"][node_id]["status"] = "non_interactive"
-                    break
+            location = self.store.resolve(node_id)
+            if location:
+                self.store.update_node(*location, status="non_interactive")
     
-    def save_fdom_to_file(self, output_path: Optional[str] = None) -> str:
+    def save_fdom_to_file(self, output_path: Optional[str] = None, compact: bool = False) -> str:
         """
-        Save the current fDOM structure to JSON file
+        Save the current fDOM structure
+        
+        Changes since the last save are appended to fdom.changes.jsonl; fdom.json
+        itself is rewritten periodically, or when compact=True.
         
         Args:
-            output_path: Custom output path, or auto-generate if None
+            output_path: Custom output path for a full export, or the app's fdom.json if None
+            compact: Rewrite fdom.json in full and clear the change log
             
         Returns:
             Path where fDOM was saved
         """
-        if not output_path:
-            app_dir = Path(__file__).parent.parent.parent / "apps" / self.app_name
-            app_dir.mkdir(parents=True, exist_ok=True)
-            output_path = app_dir / "fdom.json"
-        
         # Update metadata
         self.fdom_data.update({
             "last_updated": datetime.now().isoformat(),
@@ -262,9 +278,11 @@ class StateManager:
             }
         })
         
-        # Save to file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(self.fdom_data, f, indent=2, ensure_ascii=False)
+        if output_path:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(self.fdom_data, f, indent=2, ensure_ascii=False)
+        else:
+            output_path = self.store.save(compact=compact)
         
         self.console.print(f"[green]💾 fDOM saved to: {output_path}[/green]")
         return str(output_path)
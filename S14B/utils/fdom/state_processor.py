@@ -1,10 +1,16 @@
 """State creation and processing logic"""
+import copy
 import json
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
 from rich.console import Console
 
+from .incremental_parse import plan_incremental_parse
+from .state_index import make_fingerprint
+
 
 class StateProcessor:
     """Handles state creation, semantic naming, and metadata"""
@@ -42,11 +48,30 @@ class StateProcessor:
             self.console.print("[red]❌ Failed to extract change regions[/red]")
             return None
         
-        # Analyze with Seraphine using the actual difference image
-        popup_crop_path = diff_result["diff_image_path"]
-        seraphine_result = self.seraphine_integrator.analyze_screenshot(
-            popup_crop_path, new_state_name, source_element_name
-        )
+        # ✅ INCREMENTAL RE-PARSE: only changed regions outside known elements go to Seraphine
+        parent_nodes = self.state_manager.fdom_data.get("states", {}).get(current_state, {}).get("nodes", {})
+        unified_region = diff_result["regions"][0]
+        plan = None
+        if diff_result.get("change_boxes") and diff_result.get("image_size"):
+            plan = plan_incremental_parse(diff_result["change_boxes"], diff_result["image_size"], parent_nodes)
+        
+        analysis_start = time.perf_counter()
+        unified_bounds = (unified_region[0], unified_region[1],
+                          unified_region[0] + unified_region[2], unified_region[1] + unified_region[3])
+        if plan and plan["regions"] != [unified_bounds]:
+            seraphine_result = self._analyze_regions(
+                after_screenshot, plan["regions"], diff_path, new_state_name, source_element_name
+            )
+        else:
+            # Analyze with Seraphine using the actual difference image
+            popup_crop_path = diff_result["diff_image_path"]
+            seraphine_result = self.seraphine_integrator.analyze_screenshot(
+                popup_crop_path, new_state_name, source_element_name
+            )
+            if seraphine_result:
+                # Map crop coordinates back to the full screenshot
+                self._offset_nodes(seraphine_result.get('nodes', {}), unified_region[0], unified_region[1])
+        analysis_time = time.perf_counter() - analysis_start
         
         if not seraphine_result or not seraphine_result.get('nodes'):
             self.console.print("[red]❌ Seraphine analysis failed[/red]")
@@ -57,20 +82,17 @@ class StateProcessor:
             new_state_name, seraphine_result, diff_path,
             source_element_name, node_id, current_state
         )
+        if plan:
+            new_state_data["incremental_parse"] = self._incremental_parse_report(plan, analysis_time)
         
-        # Add elements with coordinate mapping and deduplication
-        unified_region = diff_result["regions"][0]
-        x_offset, y_offset = unified_region[0], unified_region[1]
+        # Full-screen fingerprint so navigation can recognise this state later (image is only the crop)
+        after_screen = self.visual_differ.load(after_screenshot)
+        if after_screen is not None:
+            new_state_data["fingerprint"] = make_fingerprint(after_screen)
         
+        # Add elements with deduplication
         new_nodes_added = 0
         for popup_node_id, popup_node_data in seraphine_result['nodes'].items():
-            crop_bbox = popup_node_data['bbox']
-            full_bbox = [
-                crop_bbox[0] + x_offset, crop_bbox[1] + y_offset,
-                crop_bbox[2] + x_offset, crop_bbox[3] + y_offset
-            ]
-            popup_node_data['bbox'] = full_bbox
-            
             if not self._is_duplicate_element(popup_node_data, current_state):
                 new_state_data["nodes"][popup_node_id] = popup_node_data
                 self.state_manager.pending_nodes.add(f"{new_state_name}::{popup_node_id}")
@@ -80,8 +102,16 @@ class StateProcessor:
         
         self.console.print(f"[cyan]✅ Added {new_nodes_added}/{len(seraphine_result['nodes'])} new elements[/cyan]")
         
+        # Parent elements inside the change crop that were not re-parsed keep their detections and captions
+        if plan and plan["inherited_nodes"]:
+            inherited = self._inherit_parent_nodes(
+                new_state_data["nodes"], parent_nodes, plan["inherited_nodes"], current_state
+            )
+            new_state_data["inherited_nodes"] = inherited
+            self.console.print(f"[cyan]♻️ Inherited {len(inherited)} parent elements with their captions[/cyan]")
+        
         # Save state and update tracking
-        self.state_manager.fdom_data["states"][new_state_name] = new_state_data
+        self.state_manager.store.add_state(new_state_name, new_state_data)
         self.state_manager.mark_node_explored(node_id, click_result=new_state_name, interaction_type="menu")
         self._add_interaction_edge(current_state, new_state_name, node_id)
         self.state_manager.save_fdom_to_file()
@@ -89,6 +119,79 @@ class StateProcessor:
         return new_state_name
 
     
+    def _inherit_parent_nodes(self, nodes: Dict, parent_nodes: Dict, node_ids: List[str],
+                              parent_state: str) -> List[str]:
+        """Copy parent nodes into the new state; they stay explored/pending through the parent"""
+        inherited = []
+        for parent_id in node_ids:
+            node_id = parent_id if parent_id not in nodes else f"P_{parent_id}"
+            node_data = copy.deepcopy(parent_nodes[parent_id])
+            node_data["inherited_from"] = f"{parent_state}::{parent_id}"
+            nodes[node_id] = node_data
+            inherited.append(node_id)
+        return inherited
+    
+    def _offset_nodes(self, nodes: Dict, x_offset: int, y_offset: int) -> None:
+        """Shift crop-relative node bboxes into full-screenshot coordinates"""
+        for node_data in nodes.values():
+            crop_bbox = node_data['bbox']
+            node_data['bbox'] = [
+                crop_bbox[0] + x_offset, crop_bbox[1] + y_offset,
+                crop_bbox[2] + x_offset, crop_bbox[3] + y_offset
+            ]
+    
+    def _analyze_regions(self, after_screenshot: str, regions: List[Tuple[int, int, int, int]],
+                         diff_path: str, state_name: str, source_element_name: str) -> Optional[Dict]:
+        """Run Seraphine on each changed region separately and stitch the nodes together"""
+        nodes, total_time, icons = {}, 0.0, 0
+        diff_file = Path(diff_path)
+        with Image.open(after_screenshot) as after_image:
+            for i, (x1, y1, x2, y2) in enumerate(regions):
+                region_path = diff_file.with_name(f"{diff_file.stem}_r{i}{diff_file.suffix}")
+                after_image.crop((x1, y1, x2, y2)).save(region_path)
+                
+                result = self.seraphine_integrator.analyze_screenshot(
+                    str(region_path), state_name, source_element_name
+                )
+                if not result or not result.get('nodes'):
+                    continue
+                self._offset_nodes(result['nodes'], x1, y1)
+                # Seraphine ids restart per crop, so prefix them when stitching several regions
+                prefix = f"R{i}_" if len(regions) > 1 else ""
+                nodes.update({f"{prefix}{nid}": data for nid, data in result['nodes'].items()})
+                total_time += result.get('total_time', 0)
+                icons += result.get('total_icons_found', 0)
+        
+        if not nodes:
+            return None
+        return {'nodes': nodes, 'total_time': total_time, 'total_icons_found': icons}
+    
+    def _incremental_parse_report(self, plan: Dict, analysis_time: float) -> Dict:
+        """Pixels re-analysed against the unified diff crop the non-incremental path parses"""
+        unified = plan["unified_region"]
+        unified_area = (unified[2] - unified[0]) * (unified[3] - unified[1]) if unified else 0
+        parsed_area = sum((r[2] - r[0]) * (r[3] - r[1]) for r in plan["regions"])
+        crop_fraction = parsed_area / unified_area if unified_area else 1.0
+        # Seraphine time roughly scales with pixels; the fallback path parses the unified crop itself
+        latency_saved = None
+        if 0 < crop_fraction < 1:
+            latency_saved = round(analysis_time * (1 / crop_fraction - 1), 3)
+        report = {
+            "regions": len(plan["regions"]),
+            "reanalysed_fraction": round(plan["reanalysed_fraction"], 4),
+            "unified_crop_fraction": round(crop_fraction, 4),
+            "reused_parent_nodes": len(plan["reused_nodes"]),
+            "analysis_time": round(analysis_time, 3),
+            "est_latency_saved_s": latency_saved
+        }
+        saved_text = f", saved ~{latency_saved:.2f}s (est.)" if latency_saved is not None else ""
+        self.console.print(
+            f"[cyan]⚡ Incremental parse: {report['regions']} region(s), "
+            f"{crop_fraction * 100:.1f}% of the diff crop re-analysed, "
+            f"{report['reused_parent_nodes']} parent nodes reused{saved_text}[/cyan]"
+        )
+        return report
+    
     def _generate_semantic_state_name(self, element_name: str, current_state: str) -> str:
         """Generate file-safe semantic state name"""
         clean_name = element_name.lower().replace(' ', '_').replace('(', '').replace(')', '').replace('/', '_')
@@ -193,26 +296,13 @@ class StateProcessor:
             "timestamp": datetime.now().isoformat()
         }
         
-        if "edges" not in self.state_manager.fdom_data:
-            self.state_manager.fdom_data["edges"] = []
-            
-        self.state_manager.fdom_data["edges"].append(edge)
+        self.state_manager.store.add_edge(edge)
         
         self.console.print(f"[blue]🔗 Edge added: {from_state} --[{element_name}]--> {to_state}[/blue]")
     
     def _find_node_in_fdom(self, node_id: str) -> Optional[Dict]:
         """Find node data in fDOM"""
-        if "::" in node_id:
-            state_name, actual_node_id = node_id.split("::", 1)
-            state_data = self.state_manager.fdom_data.get("states", {}).get(state_name, {})
-            return state_data.get("nodes", {}).get(actual_node_id)
-        
-        # Fallback: search all states
-        for state_data in self.state_manager.fdom_data.get("states", {}).values():
-            nodes = state_data.get("nodes", {})
-            if node_id in nodes:
-                return nodes[node_id]
-        return None
+        return self.state_manager.store.find_node(node_id)
     
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename for Windows compatibility"""
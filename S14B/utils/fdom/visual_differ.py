@@ -1,81 +1,312 @@
 """
 VisualDiffer - Visual comparison and hash-based change detection for fDOM Framework
-Handles screenshot comparison using hash and OpenCV-based region extraction
+Handles screenshot comparison using hash and OpenCV-based region extraction.
+Screenshots are decoded once into a cached grayscale pyramid with a 64-bit DCT
+perceptual hash, so repeated verification against the same reference screens
+skips disk reads and cheap low-resolution checks run before full-size diffs.
 """
 import hashlib
 import os
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple, Union
+import cv2
 import numpy as np
 from PIL import Image
 from rich.console import Console
 from rich.panel import Panel
 import time
 
+CACHE_SIZE = 48            # decoded screenshots kept in memory (LRU)
+PREFILTER_LEVEL = 2        # pyramid level for the prefilter: 1/4 of each side
+PREFILTER_MARGIN = 5.0     # % points; low-res similarity this far under target can't reach it
+PHASH_SAMPLE = 32          # DCT input size
+PHASH_SIZE = 8             # low-frequency block kept -> 64 bits
+PHASH_MATCH_DISTANCE = 6   # bits; cursor blink/hover noise stays below this
+
+
+def _dct_hash(gray: np.ndarray) -> int:
+    small = cv2.resize(gray, (PHASH_SAMPLE, PHASH_SAMPLE), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:PHASH_SIZE, :PHASH_SIZE].ravel()
+    bits = low > np.median(low[1:])  # DC term excluded: it only tracks brightness
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(hash1: int, hash2: int) -> int:
+    return bin(hash1 ^ hash2).count("1")
+
+
+class ScreenImage:
+    """One decoded screenshot with lazily built grayscale pyramid, digest and phash"""
+
+    def __init__(self, bgr: np.ndarray, source: Optional[str] = None):
+        self.bgr = bgr
+        self.source = source
+        self.gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY) if bgr.ndim == 3 else bgr
+        self._pyramid = [self.gray]
+        self._digest = None
+        self._phash = None
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.gray.shape[:2]
+
+    def level(self, k: int) -> np.ndarray:
+        """Grayscale at 1/2**k of each side"""
+        while len(self._pyramid) <= k:
+            previous = self._pyramid[-1]
+            if min(previous.shape[:2]) < 2:
+                return previous
+            self._pyramid.append(cv2.pyrDown(previous))
+        return self._pyramid[k]
+
+    @property
+    def digest(self) -> str:
+        """Exact content digest of the grayscale pixels"""
+        if self._digest is None:
+            self._digest = hashlib.md5(self.gray.tobytes() + str(self.gray.shape).encode()).hexdigest()
+        return self._digest
+
+    @property
+    def phash(self) -> int:
+        if self._phash is None:
+            self._phash = _dct_hash(self.gray)
+        return self._phash
+
+
+ImageInput = Union[str, os.PathLike, np.ndarray, Image.Image, ScreenImage]
+
+
+class PerceptualHashIndex:
+    """key -> 64-bit phash, searched by Hamming distance in one vectorized pass"""
+
+    def __init__(self):
+        self._keys: List[Hashable] = []
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._positions: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._positions
+
+    def add(self, key: Hashable, phash: int) -> None:
+        if key in self._positions:
+            self._hashes[self._positions[key]] = np.uint64(phash)
+            return
+        self._positions[key] = len(self._keys)
+        self._keys.append(key)
+        self._hashes = np.append(self._hashes, np.uint64(phash))
+
+    def distances(self, phash: int) -> np.ndarray:
+        xor = np.bitwise_xor(self._hashes, np.uint64(phash))
+        return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+    def nearest(self, phash: int, max_distance: Optional[int] = None,
+                limit: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """(key, distance) pairs, closest first"""
+        if not self._keys:
+            return []
+        dist = self.distances(phash)
+        order = np.argsort(dist, kind="stable")
+        if max_distance is not None:
+            order = order[dist[order] <= max_distance]
+        if limit is not None:
+            order = order[:limit]
+        return [(self._keys[i], int(dist[i])) for i in order]
+
+
 class VisualDiffer:
     """
     Handles visual comparison and change detection between screenshots
+    
+    Every method accepts a file path, a BGR ndarray, a PIL image or a ScreenImage.
     """
     
-    def __init__(self, config_manager):
+    def __init__(self, config_manager, cache_size: int = CACHE_SIZE):
         self.config = config_manager
         self.console = Console()
-    
-    def calculate_image_hash(self, image_path: str) -> str:
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple, ScreenImage]" = OrderedDict()
+
+    # ---------- decoding / cache ----------
+
+    @staticmethod
+    def _file_key(path: str) -> Optional[Tuple]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def _cache_put(self, key: Tuple, screen: ScreenImage) -> None:
+        self._cache[key] = screen
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def load(self, image: ImageInput) -> Optional[ScreenImage]:
+        """Decode (or fetch from cache) a screenshot; None if unreadable"""
+        if isinstance(image, ScreenImage):
+            return image
+        if isinstance(image, np.ndarray):
+            return ScreenImage(image)
+        if isinstance(image, Image.Image):
+            return ScreenImage(cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR))
+        if not image:
+            return None
+
+        path = os.fspath(image)
+        key = self._file_key(path)
+        if key is None:
+            return None
+        screen = self._cache.get(key)
+        if screen is not None:
+            self._cache.move_to_end(key)
+            return screen
+        bgr = cv2.imread(path)
+        if bgr is None:
+            return None
+        screen = ScreenImage(bgr, source=path)
+        self._cache_put(key, screen)
+        return screen
+
+    def remember(self, path: str, image: ImageInput) -> Optional[ScreenImage]:
+        """Cache an image that was just saved to path so it is never decoded back"""
+        key = self._file_key(path)
+        screen = self.load(image)
+        if key is not None and screen is not None:
+            screen.source = str(path)
+            self._cache_put(key, screen)
+        return screen
+
+    # ---------- hashing ----------
+
+    def calculate_image_hash(self, image_path: ImageInput) -> str:
         """
-        Calculate perceptual hash of an image
+        Calculate change-detection hash of an image
+        
+        Exact digest of the 64x64 grayscale thumbnail: any visible change flips it,
+        which is what before/after click checks need. Use calculate_perceptual_hash
+        to recognise near-identical screens.
         
         Args:
-            image_path: Path to image file
+            image_path: Path to image file (or in-memory image)
             
         Returns:
             Hash string for comparison
         """
         try:
-            with Image.open(image_path) as img:
-                # Convert to grayscale and resize for consistent hashing
-                img = img.convert('L').resize((64, 64))
-                
-                # Calculate hash using pixel data
-                pixels = np.array(img)
-                hash_obj = hashlib.md5(pixels.tobytes())
-                return hash_obj.hexdigest()
-                
+            screen = self.load(image_path)
+            if screen is None:
+                raise ValueError("could not load image")
+            thumb = cv2.resize(screen.gray, (64, 64), interpolation=cv2.INTER_AREA)
+            return hashlib.md5(thumb.tobytes()).hexdigest()
         except Exception as e:
             self.console.print(f"[red]❌ Error calculating hash for {image_path}: {e}[/red]")
             return ""
 
-    def extract_change_regions(self, before_path: str, after_path: str, 
+    def calculate_perceptual_hash(self, image_path: ImageInput) -> str:
+        """64-bit DCT perceptual hash as 16 hex chars ("" if unreadable)"""
+        screen = self.load(image_path)
+        return f"{screen.phash:016x}" if screen is not None else ""
+
+    @staticmethod
+    def hashes_match(hash1: str, hash2: str, max_distance: int = PHASH_MATCH_DISTANCE) -> bool:
+        """Perceptual hashes within max_distance bits of each other"""
+        if not hash1 or not hash2:
+            return False
+        return hamming(int(hash1, 16), int(hash2, 16)) <= max_distance
+
+    # ---------- comparison ----------
+
+    @staticmethod
+    def _aligned(img1: np.ndarray, img2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if img1.shape == img2.shape:
+            return img1, img2
+        h = min(img1.shape[0], img2.shape[0])
+        w = min(img1.shape[1], img2.shape[1])
+        return cv2.resize(img1, (w, h)), cv2.resize(img2, (w, h))
+
+    @staticmethod
+    def _pixel_similarity(gray1: np.ndarray, gray2: np.ndarray, threshold: int) -> float:
+        diff = cv2.absdiff(gray1, gray2)
+        different_pixels = int(np.count_nonzero(diff > threshold))
+        return (diff.size - different_pixels) / diff.size * 100
+
+    def quick_similarity(self, image1: ImageInput, image2: ImageInput, threshold: int = 15,
+                         level: int = PREFILTER_LEVEL) -> float:
+        """Similarity on a downscaled pyramid level (1/16 of the pixels at level 2)"""
+        screen1, screen2 = self.load(image1), self.load(image2)
+        if screen1 is None or screen2 is None:
+            return 0.0
+        return self._pixel_similarity(*self._aligned(screen1.level(level), screen2.level(level)), threshold)
+
+    def match_screen(self, image: ImageInput, references: Sequence[Tuple[str, ImageInput]],
+                     min_similarity: float = 99.0, threshold: int = 15) -> Optional[Tuple[str, float]]:
+        """
+        First reference (by perceptual-hash distance) at least min_similarity similar
+        
+        References far off in the low-res prefilter are rejected without a full-size diff.
+        
+        Returns:
+            (reference name, similarity) or None
+        """
+        screen = self.load(image)
+        if screen is None:
+            return None
+        loaded, index = {}, PerceptualHashIndex()
+        for i, (name, ref) in enumerate(references):
+            ref = self.load(ref)
+            if ref is not None:
+                loaded[i] = (name, ref)
+                index.add(i, ref.phash)
+
+        for i, _ in index.nearest(screen.phash):
+            name, ref = loaded[i]
+            quick = self.quick_similarity(screen, ref, threshold)
+            if quick < min_similarity - PREFILTER_MARGIN:
+                self.console.print(f"[dim]📊 {name}: ~{quick:.1f}% (low-res prefilter)[/dim]")
+                continue
+            similarity = self.calculate_similarity_percentage(screen, ref, threshold)
+            self.console.print(f"[dim]📊 {name}: {similarity}%[/dim]")
+            if similarity >= min_similarity:
+                return name, similarity
+        return None
+
+    def extract_change_regions(self, before_path: ImageInput, after_path: ImageInput, 
                               output_diff_path: str, click_coords: Optional[Tuple] = None) -> Dict:
         """
         Extract FULL difference region as single crop (following old.txt approach)
         """
         try:
-            import cv2
-            import numpy as np
-            
             self.console.print(f"[yellow]🔍 EXTRACTING FULL DIFFERENCE REGION...[/yellow]")
-            self.console.print(f"Before: {Path(before_path).name}")
-            self.console.print(f"After:  {Path(after_path).name}")
+            if isinstance(before_path, (str, os.PathLike)):
+                self.console.print(f"Before: {Path(before_path).name}")
+                self.console.print(f"After:  {Path(after_path).name}")
             
-            # Load both images
-            img1 = cv2.imread(before_path)
-            img2 = cv2.imread(after_path)
+            # Load both images (cached: each screenshot is decoded once)
+            before, after = self.load(before_path), self.load(after_path)
             
-            if img1 is None or img2 is None:
+            if before is None or after is None:
                 return {"success": False, "error": "Could not load images"}
             
+            if before.shape == after.shape and before.digest == after.digest:
+                self.console.print("[red]ℹ️ No significant visual differences found.[/red]")
+                return {"success": False, "reason": "No significant differences detected"}
+            
             # Match dimensions if needed
-            if img1.shape != img2.shape:
-                h = min(img1.shape[0], img2.shape[0])
-                w = min(img1.shape[1], img2.shape[1])
-                img1 = cv2.resize(img1, (w, h))
+            gray1, gray2 = before.gray, after.gray
+            img2 = after.bgr
+            if gray1.shape != gray2.shape:
+                h = min(gray1.shape[0], gray2.shape[0])
+                w = min(gray1.shape[1], gray2.shape[1])
+                gray1, gray2 = cv2.resize(gray1, (w, h)), cv2.resize(gray2, (w, h))
                 img2 = cv2.resize(img2, (w, h))
                 self.console.print(f"[yellow]⚠️ Resized both images to ({w}, {h})[/yellow]")
 
-            # Convert to grayscale and compute absolute difference
-            gray1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-            gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
+            # Absolute difference of the cached grayscale images
             diff = cv2.absdiff(gray1, gray2)
 
             # Threshold and dilate
@@ -116,7 +347,10 @@ class VisualDiffer:
                 "detection_method": "opencv_unified_crop",
                 "total_regions": 1,
                 "diff_image_path": output_diff_path,
-                "crop_bounds": (x_min, y_min, x_max, y_max)
+                "crop_bounds": (x_min, y_min, x_max, y_max),
+                # Individual change boxes for incremental re-parse (see incremental_parse.py)
+                "change_boxes": boxes,
+                "image_size": (gray2.shape[1], gray2.shape[0])
             }
             
         except Exception as e:
@@ -125,48 +359,31 @@ class VisualDiffer:
             traceback.print_exc()
             return {"success": False, "error": str(e)}
 
-    def calculate_similarity_percentage(self, image1_path: str, image2_path: str, threshold: int = 15) -> float:
+    def calculate_similarity_percentage(self, image1_path: ImageInput, image2_path: ImageInput, threshold: int = 15) -> float:
         """
         Calculate similarity percentage between two images using pixel difference analysis
         
         Args:
-            image1_path: Path to first image
-            image2_path: Path to second image  
+            image1_path: Path to first image (or in-memory image)
+            image2_path: Path to second image (or in-memory image)
             threshold: Pixel difference threshold (lower = more sensitive)
             
         Returns:
             Similarity percentage (0-100, where 100 = identical)
         """
         try:
-            import cv2
-            import numpy as np
+            screen1, screen2 = self.load(image1_path), self.load(image2_path)
             
-            # Load images
-            img1 = cv2.imread(image1_path)
-            img2 = cv2.imread(image2_path)
-            
-            if img1 is None or img2 is None:
+            if screen1 is None or screen2 is None:
                 self.console.print(f"[red]❌ Could not load images for comparison[/red]")
                 return 0.0
             
-            # Ensure same dimensions
-            if img1.shape != img2.shape:
-                h = min(img1.shape[0], img2.shape[0])
-                w = min(img1.shape[1], img2.shape[1])
-                img1 = cv2.resize(img1, (w, h))
-                img2 = cv2.resize(img2, (w, h))
-            
-            # Convert to grayscale and calculate difference
-            gray1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-            gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-            diff = cv2.absdiff(gray1, gray2)
-            
-            # Count pixels that differ significantly
-            different_pixels = np.sum(diff > threshold)
-            total_pixels = diff.shape[0] * diff.shape[1]
+            # Identical pixels: no diff needed
+            if screen1.shape == screen2.shape and screen1.digest == screen2.digest:
+                return 100.0
             
-            # Calculate similarity percentage
-            similarity = ((total_pixels - different_pixels) / total_pixels) * 100
+            # Ensure same dimensions, then count pixels that differ significantly
+            similarity = self._pixel_similarity(*self._aligned(screen1.gray, screen2.gray), threshold)
             
             return round(similarity, 2)
             
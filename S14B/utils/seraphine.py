@@ -23,6 +23,7 @@ from seraphine_pipeline.gemini_integration import run_gemini_analysis, integrate
 from seraphine_pipeline.pipeline_exporter import save_enhanced_pipeline_json, create_enhanced_seraphine_structure
 from concurrent.futures import ThreadPoolExecutor
 from seraphine_pipeline.parallel_processor import ParallelProcessor
+from seraphine_pipeline.frame import Frame
 from seraphine_pipeline.helpers import load_configuration, debug_print
 from seraphine_pipeline.seraphine_preprocessor import create_group_visualization, analyze_supergroups_with_gemini, integrate_supergroup_analysis
 from seraphine_pipeline.splashscreen_handler import handle_splash_screen_if_needed
@@ -104,9 +105,12 @@ def assign_intelligent_ids(yolo_detections, ocr_detections):
     
     return yolo_detections, ocr_detections
 
-def run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config):
+def run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config, image_path=None):
     """
     Step 1: Run YOLO + OCR detection + intelligent merging (FIXED - using ParallelProcessor!)
+    
+    img_bgr may be a decoded BGR array or a Frame; it is handed to both detectors
+    in memory, so preprocessing is shared and nothing is written to disk.
     """
     debug_print("\n🔄 Step 1: Parallel YOLO + OCR Detection + Intelligent Merging (FIXED)")
     debug_print("=" * 60)
@@ -121,60 +125,52 @@ def run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config):
         save_intermediate_results=False  # We handle JSON separately
     )
     
-    # For now, save BGR as temp file for ParallelProcessor 
-    # (until ParallelProcessor supports direct PIL/numpy input)
-    temp_image_path = "temp_detection_image.jpg"
-    cv2.imwrite(temp_image_path, img_bgr)
-    
-    try:
-        detection_start = time.time()
-        
-        # 🎯 Use the PROPER ParallelProcessor with full merging logic!
-        results = parallel_processor.process_image(temp_image_path, "temp")
-        
-        total_detection_time = time.time() - detection_start
-        
-        # Extract results (ParallelProcessor returns proper structure)
-        yolo_detections = results['yolo_detections']
-        ocr_detections = results['ocr_detections'] 
-        merged_detections = results['merged_detections']
-        merge_stats = results['merge_stats']
-        
-        # Assign intelligent IDs for tracking (same as before)
-        yolo_detections, ocr_detections = assign_intelligent_ids(yolo_detections, ocr_detections)
-        
-        # Update merged detections with proper IDs
-        for i, detection in enumerate(merged_detections):
-            detection['m_id'] = f"M{i+1:03d}"
-        
-        debug_print(f"\n📊 FIXED Detection + Merge Results:")
-        debug_print(f"  🎯 YOLO detections: {len(yolo_detections)} (Y001-Y{len(yolo_detections):03d})")
-        debug_print(f"  📝 OCR detections: {len(ocr_detections)} (O001-O{len(ocr_detections):03d})")
-        debug_print(f"  🔗 MERGED detections: {len(merged_detections)} (M001-M{len(merged_detections):03d})")
-        debug_print(f"  ⏱️  Total time: {total_detection_time:.3f}s")
-        debug_print(f"  🎯 PROPER 3-stage merging logic restored!")
-        debug_print(f"  📈 Merge efficiency: {len(yolo_detections) + len(ocr_detections)} → {len(merged_detections)} ({len(yolo_detections) + len(ocr_detections) - len(merged_detections)} removed)")
-        
-        return {
-            'yolo_detections': yolo_detections,
-            'ocr_detections': ocr_detections, 
-            'merged_detections': merged_detections,
-            'merge_stats': merge_stats,
-            'timing': {
-                'total_detection_time': total_detection_time,
-                'parallel_detection_time': results['timing']['parallel_detection_time'],
-                'merge_time': results['timing']['merge_time']
-            }
+    detection_start = time.time()
+    
+    # 🎯 Use the PROPER ParallelProcessor with full merging logic!
+    # The frame stays in memory: no temp JPEG, no re-decode, safe for concurrent parses
+    results = parallel_processor.process_image(img_bgr, "temp", image_path=image_path)
+    
+    total_detection_time = time.time() - detection_start
+    
+    # Extract results (ParallelProcessor returns proper structure)
+    yolo_detections = results['yolo_detections']
+    ocr_detections = results['ocr_detections'] 
+    merged_detections = results['merged_detections']
+    merge_stats = results['merge_stats']
+    
+    # Assign intelligent IDs for tracking (same as before)
+    yolo_detections, ocr_detections = assign_intelligent_ids(yolo_detections, ocr_detections)
+    
+    # Update merged detections with proper IDs
+    for i, detection in enumerate(merged_detections):
+        detection['m_id'] = f"M{i+1:03d}"
+    
+    debug_print(f"\n📊 FIXED Detection + Merge Results:")
+    debug_print(f"  🎯 YOLO detections: {len(yolo_detections)} (Y001-Y{len(yolo_detections):03d})")
+    debug_print(f"  📝 OCR detections: {len(ocr_detections)} (O001-O{len(ocr_detections):03d})")
+    debug_print(f"  🔗 MERGED detections: {len(merged_detections)} (M001-M{len(merged_detections):03d})")
+    debug_print(f"  ⏱️  Total time: {total_detection_time:.3f}s")
+    debug_print(f"  🎯 PROPER 3-stage merging logic restored!")
+    debug_print(f"  📈 Merge efficiency: {len(yolo_detections) + len(ocr_detections)} → {len(merged_detections)} ({len(yolo_detections) + len(ocr_detections) - len(merged_detections)} removed)")
+    
+    return {
+        'yolo_detections': yolo_detections,
+        'ocr_detections': ocr_detections, 
+        'merged_detections': merged_detections,
+        'merge_stats': merge_stats,
+        'timing': {
+            'total_detection_time': total_detection_time,
+            'parallel_detection_time': results['timing']['parallel_detection_time'],
+            'merge_time': results['timing']['merge_time']
         }
-        
-    finally:
-        # Clean up temporary file
-        if os.path.exists(temp_image_path):
-            os.remove(temp_image_path)
+    }
 
-def run_seraphine_grouping(merged_detections, config, image_path=None):
+def run_seraphine_grouping(merged_detections, config, image_path=None, frame=None):
     """
     Step 2: Run Seraphine intelligent grouping with perfect m_id tracking
+    
+    frame: decoded screenshot of image_path, reused for the group visualization
     """
     debug_print("🧠 Step 2: Running Seraphine Intelligent Grouping")
     debug_print("=" * 60)
@@ -227,7 +223,8 @@ def run_seraphine_grouping(merged_detections, config, image_path=None):
         if hasattr(bbox_processor, 'final_groups') and bbox_processor.final_groups:
             app_name = os.path.splitext(os.path.basename(image_path))[0]
             visualization_path = create_group_visualization(bbox_processor.final_groups, image_path, 
-                                     config.get("output_dir", "outputs"), app_name)
+                                     config.get("output_dir", "outputs"), app_name,
+                                     image_bgr=frame.bgr if frame is not None else None)
             enhanced_analysis['supergroup_visualization_path'] = visualization_path
             
             # Run Gemini analysis and integrate results into existing structure
@@ -467,6 +464,10 @@ def display_enhanced_pipeline_summary(image_path, detection_results, seraphine_a
     if gemini_results:
         debug_print(f"  🤖 GEMINI analysis: ✅ {gemini_results.get('successful_analyses', 0)}/{gemini_results.get('total_images_analyzed', 0)} images analyzed")
         debug_print(f"     🎯 Total icons found: {gemini_results.get('total_icons_found', 0)}")
+        cache_stats = gemini_results.get('caption_cache')
+        if cache_stats:
+            debug_print(f"     🗃️  Caption cache: {cache_stats['hit_rate']:.0%} hit rate, "
+                        f"{cache_stats['model_calls_saved']} Gemini calls saved")
     else:
         debug_print(f"  🤖 GEMINI analysis: ⏭️ Disabled or failed")
     
@@ -535,11 +536,14 @@ async def main(image_path=None):
         pipeline_start = time.time()
         
         try:
+            # Decode once; detection, grouping visualization and group crops share this frame
+            frame = Frame(img_bgr, source=image_path)
+            
             # Step 1: Detection + Merging
-            detection_results = run_parallel_detection_and_merge(img_bgr, yolo_config, ocr_config, config)
+            detection_results = run_parallel_detection_and_merge(frame, yolo_config, ocr_config, config, image_path)
             
             # Step 2: Seraphine Grouping (may raise PipelineRestartRequired)
-            seraphine_analysis = run_seraphine_grouping(detection_results['merged_detections'], config, image_path)
+            seraphine_analysis = run_seraphine_grouping(detection_results['merged_detections'], config, image_path, frame)
             
             # Continue with normal pipeline
             # Step 3: Generate Grouped Images for Gemini Analysis
@@ -561,7 +565,8 @@ async def main(image_path=None):
                 grouped_image_paths = final_group_generator.create_grouped_images(
                     image_path, 
                     seraphine_analysis, 
-                    filename_base
+                    filename_base,
+                    image=frame.pil
                 )
                 
                 debug_print(f"✅ Generated {len(grouped_image_paths)} grouped images")
@@ -571,7 +576,7 @@ async def main(image_path=None):
             if config.get("gemini_enabled", False):
                 try:
                     gemini_results = await run_gemini_analysis(
-                        seraphine_analysis, grouped_image_paths, image_path, config
+                        seraphine_analysis, grouped_image_paths, image_path, config, image=frame.pil
                     )
                     
                     if gemini_results:
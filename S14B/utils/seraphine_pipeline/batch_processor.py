@@ -0,0 +1,250 @@
+"""
+Batch screenshot processing for the Seraphine pipeline
+Shards saved screenshots across worker processes, each holding its own YOLO/OCR
+ONNX sessions with a fixed share of the CPU cores, batches YOLO inference for
+same-size screenshots and streams one JSON line per image. Detection + merging +
+grouping only (no Gemini, no desktop), so it runs headless on Linux.
+
+Usage (from S14B, where config.json and models/ paths resolve):
+    python -m utils.seraphine_pipeline.batch_processor "apps/*/screenshots/*.png" -o outputs/batch.jsonl
+No imports from original files allowed.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import cv2
+
+from .yolo_detector import YOLODetector, YOLOConfig, model_cache
+from .ocr_detector import OCRDetector, OCRDetConfig, ocr_model_cache
+from .bbox_merger import BBoxMerger
+from .seraphine_processor import FinalSeraphineProcessor
+from .pipeline_exporter import create_enhanced_seraphine_structure
+from .frame import Frame
+from .helpers import load_configuration
+
+CHUNK_SIZE = 8  # images per task: one YOLO batch, small enough to keep workers balanced
+
+_worker: Dict[str, Any] = {}
+
+
+def detector_configs(config: Dict) -> Tuple[YOLOConfig, OCRDetConfig]:
+    """YOLO/OCR configs from config.json values, with per-step logging switched off"""
+    yolo_config = YOLOConfig(
+        model_path=config.get("yolo_model_path", "models/model_dynamic.onnx"),
+        conf_threshold=config.get("yolo_conf_threshold", 0.1),
+        iou_threshold=config.get("yolo_iou_threshold", 0.1),
+        enable_timing=False,
+        enable_debug=False
+    )
+    ocr_config = OCRDetConfig(
+        model_path=config.get("ocr_model_path", "models/ch_PP-OCRv3_det_infer.onnx"),
+        det_threshold=config.get("ocr_det_threshold", 0.3),
+        max_side_len=config.get("ocr_max_side_len", 960),
+        enable_timing=False,
+        enable_debug=False,
+        use_dilation=config.get("ocr_use_dilation", True)
+    )
+    return yolo_config, ocr_config
+
+
+def _init_worker(config: Dict, intra_op_threads: int):
+    """Per-process detectors; ONNX sessions load on first use and then stay warm"""
+    cv2.setNumThreads(1)  # OpenCV pre/post-processing must not compete with onnxruntime
+    model_cache.set_threads(intra_op_threads)
+    ocr_model_cache.set_threads(intra_op_threads)
+    yolo_config, ocr_config = detector_configs(config)
+    _worker.update(
+        yolo=YOLODetector(yolo_config),
+        ocr=OCRDetector(ocr_config),
+        merger=BBoxMerger(iou_threshold=config.get("merger_iou_threshold", 0.1), enable_timing=False),
+        config=config,
+    )
+
+
+def _seraphine_groups(merged_detections: List[Dict]) -> Dict:
+    """Group merged detections; same shape as the pipeline's 'seraphine_groups' output"""
+    detections = []
+    for i, detection in enumerate(merged_detections):
+        m_id = f"M{i+1:03d}"
+        detection['m_id'] = m_id
+        detections.append({
+            'bbox': detection['bbox'],
+            'id': m_id,
+            'merged_id': m_id,
+            'type': detection.get('type', 'unknown'),
+            'source': detection.get('source', 'merged'),
+            'confidence': detection.get('confidence', 1.0),
+            'y_id': detection.get('y_id', 'NA'),
+            'o_id': detection.get('o_id', 'NA')
+        })
+    if not detections:
+        return {}
+    processor = FinalSeraphineProcessor(enable_timing=False, enable_debug=False)
+    return create_enhanced_seraphine_structure(processor.process_detections(detections), detections)
+
+
+def _process_chunk(image_paths: List[str]) -> List[Dict]:
+    """Worker task: decode a chunk, batch YOLO over it, then OCR/merge/group per image"""
+    records, frames = [], []
+    for path in image_paths:
+        start = time.perf_counter()
+        try:
+            frames.append((path, Frame.from_path(path), start))
+        except Exception as e:
+            records.append({'image': path, 'error': str(e)})
+
+    if not frames:
+        return records
+
+    yolo_start = time.perf_counter()
+    try:
+        yolo_results = _worker['yolo'].detect_batch([frame for _, frame, _ in frames], max_batch=CHUNK_SIZE)
+    except Exception:
+        yolo_results = [None] * len(frames)  # retried per image below so one bad frame fails alone
+    yolo_share = (time.perf_counter() - yolo_start) / len(frames)
+
+    for (path, frame, start), yolo_detections in zip(frames, yolo_results):
+        try:
+            if yolo_detections is None:
+                yolo_detections = _worker['yolo'].detect(frame)
+            ocr_start = time.perf_counter()
+            ocr_detections = _worker['ocr'].detect(frame)
+            ocr_time = time.perf_counter() - ocr_start
+
+            for i, detection in enumerate(yolo_detections):
+                detection['y_id'] = f"Y{i+1:03d}"
+            for i, detection in enumerate(ocr_detections):
+                detection['o_id'] = f"O{i+1:03d}"
+            merged_detections, _ = _worker['merger'].merge_detections(yolo_detections, ocr_detections)
+
+            group_start = time.perf_counter()
+            groups = _seraphine_groups(merged_detections)
+            group_time = time.perf_counter() - group_start
+
+            records.append({
+                'image': path,
+                'width': frame.width,
+                'height': frame.height,
+                'yolo_count': len(yolo_detections),
+                'ocr_count': len(ocr_detections),
+                'merged_count': len(merged_detections),
+                'merged_detections': merged_detections,
+                'seraphine_groups': groups,
+                'timing': {
+                    'yolo_time': yolo_share,
+                    'ocr_time': ocr_time,
+                    'grouping_time': group_time,
+                    'wall_time': time.perf_counter() - start,
+                },
+                'worker_pid': os.getpid(),
+            })
+        except Exception as e:
+            records.append({'image': path, 'error': str(e)})
+    return records
+
+
+def _json_default(value):
+    # numpy scalars from the detectors/merger
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def expand_images(patterns: Iterable[str]) -> List[str]:
+    """Glob patterns and directories -> sorted unique image paths"""
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        for path in glob.glob(pattern):
+            if path.lower().endswith((".png", ".jpg", ".jpeg", ".bmp")):
+                found.add(path)
+    return sorted(found)
+
+
+def _chunks(image_paths: List[str]) -> List[List[str]]:
+    # Same-size screenshots are adjacent per app folder, so sorted chunks batch well
+    return [image_paths[i:i + CHUNK_SIZE] for i in range(0, len(image_paths), CHUNK_SIZE)]
+
+
+def iter_batch(image_paths: List[str], config: Dict = None, workers: int = None,
+               intra_op_threads: int = None) -> Iterator[Dict]:
+    """
+    Yield one result record per image, in input order, as soon as its chunk is done
+
+    Args:
+        image_paths: saved screenshots
+        config: pipeline config (defaults to config.json)
+        workers: worker processes (default: half the cores, at least 1)
+        intra_op_threads: onnxruntime threads per worker (default: cores // workers)
+    """
+    config = config or load_configuration() or {}
+    cores = os.cpu_count() or 1
+    workers = max(1, workers or cores // 2)
+    intra_op_threads = intra_op_threads or max(1, cores // workers)
+
+    if workers == 1:
+        _init_worker(config, intra_op_threads)
+        for chunk in _chunks(image_paths):
+            yield from _process_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config, intra_op_threads)) as pool:
+        for records in pool.map(_process_chunk, _chunks(image_paths)):
+            yield from records
+
+
+def run_batch(image_paths: List[str], output_path: str, config: Dict = None, workers: int = None,
+              intra_op_threads: int = None, quiet: bool = False) -> Dict:
+    """Stream results to a JSONL file and return throughput statistics"""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    start = time.perf_counter()
+    done = failed = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        for record in iter_batch(image_paths, config, workers, intra_op_threads):
+            out.write(json.dumps(record, default=_json_default) + "\n")
+            out.flush()
+            done += 1
+            failed += 'error' in record
+            if not quiet:
+                elapsed = time.perf_counter() - start
+                print(f"[{done}/{len(image_paths)}] {record['image']} "
+                      f"({record.get('merged_count', 'error')}) {done / elapsed:.2f} img/s", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'images': done,
+        'failed': failed,
+        'seconds': elapsed,
+        'images_per_second': done / elapsed if elapsed > 0 else 0.0,
+        'output': output_path,
+    }
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Seraphine detection + grouping over saved screenshots")
+    parser.add_argument("images", nargs="+", help="Image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="outputs/seraphine_batch.jsonl", help="JSONL output path")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("-t", "--threads", type=int, default=None, help="onnxruntime intra-op threads per worker")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print the final summary")
+    args = parser.parse_args()
+
+    image_paths = expand_images(args.images)
+    if not image_paths:
+        print("No images found", file=sys.stderr)
+        sys.exit(1)
+
+    stats = run_batch(image_paths, args.output, workers=args.workers,
+                      intra_op_threads=args.threads, quiet=args.quiet)
+    print(f"{stats['images']} images ({stats['failed']} failed) in {stats['seconds']:.1f}s: "
+          f"{stats['images_per_second']:.2f} images/sec -> {stats['output']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ No imports from original files allowed.
 import numpy as np
 from typing import List, Dict, Any, Tuple
 from .helpers import debug_print
+from .spatial_index import BoxGrid, iou_one_to_many, containment_ratio
 
 def calculate_iou(box1: List[int], box2: List[int]) -> float:
     """Calculate IoU between two boxes in [x1, y1, x2, y2] format"""
@@ -119,30 +120,23 @@ class BBoxMerger:
             debug_print(f"  🔄 Stage 1: Removing YOLO self-overlaps...")
         
         filtered_yolo = []
+        boxes = np.array([d['bbox'] for d in yolo_detections], dtype=np.float64).reshape(-1, 4)
+        areas = np.array([calculate_box_area(d['bbox']) for d in yolo_detections], dtype=np.float64)
+        grid = BoxGrid(boxes)
         
         for i, yolo1 in enumerate(yolo_detections):
-            bbox1 = yolo1['bbox']
-            area1 = calculate_box_area(bbox1)
-            is_valid_box = True
+            # Only boxes sharing a grid cell can have IoU > 0
+            others = grid.candidates(boxes[i])
+            others = others[others != i]
+            iou = iou_one_to_many(boxes[i], boxes[others])
+            # If significant overlap and current box is larger, discard it (keep smaller box)
+            hits = np.nonzero((iou > self.iou_threshold) & (areas[i] > areas[others]))[0]
             
-            # Check against all other YOLO boxes
-            for j, yolo2 in enumerate(yolo_detections):
-                if i == j:
-                    continue
-                    
-                bbox2 = yolo2['bbox']
-                area2 = calculate_box_area(bbox2)
-                
-                iou = calculate_iou(bbox1, bbox2)
-                
-                # If significant overlap and current box is larger, discard it (keep smaller box)
-                if iou > self.iou_threshold and area1 > area2:
-                    is_valid_box = False
-                    if self.enable_timing:
-                        debug_print(f"    🗑️ Discarding larger YOLO box (area: {area1:.1f}) in favor of smaller (area: {area2:.1f}), IoU: {iou:.3f}")
-                    break
-            
-            if is_valid_box:
+            if len(hits):
+                if self.enable_timing:
+                    j = hits[0]
+                    debug_print(f"    🗑️ Discarding larger YOLO box (area: {areas[i]:.1f}) in favor of smaller (area: {areas[others[j]]:.1f}), IoU: {iou[j]:.3f}")
+            else:
                 filtered_yolo.append(yolo1)
         
         if self.enable_timing:
@@ -169,22 +163,17 @@ class BBoxMerger:
             debug_print(f"  🔄 Stage 1.5: Filtering YOLO boxes with >{max_ocr_inside} OCR inside...")
         
         filtered_yolo = []
+        ocr_boxes = np.array([d['bbox'] for d in ocr_detections], dtype=np.float64).reshape(-1, 4)
+        ocr_grid = BoxGrid(ocr_boxes)
         
         for yolo_det in yolo_detections:
             yolo_bbox = yolo_det['bbox']
-            ocr_inside_count = 0
             
-            # Count how many OCR boxes are inside this YOLO box
-            for ocr_det in ocr_detections:
-                ocr_bbox = ocr_det['bbox']
-                
-                # Check if OCR box is inside YOLO box
-                if is_box_inside(ocr_bbox, yolo_bbox, self.containment_threshold):
-                    ocr_inside_count += 1
-                    
-                    # Early exit if we exceed the threshold
-                    if ocr_inside_count > max_ocr_inside:
-                        break
+            # Count how many OCR boxes are inside this YOLO box (capped like the early exit)
+            nearby = ocr_grid.candidates(yolo_bbox)
+            ratio = containment_ratio(ocr_boxes[nearby], yolo_bbox)
+            inside = (ratio > 0) & (ratio >= self.containment_threshold)
+            ocr_inside_count = min(int(inside.sum()), max_ocr_inside + 1)
             
             if ocr_inside_count <= max_ocr_inside:
                 filtered_yolo.append(yolo_det)
@@ -218,19 +207,26 @@ class BBoxMerger:
         
         merged_detections = []
         ocr_used = [False] * len(ocr_detections)
+        ocr_boxes = np.array([d['bbox'] for d in ocr_detections], dtype=np.float64).reshape(-1, 4)
+        ocr_grid = BoxGrid(ocr_boxes)
         
         # Process each YOLO box
         for yolo_det in yolo_detections:
             yolo_bbox = yolo_det['bbox']
             box_added = False
             
-            # Check relationships with all OCR boxes
-            for j, ocr_det in enumerate(ocr_detections):
+            # Only OCR boxes sharing a grid cell can overlap; keep ascending order,
+            # since which OCR box is matched first decides the outcome
+            nearby = ocr_grid.candidates(yolo_bbox)
+            ious = iou_one_to_many(yolo_bbox, ocr_boxes[nearby])
+            overlapping = ious > self.iou_threshold
+            
+            for j, iou in zip(nearby[overlapping].tolist(), ious[overlapping].tolist()):
                 if ocr_used[j]:
                     continue
                     
+                ocr_det = ocr_detections[j]
                 ocr_bbox = ocr_det['bbox']
-                iou = calculate_iou(yolo_bbox, ocr_bbox)
                 
                 if iou > self.iou_threshold:
                     # Check containment relationships
@@ -0,0 +1,164 @@
+"""
+Persistent caption cache for Gemini icon analysis
+Element crops are keyed on a perceptual hash (plus app name and a coarse size
+bucket) so toolbars and menus that look the same across states and sessions
+are labelled once and then served from disk instead of re-sent to Gemini.
+No imports from original files allowed.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8            # 8x8 low-frequency DCT block -> 64-bit hash
+HASH_SAMPLE = 32         # crops are resampled to 32x32 grayscale before the DCT
+HAMMING_THRESHOLD = 3    # bits; anti-aliasing/highlight noise stays below this
+SIZE_BUCKET = 4          # px; "Open" and "Save" rarely share both size bucket and hash
+MAX_ENTRIES = 20000      # per cache file; least recently seen entries are dropped first
+CACHED_FIELDS = ("name", "usage", "enabled", "interactive", "type")
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "caption_cache.json")
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT = _dct_matrix(HASH_SAMPLE)
+
+
+def phash(image: Image.Image) -> int:
+    """64-bit DCT perceptual hash of a PIL image"""
+    gray = image.convert("L").resize((HASH_SAMPLE, HASH_SAMPLE), Image.Resampling.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])  # DC term excluded: it only tracks brightness
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def crop_key(image: Image.Image) -> str:
+    """Size bucket + hash, e.g. '6x4:9f3a...'; the app name is kept separately"""
+    w, h = image.size
+    return f"{w // SIZE_BUCKET}x{h // SIZE_BUCKET}:{phash(image):016x}"
+
+
+class CaptionCache:
+    """JSON-backed {app: {crop_key: caption}} store with near-duplicate lookup"""
+
+    _shared: Dict[str, "CaptionCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_distance: int = HAMMING_THRESHOLD):
+        self.path = path
+        self.max_distance = max_distance
+        self.entries: Dict[str, Dict[str, Dict]] = {}
+        self._buckets: Dict[Tuple[str, str], Tuple[list, np.ndarray]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def shared(cls, path: str = DEFAULT_CACHE_PATH) -> "CaptionCache":
+        """One instance per cache file per process"""
+        path = os.path.abspath(path)
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(path)
+            return cls._shared[path]
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = {app: dict(items) for app, items in data.get("entries", {}).items()}
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError):
+            # A corrupt cache only costs model calls; start over rather than fail the pipeline
+            self.entries = {}
+        self._buckets.clear()
+
+    def _bucket(self, app: str, size: str) -> Tuple[list, np.ndarray]:
+        """Hashes of one app/size bucket as a uint64 array for vectorized Hamming search"""
+        cached = self._buckets.get((app, size))
+        if cached is None:
+            keys = [k for k in self.entries.get(app, {}) if k.startswith(size + ":")]
+            hashes = np.array([int(k.split(":")[1], 16) for k in keys], dtype=np.uint64)
+            cached = self._buckets[(app, size)] = (keys, hashes)
+        return cached
+
+    def lookup(self, app: str, image: Image.Image) -> Tuple[str, Optional[Dict]]:
+        """Return (crop_key, cached caption or None) for one element crop"""
+        key = crop_key(image)
+        with self._lock:
+            app_entries = self.entries.get(app, {})
+            entry = app_entries.get(key)
+            if entry is None and self.max_distance > 0 and app_entries:
+                size, value = key.split(":")
+                keys, hashes = self._bucket(app, size)
+                if len(keys):
+                    xor = np.bitwise_xor(hashes, np.uint64(int(value, 16)))
+                    dist = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+                    best = int(np.argmin(dist))
+                    if dist[best] <= self.max_distance:
+                        entry = app_entries[keys[best]]
+            if entry is not None:
+                entry["last_seen"] = time.time()
+                entry["hits"] = entry.get("hits", 0) + 1
+                self._dirty = True
+            return key, entry
+
+    def put(self, app: str, key: str, icon: Dict):
+        """Remember the model's answer for a crop"""
+        entry = {field: icon[field] for field in CACHED_FIELDS if field in icon}
+        if not entry.get("name"):
+            return  # nothing useful to serve next time
+        entry.update(last_seen=time.time(), hits=0)
+        with self._lock:
+            self.entries.setdefault(app, {})[key] = entry
+            self._buckets.pop((app, key.split(":")[0]), None)
+            self._dirty = True
+
+    def save(self):
+        """Merge with what other processes wrote since load, trim, and replace atomically"""
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = {app: dict(items) for app, items in self.entries.items()}
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    on_disk = json.load(f).get("entries", {})
+                for app, items in on_disk.items():
+                    for key, entry in items.items():
+                        merged.setdefault(app, {}).setdefault(key, entry)
+            except (OSError, ValueError):
+                pass
+
+            flat = [(entry.get("last_seen", 0), app, key) for app, items in merged.items() for key, entry in items.items()]
+            if len(flat) > MAX_ENTRIES:
+                for _, app, key in sorted(flat)[:len(flat) - MAX_ENTRIES]:
+                    del merged[app][key]
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "entries": merged}, f)
+            os.replace(tmp_path, self.path)
+            self.entries = merged
+            self._buckets.clear()
+            self._dirty = False
+
+
+def app_name_for_screenshot(image_path: str) -> str:
+    """apps/<app>/screenshots/S001.png -> '<app>'; anything else falls back to 'default'"""
+    parent = os.path.dirname(os.path.abspath(image_path))
+    if os.path.basename(parent) == "screenshots":
+        return os.path.basename(os.path.dirname(parent))
+    return "default"
@@ -0,0 +1,80 @@
+"""
+Shared in-memory frame for the Seraphine detectors.
+Decodes a screenshot once and caches every derived view (RGB array, PIL image,
+per-detector input tensors) so YOLO, OCR, grouping and crops reuse them
+instead of each re-reading the file from disk.
+No imports from original files allowed.
+"""
+import threading
+import numpy as np
+import cv2
+from PIL import Image
+from typing import Any, Callable, Dict, Hashable
+
+
+class Frame:
+    """Decoded BGR screenshot plus lazily computed, thread-safe derived views"""
+
+    def __init__(self, bgr: np.ndarray, source: str = None):
+        if bgr is None or bgr.ndim != 3 or bgr.shape[2] != 3:
+            raise ValueError("Frame expects an HxWx3 BGR image")
+        self.bgr = bgr
+        self.source = source  # original path, used only for naming outputs
+        self._views: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, image_path: str) -> "Frame":
+        img_bgr = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if img_bgr is None:
+            raise ValueError(f"Could not load image: {image_path}")
+        return cls(img_bgr, source=image_path)
+
+    @classmethod
+    def from_pil(cls, pil_image: Image.Image) -> "Frame":
+        rgb = np.array(pil_image.convert("RGB"))
+        frame = cls(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        frame._views["rgb"] = rgb
+        return frame
+
+    @classmethod
+    def wrap(cls, image_input) -> "Frame":
+        """Accept a Frame, a BGR ndarray, a PIL image or a file path"""
+        if isinstance(image_input, Frame):
+            return image_input
+        if isinstance(image_input, np.ndarray):
+            return cls(image_input)
+        if isinstance(image_input, str):
+            return cls.from_path(image_input)
+        return cls.from_pil(image_input)
+
+    @property
+    def width(self) -> int:
+        return self.bgr.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.bgr.shape[0]
+
+    def view(self, key: Hashable, build: Callable[["Frame"], Any]) -> Any:
+        """Return the cached view for key, building it once on first use.
+
+        Each key has its own lock: two detector threads asking for the same
+        view compute it once, while different views still build in parallel.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._views:
+                self._views[key] = build(self)
+            return self._views[key]
+
+    @property
+    def rgb(self) -> np.ndarray:
+        return self.view("rgb", lambda f: cv2.cvtColor(f.bgr, cv2.COLOR_BGR2RGB))
+
+    @property
+    def pil(self) -> Image.Image:
+        """RGB PIL image; treat as read-only, callers that draw must copy()"""
+        return self.view("pil", lambda f: Image.fromarray(f.rgb))
@@ -79,7 +79,96 @@ def integrate_gemini_results(seraphine_analysis, gemini_results):
     
     return seraphine_analysis
 
-async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_path, config):
+async def analyze_with_caption_cache(analyzer, generator, seraphine_analysis, image_path, filename_base,
+                                     app_name, cache, image=None, baseline_calls=None):
+    """
+    Send only crops the caption cache does not know to Gemini and merge in cached captions
+
+    Cache hits are left out of the combined images, so fewer images (model calls) go out.
+    Icon ids in the returned results always use the original "{group_id}_{i+1}" labels.
+    baseline_calls is the number of combined images the uncached run would send; when it
+    is unknown it is estimated from the crops per image actually sent.
+    """
+    hits, keys = {}, {}
+
+    def skip_box(label, crop):
+        key, entry = cache.lookup(app_name, crop)
+        keys[label] = key
+        if entry is not None:
+            hits[label] = entry
+            return True
+        return False
+
+    result = generator.create_grouped_images(
+        image_path=image_path,
+        seraphine_analysis=seraphine_analysis,
+        filename_base=filename_base,
+        return_direct_images=True,
+        image=image,
+        skip_box=skip_box
+    )
+    label_map = result.get('label_map', {})
+    direct_images = [(img, name) for img, name in result['direct_images'] if "combined" in name]
+
+    if direct_images:
+        gemini_results = await analyzer.analyze_grouped_images(
+            grouped_image_paths=None,
+            filename_base=filename_base,
+            direct_images=direct_images
+        )
+    else:
+        gemini_results = {
+            'filename_base': filename_base,
+            'analysis_duration_seconds': 0.0,
+            'total_images_analyzed': 0,
+            'analysis_mode': 'direct',
+            'successful_analyses': 0,
+            'total_icons_found': 0,
+            'images': []
+        }
+
+    # Relabel model answers back to full-group ids and remember them
+    for image_result in gemini_results['images']:
+        for icon in image_result.get('icons', []):
+            icon['id'] = label_map.get(icon.get('id'), icon.get('id'))
+            if image_result['analysis_success'] and icon['id'] in keys and icon['id'] not in hits:
+                cache.put(app_name, keys[icon['id']], icon)
+
+    if hits:
+        cached_icons = [dict(entry, id=label) for label, entry in hits.items()]
+        gemini_results['images'].append({
+            'image_path': 'cache:caption_cache',
+            'image_name': 'caption_cache',
+            'icons_found': len(cached_icons),
+            'icons': cached_icons,
+            'raw_response': None,
+            'analysis_success': True,
+            'from_cache': True
+        })
+        gemini_results['total_icons_found'] += len(cached_icons)
+    cache.save()
+
+    sent_calls = len(direct_images)
+    misses = len(keys) - len(hits)
+    if baseline_calls is None:
+        # One partly filled image would have held every crop; beyond that scale by density
+        baseline_calls = -(-len(keys) * sent_calls // misses) if sent_calls > 1 else int(bool(keys))
+    gemini_results['caption_cache'] = {
+        'app_name': app_name,
+        'crops': len(keys),
+        'hits': len(hits),
+        'misses': misses,
+        'hit_rate': len(hits) / len(keys) if keys else 0.0,
+        'model_calls': sent_calls,
+        'model_calls_saved': max(0, baseline_calls - sent_calls)
+    }
+    stats = gemini_results['caption_cache']
+    debug_print(f"   🗃️  Caption cache: {stats['hits']}/{stats['crops']} crops cached "
+                f"({stats['hit_rate']:.0%}), {stats['model_calls']} Gemini calls, "
+                f"{stats['model_calls_saved']} saved")
+    return gemini_results
+
+async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_path, config, image=None):
     """
     Run Gemini LLM analysis with optimized image sharing
     """
@@ -117,25 +206,42 @@ async def run_gemini_analysis(seraphine_analysis, grouped_image_paths, image_pat
                 save_mapping=False  # Don't save files, just get images
             )
             
-            # Get direct images using the correct method
-            result = final_group_generator.create_grouped_images(
-                image_path=image_path,
-                seraphine_analysis=seraphine_analysis,
-                filename_base=filename_base,
-                return_direct_images=True
-            )
-            
-            # Extract direct images from result
-            direct_images = result['direct_images']
-            
-            debug_print(f"   🖼️  Generated {len(direct_images)} direct images for Gemini analysis")
-            
-            # Analyze with direct images (no file I/O)
-            gemini_results = await analyzer.analyze_grouped_images(
-                grouped_image_paths=None,
-                filename_base=filename_base,
-                direct_images=direct_images
-            )
+            if config.get("gemini_caption_cache", True):
+                from .caption_cache import CaptionCache, DEFAULT_CACHE_PATH, app_name_for_screenshot
+                
+                # Step 3 already packed the full groups; its image count is the uncached call count
+                baseline_calls = None
+                if grouped_image_paths:
+                    baseline_calls = len([p for p in grouped_image_paths if "combined" in os.path.basename(p)])
+                
+                gemini_results = await analyze_with_caption_cache(
+                    analyzer, final_group_generator, seraphine_analysis, image_path, filename_base,
+                    app_name=config.get("gemini_cache_app") or app_name_for_screenshot(image_path),
+                    cache=CaptionCache.shared(config.get("gemini_cache_path") or DEFAULT_CACHE_PATH),
+                    image=image,
+                    baseline_calls=baseline_calls
+                )
+            else:
+                # Get direct images using the correct method
+                result = final_group_generator.create_grouped_images(
+                    image_path=image_path,
+                    seraphine_analysis=seraphine_analysis,
+                    filename_base=filename_base,
+                    return_direct_images=True,
+                    image=image
+                )
+                
+                # Extract direct images from result
+                direct_images = result['direct_images']
+                
+                debug_print(f"   🖼️  Generated {len(direct_images)} direct images for Gemini analysis")
+                
+                # Analyze with direct images (no file I/O)
+                gemini_results = await analyzer.analyze_grouped_images(
+                    grouped_image_paths=None,
+                    filename_base=filename_base,
+                    direct_images=direct_images
+                )
         else:
             debug_print("   📁 Using file mode (traditional)")
             # Use traditional file mode
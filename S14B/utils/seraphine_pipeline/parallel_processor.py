@@ -6,13 +6,15 @@ import time
 import threading
 import json
 import os
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Union
+import numpy as np
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from .helpers import debug_print
 
 from .yolo_detector import YOLODetector, YOLOConfig
 from .ocr_detector import OCRDetector, OCRDetConfig
 from .bbox_merger import BBoxMerger
+from .frame import Frame
 try:
     from .yolo_visualizer import DetectionVisualizer
 except ImportError:
@@ -60,19 +62,25 @@ class ParallelProcessor:
             debug_print("⚠️  DetectionVisualizer not available, skipping visualizations")
             self.create_visualizations = False
     
-    def process_image(self, image_path: str, output_dir: str = "outputs") -> Dict[str, Any]:
+    def process_image(self, image: Union[str, np.ndarray, Frame], output_dir: str = "outputs",
+                      image_path: str = None) -> Dict[str, Any]:
         """
         Process image with parallel YOLO and OCR detection, then merge results
         
         Args:
-            image_path: Path to input image
+            image: Path to input image, decoded BGR numpy array or Frame.
+                   The image is decoded once and shared by both detectors.
             output_dir: Directory to save results
+            image_path: Original file path of an in-memory image (names output files)
             
         Returns:
             Dictionary containing all results and timing information
         """
         total_start = time.time()
         
+        frame = Frame.wrap(image)
+        image_path = image_path or frame.source or "frame"
+        
         if self.enable_timing:
             debug_print(f"\n🚀 Starting parallel detection pipeline...")
             debug_print(f"📁 Image: {image_path}")
@@ -99,12 +107,12 @@ class ParallelProcessor:
         def run_yolo():
             if self.enable_timing:
                 debug_print(f"🎯 Thread: Starting YOLO detection...")
-            return self.yolo_detector.detect(image_path)
+            return self.yolo_detector.detect(frame)
         
         def run_ocr():
             if self.enable_timing:
                 debug_print(f"📝 Thread: Starting OCR detection...")
-            return self.ocr_detector.detect(image_path)
+            return self.ocr_detector.detect(frame)
         
         # Execute in parallel using ThreadPoolExecutor
         with ThreadPoolExecutor(max_workers=2) as executor:
@@ -140,7 +148,7 @@ class ParallelProcessor:
         
         # Create visualizations if enabled
         viz_time = 0
-        if self.create_visualizations:
+        if self.create_visualizations and os.path.exists(image_path):
             viz_start = time.time()
             if self.enable_timing:
                 debug_print(f"\n🎨 Creating beautiful visualizations...")
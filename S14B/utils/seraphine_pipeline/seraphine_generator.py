@@ -1,7 +1,7 @@
 import os
 import time
 import glob
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Tuple
 from PIL import Image
 from .helpers import debug_print
 
@@ -19,7 +19,9 @@ class FinalGroupImageGenerator:
         os.makedirs(self.output_dir, exist_ok=True)
     
     def create_grouped_images(self, image_path: str, seraphine_analysis: Dict[str, Any], 
-                            filename_base: str, return_direct_images: bool = False) -> List[str] | Dict[str, Any]:
+                            filename_base: str, return_direct_images: bool = False,
+                            image: Image.Image = None,
+                            skip_box: Callable[[str, Image.Image], bool] = None) -> List[str] | Dict[str, Any]:
         """
         Generate group images using the BBoxProcessor, filtering to only explore=True groups
         
@@ -28,6 +30,10 @@ class FinalGroupImageGenerator:
             seraphine_analysis: Result from FinalSeraphineProcessor.process_detections()
             filename_base: Base filename for outputs
             return_direct_images: If True, returns PIL images directly for Gemini
+            image: Already decoded screenshot (PIL, RGB); skips re-reading image_path
+            skip_box: Called with (label, crop) per box; boxes it returns True for are left
+                out of the images (e.g. already captioned). Surviving boxes are relabelled
+                by position, so the result's 'label_map' maps new labels to original ones
             
         Returns:
             If return_direct_images=False: List of generated image file paths (original behavior)
@@ -76,13 +82,17 @@ class FinalGroupImageGenerator:
         
         # Load original image into processor
         try:
-            bbox_processor.original_image = Image.open(image_path)
+            bbox_processor.original_image = image if image is not None else Image.open(image_path)
             if self.enable_debug:
                 debug_print(f"📷 Loaded original image: {bbox_processor.original_image.size}")
         except Exception as e:
             debug_print(f"❌ Error loading original image: {e}")
             bbox_processor.original_image = None
         
+        label_map = {}
+        if skip_box is not None and bbox_processor.original_image is not None:
+            bbox_processor.final_groups, label_map = self._drop_skipped_boxes(bbox_processor, filtered_groups, skip_box)
+        
         # Generate images
         os.makedirs(self.output_dir, exist_ok=True)
         
@@ -90,6 +100,8 @@ class FinalGroupImageGenerator:
             if return_direct_images:
                 # Generate with direct image return
                 result = bbox_processor.generate_images(self.output_dir, return_images=True)
+                if skip_box is not None:
+                    self._restore_group_labels(bbox_processor, filtered_groups)
                 
                 # Create file path list for compatibility
                 generated_files = result['saved_paths']
@@ -103,6 +115,7 @@ class FinalGroupImageGenerator:
                     debug_print(f"⏱️  Image generation (with direct return, {explore_count} groups): {elapsed:.3f}s")
                 
                 return {
+                    'label_map': label_map,
                     'file_paths': generated_files,
                     'direct_images': [(img, filename) for img, filename, _ in result['generated_images']],
                     'image_count': result['image_count'],
@@ -112,6 +125,8 @@ class FinalGroupImageGenerator:
             else:
                 # Original behavior - just save files
                 bbox_processor.generate_images(self.output_dir)
+                if skip_box is not None:
+                    self._restore_group_labels(bbox_processor, filtered_groups)
                 if self.save_mapping:
                     bbox_processor.save_mapping(self.output_dir)
                 
@@ -134,3 +149,26 @@ class FinalGroupImageGenerator:
         finally:
             # ✅ RESTORE ORIGINAL GROUPS (important for other parts of pipeline)
             bbox_processor.final_groups = original_final_groups
+
+    @staticmethod
+    def _drop_skipped_boxes(bbox_processor, groups: Dict[str, list],
+                            skip_box: Callable[[str, Image.Image], bool]) -> Tuple[Dict[str, list], Dict[str, str]]:
+        """Keep only boxes skip_box rejects; groups left empty are dropped entirely"""
+        kept_groups, label_map = {}, {}
+        for group_id, boxes in groups.items():
+            kept = []
+            for i, bbox in enumerate(boxes):
+                label = f"{group_id}_{i+1}"
+                if not skip_box(label, bbox_processor.crop_bbox_from_image(bbox)):
+                    kept.append(bbox)
+                    label_map[f"{group_id}_{len(kept)}"] = label
+            if kept:
+                kept_groups[group_id] = kept
+        return kept_groups, label_map
+
+    @staticmethod
+    def _restore_group_labels(bbox_processor, groups: Dict[str, list]):
+        """Point bbox_to_group_mapping at the labels the full groups would have produced"""
+        for group_id, boxes in groups.items():
+            for i, bbox in enumerate(boxes):
+                bbox_processor.bbox_to_group_mapping[bbox.merged_id] = f"{group_id}_{i+1}"
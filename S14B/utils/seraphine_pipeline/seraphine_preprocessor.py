@@ -31,7 +31,8 @@ except ImportError:
 
 
 def create_group_visualization(final_groups: Dict, original_image_path: str, 
-                             output_dir: str = "outputs", app_name: str = "app") -> str:
+                             output_dir: str = "outputs", app_name: str = "app",
+                             image_bgr=None) -> str:
     """
     Create group visualization overlay on original screenshot using EXACT labeling from postprocessor
     
@@ -40,13 +41,15 @@ def create_group_visualization(final_groups: Dict, original_image_path: str,
         original_image_path: Path to S001.png screenshot  
         output_dir: Output directory for saving result
         app_name: App name for filename
+        image_bgr: Already decoded screenshot; skips re-reading original_image_path
         
     Returns:
         Path to saved visualization image
     """    
     # Load original image using cv2 (same as postprocessor)
     try:
-        image = cv2.imread(original_image_path)
+        # Draw on a copy: the decoded frame is shared with the rest of the pipeline
+        image = image_bgr.copy() if image_bgr is not None else cv2.imread(original_image_path)
         if image is None:
             raise ValueError(f"Could not load image: {original_image_path}")
         
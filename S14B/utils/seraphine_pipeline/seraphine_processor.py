@@ -9,6 +9,7 @@ import math
 import time
 import tempfile
 from .helpers import debug_print
+from .spatial_index import PointGrid
 import numpy as np
 
 @dataclass
@@ -232,8 +233,9 @@ class BBoxProcessor:
         
         # Update the main lists to exclude long boxes
         self.all_bboxes = remaining_bboxes
-        self.sort_x_list = [b for b in self.sort_x_list if b in remaining_bboxes]
-        self.sort_y_list = [b for b in self.sort_y_list if b in remaining_bboxes]
+        remaining_ids = {id(b) for b in remaining_bboxes}  # identity set: list membership was O(n^2)
+        self.sort_x_list = [b for b in self.sort_x_list if id(b) in remaining_ids]
+        self.sort_y_list = [b for b in self.sort_y_list if id(b) in remaining_ids]
         
         self.log(f"Identified {len(self.long_boxes)} long boxes")
         self.log(f"Remaining {len(self.all_bboxes)} boxes for grouping")
@@ -261,95 +263,94 @@ class BBoxProcessor:
                 gap = bbox2.y1 - bbox1.y2
                 return gap  # Positive distance = gap
 
-    def horizontal_grouping(self):
-        """FIXED: Horizontal grouping with overlap support"""
-        self.log("Step 6: Performing horizontal grouping (overlap-aware)")
+    def _chain_groups(self, sorted_list: List[BBox], direction: str) -> Dict[int, List[BBox]]:
+        """
+        Greedy chaining shared by horizontal/vertical grouping.
         
-        used_boxes = set()
-        group_id = 0
+        Same result as scanning the whole sorted list for every anchor: the scan
+        only moves forward, so the next box joined is the first unused box after
+        the last one joined that passes the alignment and overlap/gap checks.
+        A grid over (leading edge, cross-axis center) limits that search to boxes
+        that can pass; the checks themselves run vectorized on the candidates.
+        """
+        groups: Dict[int, List[BBox]] = {}
+        n = len(sorted_list)
+        if n == 0:
+            return groups
+        
+        horizontal = direction == 'horizontal'
+        coords = np.array([[b.x1, b.y1, b.x2, b.y2] for b in sorted_list], dtype=np.float64)
+        if horizontal:
+            lead, trail, cross = coords[:, 0], coords[:, 2], (coords[:, 1] + coords[:, 3]) / 2
+            size = coords[:, 2] - coords[:, 0]
+            cross_tol = self.Y_VARIANCE_TOLERANCE
+        else:
+            lead, trail, cross = coords[:, 1], coords[:, 3], (coords[:, 0] + coords[:, 2]) / 2
+            size = coords[:, 3] - coords[:, 1]
+            cross_tol = self.HORIZONTAL_TOLERANCE_PX
+        
+        grid = PointGrid(lead, cross, cell_size=max(16, int(np.median(np.abs(size)) * 2)))
+        
+        # used is tracked per merged_id, exactly like the original used_boxes set
+        positions_by_id: Dict[int, List[int]] = {}
+        for pos, bbox in enumerate(sorted_list):
+            positions_by_id.setdefault(bbox.merged_id, []).append(pos)
+        used = np.zeros(n, dtype=bool)
         
-        for bbox in self.sort_x_list:
-            if bbox.merged_id in used_boxes:
+        def mark_used(bbox: BBox):
+            used[positions_by_id[bbox.merged_id]] = True
+        
+        group_id = 0
+        for anchor in range(n):
+            if used[anchor]:
                 continue
             
-            current_group = [bbox]
-            used_boxes.add(bbox.merged_id)
-            current_bbox = bbox
+            current_group = [sorted_list[anchor]]
+            mark_used(sorted_list[anchor])
+            cur, scan_from = anchor, 0
             
-            # Find horizontal neighbors
-            for next_bbox in self.sort_x_list:
-                if next_bbox.merged_id in used_boxes:
-                    continue
+            while True:
+                cur_size = size[cur]
+                max_gap = min(self.HORIZONTAL_TOLERANCE_PX, cur_size) if horizontal else self.HORIZONTAL_TOLERANCE_PX
+                # Window is a superset: max_overlap = min(cur, next) * 0.3 <= cur * 0.3
+                cand = grid.query(trail[cur] - max(cur_size, 0) * 0.3 - 1, trail[cur] + max_gap + 1,
+                                  cross[cur] - cross_tol - 1, cross[cur] + cross_tol + 1)
+                cand = cand[(cand >= scan_from) & ~used[cand]]
+                if len(cand):
+                    # Overlap-aware distance: negative = overlap, positive = gap
+                    distance = lead[cand] - trail[cur]
+                    max_overlap = np.minimum(cur_size, size[cand]) * 0.3  # 30% overlap allowed
+                    ok = ((np.abs(cross[cand] - cross[cur]) <= cross_tol) &
+                          (-max_overlap <= distance) & (distance <= max_gap))
+                    cand, distance = cand[ok], distance[ok]
+                if not len(cand):
+                    break
                 
-                # Check if next box is horizontally aligned
-                y_diff = abs(next_bbox.center_y - current_bbox.center_y)
-                if y_diff <= self.Y_VARIANCE_TOLERANCE:
-                    # FIXED: Use overlap-aware distance
-                    distance = self.calculate_overlap_aware_distance(current_bbox, next_bbox, 'horizontal')
-                    
-                    # Allow small overlaps and reasonable gaps
-                    max_overlap = min(current_bbox.width, next_bbox.width) * 0.3  # 30% overlap allowed
-                    max_gap = min(self.HORIZONTAL_TOLERANCE_PX, current_bbox.width)
-                    
-                    if -max_overlap <= distance <= max_gap:  # Allows overlaps AND gaps
-                        current_group.append(next_bbox)
-                        used_boxes.add(next_bbox.merged_id)
-                        current_bbox = next_bbox
-                        
-                        if distance < 0:
-                            self.log(f"OVERLAP: Grouped overlapping boxes (overlap: {-distance:.1f}px)")
-                        else:
-                            self.log(f"GAP: Grouped boxes with gap (gap: {distance:.1f}px)")
+                nxt = int(cand[0])
+                current_group.append(sorted_list[nxt])
+                mark_used(sorted_list[nxt])
+                cur, scan_from = nxt, nxt + 1
+                
+                if distance[0] < 0:
+                    self.log(f"OVERLAP: Grouped overlapping boxes (overlap: {-distance[0]:.1f}px)")
+                else:
+                    self.log(f"GAP: Grouped boxes with gap (gap: {distance[0]:.1f}px)")
             
-            if len(current_group) > 0:
-                self.horizontal_groups[group_id] = current_group
-                self.log(f"Created horizontal group H{group_id} with {len(current_group)} boxes")
-                group_id += 1
+            groups[group_id] = current_group
+            self.log(f"Created {direction} group {'H' if horizontal else 'V'}{group_id} with {len(current_group)} boxes")
+            group_id += 1
+        
+        return groups
+    
+    def horizontal_grouping(self):
+        """FIXED: Horizontal grouping with overlap support (grid-indexed, see _chain_groups)"""
+        self.log("Step 6: Performing horizontal grouping (overlap-aware)")
+        self.horizontal_groups.update(self._chain_groups(self.sort_x_list, 'horizontal'))
     
     def vertical_grouping(self):
-        """FIXED: Vertical grouping with overlap support"""
+        """FIXED: Vertical grouping with overlap support (grid-indexed, see _chain_groups)"""
         self.log("Step 7: Performing vertical grouping (overlap-aware)")
-        
-        used_boxes = set()
-        group_id = 0
-        
-        for bbox in self.sort_y_list:
-            if bbox.merged_id in used_boxes:
-                continue
-            
-            current_group = [bbox]
-            used_boxes.add(bbox.merged_id)
-            current_bbox = bbox
-            
-            # Find vertical neighbors
-            for next_bbox in self.sort_y_list:
-                if next_bbox.merged_id in used_boxes:
-                    continue
-                
-                # Check if next box is vertically aligned
-                x_diff = abs(next_bbox.center_x - current_bbox.center_x)
-                if x_diff <= self.HORIZONTAL_TOLERANCE_PX:
-                    # FIXED: Use overlap-aware distance
-                    distance = self.calculate_overlap_aware_distance(current_bbox, next_bbox, 'vertical')
-                    
-                    # Allow small overlaps and reasonable gaps
-                    max_overlap = min(current_bbox.height, next_bbox.height) * 0.3  # 30% overlap allowed
-                    max_gap = self.HORIZONTAL_TOLERANCE_PX
-                    
-                    if -max_overlap <= distance <= max_gap:  # Allows overlaps AND gaps
-                        current_group.append(next_bbox)
-                        used_boxes.add(next_bbox.merged_id)
-                        current_bbox = next_bbox
-                        
-                        if distance < 0:
-                            self.log(f"OVERLAP: Grouped overlapping boxes (overlap: {-distance:.1f}px)")
-                        else:
-                            self.log(f"GAP: Grouped boxes with gap (gap: {distance:.1f}px)")
-            
-            if len(current_group) > 0:
-                self.vertical_groups[group_id] = current_group
-                self.log(f"Created vertical group V{group_id} with {len(current_group)} boxes")
-                group_id += 1
+        self.vertical_groups.update(self._chain_groups(self.sort_y_list, 'vertical'))
     
     def merge_groups(self):
         """Step 8: Merge groups and resolve conflicts"""
@@ -0,0 +1,155 @@
+"""
+Spatial indexes for Seraphine grouping and YOLO/OCR merging
+Uniform grids replace the all-pairs scans in BBoxProcessor and BBoxMerger:
+candidates come from nearby cells and are then checked exactly with vectorized
+NumPy, so results are identical to the pairwise loops.
+No imports from original files allowed.
+"""
+import time
+import random
+from collections import defaultdict
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+def _cell_size(extents: np.ndarray, minimum: int = 16) -> int:
+    """Grid cell about twice the typical box size keeps candidate lists short"""
+    if len(extents) == 0:
+        return minimum
+    return max(minimum, int(np.median(extents) * 2))
+
+
+class PointGrid:
+    """Grid over one anchor point per item; answers axis-aligned range queries"""
+
+    def __init__(self, xs: np.ndarray, ys: np.ndarray, cell_size: int):
+        self.xs = np.asarray(xs, dtype=np.float64)
+        self.ys = np.asarray(ys, dtype=np.float64)
+        self.cell = float(cell_size)
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, key in enumerate(zip((self.xs // self.cell).astype(int), (self.ys // self.cell).astype(int))):
+            self._cells[key].append(i)
+
+    def query(self, x_lo: float, x_hi: float, y_lo: float, y_hi: float) -> np.ndarray:
+        """Ids whose point lies in [x_lo, x_hi] x [y_lo, y_hi], ascending"""
+        found = []
+        for cx in range(int(x_lo // self.cell), int(x_hi // self.cell) + 1):
+            for cy in range(int(y_lo // self.cell), int(y_hi // self.cell) + 1):
+                found.extend(self._cells.get((cx, cy), ()))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        ids = np.array(found, dtype=np.int64)
+        xs, ys = self.xs[ids], self.ys[ids]
+        ids = ids[(xs >= x_lo) & (xs <= x_hi) & (ys >= y_lo) & (ys <= y_hi)]
+        return np.sort(ids)
+
+
+class BoxGrid:
+    """Grid over [x1, y1, x2, y2] boxes; each box is registered in every cell it covers.
+
+    Two boxes with a non-empty intersection always share a cell, so
+    candidates() is a superset of the truly overlapping boxes.
+    """
+
+    def __init__(self, boxes: np.ndarray, cell_size: int = None):
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        extents = np.maximum(self.boxes[:, 2] - self.boxes[:, 0], self.boxes[:, 3] - self.boxes[:, 1])
+        self.cell = float(cell_size or _cell_size(extents))
+        self._cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        spans = (self.boxes // self.cell).astype(int)
+        for i, (cx1, cy1, cx2, cy2) in enumerate(spans):
+            for cx in range(cx1, cx2 + 1):
+                for cy in range(cy1, cy2 + 1):
+                    self._cells[(cx, cy)].append(i)
+
+    def candidates(self, box) -> np.ndarray:
+        """Ids of boxes sharing at least one cell with box, ascending and unique"""
+        cx1, cy1, cx2, cy2 = (int(v // self.cell) for v in box)
+        found = []
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                found.extend(self._cells.get((cx, cy), ()))
+        return np.unique(np.array(found, dtype=np.int64))
+
+
+def _intersection(box, boxes: np.ndarray) -> np.ndarray:
+    iw = np.minimum(box[2], boxes[:, 2]) - np.maximum(box[0], boxes[:, 0])
+    ih = np.minimum(box[3], boxes[:, 3]) - np.maximum(box[1], boxes[:, 1])
+    return np.where((iw > 0) & (ih > 0), iw * ih, 0.0)
+
+
+def iou_one_to_many(box, boxes: np.ndarray) -> np.ndarray:
+    """Same values as bbox_merger.calculate_iou(box, b) for every b in boxes"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    inter = _intersection(box, boxes)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    union = area + (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]) - inter
+    out = np.zeros(len(boxes))
+    ok = (inter > 0) & (union > 0)
+    out[ok] = inter[ok] / union[ok]
+    return out
+
+
+def containment_ratio(inner_boxes: np.ndarray, outer) -> np.ndarray:
+    """Share of each inner box covered by outer (is_box_inside compares this to its threshold)"""
+    inner_boxes = np.asarray(inner_boxes, dtype=np.float64).reshape(-1, 4)
+    inter = _intersection(outer, inner_boxes)
+    area = (inner_boxes[:, 2] - inner_boxes[:, 0]) * (inner_boxes[:, 3] - inner_boxes[:, 1])
+    out = np.zeros(len(inner_boxes))
+    ok = (inter > 0) & (area > 0)
+    out[ok] = inter[ok] / area[ok]
+    return out
+
+
+# ---------- benchmark ----------
+
+def synthetic_screen(n: int, width: int = 2560, height: int = 1440, seed: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """Toolbar/list-like layout: rows of icons and text boxes with jitter and overlaps"""
+    rng = random.Random(seed)
+    yolo, ocr = [], []
+    x, y = 0, 0
+    for i in range(n):
+        w, h = rng.randint(12, 60), rng.randint(12, 28)
+        if x + w > width:
+            x, y = 0, y + rng.randint(18, 40)
+            if y + h > height:
+                y = rng.randint(0, 20)
+        box = [x, y + rng.randint(-3, 3), x + w, y + h]
+        box[1] = max(0, box[1])
+        target = yolo if rng.random() < 0.5 else ocr
+        target.append({"bbox": box, "type": "icon" if target is yolo else "text",
+                       "source": "yolo" if target is yolo else "ocr_det", "confidence": 1.0})
+        if rng.random() < 0.15:  # overlapping duplicate, as detectors produce
+            d = rng.randint(0, 3)
+            yolo.append({"bbox": [box[0] + d, box[1] + d, box[2] + d, box[3] + d],
+                         "type": "icon", "source": "yolo", "confidence": 1.0})
+        x += w + rng.randint(-5, 25)
+    return yolo, ocr
+
+
+def benchmark(sizes=(100, 1_000, 5_000)):
+    """Time merging and grouping on synthetic screens of increasing density"""
+    import copy
+    from .bbox_merger import BBoxMerger
+    from .seraphine_processor import FinalSeraphineProcessor
+
+    for n in sizes:
+        yolo, ocr = synthetic_screen(n)
+        merger = BBoxMerger(iou_threshold=0.1, enable_timing=False)
+        start = time.perf_counter()
+        merged, _ = merger.merge_detections(copy.deepcopy(yolo), copy.deepcopy(ocr))
+        merge_ms = (time.perf_counter() - start) * 1000
+
+        processor = FinalSeraphineProcessor(enable_timing=False, enable_debug=False)
+        detections = [dict(d, merged_id=i, id=i) for i, d in enumerate(merged)]
+        start = time.perf_counter()
+        result = processor.process_detections(detections)
+        group_ms = (time.perf_counter() - start) * 1000
+        groups = len(result["bbox_processor"].final_groups)
+        print(f"{n:>6} boxes: merge {merge_ms:9.1f} ms ({len(merged)} kept), "
+              f"grouping {group_ms:9.1f} ms ({groups} groups)")
+
+
+if __name__ == "__main__":
+    # python -m seraphine_pipeline.spatial_index  (run from S14B/utils)
+    benchmark()
@@ -15,6 +15,7 @@ import json
 import os
 import sys
 from .helpers import debug_print
+from .frame import Frame
 
 @dataclass
 class YOLOConfig:
@@ -91,6 +92,8 @@ class CPUModelCache:
     _session = None
     _model_path = None
     _input_name = None
+    _intra_op_threads = 0  # 0 = onnxruntime default (all physical cores)
+    _inter_op_threads = 0
     
     def __new__(cls):
         if cls._instance is None:
@@ -111,6 +114,10 @@ class CPUModelCache:
             so.enable_mem_reuse = True
             so.enable_cpu_mem_arena = True
             so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self._intra_op_threads:
+                so.intra_op_num_threads = self._intra_op_threads
+            if self._inter_op_threads:
+                so.inter_op_num_threads = self._inter_op_threads
             
             providers = [("CPUExecutionProvider", {
                 "enable_cpu_mem_arena": True,
@@ -134,6 +141,12 @@ class CPUModelCache:
         self._model_path = None
         self._input_name = None
         debug_print("  🔄 YOLO model cache cleared")
+    
+    def set_threads(self, intra_op: int, inter_op: int = 1):
+        """Pin the session's thread pools (e.g. one share of the cores per batch worker)"""
+        if (intra_op, inter_op) != (self._intra_op_threads, self._inter_op_threads):
+            self._intra_op_threads, self._inter_op_threads = intra_op, inter_op
+            self._session = None  # rebuilt with the new options on next use
 
 # Global instance
 model_cache = CPUModelCache()
@@ -143,7 +156,6 @@ def round_to_multiple(x, base):
 
 def load_and_prepare_image_ultra_fast(img_path, max_resolution, enable_timing=True):
     """🚀 ULTRA-FAST: Optimized preprocessing pipeline with minimal memory allocations"""
-    start_time = time.time()
     if enable_timing:
         debug_print(f"📸 YOLO: Loading and preparing image: {img_path}")
     
@@ -151,6 +163,14 @@ def load_and_prepare_image_ultra_fast(img_path, max_resolution, enable_timing=Tr
     # Load directly as BGR (OpenCV native format)
     img_bgr = cv2.imread(img_path, cv2.IMREAD_COLOR)
     load_time = time.time() - load_start
+    if enable_timing:
+        debug_print(f"   - Loading: {load_time:.3f}s")
+    
+    return prepare_bgr_ultra_fast(img_bgr, max_resolution, enable_timing)
+
+def prepare_bgr_ultra_fast(img_bgr, max_resolution, enable_timing=True):
+    """🚀 Same preprocessing as load_and_prepare_image_ultra_fast, on an already decoded BGR frame"""
+    start_time = time.time()
     
     orig_h, orig_w = img_bgr.shape[:2]
     target_w = min(round_to_multiple(orig_w, 32), max_resolution[0])
@@ -183,7 +203,6 @@ def load_and_prepare_image_ultra_fast(img_path, max_resolution, enable_timing=Tr
     if enable_timing:
         total_time = time.time() - start_time
         debug_print(f"  YOLO image preparation: {total_time:.3f}s")
-        debug_print(f"   - Loading: {load_time:.3f}s")
         debug_print(f"   - Resizing ({orig_w}x{orig_h} → {target_w}x{target_h}): {resize_time:.3f}s")
         debug_print(f"   - Array conversion: {convert_time:.3f}s")
     
@@ -352,23 +371,15 @@ class YOLODetector:
     
     def __init__(self, config: YOLOConfig = None):
         self.config = config or YOLOConfig()
+        self._batch_inference = True
     
     def detect(self, image_input) -> List[Dict[str, Any]]:
         """
         Run YOLO detection on image
         Args:
-            image_input: str (file path) or PIL.Image
+            image_input: str (file path), BGR numpy array, Frame or PIL.Image
         """
-        if isinstance(image_input, str):
-            # File path - use existing fast loading
-            input_tensor, input_size, orig_size, scaling_factors, content_image = load_and_prepare_image_ultra_fast(
-                image_input, self.config.max_resolution, self.config.enable_timing
-            )
-        else:
-            # PIL Image - use new PIL loading
-            input_tensor, input_size, orig_size, scaling_factors, content_image = load_and_prepare_image_from_pil(
-                image_input, self.config.max_resolution, self.config.enable_timing
-            )
+        prepared = self._prepare(image_input)
         
         total_start = time.time()
         
@@ -379,12 +390,83 @@ class YOLODetector:
                 debug_print(f"🚀 Content filtering: ENABLED (min pixels: {self.config.min_content_pixels})")
             debug_print("=" * 60)
         
-        output = run_inference_optimized(self.config.model_path, input_tensor, self.config.enable_timing)
+        output = run_inference_optimized(self.config.model_path, prepared[0], self.config.enable_timing)
+        detections = self._finish(output, prepared)
+        
+        if self.config.enable_timing:
+            total_time = time.time() - total_start
+            debug_print("=" * 60)
+            debug_print(f"  🎯 YOLO Pipeline completed in {total_time:.3f}s")
+            debug_print(f"  Final result: {len(detections)} quality YOLO detections")
+        
+        return detections
+    
+    def detect_batch(self, image_inputs: List[Any], max_batch: int = 8) -> List[List[Dict[str, Any]]]:
+        """
+        Run YOLO on several images, stacking same-size inputs into one inference call
+        
+        Screenshots of one app usually share a resolution, so a shard of them becomes a
+        few NCHW batches instead of one session.run per image. Results come back in
+        input order and are identical to calling detect() on each image.
+        """
+        prepared = [self._prepare(image_input) for image_input in image_inputs]
+        results: List[List[Dict[str, Any]]] = [None] * len(prepared)
+        
+        by_size: Dict[Tuple[int, int], List[int]] = {}
+        for i, item in enumerate(prepared):
+            by_size.setdefault(item[1], []).append(i)
+        
+        for indices in by_size.values():
+            for start in range(0, len(indices), max_batch):
+                chunk = indices[start:start + max_batch]
+                if len(chunk) > 1 and self._batch_inference:
+                    batch_tensor = np.concatenate([prepared[i][0] for i in chunk], axis=0)
+                    try:
+                        output = run_inference_optimized(self.config.model_path, batch_tensor, self.config.enable_timing)
+                    except Exception as e:
+                        # Model exported with a fixed batch of 1: fall back to per-image calls
+                        debug_print(f"⚠️  YOLO: batched inference unavailable ({e}), running per image")
+                        self._batch_inference = False
+                    else:
+                        for batch_idx, i in enumerate(chunk):
+                            results[i] = self._finish(output, prepared[i], batch_idx)
+                        continue
+                for i in chunk:
+                    output = run_inference_optimized(self.config.model_path, prepared[i][0], self.config.enable_timing)
+                    results[i] = self._finish(output, prepared[i])
+        
+        return results
+    
+    def _prepare(self, image_input):
+        """Input tensor, input size, original size, scaling factors and content image"""
+        if isinstance(image_input, (Frame, np.ndarray)):
+            # Decoded frame - preprocess once per frame and reuse on repeated calls
+            frame = Frame.wrap(image_input)
+            max_resolution = tuple(self.config.max_resolution)
+            return frame.view(
+                ("yolo", max_resolution),
+                lambda f: prepare_bgr_ultra_fast(f.bgr, max_resolution, self.config.enable_timing)
+            )
+        elif isinstance(image_input, str):
+            # File path - use existing fast loading
+            return load_and_prepare_image_ultra_fast(
+                image_input, self.config.max_resolution, self.config.enable_timing
+            )
+        else:
+            # PIL Image - use new PIL loading
+            return load_and_prepare_image_from_pil(
+                image_input, self.config.max_resolution, self.config.enable_timing
+            )
+    
+    def _finish(self, output, prepared, batch_idx: int = 0) -> List[Dict[str, Any]]:
+        """Postprocess one image's slice of the model output into filtered detections"""
+        _, input_size, orig_size, scaling_factors, content_image = prepared
         
         boxes_raw = postprocess_optimized(
             output, input_size, orig_size, scaling_factors,
             self.config.conf_threshold, self.config.iou_threshold, 
-            self.config.enable_timing, self.config.enable_debug
+            self.config.enable_timing, self.config.enable_debug,
+            batch_idx=batch_idx
         )
         
         # Convert to standardized format
@@ -413,12 +495,6 @@ class YOLODetector:
                 debug_print(f"  🚀 Content filtering: {filter_time:.3f}s")
                 debug_print(f"    Filtered out {filtered_count} sparse boxes ({len(detections)} kept)")
         
-        if self.config.enable_timing:
-            total_time = time.time() - total_start
-            debug_print("=" * 60)
-            debug_print(f"  🎯 YOLO Pipeline completed in {total_time:.3f}s")
-            debug_print(f"  Final result: {len(detections)} quality YOLO detections")
-        
         return detections
     
     def clip_bbox_to_image_bounds(self, bbox, image_width, image_height):
@@ -634,12 +710,21 @@ def process_batch(detector, args):
         debug_print(f"🚀 Processing {len(all_images)} images in batch mode...")
         debug_print("=" * 60)
     
+    # Same-size screenshots share one inference call; a failing chunk retries image by image
+    batched = {}
+    for start in range(0, len(all_images), 8):
+        chunk = all_images[start:start + 8]
+        try:
+            batched.update(zip(chunk, detector.detect_batch(chunk)))
+        except Exception:
+            pass
+    
     for i, image_path in enumerate(all_images, 1):
         if not args.quiet:
             debug_print(f"\n[{i}/{len(all_images)}] Processing: {image_path}")
         
         try:
-            detections = detector.detect(image_path)
+            detections = batched[image_path] if image_path in batched else detector.detect(image_path)
             results[image_path] = detections
             successful += 1
             
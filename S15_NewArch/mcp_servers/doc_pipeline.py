@@ -0,0 +1,279 @@
+# doc_pipeline.py - Multi-process document extraction pipeline for server_rag
+# Stages: extract (process pool) -> chunk (threads) -> embed (threads),
+# connected by bounded queues so the three stages overlap.
+
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+EXTRACT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+STAGE_WORKERS = 2       # threads per chunk/embed stage; both wait on Ollama -> I/O bound
+QUEUE_SIZE = 16         # bound on in-flight segments between stages
+LARGE_PDF_PAGES = 16    # PDFs above this many pages are split across workers
+PAGES_PER_TASK = 8
+
+_STOP = object()
+
+# Per-process state, created lazily inside each extraction worker
+_markitdown = None
+
+
+# ---------- extraction (runs in worker processes) ----------
+
+def _extract_pdf(path: str, pages: Optional[List[int]], image_dir: str) -> str:
+    # Each worker process owns its own PyMuPDF state, so no pdf_lock is needed here
+    import pymupdf4llm
+    markdown = pymupdf4llm.to_markdown(path, pages=pages, write_images=True, image_path=image_dir)
+    return re.sub(
+        r'!\[\]\((.*?/images/)([^)]+)\)',
+        r'![](images/\2)',
+        markdown.replace("\\", "/")
+    )
+
+
+def _extract_url(path: str) -> str:
+    import trafilatura
+    downloaded = trafilatura.fetch_url(Path(path).read_text().strip())
+    return (trafilatura.extract(downloaded) or "") if downloaded else ""
+
+
+def _extract_other(path: str) -> str:
+    global _markitdown
+    if _markitdown is None:
+        from markitdown import MarkItDown
+        _markitdown = MarkItDown()
+    return _markitdown.convert(path).text_content
+
+
+def extract_segment(path: str, kind: str, pages: Optional[List[int]], image_dir: str) -> tuple:
+    """Worker entry point. Returns (markdown, seconds_spent)."""
+    start = time.perf_counter()
+    if kind == "pdf":
+        text = _extract_pdf(path, pages, image_dir)
+    elif kind == "url":
+        text = _extract_url(path)
+    else:
+        text = _extract_other(path)
+    return text, time.perf_counter() - start
+
+
+# ---------- planning ----------
+
+@dataclass
+class Segment:
+    file: Path
+    fhash: str
+    seq: int
+    total: int
+    kind: str
+    pages: Optional[List[int]] = None
+    text: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _file_kind(file: Path) -> str:
+    ext = file.suffix.lower()
+    if ext == ".pdf":
+        return "pdf"
+    if ext in [".html", ".htm", ".url"]:
+        return "url"
+    return "other"
+
+
+def _pdf_page_count(file: Path) -> int:
+    try:
+        import pymupdf
+        with pymupdf.open(str(file)) as doc:
+            return doc.page_count
+    except Exception:
+        return 0
+
+
+def plan_segments(file: Path, fhash: str) -> List[Segment]:
+    """Split a file into extraction tasks; large PDFs become page ranges."""
+    kind = _file_kind(file)
+    page_count = _pdf_page_count(file) if kind == "pdf" else 0
+    if page_count <= LARGE_PDF_PAGES:
+        return [Segment(file, fhash, 0, 1, kind)]
+    ranges = [list(range(p, min(p + PAGES_PER_TASK, page_count)))
+              for p in range(0, page_count, PAGES_PER_TASK)]
+    return [Segment(file, fhash, i, len(ranges), kind, pages) for i, pages in enumerate(ranges)]
+
+
+# ---------- stats ----------
+
+@dataclass
+class StageStats:
+    name: str
+    unit: str
+    items: int = 0
+    busy_s: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, items: int, seconds: float) -> None:
+        with self._lock:
+            self.items += items
+            self.busy_s += seconds
+
+    def summary(self, wall_s: float) -> dict:
+        return {
+            "stage": self.name,
+            self.unit: self.items,
+            "busy_s": round(self.busy_s, 2),
+            f"{self.unit}_per_s": round(self.items / wall_s, 2) if wall_s else 0.0,
+        }
+
+
+# ---------- pipeline ----------
+
+class DocumentPipeline:
+    """
+    Streams files through extract -> chunk -> embed.
+
+    chunk_fn(markdown, kind) -> list[str] and embed_fn(text) -> np.ndarray are
+    supplied by the server; on_document(file, fhash, embeddings, chunks) is
+    called once per file after every segment has been embedded, with chunks
+    in document order.
+    """
+
+    def __init__(
+        self,
+        chunk_fn: Callable[[str, str], List[str]],
+        embed_fn: Callable[[str], np.ndarray],
+        on_document: Callable[[Path, str, List[np.ndarray], List[str]], None],
+        image_dir: Path,
+        stage_workers: int = STAGE_WORKERS,
+        log: Callable[[str, str], None] = lambda level, msg: None,
+    ):
+        self.chunk_fn = chunk_fn
+        self.embed_fn = embed_fn
+        self.on_document = on_document
+        self.image_dir = str(image_dir)
+        self.stage_workers = stage_workers
+        self.log = log
+        self.stats = {
+            "extract": StageStats("extract", "segments"),
+            "chunk": StageStats("chunk", "chunks"),
+            "embed": StageStats("embed", "embeddings"),
+        }
+        self._segments_q: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._chunks_q: queue.Queue = queue.Queue(QUEUE_SIZE)
+        self._pending: Dict[Path, Dict[int, tuple]] = {}
+        self._pending_lock = threading.Lock()
+
+    def run(self, files: Dict[Path, str]) -> List[dict]:
+        """Process ``{file: content_hash}``. Returns per-stage throughput rows."""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.stage_workers * 2) as stages:
+            chunkers = [stages.submit(self._chunk_worker) for _ in range(self.stage_workers)]
+            embedders = [stages.submit(self._embed_worker) for _ in range(self.stage_workers)]
+
+            try:
+                self._extract_all(files)
+            finally:
+                # Always release the stage threads, even if extraction blew up,
+                # otherwise they block forever on the bounded queues
+                for _ in chunkers:
+                    self._segments_q.put(_STOP)
+                wait(chunkers)
+                for _ in embedders:
+                    self._chunks_q.put(_STOP)
+                wait(embedders)
+
+        wall = time.perf_counter() - start
+        report = [s.summary(wall) for s in self.stats.values()]
+        report.append({"stage": "total", "files": len(files), "wall_s": round(wall, 2)})
+        return report
+
+    def _extract_all(self, files: Dict[Path, str]) -> None:
+        segments = [seg for file, fhash in files.items() for seg in plan_segments(file, fhash)]
+        # spawn: forking a process that already runs MCP/asyncio threads is unsafe
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=EXTRACT_WORKERS, mp_context=ctx) as pool:
+            in_flight = {}
+            todo = iter(segments)
+            while True:
+                # Keep a bounded window in flight so extraction cannot outrun the queues
+                while len(in_flight) < EXTRACT_WORKERS * 2:
+                    seg = next(todo, None)
+                    if seg is None:
+                        break
+                    fut = pool.submit(extract_segment, str(seg.file), seg.kind, seg.pages, self.image_dir)
+                    in_flight[fut] = seg
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    seg = in_flight.pop(fut)
+                    try:
+                        seg.text, seconds = fut.result()
+                        self.stats["extract"].record(1, seconds)
+                    except Exception as e:
+                        seg.error = str(e)
+                        self.log("ERROR", f"Extraction failed for {seg.file.name} (segment {seg.seq}): {e}")
+                    self._segments_q.put(seg)  # blocks when chunking falls behind
+
+    def _chunk_worker(self) -> None:
+        while True:
+            seg = self._segments_q.get()
+            if seg is _STOP:
+                return
+            chunks: List[str] = []
+            if seg.error is None and seg.text and seg.text.strip():
+                start = time.perf_counter()
+                try:
+                    chunks = self.chunk_fn(seg.text, seg.kind)
+                except Exception as e:
+                    seg.error = str(e)
+                    self.log("ERROR", f"Chunking failed for {seg.file.name}: {e}")
+                self.stats["chunk"].record(len(chunks), time.perf_counter() - start)
+            self._chunks_q.put((seg, chunks))
+
+    def _embed_worker(self) -> None:
+        while True:
+            item = self._chunks_q.get()
+            if item is _STOP:
+                return
+            seg, chunks = item
+            embeddings = []
+            if seg.error is None and chunks:
+                start = time.perf_counter()
+                try:
+                    embeddings = [self.embed_fn(chunk) for chunk in chunks]
+                except Exception as e:
+                    seg.error = str(e)
+                    self.log("ERROR", f"Embedding failed for {seg.file.name}: {e}")
+                self.stats["embed"].record(len(embeddings), time.perf_counter() - start)
+            self._collect(seg, chunks, embeddings)
+
+    def _collect(self, seg: Segment, chunks: List[str], embeddings: List[np.ndarray]) -> None:
+        with self._pending_lock:
+            parts = self._pending.setdefault(seg.file, {})
+            parts[seg.seq] = (seg.error, chunks, embeddings)
+            if len(parts) < seg.total:
+                return
+            del self._pending[seg.file]
+
+        if any(error for error, _, _ in parts.values()):
+            # Leave the file out of the cache so the next run retries it
+            return
+        ordered = [parts[i] for i in range(seg.total)]
+        all_chunks = [c for _, chunks, _ in ordered for c in chunks]
+        all_embeddings = [e for _, _, embeddings in ordered for e in embeddings]
+        if not all_embeddings:
+            self.log("WARN", f"No content extracted from {seg.file.name}")
+            return
+        try:
+            self.on_document(seg.file, seg.fhash, all_embeddings, all_chunks)
+        except Exception as e:
+            # A failing callback must not kill the embed thread, or nothing drains _chunks_q
+            self.log("ERROR", f"Failed to store {seg.file.name}: {e}")
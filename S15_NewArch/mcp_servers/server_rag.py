@@ -1,5 +1,6 @@
 # server_rag.py - S20 Upgraded RAG Server
 # Features: ThreadPoolExecutor, pdf_lock, parallel processing, optimized chunking
+# S21: process-pool extraction pipeline (doc_pipeline.py), tiered FAISS index (vector_index.py)
 
 from mcp.server.fastmcp import FastMCP, Image
 from mcp.server.fastmcp.prompts import base
@@ -14,8 +15,9 @@ import faiss
 import numpy as np
 from pathlib import Path
 import requests
-from markitdown import MarkItDown
 import time
+from vector_index import AdaptiveIndex
+from doc_pipeline import DocumentPipeline
 from models import AddInput, AddOutput, SqrtInput, SqrtOutput, StringsToIntsInput, StringsToIntsOutput, ExpSumInput, ExpSumOutput, PythonCodeInput, PythonCodeOutput, UrlInput, FilePathInput, MarkdownInput, MarkdownOutput, ChunkListOutput, SearchDocumentsInput
 from tqdm import tqdm
 import hashlib
@@ -28,12 +30,15 @@ import re
 import base64 # ollama needs base64-encoded-image
 import asyncio
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # S20 FIX: Thread safety for PDF processing
 pdf_lock = threading.Lock()
 
+# S21: Serializes FAISS index / metadata updates from the pipeline's embed threads
+index_lock = threading.Lock()
+
 # S20 FIX: ThreadPoolExecutor for parallel file processing
+# S21: extraction moved to a process pool (doc_pipeline); this sizes the chunk/embed stage threads
 MAX_WORKERS = 2  # Conservative to prevent memory issues
 
 
@@ -65,7 +70,7 @@ def chunk_text(text, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
         yield " ".join(words[i:i+size])
 
 def mcp_log(level: str, message: str) -> None:
-    if level in ["ERROR", "WARN"]:
+    if level in ["ERROR", "WARN", "STATS"]:
         sys.stderr.write(f"{level}: {message}\n")
         sys.stderr.flush()
 
@@ -124,6 +129,8 @@ def search_stored_documents_rag(input: SearchDocumentsInput) -> list[str]:
         D, I = index.search(query_vec, k=5)
         results = []
         for idx in I[0]:
+            if idx < 0:  # ANN tiers pad with -1 when fewer than k hits
+                continue
             data = metadata[idx]
             results.append(f"{data['chunk']}\n[Source: {data['doc']}, ID: {data['chunk_id']}]")
         return results
@@ -335,83 +342,28 @@ Keep markdown formatting intact.
 
 
 
-def _process_single_file(file: Path, CACHE_META: dict, ROOT: Path) -> tuple:
-    """
-    S20 FIX: Process a single file (thread-safe worker function).
-    Returns: (file.name, file_hash, embeddings_list, metadata_list) or None on failure
-    """
-    try:
-        fhash = hashlib.md5(file.read_bytes()).hexdigest()
-        
-        # Skip if unchanged
-        if file.name in CACHE_META and CACHE_META[file.name] == fhash:
-            mcp_log("SKIP", f"Skipping unchanged file: {file.name}")
-            return None
-        
-        mcp_log("PROC", f"Processing: {file.name}")
-        ext = file.suffix.lower()
-        markdown = ""
-        
-        if ext == ".pdf":
-            # S20 FIX: Use pdf_lock to prevent PyMuPDF crashes in threads
-            mcp_log("INFO", f"Using MuPDF4LLM to extract {file.name}")
-            with pdf_lock:
-                markdown = convert_pdf_to_markdown(str(file)).markdown
-        
-        elif ext in [".html", ".htm", ".url"]:
-            mcp_log("INFO", f"Using Trafilatura to extract {file.name}")
-            url = file.read_text().strip()
-            downloaded = trafilatura.fetch_url(url)
-            if downloaded:
-                markdown = trafilatura.extract(downloaded) or ""
-        
-        else:
-            # Fallback to MarkItDown for other formats
-            converter = MarkItDown()
-            mcp_log("INFO", f"Using MarkItDown fallback for {file.name}")
-            markdown = converter.convert(str(file)).text_content
-        
-        if not markdown or not markdown.strip():
-            mcp_log("WARN", f"No content extracted from {file.name}")
-            return None
-        
-        # Chunking
-        if len(markdown.split()) < 10:
-            mcp_log("WARN", f"Content too short for semantic merge in {file.name}")
-            chunks = [markdown.strip()]
-        else:
-            mcp_log("INFO", f"Running semantic merge on {file.name} with {len(markdown.split())} words")
-            chunks = semantic_merge(markdown)
-        
-        # Generate embeddings
-        embeddings_for_file = []
-        new_metadata = []
-        for i, chunk in enumerate(chunks):
-            embedding = get_embedding(chunk)
-            embeddings_for_file.append(embedding)
-            new_metadata.append({
-                "doc": file.name,
-                "chunk": chunk,
-                "chunk_id": f"{file.stem}_{i}"
-            })
-        
-        return (file.name, fhash, embeddings_for_file, new_metadata)
-    
-    except Exception as e:
-        mcp_log("ERROR", f"Failed to process {file.name}: {e}")
-        return None
+def _chunk_markdown(markdown: str, kind: str) -> list[str]:
+    """Chunking stage for the document pipeline: caption PDF images, then semantic merge."""
+    if kind == "pdf":
+        markdown = replace_images_with_captions(markdown)
+    if not markdown.strip():
+        return []
+    if len(markdown.split()) < 10:
+        return [markdown.strip()]
+    return semantic_merge(markdown)
 
 
 def process_documents():
     """
-    S20 UPGRADED: Process documents with parallel ThreadPoolExecutor.
+    S21 UPGRADED: Process documents through the multi-process extraction pipeline.
     
     Features:
-    - ThreadPoolExecutor with MAX_WORKERS=2 for parallel file processing
-    - Thread-safe PDF processing with pdf_lock
-    - Incremental index saving
+    - Extraction in a process pool (PyMuPDF per worker, page ranges for large PDFs)
+    - Chunking and embedding on MAX_WORKERS threads each, fed by bounded queues
+    - Thread-safe index update with index_lock, incremental index saving
+    - Per-stage throughput report at the end of the run
     """
-    mcp_log("INFO", "Indexing documents with S20 parallel RAG pipeline...")
+    mcp_log("INFO", "Indexing documents with S21 pipelined RAG indexer...")
     ROOT = Path(__file__).parent.resolve()
     DOC_PATH = ROOT / "documents"
     INDEX_CACHE = ROOT / "faiss_index"
@@ -419,60 +371,66 @@ def process_documents():
     INDEX_FILE = INDEX_CACHE / "index.bin"
     METADATA_FILE = INDEX_CACHE / "metadata.json"
     CACHE_FILE = INDEX_CACHE / "doc_index_cache.json"
+    STATS_FILE = INDEX_CACHE / "pipeline_stats.json"
+    IMAGE_DIR = DOC_PATH / "images"
+    IMAGE_DIR.mkdir(parents=True, exist_ok=True)
 
     # Load existing data
     CACHE_META = json.loads(CACHE_FILE.read_text()) if CACHE_FILE.exists() else {}
     metadata = json.loads(METADATA_FILE.read_text()) if METADATA_FILE.exists() else []
-    index = faiss.read_index(str(INDEX_FILE)) if INDEX_FILE.exists() else None
+    index = AdaptiveIndex.load(INDEX_FILE) if INDEX_FILE.exists() else AdaptiveIndex()
 
-    # Get all files to process
-    files_to_process = list(DOC_PATH.glob("*.*"))
+    # Get all changed files to process
+    files_to_process = {}
+    for file in DOC_PATH.glob("*.*"):
+        fhash = hashlib.md5(file.read_bytes()).hexdigest()
+        if CACHE_META.get(file.name) == fhash:
+            mcp_log("SKIP", f"Skipping unchanged file: {file.name}")
+            continue
+        files_to_process[file] = fhash
     
     if not files_to_process:
-        mcp_log("INFO", "No documents found to process")
+        mcp_log("INFO", "No new or changed documents to process")
         return
     
     mcp_log("INFO", f"Found {len(files_to_process)} files to process")
-    
-    # S20 FIX: Process files in parallel with ThreadPoolExecutor
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        # Submit all tasks
-        future_to_file = {
-            executor.submit(_process_single_file, file, CACHE_META, ROOT): file.name
-            for file in files_to_process
-        }
-        
-        # Process results as they complete
-        for future in as_completed(future_to_file):
-            file_name = future_to_file[future]
-            try:
-                result = future.result()
-                
-                if result is None:
-                    continue  # Skipped or failed
-                
-                file_name, fhash, embeddings_for_file, new_metadata = result
-                
-                if embeddings_for_file:
-                    # Thread-safe index update
-                    with pdf_lock:
-                        if index is None:
-                            dim = len(embeddings_for_file[0])
-                            index = faiss.IndexFlatL2(dim)
-                        index.add(np.stack(embeddings_for_file))
-                        metadata.extend(new_metadata)
-                        CACHE_META[file_name] = fhash
-                        
-                        # Save incrementally
-                        CACHE_FILE.write_text(json.dumps(CACHE_META, indent=2))
-                        METADATA_FILE.write_text(json.dumps(metadata, indent=2))
-                        faiss.write_index(index, str(INDEX_FILE))
-                    
-                    mcp_log("SAVE", f"Saved FAISS index after processing {file_name}")
+
+    def on_document(file: Path, fhash: str, embeddings_for_file: list, chunks: list) -> None:
+        # Thread-safe index update
+        with index_lock:
+            index.add(np.stack(embeddings_for_file))
+            metadata.extend(
+                {"doc": file.name, "chunk": chunk, "chunk_id": f"{file.stem}_{i}"}
+                for i, chunk in enumerate(chunks)
+            )
+            CACHE_META[file.name] = fhash
             
-            except Exception as e:
-                mcp_log("ERROR", f"Failed to process {file_name}: {e}")
+            # Save incrementally
+            CACHE_FILE.write_text(json.dumps(CACHE_META, indent=2))
+            METADATA_FILE.write_text(json.dumps(metadata, indent=2))
+            index.save(INDEX_FILE)
+        
+        mcp_log("SAVE", f"Saved FAISS index after processing {file.name}")
+
+    pipeline = DocumentPipeline(
+        chunk_fn=_chunk_markdown,
+        embed_fn=get_embedding,
+        on_document=on_document,
+        image_dir=IMAGE_DIR,
+        stage_workers=MAX_WORKERS,
+        log=mcp_log,
+    )
+    report = pipeline.run(files_to_process)
+    
+    # A tier migration may still be running; persist the final index once it lands
+    if index.ntotal:
+        index.wait_for_rebuild()
+        index.save(INDEX_FILE)
+        mcp_log("INFO", f"Index tier: {index.tier} ({index.ntotal} vectors)")
     
+    STATS_FILE.write_text(json.dumps(report, indent=2))
+    for row in report:
+        mcp_log("STATS", ", ".join(f"{k}={v}" for k, v in row.items()))
     mcp_log("INFO", f"READY - Indexed {len(metadata)} chunks from {len(CACHE_META)} files")
 
 
@@ -0,0 +1,421 @@
+# vector_index.py - FAISS index tiers for the RAG server
+# Role: Pick a FAISS index tier (flat / HNSW / IVF-PQ) from the corpus size.
+
+# Responsibilities:
+
+# Build the right index for the number of stored vectors
+
+# Migrate between tiers and retrain IVF centroids in a background thread
+
+# Measure recall@k vs query latency per tier so thresholds are evidence-based
+
+# NOTE: identical copies live in llm-mcp/modules, hybrid-decision-making/modules
+# and S15_NewArch/mcp_servers (each project is packaged on its own). Only this
+# header may differ; test_vector_index.py in each project checks the copies match.
+
+# Dependencies:
+
+# faiss, numpy
+
+# Used by: server_rag.py
+
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+TIER_FLAT = "flat"
+TIER_HNSW = "hnsw"
+TIER_IVFPQ = "ivfpq"
+TIERS = (TIER_FLAT, TIER_HNSW, TIER_IVFPQ)
+
+# Below FLAT_MAX_VECTORS a brute-force scan is both exact and fast enough.
+FLAT_MAX_VECTORS = 10_000
+# HNSW keeps full vectors in RAM; past this size IVF-PQ compresses them.
+HNSW_MAX_VECTORS = 200_000
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+
+IVF_NPROBE = 16
+IVF_TRAIN_POINTS_PER_LIST = 64
+# Retrain IVF centroids once the index has grown by this factor since training.
+IVF_RETRAIN_GROWTH = 2.0
+# Vectors kept (reservoir-sampled) for IVF retraining; bounds memory and the .sample.npy file.
+IVF_RESERVOIR_SIZE = 20_000
+# Filtered searches over at most this many rows on HNSW/IVF are scanned exactly.
+EXACT_FILTER_MAX = 4096
+# Rows reconstructed per step when re-adding an IVF-PQ index after retraining.
+REBUILD_BLOCK = 65_536
+
+
+def select_tier(n_vectors: int) -> str:
+    """Return the index tier suited to ``n_vectors`` stored vectors."""
+    if n_vectors < FLAT_MAX_VECTORS:
+        return TIER_FLAT
+    if n_vectors < HNSW_MAX_VECTORS:
+        return TIER_HNSW
+    return TIER_IVFPQ
+
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest PQ sub-quantizer count that divides ``dim`` with >= 8 dims each."""
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2):
+        if dim % m == 0 and dim // m >= 8:
+            return m
+    return 1
+
+
+def _ivf_nlist(n_vectors: int) -> int:
+    # ~4*sqrt(n) lists, but never more than the training sample can support
+    nlist = int(4 * math.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // IVF_TRAIN_POINTS_PER_LIST or 1, 65536))
+
+
+def train_ivfpq(sample: np.ndarray, n_vectors: int) -> faiss.Index:
+    """Return an empty IVF-PQ index sized for ``n_vectors``, trained on ``sample``."""
+    dim = sample.shape[1]
+    nlist = _ivf_nlist(n_vectors)
+    quantizer = faiss.IndexFlatL2(dim)
+    index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), 8)
+    # PQ codebooks (256 centroids per sub-quantizer) need ~39*256 points too
+    sample_size = min(len(sample), max(nlist * IVF_TRAIN_POINTS_PER_LIST, 39 * 256))
+    picks = np.random.default_rng(0).choice(len(sample), sample_size, replace=False)
+    index.train(np.ascontiguousarray(sample[picks], dtype=np.float32))
+    index.nprobe = min(IVF_NPROBE, nlist)
+    return index
+
+
+def build_index(vectors: np.ndarray, tier: Optional[str] = None) -> faiss.Index:
+    """Build (and train, if needed) an index over ``vectors`` for the given tier."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    tier = tier or select_tier(n)
+
+    if tier == TIER_FLAT:
+        index = faiss.IndexFlatL2(dim)
+    elif tier == TIER_HNSW:
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif tier == TIER_IVFPQ:
+        index = train_ivfpq(vectors, n)
+    else:
+        raise ValueError(f"Unknown index tier: {tier}")
+
+    if n:
+        index.add(vectors)
+    return index
+
+
+def index_tier(index: faiss.Index) -> str:
+    """Identify the tier of an existing FAISS index."""
+    if isinstance(index, faiss.IndexHNSW):
+        return TIER_HNSW
+    if isinstance(index, faiss.IndexIVF):
+        return TIER_IVFPQ
+    return TIER_FLAT
+
+
+def _selector_params(index: faiss.Index, ids: np.ndarray, k: int):
+    """Search parameters that restrict ``index`` to the given row ids."""
+    selector = faiss.IDSelectorBatch(ids)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=max(index.hnsw.efSearch, k))
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def _ensure_direct_map(index: faiss.Index) -> None:
+    # IVF indexes need an id -> list map before rows can be reconstructed
+    if isinstance(index, faiss.IndexIVF) and index.direct_map.no():
+        index.make_direct_map()
+
+
+class AdaptiveIndex:
+    """
+    FAISS index wrapper that moves between tiers as the corpus grows.
+
+    No raw copy of the corpus is kept: flat and HNSW storage is lossless, so
+    a tier migration reconstructs vectors from the live index. Once in the
+    IVF-PQ tier only the compressed codes plus a bounded reservoir sample
+    (IVF_RESERVOIR_SIZE vectors) are held; centroids are retrained from the
+    reservoir and existing rows are re-added from their PQ reconstruction,
+    which trades a little recall for memory that stays O(codes).
+
+    Rebuilds run in a background thread while searches keep hitting the
+    current index. Row ids are insertion order, so callers can keep using
+    list positions as metadata keys. All FAISS calls on the live index
+    happen under one lock, since FAISS does not allow concurrent add/search.
+    """
+
+    def __init__(self, dim: Optional[int] = None, tier: Optional[str] = None, background: bool = True):
+        self.dim = dim
+        self.fixed_tier = tier
+        self.background = background
+        self.index: Optional[faiss.Index] = None
+        self._trained_at = 0
+        self._reservoir: Optional[np.ndarray] = None  # preallocated, first _reservoir_fill rows valid
+        self._reservoir_fill = 0
+        self._reservoir_seen = 0
+        self._reservoir_saved_at = 0
+        self._rng = np.random.default_rng(0)
+        self._lock = threading.RLock()
+        self._rebuild_thread: Optional[threading.Thread] = None
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    @property
+    def tier(self) -> Optional[str]:
+        return index_tier(self.index) if self.index is not None else None
+
+    def add(self, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(np.atleast_2d(vectors), dtype=np.float32)
+        if not len(vectors):
+            return
+        with self._lock:
+            if self.index is None:
+                self.dim = vectors.shape[1]
+                self.index = build_index(vectors[:0], TIER_FLAT)
+            self.index.add(vectors)
+            if self._reservoir is not None:
+                self._sample(vectors)
+        self._maybe_rebuild()
+
+    def search(
+        self, queries: np.ndarray, k: int, ids: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k-NN search; results are padded with id -1 when fewer than k rows match.
+
+        ``ids`` restricts the search to those row ids (metadata filtering) inside
+        FAISS instead of over-fetching and filtering afterwards.
+        """
+        queries = np.ascontiguousarray(np.atleast_2d(queries), dtype=np.float32)
+        with self._lock:
+            if self.index is None or self.index.ntotal == 0 or (ids is not None and not len(ids)):
+                return (np.full((len(queries), k), np.inf, dtype=np.float32),
+                        np.full((len(queries), k), -1, dtype=np.int64))
+            if ids is None:
+                return self.index.search(queries, k)
+            ids = np.ascontiguousarray(ids, dtype=np.int64)
+            if self.tier != TIER_FLAT and len(ids) <= EXACT_FILTER_MAX:
+                # Graph/IVF traversal loses recall under selective filters; scan the subset
+                return self._search_subset(queries, k, ids)
+            return self.index.search(queries, k, params=_selector_params(self.index, ids, k))
+
+    def _search_subset(self, queries: np.ndarray, k: int, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        _ensure_direct_map(self.index)
+        rows = self.index.reconstruct_batch(ids)
+        dists = ((queries[:, None, :] - rows[None, :, :]) ** 2).sum(axis=2)
+        take = min(k, len(ids))
+        order = np.argsort(dists, axis=1)[:, :take]
+        D = np.full((len(queries), k), np.inf, dtype=np.float32)
+        I = np.full((len(queries), k), -1, dtype=np.int64)
+        D[:, :take] = np.take_along_axis(dists, order, axis=1)
+        I[:, :take] = ids[order]
+        return D, I
+
+    def vectors(self) -> np.ndarray:
+        """Stored vectors (PQ reconstructions in the IVF-PQ tier)."""
+        with self._lock:
+            return self._reconstruct(self.index, 0, self.ntotal)
+
+    # ---------- tier management ----------
+
+    @staticmethod
+    def _reconstruct(index: Optional[faiss.Index], start: int, stop: int) -> np.ndarray:
+        if index is None or stop <= start:
+            return np.zeros((0, index.d if index is not None else 0), dtype=np.float32)
+        _ensure_direct_map(index)
+        return index.reconstruct_n(start, stop - start)
+
+    def _set_reservoir(self, sample: Optional[np.ndarray], seen: int) -> None:
+        if sample is None:
+            self._reservoir, self._reservoir_fill, self._reservoir_seen = None, 0, 0
+            return
+        sample = sample[:IVF_RESERVOIR_SIZE]
+        self._reservoir = np.empty((IVF_RESERVOIR_SIZE, sample.shape[1]), dtype=np.float32)
+        self._reservoir[:len(sample)] = sample
+        self._reservoir_fill = len(sample)
+        self._reservoir_seen = max(seen, len(sample))
+
+    def _sample(self, vectors: np.ndarray) -> None:
+        """Reservoir sampling (Algorithm R) over every vector added in the IVF tier."""
+        for vec in vectors:
+            self._reservoir_seen += 1
+            if self._reservoir_fill < IVF_RESERVOIR_SIZE:
+                self._reservoir[self._reservoir_fill] = vec
+                self._reservoir_fill += 1
+                continue
+            slot = self._rng.integers(self._reservoir_seen)
+            if slot < IVF_RESERVOIR_SIZE:
+                self._reservoir[slot] = vec
+
+    def _target_tier(self) -> str:
+        return self.fixed_tier or select_tier(self.ntotal)
+
+    def _needs_rebuild(self) -> bool:
+        if self.index is None:
+            return False
+        target = self._target_tier()
+        if target != self.tier:
+            return True
+        # IVF centroids drift as data grows; retrain once the corpus has grown enough
+        return target == TIER_IVFPQ and self.ntotal >= self._trained_at * IVF_RETRAIN_GROWTH
+
+    def _maybe_rebuild(self) -> None:
+        with self._lock:
+            if not self._needs_rebuild():
+                return
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return
+            if not self.background:
+                self._rebuild()
+                return
+            self._rebuild_thread = threading.Thread(target=self._rebuild, daemon=True)
+            self._rebuild_thread.start()
+
+    def _rebuild(self) -> None:
+        with self._lock:
+            old_index = self.index
+            n = old_index.ntotal
+            tier = self._target_tier()
+            sample = self._reservoir[:self._reservoir_fill].copy() if self._reservoir is not None else None
+            snapshot = self._reconstruct(old_index, 0, n) if tier != TIER_IVFPQ else None
+
+        if tier == TIER_IVFPQ:
+            if sample is None or not len(sample):
+                # Entering the IVF tier: seed the reservoir from the current rows
+                picks = np.sort(self._rng.choice(n, min(n, IVF_RESERVOIR_SIZE), replace=False))
+                with self._lock:
+                    _ensure_direct_map(old_index)
+                    sample = np.stack([old_index.reconstruct(int(i)) for i in picks])
+            new_index = train_ivfpq(sample, n)
+            # Re-add in blocks so the full corpus is never materialized at once
+            for start in range(0, n, REBUILD_BLOCK):
+                with self._lock:
+                    block = self._reconstruct(old_index, start, min(start + REBUILD_BLOCK, n))
+                new_index.add(block)
+        else:
+            new_index = build_index(snapshot, tier)
+            del snapshot
+
+        with self._lock:
+            # Vectors added while we were building go in before the swap
+            tail = self._reconstruct(old_index, n, old_index.ntotal)
+            if len(tail):
+                new_index.add(tail)
+            self.index = new_index
+            if tier == TIER_IVFPQ:
+                self._trained_at = new_index.ntotal
+                if self._reservoir is None:
+                    self._set_reservoir(sample, n)
+                    if len(tail):
+                        self._sample(tail)
+            else:
+                self._set_reservoir(None, 0)
+
+    def wait_for_rebuild(self, timeout: Optional[float] = None) -> None:
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # ---------- persistence ----------
+
+    def save(self, index_path: Path) -> None:
+        """Write the FAISS index to ``index_path`` (plus the IVF training reservoir, if any)."""
+        index_path = Path(index_path)
+        with self._lock:
+            if self.index is None:
+                return
+            faiss.write_index(self.index, str(index_path))
+            sample_path = index_path.with_suffix(".sample.npy")
+            # The reservoir only drifts slowly, so rewrite it after ~10% new vectors, not on every save
+            stale = self._reservoir_seen - self._reservoir_saved_at >= max(1, self._reservoir_saved_at // 10)
+            if self._reservoir is not None and (stale or not sample_path.exists()):
+                np.save(sample_path, self._reservoir[:self._reservoir_fill])
+                self._reservoir_saved_at = self._reservoir_seen
+
+    @classmethod
+    def load(cls, index_path: Path, background: bool = True) -> "AdaptiveIndex":
+        index_path = Path(index_path)
+        index = faiss.read_index(str(index_path))
+        adaptive = cls(dim=index.d, background=background)
+        adaptive.index = index
+        if index_tier(index) == TIER_IVFPQ:
+            adaptive._trained_at = index.ntotal
+            sample_path = index_path.with_suffix(".sample.npy")
+            if sample_path.exists():
+                adaptive._set_reservoir(np.load(sample_path), index.ntotal)
+                adaptive._reservoir_saved_at = adaptive._reservoir_seen
+        adaptive._maybe_rebuild()
+        return adaptive
+
+
+def benchmark_tiers(
+    vectors: np.ndarray,
+    queries: Optional[np.ndarray] = None,
+    k: int = 10,
+    tiers: Tuple[str, ...] = TIERS,
+    n_queries: int = 200,
+) -> List[Dict]:
+    """
+    Measure build time, mean query latency and recall@k for each tier.
+
+    Ground truth comes from an exact flat scan over the same vectors.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if queries is None:
+        rng = np.random.default_rng(1)
+        picks = rng.choice(len(vectors), min(n_queries, len(vectors)), replace=False)
+        queries = vectors[picks] + rng.normal(0, 0.01, (len(picks), vectors.shape[1])).astype(np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for tier in tiers:
+        start = time.perf_counter()
+        index = build_index(vectors, tier)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = index.search(queries, k)
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+        results.append({
+            "tier": tier,
+            "n_vectors": len(vectors),
+            "build_s": round(build_s, 3),
+            "latency_ms": round(latency_ms, 4),
+            f"recall@{k}": round(hits / (len(queries) * k), 4),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    # Usage: python vector_index.py [index.bin | n_vectors] [dim]
+    arg = sys.argv[1] if len(sys.argv) > 1 else "50000"
+    if Path(arg).exists():
+        data = AdaptiveIndex.load(Path(arg), background=False).vectors()
+    else:
+        dim = int(sys.argv[2]) if len(sys.argv) > 2 else 768
+        data = np.random.default_rng(0).standard_normal((int(arg), dim)).astype(np.float32)
+
+    print(f"Benchmarking {len(data)} vectors (auto tier: {select_tier(len(data))})")
+    for row in benchmark_tiers(data):
+        print("  " + "  ".join(f"{key}={value}" for key, value in row.items()))
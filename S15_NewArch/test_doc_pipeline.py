@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test the S21 document extraction pipeline (mcp_servers/doc_pipeline.py)
+
+Extraction is stubbed out, so no PDF libraries or Ollama are needed.
+Run with: python test_doc_pipeline.py  (or pytest test_doc_pipeline.py)
+"""
+
+import sys
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# mcp_servers modules import each other as siblings
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_servers"))
+
+import doc_pipeline
+from doc_pipeline import DocumentPipeline, Segment, plan_segments
+
+
+def _pipeline(stored, on_document=None, chunk_fn=None):
+    return DocumentPipeline(
+        chunk_fn=chunk_fn or (lambda text, kind: text.split("|")),
+        embed_fn=lambda text: np.full(4, len(text), dtype=np.float32),
+        on_document=on_document or (lambda f, h, e, c: stored.append((f.name, h, c))),
+        image_dir=Path("."),
+    )
+
+
+def _feed(pipeline, segments):
+    """Replace the process-pool stage with a direct feed of pre-extracted segments."""
+    def extract_all(files):
+        for seg in segments:
+            pipeline._segments_q.put(seg)
+    pipeline._extract_all = extract_all
+
+
+def test_plan_segments_splits_large_pdfs():
+    original = doc_pipeline._pdf_page_count
+    try:
+        doc_pipeline._pdf_page_count = lambda file: 20
+        segments = plan_segments(Path("big.pdf"), "h")
+        assert [s.pages for s in segments] == [list(range(0, 8)), list(range(8, 16)), [16, 17, 18, 19]]
+        assert all(s.total == 3 and s.kind == "pdf" for s in segments)
+
+        doc_pipeline._pdf_page_count = lambda file: doc_pipeline.LARGE_PDF_PAGES
+        small = plan_segments(Path("small.pdf"), "h")
+        assert len(small) == 1 and small[0].pages is None
+    finally:
+        doc_pipeline._pdf_page_count = original
+
+    other = plan_segments(Path("notes.docx"), "h")
+    assert len(other) == 1 and other[0].kind == "other"
+
+
+def test_chunk_order_kept_when_segments_finish_out_of_order():
+    stored = []
+    pipeline = _pipeline(stored)
+    doc = Path("doc.pdf")
+    segments = [
+        Segment(doc, "h", 2, 3, "pdf", text="e|f"),
+        Segment(doc, "h", 0, 3, "pdf", text="a|b"),
+        Segment(doc, "h", 1, 3, "pdf", text="c|d"),
+    ]
+    _feed(pipeline, segments)
+    pipeline.run({doc: "h"})
+
+    assert stored == [("doc.pdf", "h", ["a", "b", "c", "d", "e", "f"])]
+
+
+def test_failed_segment_keeps_file_out_of_cache():
+    stored = []
+    pipeline = _pipeline(stored)
+    bad, good = Path("bad.pdf"), Path("good.txt")
+    _feed(pipeline, [
+        Segment(bad, "h1", 0, 2, "pdf", text="a|b"),
+        Segment(bad, "h1", 1, 2, "pdf", error="boom"),
+        Segment(good, "h2", 0, 1, "other", text="x|y"),
+    ])
+    pipeline.run({bad: "h1", good: "h2"})
+
+    assert [name for name, _, _ in stored] == ["good.txt"]
+
+
+def test_raising_callback_does_not_hang():
+    stored = []
+
+    def on_document(file, fhash, embeddings, chunks):
+        if file.name.startswith("fail"):
+            raise RuntimeError("disk full")
+        stored.append(file.name)
+
+    pipeline = _pipeline(stored, on_document=on_document)
+    files = [Path(f"{'fail' if i % 2 else 'ok'}_{i}.txt") for i in range(40)]
+    _feed(pipeline, [Segment(f, "h", 0, 1, "other", text="a|b") for f in files])
+
+    runner = threading.Thread(target=pipeline.run, args=({f: "h" for f in files},), daemon=True)
+    runner.start()
+    runner.join(timeout=10)
+    assert not runner.is_alive(), "pipeline deadlocked after on_document raised"
+    assert len(stored) == 20
+
+
+def test_stats_report():
+    pipeline = _pipeline([])
+    doc = Path("doc.txt")
+    _feed(pipeline, [Segment(doc, "h", 0, 1, "other", text="a|b|c")])
+    pipeline.stats["extract"].record(1, 0.5)
+    report = pipeline.run({doc: "h"})
+
+    rows = {row["stage"]: row for row in report}
+    assert set(rows) == {"extract", "chunk", "embed", "total"}
+    assert rows["extract"]["segments"] == 1
+    assert rows["chunk"]["chunks"] == 3
+    assert rows["embed"]["embeddings"] == 3
+    assert rows["total"]["files"] == 1 and rows["total"]["wall_s"] >= 0
+    assert "embeddings_per_s" in rows["embed"]
+
+
+if __name__ == "__main__":
+    tests = [
+        ("plan_segments splits large PDFs into page ranges", test_plan_segments_splits_large_pdfs),
+        ("Chunk order kept across out-of-order segments", test_chunk_order_kept_when_segments_finish_out_of_order),
+        ("Failed segment keeps file out of the cache", test_failed_segment_keeps_file_out_of_cache),
+        ("Raising on_document does not deadlock", test_raising_callback_does_not_hang),
+        ("Per-stage stats report", test_stats_report),
+    ]
+
+    failed = 0
+    for name, test_func in tests:
+        try:
+            test_func()
+            print(f"✅ {name}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {name} - Error: {e}")
+
+    sys.exit(0 if failed == 0 else 1)
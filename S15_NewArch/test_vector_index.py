@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test the tiered FAISS index (mcp_servers/vector_index.py)
+
+Run with: pytest test_vector_index.py
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# mcp_servers modules import each other as siblings
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_servers"))
+
+import vector_index as vi
+import faiss
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+COPIES = [
+    REPO_ROOT / "llm-mcp" / "modules" / "vector_index.py",
+    REPO_ROOT / "hybrid-decision-making" / "modules" / "vector_index.py",
+    REPO_ROOT / "S15_NewArch" / "mcp_servers" / "vector_index.py",
+]
+
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_select_tier_boundaries():
+    assert vi.select_tier(0) == vi.TIER_FLAT
+    assert vi.select_tier(vi.FLAT_MAX_VECTORS - 1) == vi.TIER_FLAT
+    assert vi.select_tier(vi.FLAT_MAX_VECTORS) == vi.TIER_HNSW
+    assert vi.select_tier(vi.HNSW_MAX_VECTORS - 1) == vi.TIER_HNSW
+    assert vi.select_tier(vi.HNSW_MAX_VECTORS) == vi.TIER_IVFPQ
+
+
+def test_flat_to_hnsw_migration_keeps_row_ids():
+    original = vi.FLAT_MAX_VECTORS
+    vi.FLAT_MAX_VECTORS = 100
+    try:
+        index = vi.AdaptiveIndex(background=False)
+        data = _vectors(150)
+        index.add(data[:60])
+        assert index.tier == vi.TIER_FLAT
+        index.add(data[60:])
+        assert index.tier == vi.TIER_HNSW
+        assert index.ntotal == 150
+        _, ids = index.search(data[[3, 120]], 1)
+        assert ids[:, 0].tolist() == [3, 120]
+    finally:
+        vi.FLAT_MAX_VECTORS = original
+
+
+def test_search_pads_with_minus_one():
+    index = vi.AdaptiveIndex()
+    _, ids = index.search(_vectors(1), 3)
+    assert ids.tolist() == [[-1, -1, -1]]
+
+    index.add(_vectors(2))
+    _, ids = index.search(_vectors(1), 5)
+    assert sorted(ids[0].tolist()) == [-1, -1, -1, 0, 1]
+
+
+def test_load_legacy_flat_index(tmp_path=None):
+    directory = Path(tmp_path or tempfile.mkdtemp())
+    path = directory / "index.bin"
+    legacy = faiss.IndexFlatL2(16)
+    data = _vectors(20)
+    legacy.add(data)
+    faiss.write_index(legacy, str(path))
+
+    index = vi.AdaptiveIndex.load(path)
+    assert index.tier == vi.TIER_FLAT and index.ntotal == 20
+    _, ids = index.search(data[[7]], 1)
+    assert ids[0, 0] == 7
+    index.add(_vectors(5, seed=1))
+    index.save(path)
+    assert faiss.read_index(str(path)).ntotal == 25
+
+
+def test_search_restricted_to_ids():
+    data = _vectors(300)
+    allowed = np.arange(0, 300, 7)
+    for tier in (vi.TIER_FLAT, vi.TIER_HNSW):
+        index = vi.AdaptiveIndex(tier=tier, background=False)
+        index.add(data)
+        _, ids = index.search(data[[14, 15]], 4, ids=allowed)
+        assert ids[0, 0] == 14
+        assert set(ids.ravel()) <= set(allowed.tolist())
+        _, ids = index.search(data[[0]], 4, ids=np.array([5, 9]))
+        assert sorted(ids[0].tolist()) == [-1, -1, 5, 9]
+
+
+def _body(path):
+    # Everything from the first import down must be identical across copies
+    lines = path.read_text(encoding="utf-8").splitlines()
+    start = next(i for i, line in enumerate(lines) if line.startswith("import "))
+    return lines[start:]
+
+
+def test_copies_in_sync():
+    present = [p for p in COPIES if p.exists()]
+    bodies = {str(p.relative_to(REPO_ROOT)): _body(p) for p in present}
+    reference = _body(Path(vi.__file__))
+    drifted = [name for name, body in bodies.items() if body != reference]
+    assert not drifted, f"vector_index.py copies drifted: {drifted}"
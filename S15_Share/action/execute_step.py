@@ -2,11 +2,8 @@ import uuid
 from utils.utils import log_step, log_error
 from action.executor import run_user_code
 from agent.agentSession import ExecutionSnapshot
-from concurrent.futures import ThreadPoolExecutor
 import asyncio
 
-executor = ThreadPoolExecutor(max_workers=3)  # Limit to 3 variants
-
 async def execute_step(step_id, code, ctx, session, multi_mcp, variant_used: str = ""):
     result = None
     try:
@@ -38,12 +35,10 @@ async def execute_step(step_id, code, ctx, session, multi_mcp, variant_used: str
     return result
 
 
-def run_step_in_thread(step_id, code, ctx, session, multi_mcp, variant):
-    return asyncio.run(execute_step(step_id, code, ctx, session, multi_mcp, variant_used=variant))
-
 async def execute_step_with_mode(step_id, code_variants, ctx, mode, session, multi_mcp):
     if mode == "parallel":
-        loop = asyncio.get_event_loop()
+        # Variants run as tasks on this loop: MCP sessions belong to it, and a fresh
+        # loop per thread (asyncio.run) cannot safely drive them
         tasks = []
         variant_map = []
 
@@ -53,11 +48,7 @@ async def execute_step_with_mode(step_id, code_variants, ctx, mode, session, mul
                 code = code_variants[variant]
                 variant_map.append(variant)
                 tasks.append(
-                    loop.run_in_executor(
-                        executor,
-                        run_step_in_thread,
-                        step_id, code, ctx, session, multi_mcp, variant
-                    )
+                    execute_step(step_id, code, ctx, session, multi_mcp, variant_used=variant)
                 )
 
         if not tasks:
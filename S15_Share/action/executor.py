@@ -6,10 +6,13 @@ import textwrap
 import re
 import os
 import json
+import hashlib
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 import traceback
 from utils.utils import log_json_block, log_step, log_error, log_json_block
+from action.session_store import get_session_store
 from agent.agentSession import ExecutionSnapshot
 
 ALLOWED_MODULES = {
@@ -46,6 +49,8 @@ SAFE_BUILTINS = [
 
 MAX_FUNCTIONS = 20
 TIMEOUT_PER_FUNCTION = 50
+CODE_CACHE_SIZE = 256
+SANDBOX_POOL_SIZE = 3  # one warm namespace per code variant (A/B/C)
 
 class KeywordStripper(ast.NodeTransformer):
     """Rewrite all function calls to remove keyword args and keep only values as positional."""
@@ -83,7 +88,8 @@ def fix_unterminated_triple_quotes(code: str) -> str:
     return code
 
 
-def build_safe_globals(mcp_funcs: dict, multi_mcp=None, session_id: str = None) -> dict:
+def build_base_globals(mcp_funcs: dict, multi_mcp=None) -> dict:
+    """Session-independent part of the sandbox: builtins, tools, allowed modules, parallel()"""
     safe_globals = {
         "__builtins__": {
             k: getattr(builtins, k) for k in SAFE_BUILTINS
@@ -94,15 +100,24 @@ def build_safe_globals(mcp_funcs: dict, multi_mcp=None, session_id: str = None)
     for module in ALLOWED_MODULES:
         safe_globals[module] = __import__(module)
 
+    if multi_mcp:
+        async def parallel(*tool_calls):
+            coros = [multi_mcp.function_wrapper(tool_name, *args) for tool_name, *args in tool_calls]
+            return await asyncio.gather(*coros)
+        safe_globals["parallel"] = parallel
+
+    return safe_globals
+
+
+def add_session_globals(safe_globals: dict, session_id: str = None) -> dict:
+    """Per-run part of the sandbox: final_answer, session variables, globals_schema"""
+    parallel = safe_globals.get("parallel")
     safe_globals["final_answer"] = lambda x: safe_globals.setdefault("result_holder", x)
 
     if session_id:
         safe_globals.update(load_session_vars(session_id))
 
-    if multi_mcp:
-        async def parallel(*tool_calls):
-            coros = [multi_mcp.function_wrapper(tool_name, *args) for tool_name, *args in tool_calls]
-            return await asyncio.gather(*coros)
+    if parallel:
         safe_globals["parallel"] = parallel
 
     # Allow both direct access (`urls`) and schema-style (`globals_schema.get("urls", "")`)
@@ -113,30 +128,67 @@ def build_safe_globals(mcp_funcs: dict, multi_mcp=None, session_id: str = None)
     return safe_globals
 
 
-def save_session_vars(session_id: str, variables: dict):
-    os.makedirs("action/sandbox_state", exist_ok=True)
-    path = f"action/sandbox_state/{session_id}.json"
+def build_safe_globals(mcp_funcs: dict, multi_mcp=None, session_id: str = None) -> dict:
+    return add_session_globals(build_base_globals(mcp_funcs, multi_mcp), session_id)
 
-    # Load existing vars if any
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-    except FileNotFoundError:
-        existing = {}
 
-    # Merge
-    merged = {**existing, **variables}
+class SandboxPool:
+    """
+    Pre-built sandbox namespaces for the current MultiMCP tool set
 
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(merged, f, indent=2, ensure_ascii=False)
+    Tool proxies, module imports and the parallel() helper are built once per
+    tool set; each run takes a fresh copy of that template (never a namespace
+    another run has executed in), and the pool is topped up after the run.
+    """
 
+    def __init__(self, size: int = SANDBOX_POOL_SIZE):
+        self.size = size
+        self.tool_names = frozenset()
+        self._key = None
+        self._template = None
+        self._warm = []
 
-def load_session_vars(session_id: str) -> dict:
-    try:
-        with open(f"action/sandbox_state/{session_id}.json", "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    def bind(self, multi_mcp) -> frozenset:
+        """Rebuild the template if the tool set changed; returns the tool names"""
+        names = tuple(tool.name for tool in multi_mcp.get_all_tools())
+        key = (id(multi_mcp), names)
+        if key != self._key:  # first run, another MultiMCP, or servers added/removed
+            tool_funcs = {name: make_tool_proxy(name, multi_mcp) for name in names}
+            self._template = build_base_globals(tool_funcs, multi_mcp)
+            self.tool_names = frozenset(names)
+            self._key = key
+            self._warm.clear()
+        return self.tool_names
+
+    def _copy(self) -> dict:
+        namespace = dict(self._template)
+        namespace["__builtins__"] = dict(self._template["__builtins__"])
+        return namespace
+
+    def acquire(self, multi_mcp, session_id: str = None) -> dict:
+        self.bind(multi_mcp)
+        namespace = self._warm.pop() if self._warm else self._copy()
+        return add_session_globals(namespace, session_id)
+
+    def refill(self):
+        if self._template is not None:
+            while len(self._warm) < self.size:
+                self._warm.append(self._copy())
+
+
+def save_session_vars(session_id: str, variables: dict) -> int:
+    """Log the variables this step changed; returns the session's new version"""
+    return get_session_store(session_id).save(variables)
+
+
+def load_session_vars(session_id: str, version: int = None) -> dict:
+    store = get_session_store(session_id)
+    return store.latest() if version is None else store.at_version(version)
+
+
+def restore_session_vars(session_id: str, version: int) -> dict:
+    """Make the variables as of an earlier version the session's latest again"""
+    return get_session_store(session_id).restore(version)
 
 
 def count_function_calls(code: str) -> int:
@@ -149,6 +201,117 @@ def make_tool_proxy(tool_name: str, mcp):
         return await mcp.function_wrapper(tool_name, *args)
     return _tool_fn
 
+def transform_user_code(code: str, async_funcs) -> ast.Module:
+    """Plan code -> `async def __main()` module with tool calls awaited and returns normalized"""
+    cleaned_code = fix_unterminated_triple_quotes(textwrap.dedent(code.strip()))
+    tree = ast.parse(cleaned_code)
+
+    # ─── AST Transformations ─────────────────────────────────────
+    tree = KeywordStripper().visit(tree)
+    tree = AwaitTransformer(set(async_funcs)).visit(tree)
+
+    # Rewrite return <varname> → return {"varname": varname}
+    new_body = []
+    return_found = False
+    for node in tree.body:
+        if isinstance(node, ast.Return):
+            return_found = True
+            if isinstance(node.value, ast.Name):
+                varname = node.value.id
+                new_body.append(
+                    ast.Return(
+                        value=ast.Dict(
+                            keys=[ast.Constant(value=varname)],
+                            values=[ast.Name(id=varname, ctx=ast.Load())]
+                        )
+                    )
+                )
+            else:
+                new_body.append(node)
+        else:
+            new_body.append(node)
+
+    # If return is missing but 'result' exists, add `return result`
+    result_vars = {
+        node.targets[0].id
+        for node in tree.body
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
+    }
+
+    if not return_found and "result" in result_vars:
+        new_body.append(ast.Return(value=ast.Name(id="result", ctx=ast.Load())))
+
+    ast.fix_missing_locations(tree)
+    tree.body = new_body
+    ast.fix_missing_locations(tree)
+
+    # ─── Wrap as async def __main() ──────────────────────────────
+    func_def = ast.AsyncFunctionDef(
+        name="__main",
+        args=ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]),
+        body=tree.body,
+        decorator_list=[]
+    )
+    wrapper = ast.Module(body=[func_def], type_ignores=[])
+    ast.fix_missing_locations(wrapper)
+    return wrapper
+
+
+class CompiledCodeCache:
+    """
+    LRU cache of compiled plan code
+
+    Code objects are keyed by a hash of the transformed AST, so variants that
+    differ only in formatting, comments or keyword names share one; the source
+    text (plus the tool names it was transformed against) maps to that key so a
+    repeated variant skips parsing entirely.
+    """
+
+    def __init__(self, maxsize: int = CODE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._by_source = OrderedDict()  # (code, tool names) -> (ast hash, function call count)
+        self._by_ast = OrderedDict()     # ast hash -> code object
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, code: str, async_funcs: frozenset):
+        """(code object, function call count) for plan code; raises SyntaxError like compile()"""
+        entry = self._by_source.get((code, async_funcs))
+        if entry is not None and entry[0] in self._by_ast:
+            self.hits += 1
+            self._by_source.move_to_end((code, async_funcs))
+            self._by_ast.move_to_end(entry[0])
+            return self._by_ast[entry[0]], entry[1]
+
+        func_count = count_function_calls(code)
+        wrapper = transform_user_code(code, async_funcs)
+        ast_key = hashlib.sha1(ast.dump(wrapper).encode("utf-8")).hexdigest()
+        compiled = self._by_ast.get(ast_key)
+        if compiled is None:
+            self.misses += 1
+            compiled = compile(wrapper, filename="<user_code>", mode="exec")
+        else:
+            self.hits += 1
+        self._store(self._by_ast, ast_key, compiled)
+        self._store(self._by_source, (code, async_funcs), (ast_key, func_count))
+        return compiled, func_count
+
+    def _store(self, cache: OrderedDict, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+
+    def clear(self):
+        self._by_source.clear()
+        self._by_ast.clear()
+        self.hits = self.misses = 0
+
+
+SANDBOX_POOL = SandboxPool()
+CODE_CACHE = CompiledCodeCache()
+
+
 async def run_user_code(code: str, multi_mcp, session_id: str = "default_session") -> dict:
     start_time = time.perf_counter()
     start_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -156,8 +319,10 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
     def is_json_serializable(value):
         return isinstance(value, (str, int, float, bool, type(None), list, dict))
 
+    func_count = 0
     try:
-        func_count = count_function_calls(code)
+        tool_names = SANDBOX_POOL.bind(multi_mcp)
+        compiled, func_count = CODE_CACHE.get(code, tool_names)
         if func_count > MAX_FUNCTIONS:
             return {
                 "status": "error",
@@ -166,76 +331,12 @@ async def run_user_code(code: str, multi_mcp, session_id: str = "default_session
                 "total_time": str(round(time.perf_counter() - start_time, 3))
             }
 
-        tool_funcs = {
-            tool.name: make_tool_proxy(tool.name, multi_mcp)
-            for tool in multi_mcp.get_all_tools()
-        }
-
-        sandbox = build_safe_globals(tool_funcs, multi_mcp, session_id)
+        sandbox = SANDBOX_POOL.acquire(multi_mcp, session_id)
+        asyncio.get_running_loop().call_soon(SANDBOX_POOL.refill)  # top up while the tools await
         local_vars = {}
 
         log_step(f"[CODE:]: {code}", symbol="🐍")
 
-        cleaned_code = fix_unterminated_triple_quotes(textwrap.dedent(code.strip()))
-        tree = ast.parse(cleaned_code)
-
-        # ─── AST Transformations ─────────────────────────────────────
-        tree = KeywordStripper().visit(tree)
-        tree = AwaitTransformer(set(tool_funcs)).visit(tree)
-
-        # Rewrite return <varname> → return {"varname": varname}
-        new_body = []
-        return_found = False
-        for node in tree.body:
-            if isinstance(node, ast.Return):
-                return_found = True
-                if isinstance(node.value, ast.Name):
-                    varname = node.value.id
-                    new_body.append(
-                        ast.Return(
-                            value=ast.Dict(
-                                keys=[ast.Constant(value=varname)],
-                                values=[ast.Name(id=varname, ctx=ast.Load())]
-                            )
-                        )
-                    )
-                else:
-                    new_body.append(node)
-            else:
-                new_body.append(node)
-
-        # If return is missing but 'result' exists, add `return result`
-        has_result_var = any(
-            isinstance(node, ast.Assign)
-            and any(isinstance(t, ast.Name) and t.id == "result" for t in node.targets)
-            for node in new_body
-        )
-        result_vars = {
-            node.targets[0].id
-            for node in tree.body
-            if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
-        }
-
-        if not return_found and "result" in result_vars:
-            new_body.append(ast.Return(value=ast.Name(id="result", ctx=ast.Load())))
-
-
-        ast.fix_missing_locations(tree)
-        tree.body = new_body
-        ast.fix_missing_locations(tree)
-
-        # ─── Wrap as async def __main() ──────────────────────────────
-        func_def = ast.AsyncFunctionDef(
-            name="__main",
-            args=ast.arguments(posonlyargs=[], args=[], kwonlyargs=[], kw_defaults=[], defaults=[]),
-            body=tree.body,
-            decorator_list=[]
-        )
-        wrapper = ast.Module(body=[func_def], type_ignores=[])
-        ast.fix_missing_locations(wrapper)
-        
-
-        compiled = compile(wrapper, filename="<user_code>", mode="exec")
         exec(compiled, sandbox, local_vars)
 
         # ─── Execute and collect result ──────────────────────────────
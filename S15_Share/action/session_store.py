@@ -0,0 +1,210 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+SANDBOX_STATE_DIR = "action/sandbox_state"
+SNAPSHOT_EVERY = 50     # versions appended before the latest state is snapshotted
+SNAPSHOT_LOG_RATIO = 1.0  # ...or once the unsnapshotted log tail outgrows the snapshot
+
+
+class SessionVarStore:
+    """
+    Append-only, versioned store of one session's sandbox variables.
+
+    <session>.vars.jsonl holds one line per save with only the keys that changed
+    ({"v": version, "set": {...}, "del": [...]}), so a step costs the size of what
+    it changed. <session>.snapshot.json periodically records the latest variables
+    together with the log offset they cover; the latest state is that snapshot
+    plus the log tail. The full log is kept, so any earlier version can be rebuilt.
+    A legacy <session>.json (whole-state rewrite) becomes version 0 on first use.
+    """
+
+    def __init__(self, session_id: str, state_dir: str = SANDBOX_STATE_DIR,
+                 snapshot_every: int = SNAPSHOT_EVERY):
+        self.session_id = session_id
+        self.state_dir = state_dir
+        self.snapshot_every = snapshot_every
+        self.log_path = os.path.join(state_dir, f"{session_id}.vars.jsonl")
+        self.snapshot_path = os.path.join(state_dir, f"{session_id}.snapshot.json")
+        self.legacy_path = os.path.join(state_dir, f"{session_id}.json")
+        self._encoded: Dict[str, str] = {}   # latest value of each key, as JSON text
+        self.version = 0
+        self._snapshot_version = 0
+        self._snapshot_offset = 0
+        self._snapshot_size = 0
+        self._log_size = -1                  # log size our in-memory state reflects
+        self._torn = False
+
+    # ─── reading ─────────────────────────────────────────────────
+
+    @staticmethod
+    def _apply(encoded: Dict[str, str], entry: Dict):
+        for key in entry.get("del", []):
+            encoded.pop(key, None)
+        for key, value in entry.get("set", {}).items():
+            encoded[key] = json.dumps(value, ensure_ascii=False)
+
+    def _read_log(self, offset: int = 0, until_version: Optional[int] = None):
+        """Yield complete log entries from offset; stops at a torn final line"""
+        try:
+            with open(self.log_path, "rb") as f:
+                f.seek(offset)
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        self._torn = True  # interrupted append: ignored, cut before the next one
+                        break
+                    entry = json.loads(raw)
+                    if until_version is not None and entry["v"] > until_version:
+                        break
+                    yield entry
+        except FileNotFoundError:
+            return
+
+    def _log_file_size(self) -> int:
+        try:
+            return os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+
+    def refresh(self):
+        """Bring the in-memory latest state up to date with the files (cheap if nothing changed)"""
+        size = self._log_file_size()
+        if size == self._log_size:
+            return
+        if size == 0 and os.path.exists(self.legacy_path):
+            self._migrate_legacy()
+            size = self._log_file_size()
+        if self._log_size < 0 or size < self._log_size:
+            self._load_snapshot()
+            offset = self._snapshot_offset
+        else:
+            offset = self._log_size  # another writer appended: replay only what is new
+        for entry in self._read_log(offset):
+            self._apply(self._encoded, entry)
+            self.version = entry["v"]
+        self._log_size = size
+
+    def _load_snapshot(self):
+        self._encoded, self.version = {}, 0
+        self._snapshot_version = self._snapshot_offset = self._snapshot_size = 0
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._encoded = {k: json.dumps(v, ensure_ascii=False) for k, v in snapshot["vars"].items()}
+            self.version = self._snapshot_version = snapshot["version"]
+            self._snapshot_offset = snapshot["log_offset"]
+            self._snapshot_size = os.path.getsize(self.snapshot_path)
+        except FileNotFoundError:
+            pass
+
+    def latest(self) -> Dict:
+        """Latest variables, as fresh objects the sandbox may mutate freely"""
+        self.refresh()
+        return {k: json.loads(v) for k, v in self._encoded.items()}
+
+    def at_version(self, version: int) -> Dict:
+        """Variables as they were right after the given version was saved"""
+        encoded: Dict[str, str] = {}
+        for entry in self._read_log(until_version=version):
+            self._apply(encoded, entry)
+        return {k: json.loads(v) for k, v in encoded.items()}
+
+    def versions(self) -> List[Dict]:
+        """[{"version", "set": [keys], "del": [keys]}] for every saved version"""
+        return [{"version": e["v"], "set": list(e.get("set", {})), "del": e.get("del", [])}
+                for e in self._read_log()]
+
+    # ─── writing ─────────────────────────────────────────────────
+
+    def _append(self, changed: Dict[str, str], deleted: List[str]) -> int:
+        os.makedirs(self.state_dir, exist_ok=True)
+        if self._log_size > 0 and self._torn:
+            self._truncate_torn_tail()
+            self._torn = False
+
+        version = self.version + 1
+        # Values are already JSON text: splice them in rather than re-encoding
+        body = ", ".join(f"{json.dumps(k, ensure_ascii=False)}: {v}" for k, v in changed.items())
+        line = f'{{"v": {version}, "set": {{{body}}}'
+        if deleted:
+            line += f', "del": {json.dumps(deleted, ensure_ascii=False)}'
+        with open(self.log_path, "ab") as f:
+            f.write((line + "}\n").encode("utf-8"))
+        self._log_size = self._log_file_size()
+        for key in deleted:
+            self._encoded.pop(key, None)
+        self._encoded.update(changed)
+        self.version = version
+
+        if self._snapshot_due():
+            self.snapshot()
+        return self.version
+
+    def _migrate_legacy(self):
+        """Turn a whole-state <session>.json into log version 0 (kept, but no longer written)"""
+        with open(self.legacy_path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self.log_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"v": 0, "set": legacy}, ensure_ascii=False) + "\n")
+        self._log_size = -1
+
+    def _truncate_torn_tail(self):
+        """Drop a partial last line left by a crash so the next append starts on a fresh line"""
+        with open(self.log_path, "rb+") as f:
+            content = f.read()
+            if content and not content.endswith(b"\n"):
+                f.truncate(content.rfind(b"\n") + 1)
+
+    def save(self, variables: Dict) -> int:
+        """Merge variables into the latest state, logging only changed keys; returns the version"""
+        self.refresh()
+        changed = {}
+        for key, value in variables.items():
+            encoded = json.dumps(value, ensure_ascii=False)
+            if self._encoded.get(key) != encoded:
+                changed[key] = encoded
+        if not changed:
+            return self.version
+        return self._append(changed, [])
+
+    def restore(self, version: int) -> Dict:
+        """Make an earlier version's variables the latest again (as a new version)"""
+        target = self.at_version(version)
+        self.refresh()
+        encoded = {k: json.dumps(v, ensure_ascii=False) for k, v in target.items()}
+        changed = {k: v for k, v in encoded.items() if self._encoded.get(k) != v}
+        deleted = [k for k in self._encoded if k not in encoded]
+        if changed or deleted:
+            self._append(changed, deleted)
+        return target
+
+    # ─── compaction ──────────────────────────────────────────────
+
+    def _snapshot_due(self) -> bool:
+        if self.version - self._snapshot_version >= self.snapshot_every:
+            return True
+        return self._log_size - self._snapshot_offset > SNAPSHOT_LOG_RATIO * max(self._snapshot_size, 4096)
+
+    def snapshot(self):
+        """Write the latest state and the log offset it covers (atomic replace)"""
+        body = ",\n".join(f"    {json.dumps(k, ensure_ascii=False)}: {v}" for k, v in self._encoded.items())
+        text = (f'{{\n  "version": {self.version},\n  "log_offset": {self._log_size},\n'
+                f'  "vars": {{\n{body}\n  }}\n}}\n')
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self.snapshot_path)
+        self._snapshot_version = self.version
+        self._snapshot_offset = self._log_size
+        self._snapshot_size = len(text.encode("utf-8"))
+
+
+_stores: Dict[str, SessionVarStore] = {}
+
+
+def get_session_store(session_id: str) -> SessionVarStore:
+    store = _stores.get(session_id)
+    if store is None:
+        store = _stores[session_id] = SessionVarStore(session_id)
+    return store
@@ -0,0 +1,112 @@
+"""
+Benchmark run_user_code setup cost against a local dummy MultiMCP.
+
+"cold" clears the compiled-code cache and the sandbox pool before every call,
+which is what each call used to pay (tool proxies, safe globals, parse/transform/
+compile); "warm" is the normal path. The parallel case runs a step's A/B/C
+variants through execute_step_with_mode. Console logging is switched off so the
+numbers are setup + execution, not rich rendering.
+
+Run from S15_Share:
+    python benchmark_executor.py [iterations]
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import action.executor as executor
+from action.execute_step import execute_step_with_mode
+
+TOOL_COUNT = 40
+
+PLAN_CODE = """
+urls = ["https://example.com/a", "https://example.com/b"]
+pages = []
+for url in urls:
+    pages.append(fetch_page(url=url))
+summary = summarize_text("\\n".join(pages))
+total = sum(len(p) for p in pages)
+result = {"summary": summary, "total": total}
+return result
+"""
+
+
+class DummyMultiMCP:
+    """get_all_tools/function_wrapper like MultiMCP, with instant in-process tools"""
+
+    def __init__(self, tool_count: int = TOOL_COUNT):
+        self.tools = [SimpleNamespace(name=name) for name in
+                      ["fetch_page", "summarize_text"] + [f"tool_{i}" for i in range(tool_count - 2)]]
+
+    def get_all_tools(self):
+        return self.tools
+
+    async def function_wrapper(self, tool_name: str, *args):
+        return f"{tool_name}: {args[0] if args else ''}"
+
+
+class DummyContext:
+    session_id = "benchmark_session"
+
+    def update_step_result(self, step_id, result):
+        pass
+
+    def mark_step_completed(self, step_id):
+        pass
+
+    def mark_step_failed(self, step_id, error):
+        pass
+
+
+async def time_calls(label: str, iterations: int, call, cold: bool = False) -> float:
+    elapsed = 0.0
+    for _ in range(iterations):
+        if cold:
+            executor.CODE_CACHE.clear()
+            executor.SANDBOX_POOL = executor.SandboxPool()
+        start = time.perf_counter()
+        result = await call()
+        elapsed += time.perf_counter() - start
+        assert result.get("status") == "success", result
+    per_call = elapsed / iterations * 1000
+    print(f"{label:<34} {per_call:8.3f} ms/call", file=sys.__stdout__)
+    return per_call
+
+
+async def main(iterations: int):
+    multi_mcp = DummyMultiMCP()
+    ctx = DummyContext()
+    variants = {f"CODE_1{suffix}": PLAN_CODE.replace("pages", f"pages_{suffix.lower()}") for suffix in "ABC"}
+
+    def single():
+        return executor.run_user_code(PLAN_CODE, multi_mcp, ctx.session_id)
+
+    def parallel():
+        return execute_step_with_mode("1", variants, ctx, "parallel", None, multi_mcp)
+
+    executor.log_step = executor.log_json_block = lambda *args, **kwargs: None
+    with contextlib.redirect_stdout(io.StringIO()):
+        await single()  # import/first-use costs out of the way
+        cold = await time_calls("run_user_code (cold setup)", iterations, single, cold=True)
+        warm = await time_calls("run_user_code (pool + code cache)", iterations, single)
+        cold_abc = await time_calls("A/B/C variants (cold setup)", iterations, parallel, cold=True)
+        warm_abc = await time_calls("A/B/C variants (pool + code cache)", iterations, parallel)
+
+    print(f"speedup: single {cold / warm:.1f}x, variants {cold_abc / warm_abc:.1f}x "
+          f"(code cache hits {executor.CODE_CACHE.hits}, misses {executor.CODE_CACHE.misses})")
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.getcwd()
+        os.chdir(workdir)  # session variables are written under ./action/sandbox_state
+        try:
+            asyncio.run(main(iterations))
+        finally:
+            os.chdir(root)
@@ -0,0 +1,196 @@
+import math
+import re
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TOKEN_BUDGET = 6000   # completed steps + globals; perception and query come on top
+CHARS_PER_TOKEN = 4           # rough estimate, good enough for packing
+GLOBAL_PREVIEW_CHARS = 500
+SHORT_PREVIEW_CHARS = 120
+STEP_RESULT_CHARS = 300
+PAGE_STATE_SHARE = 0.5        # most of the latest page state, but never the whole budget
+RELEVANCE_SCAN_CHARS = 2000   # head of each value used to judge relevance
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STEP_RE = re.compile(r"\d+")
+_STOPWORDS = frozenset("a an and the to of in on for with is are be it this that what how from by at as or".split())
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _words(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1}
+
+
+def _version(value: Any) -> Tuple:
+    """Identity plus size: catches replaced values and most in-place growth"""
+    try:
+        size = len(value)
+    except TypeError:
+        size = None
+    return id(value), type(value).__name__, size
+
+
+def _step_number(key: str) -> int:
+    digits = _STEP_RE.match(key.rsplit("_", 1)[-1])
+    return int(digits.group()) if digits else -1
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+class _Preview:
+    __slots__ = ("version", "text", "words", "value")
+
+    def __init__(self, value: Any, label: str = ""):
+        self.value = value  # keeps the object alive so its id cannot be reused
+        self.version = _version(value)
+        self.text = str(value) if value is not None else ""
+        self.words = _words(label + " " + self.text[:RELEVANCE_SCAN_CHARS])
+
+
+class DecisionContextBuilder:
+    """
+    Packs completed steps and globals into a token budget for the decision prompt.
+
+    str() of each value is computed once per (key, identity, size) and reused on
+    later calls, so large page-state globals are stringified once per session,
+    not once per decision. Every step id and global name is always listed; the
+    budget decides how much detail each one gets, most relevant to the current
+    query first (the latest page state and memory are always kept).
+    """
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+        self._previews: Dict[str, _Preview] = {}
+
+    def preview(self, key: str, value: Any, label: str = "") -> _Preview:
+        """str() of value and its words for relevance (label included), recomputed only when value changes"""
+        cached = self._previews.get(key)
+        if cached is None or cached.version != _version(value):
+            cached = self._previews[key] = _Preview(value, label)
+        return cached
+
+    # ─── relevance ───────────────────────────────────────────────
+
+    @staticmethod
+    def query_words(query: str, p_out: Optional[dict]) -> set:
+        words = _words(query or "")
+        for value in (p_out or {}).values():
+            if isinstance(value, str):
+                words |= _words(value)
+        return words
+
+    @staticmethod
+    def _relevance(item_words: set, query: set, recency: float) -> float:
+        overlap = len(item_words & query)
+        return overlap / math.sqrt(len(query) or 1) + recency
+
+    # ─── packing ─────────────────────────────────────────────────
+
+    def build(self, ctx, query: str, p_out: Optional[dict], completed_steps: List[dict]) -> dict:
+        budget = self.token_budget
+        query_set = self.query_words(query, p_out)
+        globals_dict = getattr(ctx, "globals", {}) or {}
+
+        # Skeleton: every step id and global name, with type, is always sent
+        steps_out = [{"index": s.get("index"), "status": s.get("status"), "type": s.get("type")}
+                     for s in completed_steps]
+        globals_out = {k: {"type": type(v).__name__} for k, v in globals_dict.items()}
+        failed_out = []
+        for n in getattr(ctx, "failed_nodes", []):
+            step = ctx.steps[n].__dict__ if hasattr(ctx, "steps") and n in ctx.steps else {"index": n}
+            failed_out.append({"index": step.get("index"),
+                               "description": _clip(step.get("description") or "", 100),
+                               "error": _clip(str(step.get("error") or ""), 200)})
+        budget -= estimate_tokens(str(steps_out) + str(globals_out) + str(failed_out))
+
+        # Candidates: (priority, options as [(tokens, apply)] from richest to leanest)
+        candidates = []
+        page_keys = [k for k in globals_dict if k.startswith("page_state_")]
+        # Step suffixes like "10A": compare the step number, not the string ("9A" > "10A")
+        latest_page = max(reversed(page_keys), key=_step_number) if page_keys else None
+        names = list(globals_dict)
+        for position, key in enumerate(names):
+            preview = self.preview(key, globals_dict[key], label=key.replace("_", " "))
+            recency = position / max(len(names), 1)
+            if key == latest_page:
+                priority, limits = math.inf, [int(self.token_budget * PAGE_STATE_SHARE) * CHARS_PER_TOKEN,
+                                              GLOBAL_PREVIEW_CHARS]
+            elif key.startswith("page_state_"):
+                priority, limits = self._relevance(preview.words, query_set, 0.0), [SHORT_PREVIEW_CHARS]
+            elif key == "memory":
+                priority, limits = math.inf, [200]
+            else:
+                priority = self._relevance(preview.words, query_set, recency)
+                limits = [GLOBAL_PREVIEW_CHARS, SHORT_PREVIEW_CHARS]
+            candidates.append((priority, position, self._global_options(globals_out[key], preview.text, limits)))
+
+        for position, (step, entry) in enumerate(zip(completed_steps, steps_out)):
+            if step.get("index") == "ROOT":
+                continue
+            recency = position / max(len(completed_steps), 1)
+            description = step.get("description") or ""
+            preview = self.preview(f"__step__{step.get('index')}", step.get("result") or None, label=description)
+            candidates.append((self._relevance(preview.words, query_set, recency), position,
+                               self._step_options(entry, step, description, preview.text)))
+
+        live = set(globals_dict) | {f"__step__{s.get('index')}" for s in completed_steps}
+        for key in [k for k in self._previews if k not in live]:
+            del self._previews[key]
+
+        # Most relevant first; each gets its richest option that still fits
+        packed = omitted = 0
+        for _, _, options in sorted(candidates, key=lambda c: (-c[0], -c[1])):
+            for tokens, apply, detailed in options:
+                if tokens <= budget:
+                    apply()
+                    budget -= tokens
+                    packed += detailed
+                    omitted += not detailed
+                    break
+            else:
+                omitted += 1
+
+        return {
+            "completed_steps": steps_out,
+            "failed_steps": failed_out,
+            "globals_schema": globals_out,
+            "_context_budget": {"tokens": self.token_budget, "unused": max(budget, 0),
+                                "detailed": packed, "names_only": omitted},
+        }
+
+    @staticmethod
+    def _global_options(entry: dict, text: str, limits: List[int]) -> list:
+        options = []
+        for limit in limits:
+            clipped = _clip(text, limit)
+            options.append((estimate_tokens(clipped) + 4, lambda c=clipped: entry.__setitem__("preview", c), True))
+        size = len(text)
+        options.append((6, lambda: entry.__setitem__("preview", f"(omitted: {size} chars)"), False))
+        return options
+
+    @staticmethod
+    def _step_options(entry: dict, step: dict, description: str, result_text: str) -> list:
+        full = {"description": _clip(description, 200)}
+        if result_text:
+            full["result"] = _clip(result_text, STEP_RESULT_CHARS)
+        if step.get("error"):
+            full["error"] = _clip(str(step["error"]), 200)
+        lean = {"description": _clip(description, 100)}
+        return [(estimate_tokens(str(fields)), lambda f=fields: entry.update(f), True) for fields in (full, lean)]
+
+
+_builders: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_context_builder(ctx, token_budget: int = DEFAULT_TOKEN_BUDGET) -> DecisionContextBuilder:
+    """One builder (and preview cache) per session context"""
+    builder = _builders.get(ctx)
+    if builder is None:
+        builder = _builders[ctx] = DecisionContextBuilder(token_budget)
+    builder.token_budget = token_budget
+    return builder
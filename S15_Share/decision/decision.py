@@ -16,6 +16,7 @@ from agent.agentSession import AgentSession
 import uuid
 from datetime import datetime
 from agent.model_manager import ModelManager
+from decision.context_builder import DEFAULT_TOKEN_BUDGET, get_context_builder
 
 class Decision:
     def __init__(self, decision_prompt_path: str, multi_mcp: MultiMCP, browser_decision_prompt_path: str = None, api_key: str | None = None, model: str = "gemini-2.0-flash"):
@@ -161,23 +162,11 @@ class Decision:
 
 
 
-def build_decision_input(ctx, query, p_out, strategy):
+def build_decision_input(ctx, query, p_out, strategy, token_budget: int = DEFAULT_TOKEN_BUDGET):
     completed_steps = [ctx.steps[n].__dict__ for n in ctx.steps if ctx.steps[n].status == "completed"]
-    
-    # DEBUG: Print what we're seeing
-    print(f"🔍 DEBUG - completed_steps: {[step.get('index') for step in completed_steps]}")
-    
     real_completed_steps = [step for step in completed_steps if step.get('index') != 'ROOT']
-    
-    print(f"🔍 DEBUG - real_completed_steps: {[step.get('index') for step in real_completed_steps]}")
-    
     plan_mode = "initial" if len(real_completed_steps) == 0 else "mid_session"
-    
-    print(f"🔍 DEBUG - plan_mode: {plan_mode}")
-    
-    # 🔥 NEW: DETERMINISTIC PROMPT TRIMMING
-    step_count = len(real_completed_steps)
-    
+
     # Base decision input
     decision_input = {
         "current_time": datetime.utcnow().isoformat(),
@@ -187,135 +176,14 @@ def build_decision_input(ctx, query, p_out, strategy):
         "perception": p_out,
         "plan_graph": {},
     }
-    
-    # 🎯 SMART TRIMMING BASED ON STEP COUNT
-    if step_count <= 1:  # Only steps 0, 1 get full context  
-        # Send everything
-        decision_input.update({
-            "completed_steps": completed_steps,
-            "failed_steps": [ctx.steps[n].__dict__ for n in ctx.failed_nodes],
-            "globals_schema": {
-                k: {
-                    "type": type(v).__name__,
-                    "preview": str(v)[:500] + ("…" if len(str(v)) > 500 else "")
-                } for k, v in ctx.globals.items()
-            }
-        })
-        print(f"📊 FULL CONTEXT: Step {step_count} - sending complete data")
-    else:  # Step 2+ get trimmed
-        # Start trimming
-        print(f"✂️ TRIMMING: Step {step_count} - applying smart compression")
-        
-        # 1. 🗑️ TRIM GLOBALS: Only keep latest page state + essential vars
-        trimmed_globals = trim_globals_schema(ctx.globals, step_count)
-        
-        # 2. 📝 TRIM COMPLETED STEPS: Compress to essential outcomes only  
-        trimmed_completed_steps = compress_completed_steps(completed_steps)
-        
-        # 3. ⚠️ TRIM FAILED STEPS: Just count, not full details
-        failed_count = len([ctx.steps[n].__dict__ for n in ctx.failed_nodes])
-        
-        decision_input.update({
-            "completed_steps": trimmed_completed_steps,
-            "failed_steps_count": failed_count,  # Just the count
-            "globals_schema": trimmed_globals,
-            "_trimming_applied": True,  # Flag for debugging
-            "_original_step_count": step_count
-        })
-        
-        print(f"📉 COMPRESSION APPLIED: {step_count} steps → compressed format")
-    
-    return decision_input
-
-
-def trim_globals_schema(globals_dict: dict, step_count: int) -> dict:
-    """
-    🔥 DETERMINISTIC GLOBALS TRIMMING
-    Keep only: latest page state (FULL) + memory + essential execution context
-    Drop: old page states (historical data)
-    """
-    trimmed = {}
-    
-    # Always keep memory (usually small)
-    if "memory" in globals_dict:
-        trimmed["memory"] = {
-            "type": type(globals_dict["memory"]).__name__,
-            "preview": str(globals_dict["memory"])[:200] + ("…" if len(str(globals_dict["memory"])) > 200 else "")
-        }
-    
-    # Find the latest page state (highest step number)
-    page_states = {k: v for k, v in globals_dict.items() if k.startswith("page_state_")}
-    
-    if page_states:
-        # Get the most recent page state only
-        latest_key = max(page_states.keys(), key=lambda x: x.split("_")[-1])
-        
-        # 🎯 KEEP LATEST PAGE STATE COMPLETELY INTACT - THIS IS CURRENT CONTEXT!
-        trimmed[latest_key] = {
-            "type": type(page_states[latest_key]).__name__,
-            "preview": str(page_states[latest_key])  # NO TRUNCATION!
-        }
-        print(f"🎯 GLOBALS: Kept FULL {latest_key}, dropped {len(page_states)-1} old page states")
-    
-    # Keep any other essential variables (non-page-state)  
-    essential_vars = {k: v for k, v in globals_dict.items() 
-                     if not k.startswith("page_state_") and k != "memory"}
-    
-    for k, v in essential_vars.items():
-        trimmed[k] = {
-            "type": type(v).__name__,
-            "preview": str(v)[:300] + ("…" if len(str(v)) > 300 else "")
-        }
-    
-    # Add execution summary for context
-    trimmed["_execution_summary"] = {
-        "type": "str", 
-        "preview": f"Completed {step_count} steps successfully. Previous page states available but trimmed for efficiency."
-    }
-    
-    return trimmed
 
+    # 🎯 BUDGETED CONTEXT: steps + globals packed by relevance, previews memoized per session
+    context = get_context_builder(ctx, token_budget).build(ctx, query, p_out, completed_steps)
+    decision_input.update(context)
 
-def compress_completed_steps(completed_steps: list) -> list:
-    """
-    📝 COMPRESS COMPLETED STEPS 
-    Keep essential info: step ID, description, status, key outcome
-    Remove: full results, detailed perception, verbose data
-    """
-    compressed = []
-    original_size = sum(len(str(step)) for step in completed_steps)
+    usage = context["_context_budget"]
+    print(f"📦 CONTEXT: {len(real_completed_steps)} steps, {len(context['globals_schema'])} globals → "
+          f"{usage['detailed']} detailed, {usage['names_only']} names only, "
+          f"{usage['tokens'] - usage['unused']}/{usage['tokens']} tokens")
 
-    
-    for step in completed_steps:
-        # Extract only essential information
-        essential_step = {
-            "index": step.get("index"),
-            "description": step.get("description", "")[:100],  # Truncate long descriptions
-            "status": step.get("status"),
-            "type": step.get("type")
-        }
-        
-        # Add key outcome summary instead of full result
-        result = step.get("result")
-        if result:
-            if isinstance(result, dict):
-                # For page states, just indicate success + page type
-                if any(k.startswith("page_state_") for k in result.keys()):
-                    essential_step["outcome"] = "page_interaction_successful"
-                else:
-                    essential_step["outcome"] = "data_extracted"
-            else:
-                essential_step["outcome"] = "action_completed"
-        
-        # Keep error info if present (important for decision making)
-        if step.get("error"):
-            essential_step["error"] = str(step.get("error"))[:200]
-            
-        compressed.append(essential_step)
-
-    compressed_size = sum(len(str(step)) for step in compressed)
-    reduction_pct = ((original_size - compressed_size) / original_size) * 100 if original_size > 0 else 0
-    
-    
-    print(f"📦 STEPS: Compressed {len(completed_steps)} steps, reduced size {reduction_pct:.1f}%")
-    return compressed
\ No newline at end of file
+    return decision_input
@@ -5,11 +5,22 @@ from datetime import datetime
 from typing import List, Dict
 from rapidfuzz.utils import default_process  # Add this at the top if needed
 import re
-import spacy
-nlp = spacy.load("en_core_web_sm")
+
+# spaCy is imported and the model loaded on first use, not at import time:
+# loading en_core_web_sm costs seconds and most agent starts never need NER.
+_nlp = None
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load("en_core_web_sm")
+    return _nlp
 
 def extract_named_entities(text: str) -> List[str]:
-    doc = nlp(text)
+    if not text.strip():
+        return []
+    doc = get_nlp()(text)
     return [ent.text.lower() for ent in doc.ents if ent.label_ in {"GPE", "ORG", "PERSON"}]
 
 
@@ -1,32 +1,40 @@
 import json
 import random
+import sys
+import time
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Dict
-from memory.memory_indexer import build_or_update_index, INDEX_BASE
+from typing import List, Dict, Set, Tuple
+from memory.memory_indexer import build_or_update_index, INDEX_BASE, normalize_query
+from memory.memory_indexer import extract_named_entities as _extract_entity_list
 from rapidfuzz import process, fuzz
-import re
-import spacy
-nlp = spacy.load("en_core_web_sm")
+import numpy as np
 
-def extract_named_entities(text: str) -> set:
-    doc = nlp(text)
-    return {ent.text.lower() for ent in doc.ents if ent.label_ in {"GPE", "ORG", "PERSON"}}
+NER_BOOST = 100
+SCORE_WORKERS = -1  # rapidfuzz cdist: use every core
+
+# Loaded index shared by every MemorySearch in the process, keyed on the index files' mtimes/sizes
+_INDEX_CACHE: Dict[str, object] = {"key": None, "entries": []}
 
-def normalize_query(text: str) -> str:
-    text = re.sub(r"query\s*\d+:\s*", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"[^\w\s]", "", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.lower().strip()
+
+def extract_named_entities(text: str) -> set:
+    return set(_extract_entity_list(text))
 
 
 class MemorySearch:
     def __init__(self):
         self.index_data = self.load_index()
+        self._build_lookup()
 
     def load_index(self) -> List[Dict]:
         build_or_update_index()  # Ensure latest index
+        index_files = sorted(INDEX_BASE.glob("*.json"))
+        key = tuple((f.name, f.stat().st_mtime_ns, f.stat().st_size) for f in index_files)
+        if _INDEX_CACHE["key"] == key:
+            return _INDEX_CACHE["entries"]
+
         all_entries = []
-        for index_file in sorted(INDEX_BASE.glob("*.json")):
+        for index_file in index_files:
             try:
                 with open(index_file, "r", encoding="utf-8") as f:
                     entries = json.load(f)
@@ -34,40 +42,45 @@ class MemorySearch:
                     all_entries.extend(valid_entries)
             except Exception as e:
                 print(f"[ERROR] Failed to read {index_file}: {e}")
+        _INDEX_CACHE["key"], _INDEX_CACHE["entries"] = key, all_entries
         return all_entries
 
+    def _build_lookup(self):
+        """Candidate strings for batch scoring and an entity -> row ids inverted index.
+
+        Entities were extracted by the indexer, so no NER runs over the history here.
+        """
+        self.candidates = [entry.get("normalized_query", "") for entry in self.index_data]
+        self.entity_index: Dict[str, Set[int]] = defaultdict(set)
+        for i, entry in enumerate(self.index_data):
+            for ent in entry.get("named_entities", []):
+                self.entity_index[ent].add(i)
+
+    def _entity_rows(self, query: str) -> np.ndarray:
+        if not self.entity_index:
+            return np.empty(0, dtype=np.int64)  # nothing to overlap with: skip spaCy entirely
+        rows = set()
+        for ent in extract_named_entities(query):
+            rows |= self.entity_index.get(ent, set())
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
     def search_memory(self, query: str, top_k: int = 3) -> List[Dict]:
         if not self.index_data:
             return []
 
         norm_query = normalize_query(query)
-        query_ents = extract_named_entities(query)
+        ner_rows = self._entity_rows(query)
 
-        def hybrid_score(q1, q2, named_ents):
-            score = fuzz.token_set_ratio(q1, q2)
-            if query_ents & set(named_ents):
-                score += 100  # NER boost
-            return score
+        # One vectorized pass over all candidates instead of a Python loop per entry
+        scores = process.cdist(
+            [norm_query], self.candidates,
+            scorer=fuzz.token_set_ratio, dtype=np.float32, workers=SCORE_WORKERS
+        )[0]
+        scores[ner_rows] += NER_BOOST
 
-        candidates = [
-            (entry["normalized_query"], entry["named_entities"])
-            for entry in self.index_data
-        ]
-
-        scored = []
-        for i, (norm_candidate, candidate_ents) in enumerate(candidates):
-            score = hybrid_score(norm_query, norm_candidate, candidate_ents)
-            scored.append((score, i))
-
-        # Sort and filter by NER overlap
-        scored.sort(reverse=True)
-        top_matches = [
-            (score, i) for (score, i) in scored
-            if query_ents & set(self.index_data[i].get("named_entities", []))
-        ][:top_k]
-
-        if not top_matches:
-            top_matches = scored[:top_k]
+        # Prefer entries sharing a named entity; fall back to the best fuzzy matches
+        pool = ner_rows if len(ner_rows) else np.arange(len(scores))
+        top_matches = self._top(scores, pool, top_k)
 
         return [
             {
@@ -80,8 +93,58 @@ class MemorySearch:
             for score, i in top_matches
         ]
 
+    @staticmethod
+    def _top(scores: np.ndarray, pool: np.ndarray, top_k: int) -> List[Tuple[float, int]]:
+        pool_scores = scores[pool]
+        if len(pool) > top_k:
+            keep = np.argpartition(-pool_scores, top_k - 1)[:top_k]
+            pool, pool_scores = pool[keep], pool_scores[keep]
+        # Highest score first, ties broken by later entries (same order as sort(reverse=True))
+        order = np.lexsort((-pool, -pool_scores))
+        return [(float(pool_scores[j]), int(pool[j])) for j in order]
+
+
+def benchmark(sizes=(1_000, 10_000, 100_000), queries: int = 20):
+    """Search latency over synthetic summaries (index load excluded).
+
+    The entity index stays populated so the NER-boosted path is the one timed;
+    spaCy's share of each query is measured on its own and reported alongside.
+    """
+    words = ["weather", "stock", "price", "flight", "hotel", "python", "report", "market",
+             "news", "recipe", "train", "budget", "paris", "tokyo", "delhi", "summary"]
+    cities = ["paris", "tokyo", "delhi", "london"]
+    rng = random.Random(0)
+    # Capitalised city names so spaCy tags them (GPE) and the entity lookup has work to do
+    texts = [" ".join(rng.choices(words, k=4) + [rng.choice(cities).title()]) for _ in range(queries)]
+    extract_named_entities(texts[0])  # load the spaCy model outside the timing
+    start = time.perf_counter()
+    for text in texts:
+        extract_named_entities(text)
+    ner_ms = (time.perf_counter() - start) * 1000 / queries
+    for n in sizes:
+        entries = []
+        for i in range(n):
+            text = " ".join(rng.choices(words, k=8))
+            entries.append({
+                "session_id": str(i), "original_query": text, "normalized_query": text,
+                "named_entities": [c for c in cities if c in text], "summary_output": text,
+                "timestamp": "bench",
+            })
+        ms = MemorySearch.__new__(MemorySearch)
+        ms.index_data = entries
+        ms._build_lookup()
+        start = time.perf_counter()
+        for text in texts:
+            ms.search_memory(text)
+        per_query = (time.perf_counter() - start) * 1000 / queries
+        print(f"{n:>7} summaries: {per_query:8.2f} ms/query "
+              f"({per_query - ner_ms:.2f} ms scoring + {ner_ms:.2f} ms spaCy NER)")
 
 if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        benchmark()
+        sys.exit(0)
+
     ms = MemorySearch()
     user_query = input("Enter your search query: ")
     results = ms.search_memory(user_query)
@@ -3,7 +3,7 @@ Retriever Agent - Context & Information Gathering
 
 This agent fetches relevant context for the query including:
 - Git history and commits
-- Code files and snippets
+- Code files and snippets (indexed workspace search)
 - Documentation
 - Previous similar queries from memory
 """
@@ -16,6 +16,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 
 from .base_agent import BaseAgent, AgentContext
+from tools import WorkspaceIndex
 
 
 @dataclass
@@ -31,16 +32,22 @@ class RetrieverAgent(BaseAgent):
     """
     Gathers relevant context for query processing.
     Uses multiple retrieval strategies based on intent.
+    
+    Code is searched through a WorkspaceIndex persisted in index_dir, so
+    matching chunks come from anywhere in the workspace and only files
+    changed since the last query are re-read.
     """
     
-    def __init__(self, workspace_path: Optional[str] = None):
+    def __init__(self, workspace_path: Optional[str] = None, index_dir: Optional[str] = "sessions"):
         super().__init__("retriever", "🔍 Retriever")
         self.workspace = Path(workspace_path or os.getcwd())
+        self.index = WorkspaceIndex(str(self.workspace), cache_dir=index_dir)
     
     def get_capabilities(self) -> List[str]:
         return [
             "git_history_retrieval",
             "file_content_retrieval",
+            "code_search",
             "memory_search",
             "documentation_lookup",
             "context_ranking"
@@ -68,7 +75,9 @@ class RetrieverAgent(BaseAgent):
                 retrieved_items.extend(git_items)
             
             if intent in ["code_review", "tech_debt", "documentation"]:
-                file_items = await self._retrieve_file_context(entities)
+                file_items = await self._retrieve_file_context(
+                    entities, context.original_query
+                )
                 retrieved_items.extend(file_items)
             
             if intent == "dependency_check":
@@ -175,9 +184,10 @@ class RetrieverAgent(BaseAgent):
     
     async def _retrieve_file_context(
         self, 
-        entities: Dict
+        entities: Dict,
+        query: str = ""
     ) -> List[RetrievedItem]:
-        """Retrieve file contents based on entities."""
+        """Retrieve named files plus the best-matching code chunks for the query."""
         items = []
         
         file_paths = entities.get("file_path", [])
@@ -201,6 +211,30 @@ class RetrieverAgent(BaseAgent):
                 except Exception:
                     pass
         
+        if query:
+            try:
+                # The first search builds the index; keep that off the event loop
+                chunks = await asyncio.get_running_loop().run_in_executor(
+                    None, self.index.search, query, 5, file_paths
+                )
+            except Exception:
+                chunks = []
+            
+            top_score = chunks[0].score if chunks else 0
+            for chunk in chunks:
+                items.append(RetrievedItem(
+                    source="file",
+                    content=chunk.text,
+                    relevance_score=round(0.5 + 0.35 * chunk.score / top_score, 3) if top_score else 0.5,
+                    metadata={
+                        "path": chunk.path,
+                        "start_line": chunk.start_line,
+                        "end_line": chunk.end_line,
+                        "symbols": chunk.symbols,
+                        "type": Path(chunk.path).suffix
+                    }
+                ))
+        
         return items
     
     async def _retrieve_dependency_context(self) -> List[RetrievedItem]:
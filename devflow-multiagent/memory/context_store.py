@@ -6,6 +6,7 @@ Provides:
 - Query-response history
 - Similarity-based recall
 - Persistence to disk
+- Indexed recall over large histories, with session bodies loaded on demand
 """
 
 import json
@@ -15,6 +16,8 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime
 from pathlib import Path
 
+from .query_index import QueryIndex
+
 
 @dataclass
 class ConversationTurn:
@@ -56,6 +59,10 @@ class ContextStore:
     - Turn-by-turn conversation tracking
     - Similarity-based query recall
     - Disk persistence
+    
+    Past turns are looked up through a QueryIndex kept next to the session
+    files; completed sessions are only read from disk when session_history
+    or get_session needs their full turns.
     """
     
     def __init__(self, storage_dir: str = "sessions"):
@@ -63,11 +70,24 @@ class ContextStore:
         self.storage_dir.mkdir(exist_ok=True)
         
         self.active_session: Optional[Session] = None
-        self.session_history: List[Session] = []
+        self.index = QueryIndex(self.storage_dir)
+        self._loaded_sessions: Dict[str, Session] = {}  # session file name -> session
         
         # Load history
         self._load_history()
     
+    @property
+    def session_history(self) -> List[Session]:
+        """Completed sessions (read from disk on first access)."""
+        sessions = (self._get_loaded(entry.key) for entry in self.index.completed_sessions())
+        return [s for s in sessions if s is not None]
+    
+    def get_session(self, session_id: str) -> Optional[Session]:
+        """A session by id: the active one, or a stored one loaded on demand."""
+        if self.active_session and self.active_session.session_id == session_id:
+            return self.active_session
+        return self._get_loaded(self._session_key(session_id))
+    
     def start_session(self) -> Session:
         """Start a new conversation session."""
         session_id = hashlib.md5(
@@ -85,8 +105,9 @@ class ContextStore:
         """End the current session and persist."""
         if self.active_session:
             self.active_session.end_time = datetime.now().isoformat()
-            self.session_history.append(self.active_session)
             self._save_session(self.active_session)
+            self._index_session(self.active_session)
+            self._loaded_sessions[self._session_key(self.active_session.session_id)] = self.active_session
             self.active_session = None
     
     def add_turn(
@@ -101,6 +122,7 @@ class ContextStore:
         """Add a conversation turn to active session."""
         if not self.active_session:
             self.start_session()
+        session = self.active_session
         
         turn_id = f"{self.active_session.session_id}_{self.active_session.turn_count + 1:03d}"
         
@@ -119,6 +141,12 @@ class ContextStore:
         
         # Auto-save after each turn
         self._save_session(self.active_session)
+        if session.turn_count == 1:
+            self._index_session(session)
+        self.index.record_turn(
+            self._session_key(session.session_id), turn.turn_id, turn.query,
+            turn.intent, turn.response, turn.quality_score
+        )
         
         return turn
     
@@ -156,64 +184,25 @@ class ContextStore:
         Returns:
             List of similar turns with similarity scores
         """
-        query_words = set(query.lower().split())
-        results = []
-        
-        # Search all sessions
-        for session in self.session_history:
-            for turn in session.turns:
-                turn_words = set(turn.query.lower().split())
-                
-                # Jaccard similarity
-                intersection = len(query_words & turn_words)
-                union = len(query_words | turn_words)
-                
-                if union > 0:
-                    similarity = intersection / union
-                    
-                    if similarity > 0.3:  # Threshold
-                        results.append({
-                            "turn_id": turn.turn_id,
-                            "query": turn.query,
-                            "intent": turn.intent,
-                            "response_preview": turn.response[:200],
-                            "similarity": similarity,
-                            "quality": turn.quality_score,
-                            "session_id": session.session_id
-                        })
-        
-        # Also search current session
+        # Completed sessions, plus the current one without its latest turn
+        active_key = None
+        exclude_turn = None
         if self.active_session:
-            for turn in self.active_session.turns[:-1]:  # Exclude current
-                turn_words = set(turn.query.lower().split())
-                intersection = len(query_words & turn_words)
-                union = len(query_words | turn_words)
-                
-                if union > 0:
-                    similarity = intersection / union
-                    if similarity > 0.3:
-                        results.append({
-                            "turn_id": turn.turn_id,
-                            "query": turn.query,
-                            "intent": turn.intent,
-                            "response_preview": turn.response[:200],
-                            "similarity": similarity,
-                            "quality": turn.quality_score,
-                            "session_id": self.active_session.session_id
-                        })
-        
-        # Sort by similarity
-        results.sort(key=lambda x: x["similarity"], reverse=True)
+            active_key = self._session_key(self.active_session.session_id)
+            if self.active_session.turns:
+                exclude_turn = self.active_session.turns[-1].turn_id
         
-        return results[:limit]
+        return self.index.find_similar(
+            query, active_key, threshold=0.3, exclude_turn=exclude_turn, limit=limit
+        )
     
     def get_intent_statistics(self) -> Dict[str, int]:
         """Get statistics on intent usage."""
         stats = {}
         
-        for session in self.session_history:
-            for turn in session.turns:
-                stats[turn.intent] = stats.get(turn.intent, 0) + 1
+        for entry in self.index.completed_sessions():
+            for intent, count in entry.intents.items():
+                stats[intent] = stats.get(intent, 0) + count
         
         if self.active_session:
             for turn in self.active_session.turns:
@@ -221,9 +210,13 @@ class ContextStore:
         
         return dict(sorted(stats.items(), key=lambda x: x[1], reverse=True))
     
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"session_{session_id}.json"
+    
     def _save_session(self, session: Session):
         """Save session to disk."""
-        file_path = self.storage_dir / f"session_{session.session_id}.json"
+        file_path = self.storage_dir / self._session_key(session.session_id)
         
         try:
             data = asdict(session)
@@ -231,39 +224,57 @@ class ContextStore:
         except Exception:
             pass
     
+    def _index_session(self, session: Session):
+        """Record session metadata in the index (after the file was saved)."""
+        self.index.record_session(
+            self._session_key(session.session_id), session.session_id,
+            session.start_time, session.end_time
+        )
+    
     def _load_history(self):
-        """Load session history from disk."""
-        for file_path in self.storage_dir.glob("session_*.json"):
-            try:
-                data = json.loads(file_path.read_text())
-                
-                # Reconstruct session
-                turns = [
-                    ConversationTurn(**t) for t in data.get("turns", [])
-                ]
-                
-                session = Session(
-                    session_id=data["session_id"],
-                    start_time=data["start_time"],
-                    turns=turns,
-                    context=data.get("context", {}),
-                    end_time=data.get("end_time")
-                )
+        """Load the history index; session files are only read if new or changed."""
+        self.index.load()
+    
+    def _get_loaded(self, key: str) -> Optional[Session]:
+        """Read a completed session's body from disk, once."""
+        if key in self._loaded_sessions:
+            return self._loaded_sessions[key]
+        session = self._read_session(self.storage_dir / key)
+        if session is not None and session.end_time:
+            self._loaded_sessions[key] = session
+            return session
+        return None
+    
+    def _read_session(self, file_path: Path) -> Optional[Session]:
+        """Load one session file from disk."""
+        try:
+            data = json.loads(file_path.read_text())
+            
+            # Reconstruct session
+            turns = [
+                ConversationTurn(**t) for t in data.get("turns", [])
+            ]
+            
+            return Session(
+                session_id=data["session_id"],
+                start_time=data["start_time"],
+                turns=turns,
+                context=data.get("context", {}),
+                end_time=data.get("end_time")
+            )
                 
-                if session.end_time:  # Only add completed sessions
-                    self.session_history.append(session)
-                    
-            except Exception:
-                pass
+        except Exception:
+            return None
     
     def get_summary(self) -> Dict:
         """Get storage summary."""
-        total_turns = sum(s.turn_count for s in self.session_history)
+        completed = self.index.completed_sessions()
+        total_turns = sum(s.turn_count for s in completed)
         if self.active_session:
             total_turns += self.active_session.turn_count
         
         return {
-            "sessions": len(self.session_history),
+            "sessions": len(completed),
             "active": self.active_session is not None,
             "total_turns": total_turns,
             "storage_dir": str(self.storage_dir)
@@ -0,0 +1,395 @@
+"""
+Query Index - Persistent Inverted Index over Conversation Turns
+
+Provides:
+- Token -> turn postings for Jaccard similar-query lookup
+- Per-session metadata (times, turn count, intents) without session bodies
+- Snapshot plus append-only journal on disk, one journal line per turn
+- Re-indexing of session files only when their mtime/size change
+"""
+
+import json
+import os
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# Bump when the file layout or tokenization changes; the index is rebuilt
+INDEX_VERSION = 1
+
+SNAPSHOT_NAME = "query_index.json"
+JOURNAL_NAME = "query_index.jsonl"
+PREVIEW_CHARS = 200
+COMPACT_AFTER = 2000   # journal lines replayed before the snapshot is rewritten
+
+# Per-turn columns, in snapshot order
+TURN_COLUMNS = ("turn_ids", "queries", "intents", "previews", "qualities", "sizes", "turn_sessions")
+
+
+def tokenize(query: str) -> frozenset:
+    """Same token set the similarity score has always used."""
+    return frozenset(query.lower().split())
+
+
+@dataclass
+class IndexedSession:
+    """Session metadata kept in the index instead of the session body."""
+    key: str                      # session file name
+    session_id: str               # "" for files that are not ContextStore sessions
+    start_time: str
+    end_time: Optional[str] = None
+    stat: List[int] = field(default_factory=list)   # [mtime_ns, size] of the file when indexed
+    turn_count: int = 0
+    intents: Dict[str, int] = field(default_factory=dict)
+    
+    def to_record(self) -> Dict:
+        return {"session": self.key, "session_id": self.session_id, "start_time": self.start_time,
+                "end_time": self.end_time, "stat": self.stat}
+
+
+class QueryIndex:
+    """
+    Inverted index of past queries, stored next to the session files.
+    
+    Turns are numbered in the order they were indexed and kept column-wise
+    (turn_ids[n], queries[n], ...), with postings as lists of turn numbers,
+    so <storage_dir>/query_index.json loads with a single json parse. Changes
+    since that snapshot are appended to query_index.jsonl, one line each, and
+    replayed on load; session files are only read when new or changed on disk.
+    """
+    
+    def __init__(self, storage_dir: Path):
+        self.storage_dir = Path(storage_dir)
+        self.snapshot_file = self.storage_dir / SNAPSHOT_NAME
+        self.journal_file = self.storage_dir / JOURNAL_NAME
+        
+        self.sessions: Dict[str, IndexedSession] = {}
+        self.open_sessions: Set[str] = set()   # keys of sessions without an end time
+        
+        # Turn columns; a dropped turn keeps its number with turn_sessions[n] = None
+        self.turn_ids: List[str] = []
+        self.queries: List[str] = []
+        self.intents: List[str] = []
+        self.previews: List[str] = []
+        self.qualities: List[float] = []
+        self.sizes: List[int] = []
+        self.turn_sessions: List[Optional[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+        
+        self.files_indexed = 0
+        self._generation = 0
+        self._journal_lines = 0
+    
+    # Loading
+    
+    def load(self):
+        """Read snapshot and journal, then bring them in line with the session files."""
+        self._read_snapshot()
+        self._replay()
+        
+        on_disk = {}
+        with os.scandir(self.storage_dir) as entries:
+            for dir_entry in entries:
+                if dir_entry.name.startswith("session_") and dir_entry.name.endswith(".json"):
+                    try:
+                        stat = dir_entry.stat()
+                    except OSError:
+                        continue
+                    on_disk[dir_entry.name] = [stat.st_mtime_ns, stat.st_size]
+        
+        stale = [key for key, entry in self.sessions.items()
+                 if on_disk.get(key) != entry.stat]
+        dropped_turns = self._drop(stale)
+        self._append([{"drop": key} for key in stale])
+        
+        for key, stat in on_disk.items():
+            if key not in self.sessions:
+                self._index_file(key, stat)
+        
+        if dropped_turns or self._journal_lines > COMPACT_AFTER:
+            self.compact()
+    
+    def _read_snapshot(self):
+        try:
+            data = json.loads(self.snapshot_file.read_text())
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        try:
+            for record in data["sessions"]:
+                entry = IndexedSession(
+                    key=record["session"],
+                    session_id=record["session_id"],
+                    start_time=record["start_time"],
+                    end_time=record["end_time"],
+                    stat=record["stat"],
+                    turn_count=record["turn_count"],
+                    intents=record["intents"]
+                )
+                self.sessions[entry.key] = entry
+                if not (entry.session_id and entry.end_time):
+                    self.open_sessions.add(entry.key)
+            for column in TURN_COLUMNS:
+                setattr(self, column, data["turns"][column])
+            self.postings = data["postings"]
+            self._generation = data["generation"]
+        except (KeyError, TypeError):
+            self.__init__(self.storage_dir)
+    
+    def _replay(self):
+        try:
+            lines = self.journal_file.read_text().splitlines()
+        except OSError:
+            return
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except json.JSONDecodeError:
+            header = {}
+        if header.get("version") != INDEX_VERSION or header.get("generation") != self._generation:
+            # Left over from before the snapshot was rewritten; every session
+            # it covered now mismatches its recorded stat and is re-indexed
+            return
+        
+        self._journal_lines = len(lines)
+        try:
+            records = json.loads("[" + ",".join(lines[1:]) + "]")
+        except json.JSONDecodeError:
+            # A line cut short by a crash; its session file no longer matches
+            # the recorded stat and is re-indexed in load()
+            records = []
+            for line in lines[1:]:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+        for record in records:
+            try:
+                self._apply(record)
+            except (KeyError, TypeError):
+                pass
+    
+    def _index_file(self, key: str, stat: List[int]):
+        """Read one session file into the index."""
+        try:
+            data = json.loads((self.storage_dir / key).read_text())
+            records = [{"session": key, "session_id": data["session_id"], "start_time": data["start_time"],
+                        "end_time": data.get("end_time"), "stat": stat}]
+            records.extend(self._turn_record(key, t["turn_id"], t["query"], t["intent"],
+                                             t["response"], t["quality_score"])
+                           for t in data.get("turns", []))
+        except Exception:
+            # Unreadable or not a ContextStore session: remember the stat so it
+            # is not re-read on every start, but never match against it
+            records = [{"session": key, "session_id": "", "start_time": "", "end_time": None, "stat": stat}]
+        for record in records:
+            self._apply(record)
+        self._append(records)
+        self.files_indexed += 1
+    
+    # Journal records
+    
+    @staticmethod
+    def _turn_record(key, turn_id, query, intent, response, quality, stat=None) -> Dict:
+        record = {"turn": turn_id, "session": key, "query": query, "intent": intent,
+                  "preview": response[:PREVIEW_CHARS], "quality": quality}
+        if stat is not None:
+            record["stat"] = stat
+        return record
+    
+    def _apply(self, record: Dict):
+        if "drop" in record:
+            self._drop([record["drop"]])
+        elif "turn" in record:
+            entry = self.sessions[record["session"]]
+            number = len(self.turn_ids)
+            tokens = tokenize(record["query"])
+            self.turn_ids.append(record["turn"])
+            self.queries.append(record["query"])
+            self.intents.append(record["intent"])
+            self.previews.append(record["preview"])
+            self.qualities.append(record["quality"])
+            self.sizes.append(len(tokens))
+            self.turn_sessions.append(entry.key)
+            for token in tokens:
+                posting = self.postings.get(token)
+                if posting is None:
+                    self.postings[token] = [number]
+                else:
+                    posting.append(number)
+            entry.turn_count += 1
+            entry.intents[record["intent"]] = entry.intents.get(record["intent"], 0) + 1
+            if "stat" in record:
+                entry.stat = record["stat"]
+        elif "session" in record:
+            key = record["session"]
+            entry = self.sessions.get(key)
+            if entry is None or entry.session_id != record["session_id"]:
+                self._drop([key])
+                entry = self.sessions[key] = IndexedSession(
+                    key=key,
+                    session_id=record["session_id"],
+                    start_time=record["start_time"]
+                )
+            entry.end_time = record["end_time"]
+            entry.stat = record["stat"]
+            if entry.session_id and entry.end_time:
+                self.open_sessions.discard(key)
+            else:
+                self.open_sessions.add(key)
+    
+    def _drop(self, keys: Iterable[str]) -> int:
+        """Forget sessions and their turns; returns the number of turns dropped."""
+        with_turns = set()
+        for key in keys:
+            entry = self.sessions.pop(key, None)
+            self.open_sessions.discard(key)
+            if entry is not None and entry.turn_count:
+                with_turns.add(key)
+        if not with_turns:
+            return 0
+        
+        dropped = set()
+        for number, key in enumerate(self.turn_sessions):
+            if key in with_turns:
+                self.turn_sessions[number] = None
+                dropped.add(number)
+        for token in list(self.postings):
+            posting = [n for n in self.postings[token] if n not in dropped]
+            if posting:
+                self.postings[token] = posting
+            else:
+                del self.postings[token]
+        return len(dropped)
+    
+    def _append(self, records: List[Dict]):
+        if not records:
+            return
+        try:
+            with open(self.journal_file, "a") as f:
+                if self._journal_lines == 0:
+                    f.write(json.dumps({"version": INDEX_VERSION, "generation": self._generation}) + "\n")
+                    self._journal_lines = 1
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            self._journal_lines += len(records)
+        except OSError:
+            pass
+    
+    def compact(self):
+        """Write a snapshot of the live sessions and turns and start a new journal."""
+        live = [n for n, key in enumerate(self.turn_sessions) if key is not None]
+        if len(live) != len(self.turn_sessions):
+            renumber = {old: new for new, old in enumerate(live)}
+            for column in TURN_COLUMNS:
+                values = getattr(self, column)
+                setattr(self, column, [values[n] for n in live])
+            self.postings = {token: [renumber[n] for n in posting] for token, posting in self.postings.items()}
+        
+        self._generation = time.time_ns()
+        sessions = [dict(entry.to_record(), turn_count=entry.turn_count, intents=entry.intents)
+                    for entry in self.sessions.values()]
+        data = {
+            "version": INDEX_VERSION,
+            "generation": self._generation,
+            "sessions": sessions,
+            "turns": {column: getattr(self, column) for column in TURN_COLUMNS},
+            "postings": self.postings
+        }
+        try:
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.snapshot_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(data))
+            os.replace(tmp_file, self.snapshot_file)
+            self.journal_file.unlink(missing_ok=True)
+            self._journal_lines = 0
+        except OSError:
+            pass
+    
+    # Updates from ContextStore
+    
+    def _file_stat(self, key: str) -> List[int]:
+        try:
+            stat = (self.storage_dir / key).stat()
+            return [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            return []
+    
+    def record_session(self, key: str, session_id: str, start_time: str, end_time: Optional[str]):
+        """Create or update a session entry (after its file was saved)."""
+        record = {"session": key, "session_id": session_id, "start_time": start_time,
+                  "end_time": end_time, "stat": self._file_stat(key)}
+        self._apply(record)
+        self._append([record])
+    
+    def record_turn(self, key: str, turn_id: str, query: str, intent: str, response: str, quality: float):
+        """Index a turn of an already recorded session (after its file was saved)."""
+        record = self._turn_record(key, turn_id, query, intent, response, quality, self._file_stat(key))
+        self._apply(record)
+        self._append([record])
+    
+    # Queries
+    
+    def find_similar(
+        self,
+        query: str,
+        active_session: Optional[str] = None,
+        threshold: float = 0.3,
+        exclude_turn: Optional[str] = None,
+        limit: int = 5
+    ) -> List[Dict]:
+        """
+        Turns of completed sessions (and active_session) with Jaccard
+        similarity above threshold, best first.
+        
+        Overlaps are counted straight from the postings of the query tokens,
+        so only turns sharing a token are touched and no token sets are
+        intersected; the score needs just the overlap and both set sizes.
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return []
+        
+        overlaps = Counter()
+        for token in query_words:
+            posting = self.postings.get(token)
+            if posting:
+                overlaps.update(posting)
+        
+        # The union is at least len(query_words), so smaller overlaps cannot score
+        size = len(query_words)
+        min_overlap = next((c for c in range(1, size + 1) if c / size > threshold), size + 1)
+        sizes, turn_sessions = self.sizes, self.turn_sessions
+        hidden = self.open_sessions - {active_session}
+        
+        results = []
+        for number, intersection in overlaps.items():
+            if intersection < min_overlap:
+                continue
+            similarity = intersection / (size + sizes[number] - intersection)
+            if similarity > threshold:
+                key = turn_sessions[number]
+                if key is not None and key not in hidden and self.turn_ids[number] != exclude_turn:
+                    results.append((similarity, number))
+        
+        results.sort(key=lambda x: (-x[0], x[1]))
+        
+        return [
+            {
+                "turn_id": self.turn_ids[number],
+                "query": self.queries[number],
+                "intent": self.intents[number],
+                "response_preview": self.previews[number],
+                "similarity": similarity,
+                "quality": self.qualities[number],
+                "session_id": self.sessions[self.turn_sessions[number]].session_id
+            }
+            for similarity, number in results[:limit]
+        ]
+    
+    def completed_sessions(self) -> List[IndexedSession]:
+        """Sessions with an end time, in the order they were indexed."""
+        return [s for key, s in self.sessions.items() if key not in self.open_sessions]
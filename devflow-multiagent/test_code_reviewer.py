@@ -0,0 +1,70 @@
+"""
+Tests for tools/code_reviewer.py (review cache)
+Run with: pytest test_code_reviewer.py
+"""
+
+import sys
+import os
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tools.code_reviewer import CodeReviewer
+
+SOURCE = '''
+def load(path):
+    try:
+        return open(path).read()
+    except:
+        print("failed to read a file whose name is much longer than the usual line limit allows")
+        return None
+'''
+
+
+def _review(reviewer, path):
+    return asyncio.run(reviewer.review_file(str(path)))
+
+
+def test_cache_hit_after_reinstantiation(tmp_path):
+    source = tmp_path / "module.py"
+    source.write_text(SOURCE)
+    cache_dir = tmp_path / "cache"
+    
+    first = CodeReviewer(cache_dir=str(cache_dir))
+    result = _review(first, source)
+    assert (first.cache_hits, first.cache_misses) == (0, 1)
+    assert (cache_dir / "review_cache.json").exists()
+    
+    second = CodeReviewer(cache_dir=str(cache_dir))
+    assert _review(second, source) == result
+    assert (second.cache_hits, second.cache_misses) == (1, 0)
+
+
+def test_settings_change_invalidates_cache(tmp_path):
+    source = tmp_path / "module.py"
+    source.write_text(SOURCE)
+    cache_dir = tmp_path / "cache"
+    
+    reviewer = CodeReviewer(cache_dir=str(cache_dir))
+    before = _review(reviewer, source)
+    reviewer.max_line_length = 20
+    after = _review(reviewer, source)
+    assert reviewer.cache_misses == 2
+    assert len(after.issues) > len(before.issues)
+    
+    # A fresh reviewer with the default settings does not reuse the stricter review
+    fresh = CodeReviewer(cache_dir=str(cache_dir))
+    assert _review(fresh, source) == before
+    assert fresh.cache_misses == 1
+
+
+def test_content_change_is_reviewed_again(tmp_path):
+    source = tmp_path / "module.py"
+    source.write_text(SOURCE)
+    cache_dir = tmp_path / "cache"
+    
+    _review(CodeReviewer(cache_dir=str(cache_dir)), source)
+    source.write_text(SOURCE + "\nx = 1\n")
+    reviewer = CodeReviewer(cache_dir=str(cache_dir))
+    _review(reviewer, source)
+    assert (reviewer.cache_hits, reviewer.cache_misses) == (0, 1)
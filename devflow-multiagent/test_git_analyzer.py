@@ -0,0 +1,137 @@
+"""
+Tests for tools/git_analyzer.py (cached history walk checked against git itself)
+Run with: pytest test_git_analyzer.py
+"""
+
+import sys
+import os
+import asyncio
+import random
+import shutil
+import subprocess
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tools.git_analyzer import GitAnalyzer
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+AUTHORS = [("Alice", "alice@example.com"), ("Bob Smith", "bob@corp.io"), ("carol", "carol@x.org")]
+SUBJECTS = ["feat: add thing", "fix bug", "refactor parser", "docs", "misc | pipes", "Add x"]
+
+
+def git(repo, *args, env=None, check=True):
+    result = subprocess.run(["git", *args], cwd=repo, env=env, check=check, capture_output=True, text=True)
+    return result.stdout
+
+
+def make_repo(path, seed, commits, skew):
+    """Random history with branches, merges, tags, tied timestamps and (optionally) skewed committer dates"""
+    rng = random.Random(seed)
+    repo = str(path)
+    git(repo, "init", "-q", "-b", "main")
+    now = int(time.time())
+    t = now - commits * 3600 * 2
+    branches = ["main"]
+    for i in range(commits):
+        branch = rng.choice(branches)
+        if i:
+            git(repo, "checkout", "-q", "-f", branch)
+            git(repo, "clean", "-fdq")
+        t += rng.choice([0, 0, 60, 3600, 7200])  # ties on purpose
+        commit_time = t + (rng.randint(-20000, 20000) if skew and rng.random() < 0.2 else 0)
+        name, email = rng.choice(AUTHORS)
+        env = dict(os.environ, GIT_AUTHOR_NAME=name, GIT_AUTHOR_EMAIL=email, GIT_COMMITTER_NAME=name,
+                   GIT_COMMITTER_EMAIL=email, GIT_AUTHOR_DATE=f"{t} +0200", GIT_COMMITTER_DATE=f"{commit_time} +0000")
+        r = rng.random()
+        if r < 0.15 and len(branches) > 1:
+            other = rng.choice([b for b in branches if b != branch])
+            try:
+                git(repo, "merge", "-q", "--no-ff", "-m", f"Merge {other} | into {branch}", other, env=env)
+                continue
+            except subprocess.CalledProcessError:
+                git(repo, "merge", "--abort")
+        if r > 0.9 and i:
+            new_branch = f"feature/{i}" if rng.random() < 0.5 else f"fix{i}"
+            git(repo, "checkout", "-q", "-b", new_branch)
+            branches.append(new_branch)
+        file_path = os.path.join(repo, rng.choice(["a.py", "b.txt", "dir/c.md", f"f{i % 7}.py"]))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "a") as f:
+            f.write("line\n" * rng.randint(1, 5))
+        git(repo, "add", "-A")
+        git(repo, "commit", "-q", "--allow-empty", "-m", f"{rng.choice(SUBJECTS)} {i}", env=env)
+        if rng.random() < 0.05:
+            git(repo, "tag", "-a", f"v{i}", "-m", "tag", env=env)
+    git(repo, "checkout", "-q", rng.choice(branches))
+    return repo, now, branches
+
+
+def commit_queries(rng, now):
+    day = lambda days: time.strftime("%Y-%m-%d", time.localtime(now - days * 86400))
+    for _ in range(20):
+        yield (rng.choice([None, None, "yesterday", day(rng.randint(0, 10)), "3 days ago"]),
+               rng.choice([None, None, day(rng.randint(0, 5)), "2 days ago"]),
+               rng.choice([None, None, "Alice", "bob", "Bob", "corp.io", "^carol", "Smith>"]),
+               rng.choice([1, 5, 20, 200]))
+
+
+async def check_against_git(analyzer, repo, now, branches, rng):
+    for since, until, author, limit in commit_queries(rng, now):
+        args = ["log", "--format=%H%x00%s%x00%an%x00%ae", f"-n{limit}"]
+        args += [f"--since={since}"] * bool(since) + [f"--until={until}"] * bool(until)
+        args += [f"--author={author}"] * bool(author)
+        expected = [tuple(line.split("\0")) for line in git(repo, *args).splitlines()]
+        commits = await analyzer.get_commits(since, until, author, limit)
+        assert [(c.hash, c.message, c.author, c.author_email) for c in commits] == expected, (since, until, author)
+    
+    assert await analyzer.get_current_branch() == git(repo, "branch", "--show-current").strip()
+    for base in branches + ["HEAD~3", "nonexistent"]:
+        resolves = git(repo, "rev-parse", "--verify", "--quiet", f"{base}^{{commit}}", check=False).strip()
+        count = lambda spec: int(git(repo, "rev-list", "--count", spec)) if resolves else 0
+        comparison = await analyzer.get_branch_comparison(base)
+        assert (comparison["commits_ahead"], comparison["commits_behind"]) == \
+            (count(f"{base}..HEAD"), count(f"HEAD..{base}")), base
+        
+        pr_data = await analyzer.generate_pr_data(base)
+        log = git(repo, "log", "--format=%h%x00%s", f"{base}..HEAD") if resolves else ""
+        assert [(c["hash"], c["message"]) for c in pr_data["commits"]] == \
+            [tuple(line.split("\0")) for line in log.splitlines()], base
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_history_matches_git(tmp_path, seed):
+    rng = random.Random(seed)
+    repo, now, branches = make_repo(tmp_path, seed, commits=rng.randint(20, 80), skew=seed % 2 == 1)
+    analyzer = GitAnalyzer(repo)
+    asyncio.run(check_against_git(analyzer, repo, now, branches, rng))
+    
+    # New commits and a moved branch are picked up incrementally
+    env = dict(os.environ, GIT_AUTHOR_NAME="A", GIT_AUTHOR_EMAIL="a@a", GIT_COMMITTER_NAME="A", GIT_COMMITTER_EMAIL="a@a")
+    for i in range(3):
+        with open(os.path.join(repo, "new.txt"), "a") as f:
+            f.write("x\n")
+        git(repo, "add", "-A")
+        git(repo, "commit", "-qm", f"late {i}", env=env)
+    git(repo, "branch", "-f", "side", "HEAD~1")
+    asyncio.run(check_against_git(analyzer, repo, now, branches + ["side"], rng))
+
+
+def test_repeat_queries_skip_git(tmp_path):
+    repo, _, _ = make_repo(tmp_path, 7, commits=30, skew=False)
+    analyzer = GitAnalyzer(repo)
+    
+    async def queries():
+        await analyzer.get_commits()
+        await analyzer.get_commits(since="yesterday")
+        await analyzer.get_current_branch()
+        await analyzer.generate_pr_data("main")
+    
+    asyncio.run(queries())
+    analyzer.git_calls = 0
+    asyncio.run(queries())
+    # Only the working-tree diff behind generate_pr_data's branch comparison still runs git
+    assert analyzer.git_calls == 1
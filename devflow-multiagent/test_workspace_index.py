@@ -0,0 +1,66 @@
+"""
+Tests for tools/workspace_index.py (incremental code search index)
+Run with: pytest test_workspace_index.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tools.workspace_index import WorkspaceIndex
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def _workspace(tmp_path):
+    root = tmp_path / "ws"
+    _write(root / "billing" / "invoice.py",
+           "def compute_invoice_total(items):\n    return sum(i.price for i in items)\n")
+    _write(root / "auth.py", "class TokenValidator:\n    def check(self, token):\n        return bool(token)\n")
+    _write(root / "README.md", "# Demo\nBilling and auth helpers.\n")
+    return root
+
+
+def test_search_finds_chunk_and_symbol(tmp_path):
+    index = WorkspaceIndex(str(_workspace(tmp_path)), cache_dir=str(tmp_path / "cache"))
+    chunks = index.search("where is the invoice total computed")
+    assert chunks[0].path == "billing/invoice.py"
+    assert chunks[0].symbols == ["compute_invoice_total"]
+    assert "sum(i.price" in chunks[0].text
+    assert index.find_symbol("TokenValidator")[0]["path"] == "auth.py"
+
+
+def test_edit_and_delete_are_reindexed(tmp_path):
+    root = _workspace(tmp_path)
+    index = WorkspaceIndex(str(root), cache_dir=str(tmp_path / "cache"))
+    index.search("invoice")
+    
+    # Edited file: the new function is found and its text is current
+    _write(root / "auth.py", "def rotate_refresh_token(session):\n    return session.renew()\n")
+    chunks = index.search("rotate refresh token")
+    assert chunks and chunks[0].path == "auth.py"
+    assert "session.renew()" in chunks[0].text
+    assert index.find_symbol("TokenValidator") == []
+    
+    # Deleted file: no chunks from it are returned
+    (root / "billing" / "invoice.py").unlink()
+    index.refresh(force=True)
+    assert all(c.path != "billing/invoice.py" for c in index.search("invoice total"))
+    assert index.find_symbol("compute_invoice_total") == []
+
+
+def test_reload_only_reads_changed_files(tmp_path):
+    root = _workspace(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    first = WorkspaceIndex(str(root), cache_dir=cache_dir)
+    assert first.refresh() == 3
+    first.save()
+    
+    _write(root / "README.md", "# Demo\nNow with invoice export.\n")
+    second = WorkspaceIndex(str(root), cache_dir=cache_dir)
+    assert second.refresh() == 1
+    assert {c.path for c in second.search("invoice")} == {"billing/invoice.py", "README.md"}
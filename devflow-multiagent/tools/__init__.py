@@ -4,6 +4,7 @@ DevFlow Tools - Developer Productivity Tools
 
 from .git_analyzer import GitAnalyzer, GitCommit, FileDiff
 from .code_reviewer import CodeReviewer, CodeIssue, ReviewResult, CodeMetrics
+from .workspace_index import WorkspaceIndex, CodeChunk
 
 __all__ = [
     "GitAnalyzer",
@@ -12,6 +13,8 @@ __all__ = [
     "CodeReviewer",
     "CodeIssue",
     "ReviewResult",
-    "CodeMetrics"
+    "CodeMetrics",
+    "WorkspaceIndex",
+    "CodeChunk"
 ]
 
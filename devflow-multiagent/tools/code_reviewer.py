@@ -6,16 +6,27 @@ Provides:
 - Pattern detection
 - Code quality scoring
 - Review comment generation
+- Content-hash review cache and parallel review of cache misses
 """
 
 import ast
+import asyncio
+import hashlib
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Any, Dict, List, Optional, Tuple
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 from pathlib import Path
 from enum import Enum
 
 
+# Bump when the logic of any check changes, so cached reviews are not reused
+RULESET_VERSION = 1
+
+
 class IssueSeverity(Enum):
     """Severity levels for code issues."""
     INFO = "info"
@@ -67,6 +78,36 @@ class ReviewResult:
     summary: str = ""
 
 
+def _result_to_dict(result: ReviewResult) -> Dict:
+    """Cache form of a review (the file path is re-applied on load)."""
+    data = asdict(result)
+    del data["file"]
+    for issue in data["issues"]:
+        del issue["file"]
+        issue["severity"] = issue["severity"].value
+    return data
+
+
+def _result_from_dict(file_path: str, data: Dict) -> ReviewResult:
+    return ReviewResult(
+        file=file_path,
+        metrics=CodeMetrics(**data["metrics"]),
+        issues=[CodeIssue(file=file_path, **dict(issue, severity=IssueSeverity(issue["severity"])))
+                for issue in data["issues"]],
+        score=data["score"],
+        grade=data["grade"],
+        summary=data["summary"]
+    )
+
+
+def _review_in_worker(task: Tuple[Dict, str, str]) -> ReviewResult:
+    """Process pool entry point: review one file's content with the parent's rule settings."""
+    settings, file_path, content = task
+    reviewer = CodeReviewer(cache_dir=None)
+    reviewer.apply_settings(settings)
+    return reviewer.review_content(file_path, content)
+
+
 class CodeReviewer:
     """
     Performs automated code review for Python files.
@@ -76,9 +117,14 @@ class CodeReviewer:
     - Anti-pattern detection
     - Code smell identification
     - Review comment generation
+    
+    Reviews are cached by content hash and rule settings (in memory and in
+    <cache_dir>/review_cache.json), so unchanged files are not re-analyzed;
+    a file whose size and mtime are unchanged is not even re-read. Cache
+    misses in review_files() are reviewed in a process pool.
     """
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = "sessions", max_workers: Optional[int] = None):
         # Patterns to detect
         self.antipatterns = [
             (r"except\s*:", "Bare except clause", "Specify exception type"),
@@ -99,21 +145,98 @@ class CodeReviewer:
         # Function length thresholds
         self.function_length_warning = 50
         self.function_length_error = 100
-    
-    async def review_file(self, file_path: str) -> ReviewResult:
-        """
-        Perform full review of a Python file.
         
-        Args:
-            file_path: Path to Python file
-        
-        Returns:
-            ReviewResult with metrics, issues, and score
-        """
+        # Review cache and parallelism
+        self.cache_file = Path(cache_dir) / "review_cache.json" if cache_dir else None
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_threshold = 16  # fewer misses than this are reviewed in-process
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache_entries: Dict[str, Dict] = {}   # content sha256 -> cached review
+        self._cache_files: Dict[str, List] = {}     # path -> [mtime_ns, size, sha256]
+        self._cache_ruleset: Optional[str] = None
+        self._compiled_antipatterns: Tuple[Tuple, List] = ((), [])
+    
+    def settings(self) -> Dict:
+        """Rule settings that determine a review's outcome."""
+        return {
+            "antipatterns": [list(p) for p in self.antipatterns],
+            "magic_number_pattern": self.magic_number_pattern.pattern,
+            "max_line_length": self.max_line_length,
+            "function_length_warning": self.function_length_warning,
+            "function_length_error": self.function_length_error,
+        }
+    
+    def apply_settings(self, settings: Dict):
+        """Use rule settings taken from another reviewer's settings()."""
+        self.antipatterns = [tuple(p) for p in settings["antipatterns"]]
+        self.magic_number_pattern = re.compile(settings["magic_number_pattern"])
+        self.max_line_length = settings["max_line_length"]
+        self.function_length_warning = settings["function_length_warning"]
+        self.function_length_error = settings["function_length_error"]
+    
+    def ruleset_key(self) -> str:
+        """Hash of RULESET_VERSION and the current rule settings."""
+        payload = json.dumps([RULESET_VERSION, self.settings()], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+    
+    def _sync_cache(self):
+        """Load the cache file once; drop everything if the rule settings changed."""
+        ruleset = self.ruleset_key()
+        if self._cache_ruleset == ruleset:
+            return
+        first_load = self._cache_ruleset is None
+        self._cache_entries, self._cache_files = {}, {}
+        self._cache_ruleset = ruleset
+        if first_load and self.cache_file and self.cache_file.exists():
+            try:
+                data = json.loads(self.cache_file.read_text())
+                if data.get("ruleset") == ruleset:
+                    self._cache_entries = data.get("entries", {})
+                    self._cache_files = data.get("files", {})
+            except (json.JSONDecodeError, OSError):
+                pass
+    
+    def _lookup(self, file_path: str) -> Tuple[Optional[ReviewResult], str, Optional[str]]:
+        """(cached review or None, content hash, content if it had to be read)."""
         path = Path(file_path)
+        stat = path.stat()
+        known = self._cache_files.get(str(path))
+        if known and known[0] == stat.st_mtime_ns and known[1] == stat.st_size and known[2] in self._cache_entries:
+            self.cache_hits += 1
+            return _result_from_dict(str(file_path), self._cache_entries[known[2]]), known[2], None
         
-        if not path.exists():
-            return ReviewResult(
+        content = path.read_text()
+        digest = hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest()
+        self._cache_files[str(path)] = [stat.st_mtime_ns, stat.st_size, digest]
+        if digest in self._cache_entries:
+            self.cache_hits += 1
+            return _result_from_dict(str(file_path), self._cache_entries[digest]), digest, content
+        self.cache_misses += 1
+        return None, digest, content
+    
+    def _save_cache(self):
+        if not self.cache_file:
+            return
+        # Keep only reviews some known file still has
+        live = {entry[2] for entry in self._cache_files.values()}
+        self._cache_entries = {k: v for k, v in self._cache_entries.items() if k in live}
+        data = {"ruleset": self._cache_ruleset, "entries": self._cache_entries, "files": self._cache_files}
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(data))
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass
+    
+    def clear_cache(self):
+        self._cache_entries, self._cache_files = {}, {}
+        if self.cache_file and self.cache_file.exists():
+            self.cache_file.unlink()
+    
+    def _missing_file_result(self, file_path: str) -> ReviewResult:
+        return ReviewResult(
                 file=str(file_path),
                 metrics=CodeMetrics(),
                 issues=[CodeIssue(
@@ -126,19 +249,47 @@ class CodeReviewer:
                 score=0,
                 grade="F"
             )
+    
+    async def review_file(self, file_path: str) -> ReviewResult:
+        """
+        Perform full review of a Python file.
         
-        content = path.read_text()
+        Args:
+            file_path: Path to Python file
+        
+        Returns:
+            ReviewResult with metrics, issues, and score
+        """
+        if not Path(file_path).exists():
+            return self._missing_file_result(file_path)
+        
+        self._sync_cache()
+        cached, digest, content = self._lookup(file_path)
+        if cached is not None:
+            return cached
+        
+        result = self.review_content(str(file_path), content)
+        self._cache_entries[digest] = _result_to_dict(result)
+        self._save_cache()
+        return result
+    
+    def review_content(self, file_path: str, content: str) -> ReviewResult:
+        """Review Python source text (no file access, no cache)."""
         lines = content.split("\n")
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            tree = None
         
         # Collect metrics
-        metrics = self._analyze_metrics(content, lines)
+        metrics = self._analyze_metrics(content, lines, tree)
         
         # Find issues
         issues = []
         issues.extend(self._check_antipatterns(file_path, lines))
         issues.extend(self._check_line_length(file_path, lines))
         issues.extend(self._check_magic_numbers(file_path, lines))
-        issues.extend(self._check_ast(file_path, content))
+        issues.extend(self._check_ast(file_path, content, tree))
         
         # Calculate score
         score, grade = self._calculate_score(metrics, issues)
@@ -155,8 +306,8 @@ class CodeReviewer:
             summary=summary
         )
     
-    def _analyze_metrics(self, content: str, lines: List[str]) -> CodeMetrics:
-        """Analyze code metrics."""
+    def _analyze_metrics(self, content: str, lines: List[str], tree: Optional[ast.AST] = None) -> CodeMetrics:
+        """Analyze code metrics (tree: content already parsed, if it parses)."""
         metrics = CodeMetrics()
         
         for line in lines:
@@ -170,7 +321,8 @@ class CodeReviewer:
         
         # Parse AST for detailed metrics
         try:
-            tree = ast.parse(content)
+            if tree is None:
+                tree = ast.parse(content)
             
             function_lengths = []
             
@@ -205,9 +357,17 @@ class CodeReviewer:
         """Check for antipatterns."""
         issues = []
         
+        key = tuple(self.antipatterns)
+        if self._compiled_antipatterns[0] != key:
+            self._compiled_antipatterns = (key, [
+                (re.compile(pattern, re.IGNORECASE), message, suggestion)
+                for pattern, message, suggestion in self.antipatterns
+            ])
+        antipatterns = self._compiled_antipatterns[1]
+        
         for i, line in enumerate(lines, 1):
-            for pattern, message, suggestion in self.antipatterns:
-                if re.search(pattern, line, re.IGNORECASE):
+            for regex, message, suggestion in antipatterns:
+                if regex.search(line):
                     issues.append(CodeIssue(
                         file=file_path,
                         line=i,
@@ -266,12 +426,13 @@ class CodeReviewer:
         
         return issues
     
-    def _check_ast(self, file_path: str, content: str) -> List[CodeIssue]:
+    def _check_ast(self, file_path: str, content: str, tree: Optional[ast.AST] = None) -> List[CodeIssue]:
         """AST-based checks."""
         issues = []
         
         try:
-            tree = ast.parse(content)
+            if tree is None:
+                tree = ast.parse(content)
             
             for node in ast.walk(tree):
                 # Check function length
@@ -413,9 +574,45 @@ class CodeReviewer:
         return "\n".join(lines)
     
     async def review_files(self, file_paths: List[str]) -> Dict[str, ReviewResult]:
-        """Review multiple files."""
+        """Review multiple files: cached reviews are reused, the rest run in parallel."""
+        self._sync_cache()
         results = {}
+        misses = []
         for path in file_paths:
-            results[path] = await self.review_file(path)
-        return results
+            if not Path(path).exists():
+                results[path] = self._missing_file_result(path)
+                continue
+            cached, digest, content = self._lookup(path)
+            if cached is not None:
+                results[path] = cached
+            else:
+                misses.append((path, digest, content))
+        
+        if misses:
+            reviewed = await self._review_misses([(str(path), content) for path, _, content in misses])
+            for (path, digest, _), result in zip(misses, reviewed):
+                self._cache_entries[digest] = _result_to_dict(result)
+                results[path] = result
+        self._save_cache()
+        
+        return {path: results[path] for path in file_paths}
+    
+    async def _review_misses(self, files: List[Tuple[str, str]]) -> List[ReviewResult]:
+        """Review (path, content) pairs; in a process pool when there are enough of them."""
+        workers = min(self.max_workers, len(files))
+        if len(files) < self.parallel_threshold or workers < 2:
+            return [self.review_content(path, content) for path, content in files]
+        
+        settings = self.settings()
+        tasks = [(settings, path, content) for path, content in files]
+        
+        def run_pool() -> List[ReviewResult]:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(_review_in_worker, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+        
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, run_pool)
+        except (BrokenProcessPool, OSError, NotImplementedError):
+            # No usable process pool here (sandbox, frozen app): review in-process
+            return [self.review_content(path, content) for path, content in files]
 
@@ -6,16 +6,42 @@ Provides:
 - Branch information
 - File change tracking
 - Diff analysis
+- Cached commit history from one batched `git log --numstat` pass
 """
 
 import asyncio
+import heapq
+import itertools
 import os
-from typing import Any, Dict, List, Optional
-from dataclasses import dataclass
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
 from pathlib import Path
 
 
+# Commits read by the batched history pass (newest first, across all refs);
+# queries that walk past them are answered by git directly
+HISTORY_DEPTH = 1000
+
+# One record per commit: fields NUL-separated, records start with RS
+_LOG_FORMAT = "%x1e%H%x00%h%x00%P%x00%ct%x00%aI%x00%an%x00%ae%x00%s"
+_REF_FORMAT = "%(objectname)%00%(*objectname)%00%(HEAD)%00%(refname)%00%(refname:short)"
+
+# git's rules for resolving a short ref name, in order
+_REF_RULES = ("{}", "refs/{}", "refs/tags/{}", "refs/heads/{}", "refs/remotes/{}", "refs/remotes/{}/HEAD")
+
+# Extra commits git keeps walking once only excluded ones are left (revision.c)
+_SLOP = 5
+
+# --author is a basic regex in git; patterns using syntax Python reads
+# differently are left to git
+_AUTHOR_SPECIAL = set("\\[]{}()+?|")
+
+_ISO_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
 @dataclass
 class GitCommit:
     """Represents a git commit."""
@@ -47,6 +73,19 @@ class GitCommit:
         return None
 
 
+@dataclass
+class _HistoryEntry:
+    """A commit in the cached history, with what walks and churn need."""
+    commit: GitCommit
+    parents: Tuple[str, ...]
+    commit_time: int
+    numstat: List[Tuple[str, int, int]] = field(default_factory=list)
+
+
+class _HistoryGap(Exception):
+    """A walk reached a commit outside the cached history."""
+
+
 @dataclass
 class FileDiff:
     """Represents changes to a file."""
@@ -65,14 +104,33 @@ class GitAnalyzer:
     - Analyze file changes
     - Generate summaries for standups
     - Compare branches for PRs
+    
+    Commit history is read once with `git log --numstat` and kept in memory,
+    keyed by the state of HEAD and the refs. While they are unchanged (checked
+    by stat-ing the ref files, no subprocess) history questions are answered
+    from memory by replaying git's own revision walk; when they move, only the
+    new commits are read. Working-tree diffs still run git every time.
     """
     
-    def __init__(self, repo_path: str = None):
+    def __init__(self, repo_path: str = None, history_depth: int = HISTORY_DEPTH):
         self.repo_path = Path(repo_path or os.getcwd())
         self._is_git_repo = None
+        
+        # History cache
+        self.history_depth = history_depth
+        self.git_calls = 0
+        self._git_dirs: Optional[Tuple[Path, Path]] = None   # (git dir, common dir)
+        self._ref_state: Optional[tuple] = None
+        self._refs: Dict[str, str] = {}                      # full ref name -> commit
+        self._head: Optional[str] = None
+        self._branch: Optional[str] = None
+        self._history: Dict[str, _HistoryEntry] = {}
+        self._history_tips: Set[str] = set()
+        self._refresh_lock = asyncio.Lock()
     
     async def _run_git(self, *args) -> Optional[str]:
         """Execute a git command and return output."""
+        self.git_calls += 1
         try:
             proc = await asyncio.create_subprocess_exec(
                 "git", *args,
@@ -83,11 +141,251 @@ class GitAnalyzer:
             stdout, stderr = await proc.communicate()
             
             if proc.returncode == 0:
-                return stdout.decode().strip()
+                return stdout.decode(errors="replace").strip()
             return None
         except Exception:
             return None
     
+    # History cache
+    
+    def _stat_refs(self) -> tuple:
+        """Identity of every file that records HEAD or a ref (git rewrites them by rename)."""
+        git_dir, common_dir = self._git_dirs
+        paths = [git_dir / "HEAD", common_dir / "packed-refs"]
+        for top in ("refs", "reftable"):
+            for root, _, files in os.walk(common_dir / top):
+                paths.extend(Path(root) / name for name in files)
+        
+        state = []
+        for path in paths:
+            try:
+                stat = path.stat()
+                state.append((str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                state.append((str(path), None))
+        return tuple(sorted(state, key=lambda s: s[0]))
+    
+    async def _refresh(self) -> bool:
+        """Bring refs and cached history up to date; False if git cannot be used."""
+        async with self._refresh_lock:
+            if self._git_dirs is None:
+                output = await self._run_git("rev-parse", "--git-dir", "--git-common-dir")
+                if not output or len(output.split("\n")) != 2:
+                    return False
+                git_dir, common_dir = output.split("\n")
+                self._git_dirs = (self.repo_path / git_dir, self.repo_path / common_dir)
+                self._is_git_repo = True
+            
+            state = self._stat_refs()
+            if state == self._ref_state:
+                return True
+            
+            output = await self._run_git("for-each-ref", f"--format={_REF_FORMAT}")
+            if output is None:
+                return False
+            refs, branch = {}, None
+            for line in output.split("\n"):
+                parts = line.split("\0")
+                if len(parts) == 5:
+                    refs[parts[3]] = parts[1] or parts[0]
+                    if parts[2] == "*":
+                        branch = parts[4]
+            try:
+                head = (self._git_dirs[0] / "HEAD").read_text().strip()
+            except OSError:
+                return False
+            if head.startswith("ref: "):
+                head = refs.get(head[5:])
+            else:
+                branch = "HEAD"  # detached
+            
+            tips = set(refs.values()) | ({head} if head else set())
+            if tips - set(self._history):
+                known = sorted(t for t in self._history_tips if t in self._history)
+                loaded = await self._load_history("--all", "--not", *known) if known else None
+                if loaded is None or loaded >= self.history_depth:
+                    # First load, vanished tips, or too much new history to patch in
+                    self._history = {}
+                    if await self._load_history("--all") is None:
+                        return False
+            
+            self._refs, self._head, self._branch = refs, head, branch
+            self._history_tips = {t for t in tips if t in self._history}
+            self._ref_state = state
+            return True
+    
+    async def _load_history(self, *revs: str) -> Optional[int]:
+        """Read commits with their numstat into the cache; returns how many."""
+        output = await self._run_git(
+            "log", "--no-renames", "--numstat",
+            f"--format={_LOG_FORMAT}", f"-n{self.history_depth}", *revs
+        )
+        if output is None:
+            return None
+        
+        count = 0
+        for record in output.split("\x1e"):
+            header, _, stats = record.partition("\n")
+            fields = header.split("\0")
+            if len(fields) != 8:
+                continue
+            sha, short_hash, parents, commit_time, date, author, email, message = fields
+            
+            numstat = []
+            for line in stats.split("\n"):
+                parts = line.split("\t")
+                if len(parts) == 3:
+                    numstat.append((
+                        parts[2],
+                        int(parts[0]) if parts[0] != "-" else 0,
+                        int(parts[1]) if parts[1] != "-" else 0
+                    ))
+            
+            commit = GitCommit(
+                hash=sha,
+                short_hash=short_hash,
+                message=message,
+                author=author,
+                author_email=email,
+                date=datetime.fromisoformat(date) if date else datetime.now(),
+                files_changed=[path for path, _, _ in numstat]
+            )
+            self._history[sha] = _HistoryEntry(commit, tuple(parents.split()), int(commit_time), numstat)
+            count += 1
+        return count
+    
+    def _resolve_ref(self, name: str) -> Optional[str]:
+        """Commit a ref name points to, using git's lookup order."""
+        if name == "HEAD":
+            return self._head
+        for rule in _REF_RULES:
+            sha = self._refs.get(rule.format(name))
+            if sha:
+                return sha
+        return None
+    
+    async def _resolve_rev(self, rev: str) -> Optional[str]:
+        """Commit for any revision (refs from memory, anything else via git)."""
+        sha = self._resolve_ref(rev)
+        if sha is None:
+            sha = await self._run_git("rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}")
+        return sha or None
+    
+    async def _approxidate(self, option: str, text: str) -> Optional[int]:
+        """Timestamp git would use for --since/--until=text."""
+        # The forms this tool passes itself, resolved as git does: a bare
+        # date keeps the current time of day, "yesterday" is 24 hours ago
+        if text == "yesterday":
+            return int(time.time()) - 24 * 60 * 60
+        if _ISO_DAY.match(text):
+            try:
+                day = datetime.strptime(text, "%Y-%m-%d").date()
+                now = datetime.now().replace(microsecond=0)
+                return int(datetime.combine(day, now.time()).timestamp())
+            except ValueError:
+                pass
+        
+        output = await self._run_git("rev-parse", f"--{option}={text}")
+        if output and "=" in output:
+            try:
+                return int(output.split("=", 1)[1])
+            except ValueError:
+                pass
+        return None
+    
+    def _entry(self, sha: str) -> _HistoryEntry:
+        entry = self._history.get(sha)
+        if entry is None:
+            raise _HistoryGap(sha)
+        return entry
+    
+    def _walk(self, tips: Iterable[str], max_age: Optional[int] = None) -> Iterator[_HistoryEntry]:
+        """
+        Commits from tips in `git log` order: newest commit date first, ties
+        in the order they were reached. As in git, a commit older than
+        max_age ends that line of history.
+        """
+        heap, seen, order = [], set(), itertools.count()
+        
+        def push(sha):
+            seen.add(sha)
+            heapq.heappush(heap, (-self._entry(sha).commit_time, next(order), sha))
+        
+        for tip in tips:
+            if tip not in seen:
+                push(tip)
+        while heap:
+            entry = self._history[heapq.heappop(heap)[2]]
+            if max_age is not None and entry.commit_time < max_age:
+                continue
+            yield entry
+            for parent in entry.parents:
+                if parent not in seen:
+                    push(parent)
+    
+    def _range(self, include: str, exclude: str) -> List[_HistoryEntry]:
+        """
+        Commits in exclude..include, in `git log` order.
+        
+        Mirrors git's limit_list(): both sides are walked by date, commits
+        reached from exclude mark their ancestors uninteresting, and the walk
+        stops a few commits after only uninteresting ones are left.
+        """
+        heap, seen, uninteresting, order = [], set(), set(), itertools.count()
+        
+        def push(sha):
+            seen.add(sha)
+            heapq.heappush(heap, (-self._entry(sha).commit_time, next(order), sha))
+        
+        def mark(sha):
+            stack = [sha]
+            while stack:
+                sha = stack.pop()
+                if sha in uninteresting:
+                    continue
+                uninteresting.add(sha)
+                if sha in seen:
+                    stack.extend(self._history[sha].parents)
+        
+        uninteresting.add(exclude)
+        for parent in self._entry(exclude).parents:
+            mark(parent)
+        push(exclude)
+        if include not in seen:
+            push(include)
+        
+        result, date, slop = [], float("inf"), _SLOP
+        while heap:
+            sha = heapq.heappop(heap)[2]
+            entry = self._history[sha]
+            
+            if sha in uninteresting:
+                for parent in entry.parents:
+                    uninteresting.add(parent)
+                    for grandparent in self._entry(parent).parents:
+                        mark(grandparent)
+                    if parent not in seen:
+                        push(parent)
+                # Stop once only uninteresting commits are left (still_interesting)
+                if not heap:
+                    break
+                newest = self._history[heap[0][2]].commit_time
+                if date <= newest or any(item[2] not in uninteresting for item in heap):
+                    slop = _SLOP
+                else:
+                    slop -= 1
+                    if not slop:
+                        break
+                continue
+            
+            for parent in entry.parents:
+                if parent not in seen:
+                    push(parent)
+            date = entry.commit_time
+            result.append(entry)
+        
+        return [entry for entry in result if entry.commit.hash not in uninteresting]
+    
     async def is_git_repository(self) -> bool:
         """Check if current path is a git repository."""
         if self._is_git_repo is None:
@@ -97,6 +395,8 @@ class GitAnalyzer:
     
     async def get_current_branch(self) -> Optional[str]:
         """Get current branch name."""
+        if await self._refresh():
+            return self._branch if self._head else None
         return await self._run_git("rev-parse", "--abbrev-ref", "HEAD")
     
     async def get_commits(
@@ -115,6 +415,13 @@ class GitAnalyzer:
             author: Filter by author
             limit: Maximum commits to return
         """
+        plain_author = not author or not (_AUTHOR_SPECIAL & set(author))
+        if plain_author and await self._refresh():
+            try:
+                return await self._get_cached_commits(since, until, author, limit)
+            except _HistoryGap:
+                pass
+        
         args = [
             "log",
             f"--pretty=format:%H|%h|%s|%an|%ae|%aI",
@@ -140,6 +447,62 @@ class GitAnalyzer:
         
         return commits
     
+    async def _get_cached_commits(
+        self,
+        since: Optional[str],
+        until: Optional[str],
+        author: Optional[str],
+        limit: int
+    ) -> List[GitCommit]:
+        """get_commits() from the cached history, filtered the way git log filters."""
+        if not self._head or limit == 0:
+            return []
+        max_age = await self._approxidate("since", since) if since else None
+        min_age = await self._approxidate("until", until) if until else None
+        author_re = re.compile(author) if author else None
+        
+        commits = []
+        for entry in self._walk([self._head], max_age):
+            if min_age is not None and entry.commit_time > min_age:
+                continue
+            commit = entry.commit
+            if author_re and not author_re.search(f"{commit.author} <{commit.author_email}>"):
+                continue
+            commits.append(replace(commit, files_changed=list(commit.files_changed)))
+            if len(commits) == limit:
+                break
+        return commits
+    
+    async def get_file_churn(
+        self,
+        since: str = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Most changed files in the history of HEAD, from the cached numstat.
+        
+        Args:
+            since: Only count commits since this date
+            limit: Maximum files to return
+        """
+        if not await self._refresh() or not self._head:
+            return []
+        max_age = await self._approxidate("since", since) if since else None
+        
+        churn: Dict[str, Dict[str, Any]] = {}
+        try:
+            for entry in self._walk([self._head], max_age):
+                for path, additions, deletions in entry.numstat:
+                    stats = churn.setdefault(path, {"path": path, "commits": 0, "additions": 0, "deletions": 0})
+                    stats["commits"] += 1
+                    stats["additions"] += additions
+                    stats["deletions"] += deletions
+        except _HistoryGap:
+            pass  # counted over the cached history only
+        
+        ranked = sorted(churn.values(), key=lambda s: (s["commits"], s["additions"] + s["deletions"]), reverse=True)
+        return ranked[:limit]
+    
     async def get_commits_since_yesterday(self) -> List[GitCommit]:
         """Convenience method for standup summaries."""
         yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
@@ -200,17 +563,31 @@ class GitAnalyzer:
         """
         current = await self.get_current_branch()
         
-        # Get commits ahead of base
-        output = await self._run_git(
-            "rev-list", "--count", f"{base}..{current}"
-        )
-        commits_ahead = int(output) if output else 0
+        counts = None
+        if self._ref_state is not None and self._head:
+            base_sha = await self._resolve_rev(base)
+            try:
+                counts = (
+                    len(self._range(self._head, base_sha)) if base_sha else 0,
+                    len(self._range(base_sha, self._head)) if base_sha else 0
+                )
+            except _HistoryGap:
+                pass
         
-        # Get commits behind base
-        output = await self._run_git(
-            "rev-list", "--count", f"{current}..{base}"
-        )
-        commits_behind = int(output) if output else 0
+        if counts:
+            commits_ahead, commits_behind = counts
+        else:
+            # Get commits ahead of base
+            output = await self._run_git(
+                "rev-list", "--count", f"{base}..{current}"
+            )
+            commits_ahead = int(output) if output else 0
+            
+            # Get commits behind base
+            output = await self._run_git(
+                "rev-list", "--count", f"{current}..{base}"
+            )
+            commits_behind = int(output) if output else 0
         
         # Get file changes
         files = await self.get_files_changed(ref=base)
@@ -287,13 +664,26 @@ class GitAnalyzer:
         comparison = await self.get_branch_comparison(base)
         
         # Get commits for this branch
-        output = await self._run_git(
-            "log",
-            f"--pretty=format:%h|%s",
-            f"{base}..HEAD"
-        )
+        commits = None
+        if await self._refresh() and self._head:
+            base_sha = await self._resolve_rev(base)
+            try:
+                commits = [
+                    {"hash": e.commit.short_hash, "message": e.commit.message}
+                    for e in self._range(self._head, base_sha)
+                ] if base_sha else []
+            except _HistoryGap:
+                pass
+        
+        output = None
+        if commits is None:
+            output = await self._run_git(
+                "log",
+                f"--pretty=format:%h|%s",
+                f"{base}..HEAD"
+            )
+            commits = []
         
-        commits = []
         if output:
             for line in output.split("\n"):
                 parts = line.split("|", 1)
@@ -0,0 +1,475 @@
+"""
+Workspace Index - Persistent Code Search over the Workspace
+
+Provides:
+- Line-range chunks of every source/doc file, cut at definitions
+- Per-chunk lexical postings scored with BM25
+- Symbol definitions (def/class/function/struct/...) boosting defining chunks
+- File stat tracking so only new or changed files are re-read
+- Snapshot on disk, one per workspace, reused across runs
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+# Bump when chunking or tokenization changes; the index is rebuilt
+INDEX_VERSION = 1
+
+CHUNK_LINES = 40          # hard cap on lines per chunk
+MIN_CHUNK_LINES = 8       # a definition only starts a new chunk after this many lines
+MAX_FILE_BYTES = 512 * 1024
+REFRESH_INTERVAL = 2.0    # seconds between workspace walks on search
+SAVE_INTERVAL = 30.0      # seconds between snapshot rewrites after small changes
+COMPACT_RATIO = 0.25      # dead chunks (of live ones) before the snapshot is renumbered
+
+# BM25 parameters and the bonus for chunks defining a queried symbol
+BM25_K1 = 1.2
+BM25_B = 0.75
+SYMBOL_BOOST = 1.5
+PATH_BOOST = 1.0
+
+INDEXED_SUFFIXES = {
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".rb", ".c", ".h",
+    ".cc", ".cpp", ".hpp", ".cs", ".kt", ".swift", ".php", ".scala", ".sh",
+    ".md", ".rst", ".txt", ".toml", ".yaml", ".yml", ".cfg", ".ini"
+}
+SKIP_DIRS = {
+    "node_modules", "__pycache__", "venv", "dist", "build", "target", "site-packages"
+}
+
+# Words that say what to do with the code rather than what code to look at
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "code", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "please", "review",
+    "show", "the", "this", "to", "what", "where", "which", "with", "why", "you"
+}
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+_SYMBOL_RE = re.compile(
+    r"^(\s*)(?:export\s+)?(?:default\s+)?(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?"
+    r"(def|class|function|func|fn|struct|enum|trait|interface|impl|module)\s+"
+    r"(?:\([^)]*\)\s*)?([A-Za-z_]\w*)"
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased identifiers plus their snake_case/camelCase parts."""
+    tokens = []
+    for word in _IDENT_RE.findall(text):
+        lowered = word.lower()
+        if len(lowered) > 1:
+            tokens.append(lowered)
+        parts = [p for piece in word.split("_") for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p.lower() for p in parts if len(p) > 1)
+    return tokens
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct search terms of a natural-language query."""
+    return list(dict.fromkeys(t for t in tokenize(query) if t not in STOPWORDS))
+
+
+@dataclass
+class CodeChunk:
+    """A matching line range of a workspace file."""
+    path: str                # relative to the workspace
+    start_line: int          # 1-based, inclusive
+    end_line: int
+    score: float
+    text: str
+    symbols: List[str] = field(default_factory=list)
+
+
+class WorkspaceIndex:
+    """
+    Inverted index of the workspace's source files, cut into line chunks.
+    
+    Chunks are numbered in the order they were indexed and kept column-wise
+    (chunk_paths[n], chunk_starts[n], ...); postings map a token to a flat
+    [chunk, tf, chunk, tf, ...] list. A changed or deleted file only marks its
+    chunks dead (chunk_paths[n] = None) and appends new ones; the numbering is
+    compacted when enough dead chunks pile up. The index is saved to
+    <cache_dir>/workspace_index_<hash of workspace>.json.
+    """
+    
+    def __init__(self, workspace: str, cache_dir: Optional[str] = "sessions",
+                 refresh_interval: float = REFRESH_INTERVAL):
+        self.workspace = Path(workspace).resolve()
+        digest = hashlib.sha1(str(self.workspace).encode()).hexdigest()[:12]
+        self.index_file = Path(cache_dir) / f"workspace_index_{digest}.json" if cache_dir else None
+        self.refresh_interval = refresh_interval
+        
+        self.files: Dict[str, Dict] = {}   # path -> {"stat": [mtime_ns, size], "chunks": [n, ...]}
+        self.chunk_paths: List[Optional[str]] = []
+        self.chunk_starts: List[int] = []
+        self.chunk_ends: List[int] = []
+        self.chunk_lengths: List[int] = []
+        self.chunk_symbols: List[List[str]] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.symbols: Dict[str, List[int]] = {}   # lower-cased name -> defining chunks
+        
+        self.live_chunks = 0
+        self.total_length = 0
+        self.files_indexed = 0
+        self._loaded = False
+        self._dirty = False
+        self._last_refresh = 0.0
+        self._last_save = 0.0
+        self._lock = threading.Lock()
+    
+    # Loading and saving
+    
+    def _load(self):
+        self._loaded = True
+        if not (self.index_file and self.index_file.exists()):
+            return
+        try:
+            data = json.loads(self.index_file.read_text())
+            if data.get("version") != INDEX_VERSION or data.get("workspace") != str(self.workspace):
+                return
+            files = data["files"]
+            chunks = data["chunks"]
+            postings = data["postings"]
+            symbols = data["symbols"]
+        except (OSError, json.JSONDecodeError, KeyError, TypeError):
+            return
+        self.files = files
+        self.chunk_paths = chunks["paths"]
+        self.chunk_starts = chunks["starts"]
+        self.chunk_ends = chunks["ends"]
+        self.chunk_lengths = chunks["lengths"]
+        self.chunk_symbols = chunks["symbols"]
+        self.postings = postings
+        self.symbols = symbols
+        self.live_chunks = sum(1 for p in self.chunk_paths if p is not None)
+        self.total_length = sum(n for p, n in zip(self.chunk_paths, self.chunk_lengths) if p is not None)
+    
+    def save(self):
+        """Write the snapshot now if anything changed since the last one."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+    
+    def _save(self):
+        self._last_save = time.monotonic()
+        if not self.index_file:
+            self._dirty = False
+            return
+        if len(self.chunk_paths) - self.live_chunks > COMPACT_RATIO * max(self.live_chunks, 100):
+            self._compact()
+        data = {
+            "version": INDEX_VERSION,
+            "workspace": str(self.workspace),
+            "files": self.files,
+            "chunks": {
+                "paths": self.chunk_paths,
+                "starts": self.chunk_starts,
+                "ends": self.chunk_ends,
+                "lengths": self.chunk_lengths,
+                "symbols": self.chunk_symbols
+            },
+            "postings": self.postings,
+            "symbols": self.symbols
+        }
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_suffix(".tmp")
+            tmp_file.write_text(json.dumps(data, separators=(",", ":")))
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            pass
+        self._dirty = False
+    
+    def _compact(self):
+        """Renumber live chunks from 0 and drop dead ones from the postings."""
+        renumber = {}
+        for old, path in enumerate(self.chunk_paths):
+            if path is not None:
+                renumber[old] = len(renumber)
+        keep = list(renumber)
+        self.chunk_paths = [self.chunk_paths[n] for n in keep]
+        self.chunk_starts = [self.chunk_starts[n] for n in keep]
+        self.chunk_ends = [self.chunk_ends[n] for n in keep]
+        self.chunk_lengths = [self.chunk_lengths[n] for n in keep]
+        self.chunk_symbols = [self.chunk_symbols[n] for n in keep]
+        
+        postings = {}
+        for token, flat in self.postings.items():
+            kept = []
+            for i in range(0, len(flat), 2):
+                new = renumber.get(flat[i])
+                if new is not None:
+                    kept.append(new)
+                    kept.append(flat[i + 1])
+            if kept:
+                postings[token] = kept
+        self.postings = postings
+        
+        symbols = {}
+        for name, chunk_ids in self.symbols.items():
+            kept = [renumber[n] for n in chunk_ids if n in renumber]
+            if kept:
+                symbols[name] = kept
+        self.symbols = symbols
+        
+        for entry in self.files.values():
+            entry["chunks"] = [renumber[n] for n in entry["chunks"]]
+    
+    # Keeping in step with the workspace
+    
+    def refresh(self, force: bool = False) -> int:
+        """Re-index new and changed files, forget deleted ones. Returns files re-read."""
+        with self._lock:
+            return self._refresh(force)
+    
+    def _refresh(self, force: bool = False) -> int:
+        if not self._loaded:
+            self._load()
+            force = True
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return 0
+        
+        seen = set()
+        updated = 0
+        for path, stat in self._walk():
+            seen.add(path)
+            entry = self.files.get(path)
+            if entry is None or entry["stat"] != stat:
+                self._update_file(path, stat)
+                updated += 1
+        for path in [p for p in self.files if p not in seen]:
+            self._remove_file(path)
+        
+        # A stale snapshot only costs re-reading the files changed since; no need to rewrite it each time
+        if self._dirty and (force or updated > 100 or now - self._last_save >= SAVE_INTERVAL):
+            self._save()
+        self._last_refresh = time.monotonic()
+        return updated
+    
+    def _walk(self) -> Iterable[Tuple[str, List[int]]]:
+        """(relative path, [mtime_ns, size]) of every indexable file."""
+        stack = [self.workspace]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for dir_entry in entries:
+                name = dir_entry.name
+                if name.startswith("."):
+                    continue
+                try:
+                    if dir_entry.is_dir(follow_symlinks=False):
+                        if name not in SKIP_DIRS:
+                            stack.append(dir_entry.path)
+                        continue
+                    if os.path.splitext(name)[1].lower() not in INDEXED_SUFFIXES:
+                        continue
+                    stat = dir_entry.stat()
+                except OSError:
+                    continue
+                if stat.st_size <= MAX_FILE_BYTES:
+                    rel = os.path.relpath(dir_entry.path, self.workspace).replace(os.sep, "/")
+                    yield rel, [stat.st_mtime_ns, stat.st_size]
+    
+    def _read_lines(self, path: str) -> Optional[List[str]]:
+        try:
+            text = (self.workspace / path).read_text(errors="replace")
+        except OSError:
+            return None
+        if "\x00" in text:
+            return None
+        return text.splitlines()
+    
+    def _remove_file(self, path: str):
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        for n in entry["chunks"]:
+            self.chunk_paths[n] = None
+            self.live_chunks -= 1
+            self.total_length -= self.chunk_lengths[n]
+        self._dirty = True
+    
+    def _update_file(self, path: str, stat: List[int]):
+        self._remove_file(path)
+        lines = self._read_lines(path)
+        chunk_ids = []
+        if lines is not None:
+            # Every chunk also matches its file name ("git_analyzer" -> git, analyzer, ...)
+            stem_tokens = tokenize(Path(path).stem)
+            for start, end, names in _split_chunks(lines):
+                counts = Counter(tokenize(" ".join(lines[start:end])))
+                counts.update(name.lower() for name in names)
+                counts.update(stem_tokens)
+                n = len(self.chunk_paths)
+                self.chunk_paths.append(path)
+                self.chunk_starts.append(start + 1)
+                self.chunk_ends.append(end)
+                self.chunk_lengths.append(sum(counts.values()))
+                self.chunk_symbols.append(names)
+                for token, tf in counts.items():
+                    flat = self.postings.setdefault(token, [])
+                    flat.append(n)
+                    flat.append(tf)
+                for name in names:
+                    self.symbols.setdefault(name.lower(), []).append(n)
+                self.live_chunks += 1
+                self.total_length += self.chunk_lengths[n]
+                chunk_ids.append(n)
+        self.files[path] = {"stat": stat, "chunks": chunk_ids}
+        self.files_indexed += 1
+        self._dirty = True
+    
+    # Queries
+    
+    def search(self, query: str, limit: int = 5, path_hints: Optional[List[str]] = None) -> List[CodeChunk]:
+        """
+        Best-matching chunks for a query, anywhere in the workspace.
+        
+        Args:
+            query: Natural-language query or identifiers
+            limit: Max chunks to return
+            path_hints: File paths mentioned with the query; their chunks rank higher
+        
+        Returns:
+            Chunks with their current text, best first
+        """
+        with self._lock:
+            self._refresh()
+            for _ in range(2):
+                ranked = self._rank(query_terms(query), limit, path_hints or [])
+                changed = False
+                for n, _score in ranked:
+                    path = self.chunk_paths[n]
+                    if path is None:
+                        continue
+                    stat = self._stat(path)
+                    if stat != self.files[path]["stat"]:
+                        # Edited since the last walk: re-index it before reading line ranges
+                        if stat is None:
+                            self._remove_file(path)
+                        else:
+                            self._update_file(path, stat)
+                        changed = True
+                if not changed:
+                    break
+            return [self._chunk(n, score) for n, score in ranked if self.chunk_paths[n] is not None]
+    
+    def find_symbol(self, name: str) -> List[Dict]:
+        """Definitions of a symbol: path, line range of the defining chunk, names defined there."""
+        with self._lock:
+            self._refresh()
+            return [
+                {
+                    "path": self.chunk_paths[n],
+                    "start_line": self.chunk_starts[n],
+                    "end_line": self.chunk_ends[n],
+                    "symbols": self.chunk_symbols[n]
+                }
+                for n in self.symbols.get(name.lower(), [])
+                if self.chunk_paths[n] is not None
+            ]
+    
+    def _rank(self, terms: List[str], limit: int, path_hints: List[str]) -> List[Tuple[int, float]]:
+        if not terms or not self.live_chunks:
+            return []
+        scores: Dict[int, float] = {}
+        live = self.live_chunks
+        avg_length = self.total_length / live or 1.0
+        chunk_paths = self.chunk_paths
+        chunk_lengths = self.chunk_lengths
+        norm = BM25_K1 * (1 - BM25_B)
+        scale = BM25_K1 * BM25_B / avg_length
+        
+        for term in terms:
+            flat = self.postings.get(term)
+            if not flat:
+                continue
+            matches = [(flat[i], flat[i + 1]) for i in range(0, len(flat), 2) if chunk_paths[flat[i]] is not None]
+            if not matches:
+                continue
+            idf = math.log(1 + (live - len(matches) + 0.5) / (len(matches) + 0.5))
+            for n, tf in matches:
+                scores[n] = scores.get(n, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm + scale * chunk_lengths[n])
+            for n in self.symbols.get(term, ()):
+                if n in scores:
+                    scores[n] += SYMBOL_BOOST * idf
+        
+        hints = [h.lstrip("./") for h in path_hints if "/" in h or "." in h]
+        if hints:
+            for n in scores:
+                if any(chunk_paths[n].endswith(h) for h in hints):
+                    scores[n] += PATH_BOOST
+        
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+    
+    def _stat(self, path: str) -> Optional[List[int]]:
+        try:
+            stat = os.stat(self.workspace / path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+    
+    def _chunk(self, n: int, score: float) -> CodeChunk:
+        path = self.chunk_paths[n]
+        lines = self._read_lines(path) or []
+        start, end = self.chunk_starts[n], self.chunk_ends[n]
+        return CodeChunk(
+            path=path,
+            start_line=start,
+            end_line=end,
+            score=round(score, 3),
+            text="\n".join(lines[start - 1:end]),
+            symbols=list(self.chunk_symbols[n])
+        )
+    
+    def get_stats(self) -> Dict:
+        """Index size summary."""
+        return {
+            "files": len(self.files),
+            "chunks": self.live_chunks,
+            "terms": len(self.postings),
+            "symbols": len(self.symbols),
+            "files_indexed": self.files_indexed,
+            "index_file": str(self.index_file) if self.index_file else None
+        }
+
+
+def _split_chunks(lines: List[str]) -> List[Tuple[int, int, List[str]]]:
+    """(start, end, defined symbol names) per chunk; start/end are 0-based, end exclusive."""
+    chunks = []
+    start = 0
+    names: List[str] = []
+    for i, line in enumerate(lines):
+        match = _SYMBOL_RE.match(line)
+        cut = i
+        if match:
+            # Keep decorators with the definition they belong to
+            while cut > start and lines[cut - 1].lstrip().startswith("@"):
+                cut -= 1
+        if not (match and cut - start >= MIN_CHUNK_LINES):
+            cut = i if i - start >= CHUNK_LINES else None
+        if cut is not None:
+            chunks.append((start, cut, names))
+            start, names = cut, []
+        if match:
+            names.append(match.group(3))
+    if start < len(lines):
+        chunks.append((start, len(lines), names))
+    return chunks
@@ -8,12 +8,12 @@ Uses FAISS vector embeddings to search past conversations and provide context to
 import json
 import os
 import numpy as np
-import faiss
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 import requests
 from datetime import datetime
 from modules.memory import MemoryItem
+from modules.vector_index import AdaptiveIndex
 
 # Configuration
 EMBED_URL = "http://localhost:11434/api/embeddings"
@@ -152,12 +152,9 @@ class ConversationIndexer:
             if (i + 1) % 10 == 0:
                 print(f"  Processed {i + 1}/{len(conversations)} conversations...")
         
-        # Create FAISS index
-        embeddings_array = np.stack(embeddings)
-        dimension = embeddings_array.shape[1]
-        
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings_array)
+        # Create FAISS index (tier picked from corpus size)
+        self.index = AdaptiveIndex(background=False)
+        self.index.add(np.stack(embeddings))
         self.metadata = metadata
         
         # Save index
@@ -172,7 +169,7 @@ class ConversationIndexer:
             print("⚠️ No index to save")
             return
         
-        faiss.write_index(self.index, str(self.index_path))
+        self.index.save(self.index_path)
         
         with open(self.metadata_path, 'w', encoding='utf-8') as f:
             json.dump(self.metadata, f, indent=2)
@@ -183,7 +180,7 @@ class ConversationIndexer:
     def load_index(self):
         """Load FAISS index and metadata from disk"""
         try:
-            self.index = faiss.read_index(str(self.index_path))
+            self.index = AdaptiveIndex.load(self.index_path)
             
             with open(self.metadata_path, 'r', encoding='utf-8') as f:
                 self.metadata = json.load(f)
@@ -227,7 +224,7 @@ class ConversationIndexer:
         # Prepare results
         results = []
         for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.metadata):  # Valid index
+            if 0 <= idx < len(self.metadata):  # Valid index
                 similarity = 1 / (1 + dist)  # Convert distance to similarity
                 
                 if similarity >= min_similarity:
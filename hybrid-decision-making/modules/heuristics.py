@@ -6,10 +6,69 @@ Filters and validates user inputs and agent outputs before processing/returning.
 """
 
 import re
-from typing import List, Dict, Any, Optional
+from collections import Counter, OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 
 
+PII_PATTERNS = {
+    "email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+    "phone": r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
+    "ssn": r'\b\d{3}-\d{2}-\d{4}\b',
+    "credit_card": r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b'
+}
+
+URL_PATTERN = r'https?://[^\s]+'
+
+BLOCKED_DOMAINS = [
+    "bit.ly", "tinyurl.com", "goo.gl",  # URL shorteners (can hide malicious sites)
+    "suspicious.com", "malware.com"  # Example blocked domains
+]
+
+INJECTION_PATTERNS = [
+    r'<script[^>]*>.*?</script>',  # JavaScript
+    r'__import__\(',  # Python import
+    r'subprocess\.',  # Python subprocess
+    r'os\.system\(',  # OS commands
+]
+
+# Lowercase literals of which at least one occurs in every match of the pattern
+PATTERN_ANCHORS = {
+    r'\b(system|sudo|rm -rf|drop table|delete from|exec\(|eval\()\b':
+        ("system", "sudo", "rm -rf", "drop table", "delete from", "exec(", "eval("),
+    r'\b(password|api_key|secret|token|credential)\b':
+        ("password", "api_key", "secret", "token", "credential"),
+    PII_PATTERNS["email"]: ("@",),
+    URL_PATTERN: ("http",),
+    INJECTION_PATTERNS[0]: ("<script",),
+    INJECTION_PATTERNS[1]: ("__import__(",),
+    INJECTION_PATTERNS[2]: ("subprocess.",),
+    INJECTION_PATTERNS[3]: ("os.system(",),
+}
+
+# Numeric PII patterns without their \b, run on a copy of the text where every
+# decimal digit is "0": the literal "000" prefix keeps them on sre's fast path
+DIGIT_SHAPES = {
+    PII_PATTERNS["phone"]: re.compile(r'000[-.]?000[-.]?0000'),
+    PII_PATTERNS["ssn"]: re.compile(r'000-00-0000'),
+    PII_PATTERNS["credit_card"]: re.compile(r'0000[- ]?0000[- ]?0000[- ]?0000'),
+}
+
+# Non-ASCII characters that IGNORECASE matches against an ASCII letter although
+# str.lower() does not produce that letter (or inserts a combining mark)
+_CASE_FOLD_ODDITIES = "\u017f\u0131\u0130"  # ſ ı İ
+
+# \d is str.isdecimal(); the last decimal digit is U+1FBF9
+_DIGITS_TO_ZERO = dict.fromkeys([cp for cp in range(0x1FC00) if chr(cp).isdecimal()], "0")
+
+# str.translate table that deletes every character [^a-zA-Z0-9\s.,!?] does not match
+# (\s is str.isspace(); the last whitespace code point is U+3000)
+_KEEP_PLAIN_CHARS = dict.fromkeys(
+    [ord(c) for c in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.,!?"] +
+    [cp for cp in range(0x3001) if chr(cp).isspace()]
+)
+
+
 class HeuristicResult(BaseModel):
     """Result of heuristic validation"""
     passed: bool
@@ -21,6 +80,34 @@ class HeuristicResult(BaseModel):
     sanitized_text: Optional[str] = None
 
 
+class TextScan:
+    """
+    Shared pre-pass over one text, so each rule runs its regexes only when they can match.
+
+    `literals` is the set of anchor literals present in the lowercased text. One
+    substring search per literal is cheaper in CPython than a combined regex
+    alternation over the text (which loses sre's literal fast path).
+    """
+
+    def __init__(self, text: str, literals):
+        self.text = text
+        text_lower = text.lower()
+        self.literals = {lit for lit in literals if lit in text_lower}
+        self.exact = text.isascii() or not any(c in text for c in _CASE_FOLD_ODDITIES)
+        self._digit_shapes = None
+
+    def may_match(self, pattern: str) -> bool:
+        anchors = PATTERN_ANCHORS.get(pattern)
+        if anchors is not None:
+            return not self.exact or any(anchor in self.literals for anchor in anchors)
+        shape = DIGIT_SHAPES.get(pattern)
+        if shape is not None:
+            if self._digit_shapes is None:
+                self._digit_shapes = self.text.translate(_DIGITS_TO_ZERO)
+            return shape.search(self._digit_shapes) is not None
+        return True
+
+
 class HeuristicsEngine:
     """
     Applies 10+ heuristic rules to queries and results.
@@ -43,16 +130,26 @@ class HeuristicsEngine:
         self.max_result_length = 50000
         self.max_tool_calls_per_query = 5
         
+        # Verdicts for recently validated payloads (guards run on every tool call)
+        self.verdict_cache_size = 256
+        self._verdicts: "OrderedDict[Tuple[str, str], List[HeuristicResult]]" = OrderedDict()
+        self._rules_key = None
+        self._scan_literals = {}
+        
     
     # ==================== HEURISTIC RULES ====================
     
-    def heuristic_1_banned_words(self, text: str, context: str = "query") -> HeuristicResult:
+    def heuristic_1_banned_words(self, text: str, context: str = "query",
+                                 scan: Optional[TextScan] = None) -> HeuristicResult:
         """
         RULE 1: Remove or block banned words (harmful, malicious, illegal content)
         Examples: hack, exploit, malware, illegal, pirate
         """
-        text_lower = text.lower()
-        found_words = [word for word in self.banned_words if word in text_lower]
+        if scan is not None:
+            found_words = [word for word in self.banned_words if word in scan.literals]
+        else:
+            text_lower = text.lower()
+            found_words = [word for word in self.banned_words if word in text_lower]
         
         if found_words:
             return HeuristicResult(
@@ -75,12 +172,15 @@ class HeuristicsEngine:
         )
     
     
-    def heuristic_2_dangerous_commands(self, text: str, context: str = "query") -> HeuristicResult:
+    def heuristic_2_dangerous_commands(self, text: str, context: str = "query",
+                                       scan: Optional[TextScan] = None) -> HeuristicResult:
         """
         RULE 2: Block dangerous system commands and code execution patterns
         Examples: rm -rf, drop table, exec(), eval()
         """
         for pattern in self.blocked_patterns:
+            if scan is not None and not scan.may_match(pattern):
+                continue
             if re.search(pattern, text, re.IGNORECASE):
                 return HeuristicResult(
                     passed=False,
@@ -130,22 +230,18 @@ class HeuristicsEngine:
         )
     
     
-    def heuristic_4_pii_detection(self, text: str, context: str = "query") -> HeuristicResult:
+    def heuristic_4_pii_detection(self, text: str, context: str = "query",
+                                  scan: Optional[TextScan] = None) -> HeuristicResult:
         """
         RULE 4: Detect and mask Personal Identifiable Information (PII)
         Examples: emails, phone numbers, SSN, credit cards
         """
-        pii_patterns = {
-            "email": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            "phone": r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b',
-            "ssn": r'\b\d{3}-\d{2}-\d{4}\b',
-            "credit_card": r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b'
-        }
-        
         sanitized = text
         detected = []
         
-        for pii_type, pattern in pii_patterns.items():
+        for pii_type, pattern in PII_PATTERNS.items():
+            if scan is not None and not scan.may_match(pattern):
+                continue
             matches = re.findall(pattern, text)
             if matches:
                 detected.append(f"{pii_type}: {len(matches)} occurrences")
@@ -216,11 +312,7 @@ class HeuristicsEngine:
         # Check for repeated words
         words = text.split()
         if len(words) > 10:
-            word_counts = {}
-            for word in words:
-                word_counts[word] = word_counts.get(word, 0) + 1
-            
-            max_repetition = max(word_counts.values())
+            max_repetition = max(Counter(words).values())
             if max_repetition > len(words) * 0.3:  # If any word is >30% of total
                 return HeuristicResult(
                     passed=False,
@@ -245,7 +337,8 @@ class HeuristicsEngine:
         """
         RULE 7: Limit excessive special characters (potential injection attempts)
         """
-        special_char_ratio = len(re.findall(r'[^a-zA-Z0-9\s.,!?]', text)) / max(len(text), 1)
+        # Same count as len(re.findall(r'[^a-zA-Z0-9\s.,!?]', text)), without building the list
+        special_char_ratio = len(text.translate(_KEEP_PLAIN_CHARS)) / max(len(text), 1)
         
         if special_char_ratio > 0.3:  # More than 30% special characters
             return HeuristicResult(
@@ -267,20 +360,15 @@ class HeuristicsEngine:
         )
     
     
-    def heuristic_8_valid_urls(self, text: str, context: str = "query") -> HeuristicResult:
+    def heuristic_8_valid_urls(self, text: str, context: str = "query",
+                               scan: Optional[TextScan] = None) -> HeuristicResult:
         """
         RULE 8: Validate URLs and block suspicious/malicious domains
         """
-        url_pattern = r'https?://[^\s]+'
-        urls = re.findall(url_pattern, text)
-        
-        blocked_domains = [
-            "bit.ly", "tinyurl.com", "goo.gl",  # URL shorteners (can hide malicious sites)
-            "suspicious.com", "malware.com"  # Example blocked domains
-        ]
+        urls = re.findall(URL_PATTERN, text) if scan is None or scan.may_match(URL_PATTERN) else []
         
         for url in urls:
-            for domain in blocked_domains:
+            for domain in BLOCKED_DOMAINS:
                 if domain in url.lower():
                     return HeuristicResult(
                         passed=False,
@@ -311,19 +399,15 @@ class HeuristicsEngine:
         )
     
     
-    def heuristic_9_code_injection(self, text: str, context: str = "result") -> HeuristicResult:
+    def heuristic_9_code_injection(self, text: str, context: str = "result",
+                                   scan: Optional[TextScan] = None) -> HeuristicResult:
         """
         RULE 9: Detect potential code injection in results
         Check for unexpected Python/JavaScript code in tool outputs
         """
-        injection_patterns = [
-            r'<script[^>]*>.*?</script>',  # JavaScript
-            r'__import__\(',  # Python import
-            r'subprocess\.',  # Python subprocess
-            r'os\.system\(',  # OS commands
-        ]
-        
-        for pattern in injection_patterns:
+        for pattern in INJECTION_PATTERNS:
+            if scan is not None and not scan.may_match(pattern):
+                continue
             if re.search(pattern, text, re.IGNORECASE | re.DOTALL):
                 sanitized = re.sub(pattern, '[REMOVED_CODE]', text, flags=re.IGNORECASE | re.DOTALL)
                 return HeuristicResult(
@@ -385,22 +469,68 @@ class HeuristicsEngine:
         )
     
     
+    # ==================== SCANNER AND VERDICT CACHE ====================
+    
+    def _sync_rules(self):
+        """Recollect the scan literals and drop cached verdicts if the rule lists changed"""
+        key = (tuple(self.banned_words), tuple(self.blocked_patterns),
+               self.max_query_length, self.max_result_length)
+        if key != self._rules_key:
+            def anchors(patterns):
+                return [anchor for pattern in patterns for anchor in PATTERN_ANCHORS.get(pattern, ())]
+            
+            pii = list(PII_PATTERNS.values())
+            query_patterns = list(self.blocked_patterns) + pii + [URL_PATTERN]
+            self._scan_literals = {
+                "query": tuple(dict.fromkeys(list(self.banned_words) + anchors(query_patterns))),
+                "result": tuple(dict.fromkeys(list(self.banned_words) + anchors(pii + INJECTION_PATTERNS))),
+            }
+            self._verdicts.clear()
+            self._rules_key = key
+    
+    def scan(self, text: str, context: str = "query") -> TextScan:
+        """Literal pre-pass over text for the rules run in this context"""
+        self._sync_rules()
+        return TextScan(text, self._scan_literals[context])
+    
+    def _cached_verdict(self, context: str, text: str) -> Optional[List[HeuristicResult]]:
+        self._sync_rules()
+        results = self._verdicts.get((context, text))
+        if results is not None:
+            self._verdicts.move_to_end((context, text))
+            return list(results)
+        return None
+    
+    def _store_verdict(self, context: str, text: str, results: List[HeuristicResult]):
+        if self.verdict_cache_size <= 0:
+            return
+        self._verdicts[(context, text)] = list(results)
+        while len(self._verdicts) > self.verdict_cache_size:
+            self._verdicts.popitem(last=False)
+    
+    
     # ==================== MAIN VALIDATION METHODS ====================
     
     def validate_query(self, query: str) -> List[HeuristicResult]:
         """
         Run all query heuristics and return results
         """
+        cached = self._cached_verdict("query", query)
+        if cached is not None:
+            return cached
+        
+        scan = self.scan(query, "query")
         results = [
-            self.heuristic_1_banned_words(query, "query"),
-            self.heuristic_2_dangerous_commands(query, "query"),
+            self.heuristic_1_banned_words(query, "query", scan),
+            self.heuristic_2_dangerous_commands(query, "query", scan),
             self.heuristic_3_length_validation(query, "query"),
-            self.heuristic_4_pii_detection(query, "query"),
+            self.heuristic_4_pii_detection(query, "query", scan),
             self.heuristic_5_empty_or_whitespace(query, "query"),
             self.heuristic_6_repetitive_content(query, "query"),
             self.heuristic_7_special_characters(query, "query"),
-            self.heuristic_8_valid_urls(query, "query"),
+            self.heuristic_8_valid_urls(query, "query", scan),
         ]
+        self._store_verdict("query", query, results)
         return results
     
     
@@ -408,13 +538,19 @@ class HeuristicsEngine:
         """
         Run all result heuristics and return results
         """
+        cached = self._cached_verdict("result", result)
+        if cached is not None:
+            return cached
+        
+        scan = self.scan(result, "result")
         results = [
-            self.heuristic_1_banned_words(result, "result"),
+            self.heuristic_1_banned_words(result, "result", scan),
             self.heuristic_3_length_validation(result, "result"),
-            self.heuristic_4_pii_detection(result, "result"),
-            self.heuristic_9_code_injection(result, "result"),
+            self.heuristic_4_pii_detection(result, "result", scan),
+            self.heuristic_9_code_injection(result, "result", scan),
             self.heuristic_10_json_structure(result, "result"),
         ]
+        self._store_verdict("result", result, results)
         return results
     
     
@@ -0,0 +1,82 @@
+"""
+Tests for modules/heuristics.py (literal pre-pass and verdict cache)
+Run with: pytest test_heuristics.py
+"""
+
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from modules.heuristics import HeuristicsEngine
+
+FRAGMENTS = [
+    "hack", "HaCk", "hackeygen", "ſystem", "SYSTEM", "rm -rf /", "drop table x", "exec(", "eval(x)",
+    "passWord", "api_key", "apİ_key", "ıllegal", "token", "john@example.com", "555-123-4567", "555.123.4567",
+    "5551234567", "123-45-6789", "1234 5678 9012 3456", "١٢٣-٤٥-٦٧٨٩", "2024", "https://bit.ly/x",
+    "HTTPS://bit.ly/x", "http://ok.com/?u=http://b", "<script>alert(1)</script>", "<SCRIPT src=x>",
+    "__import__('os')", "subprocess.run", "os.system('ls')", "a" * 25, "test test test", "{", '{"a": 1}',
+    "!!!###", "　", "\x1c", "plain words here", "K", "\n",
+]
+
+
+def _payloads(count, seed=0):
+    rng = random.Random(seed)
+    separators = ["", " ", "  ", "\n", ".", "x"]
+    return ["".join(rng.choice(FRAGMENTS) + rng.choice(separators) for _ in range(rng.randint(0, 12)))
+            for _ in range(count)] + ["", "   ", "[1, 2", '{"ok": [1, 2, 3]}']
+
+
+def _unscanned(engine, text, context):
+    """Every rule on its own, without the pre-pass (the reference behaviour)"""
+    if context == "query":
+        rules = [engine.heuristic_1_banned_words, engine.heuristic_2_dangerous_commands,
+                 engine.heuristic_3_length_validation, engine.heuristic_4_pii_detection,
+                 engine.heuristic_5_empty_or_whitespace, engine.heuristic_6_repetitive_content,
+                 engine.heuristic_7_special_characters, engine.heuristic_8_valid_urls]
+    else:
+        rules = [engine.heuristic_1_banned_words, engine.heuristic_3_length_validation,
+                 engine.heuristic_4_pii_detection, engine.heuristic_9_code_injection,
+                 engine.heuristic_10_json_structure]
+    return [rule(text, context) for rule in rules]
+
+
+def test_prepass_gives_same_verdicts_as_each_rule_alone():
+    engine = HeuristicsEngine()
+    engine.verdict_cache_size = 0
+    for text in _payloads(3000):
+        for context in ("query", "result"):
+            validate = engine.validate_query if context == "query" else engine.validate_result
+            assert validate(text) == _unscanned(engine, text, context), (text, context)
+
+
+def test_prepass_skips_rules_without_anchors():
+    engine = HeuristicsEngine()
+    scan = engine.scan("plain text from 2024 and 2025", "result")
+    assert scan.literals == set()
+    assert not any(scan.may_match(p) for p in engine.blocked_patterns)
+    assert engine.scan("call 555-123-4567", "query").may_match(r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b')
+    assert engine.scan("a hackeygen b", "query").literals >= {"hack", "keygen"}
+
+
+def test_verdict_cache_hits_and_follows_rule_changes():
+    engine = HeuristicsEngine()
+    first = engine.apply_heuristics("find the quick fox", "query")
+    assert engine.validate_query("find the quick fox") == engine.validate_query("find the quick fox")
+    assert len(engine._verdicts) == 1
+    assert engine.apply_heuristics("find the quick fox", "query") == first
+
+    engine.banned_words.append("fox")
+    blocked = engine.apply_heuristics("find the quick fox", "query")
+    assert not blocked["allowed"]
+    assert blocked["blocked_rules"][0]["message"] == "Detected banned words: fox"
+
+
+def test_verdict_cache_is_bounded():
+    engine = HeuristicsEngine()
+    engine.verdict_cache_size = 5
+    for i in range(20):
+        engine.validate_result(f"result {i}")
+    assert len(engine._verdicts) == 5
+    assert ("result", "result 19") in engine._verdicts
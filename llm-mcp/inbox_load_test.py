@@ -0,0 +1,127 @@
+# inbox_load_test.py → Local load check for the durable inbox queue
+# Modes:
+#   python inbox_load_test.py                 enqueue/lease/ack straight against inbox_queue.DurableQueue
+#   python inbox_load_test.py --http URL      POST /enqueue against a running mcp_server_inbox.py
+#   python inbox_load_test.py --kill          SIGKILL a producer mid-burst and check nothing acknowledged is lost
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inbox_queue import DurableQueue
+
+
+def run_direct(count: int, batch: int, path: str):
+    queue = DurableQueue(path, max_pending=count + 1)
+    queue.clear()
+
+    start = time.perf_counter()
+    for i in range(count):
+        queue.enqueue(f"task {i}")
+    single = count / (time.perf_counter() - start)
+
+    queue.clear()
+    start = time.perf_counter()
+    for i in range(0, count, batch):
+        queue.enqueue_many(f"task {j}" for j in range(i, min(i + batch, count)))
+    batched = count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    done = 0
+    while True:
+        leases = queue.lease(batch)
+        if not leases:
+            break
+        for lease in leases:
+            done += queue.ack(lease.id, lease.lease_token)
+    drained = done / (time.perf_counter() - start)
+
+    print(f"enqueue (1 per commit):      {single:10.0f} tasks/s")
+    print(f"enqueue_many ({batch} per commit): {batched:10.0f} tasks/s")
+    print(f"lease({batch}) + ack:           {drained:10.0f} tasks/s ({done} drained)")
+    queue.close()
+
+
+def run_http(url: str, count: int, batch: int):
+    def post(body: dict) -> int:
+        request = urllib.request.Request(url.rstrip("/") + "/enqueue", data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    rejected = 0
+    start = time.perf_counter()
+    for i in range(0, count, batch):
+        tasks = [f"load task {j}" for j in range(i, min(i + batch, count))]
+        status = post({"task": tasks[0]} if batch == 1 else {"tasks": tasks})
+        rejected += status == 429
+    elapsed = time.perf_counter() - start
+    print(f"HTTP /enqueue: {count / elapsed:.0f} tasks/s ({batch} per request, {rejected} requests got 429)")
+
+
+def _producer(path: str):
+    """Child process: enqueue forever, printing each committed id so the parent knows what was acknowledged"""
+    queue = DurableQueue(path, max_pending=10 ** 9)
+    i = 0
+    while True:
+        task_id = queue.enqueue(f"burst {i}")
+        sys.stdout.write(f"{task_id}\n")
+        sys.stdout.flush()
+        i += 1
+
+
+def run_kill(path: str, seconds: float):
+    DurableQueue(path).clear()
+    child = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--producer", path],
+                             stdout=subprocess.PIPE, text=True)
+    time.sleep(seconds)
+    child.send_signal(signal.SIGKILL)
+    output, _ = child.communicate()
+    committed = [int(line) for line in output.split("\n")[:-1]]  # a cut-off last line was never acknowledged
+
+    queue = DurableQueue(path)
+    stored = {lease.id for lease in queue.lease(len(committed) + 1000)}
+    lost = [task_id for task_id in committed if task_id not in stored]
+    print(f"producer killed after {len(committed)} acknowledged enqueues; "
+          f"{len(stored)} tasks on disk, {len(lost)} acknowledged tasks lost")
+    queue.close()
+    return not lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load check for the durable inbox queue")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--db", default=None, help="queue file (default: a temporary file)")
+    parser.add_argument("--http", metavar="URL", help="base URL of a running inbox HTTP API")
+    parser.add_argument("--kill", action="store_true")
+    parser.add_argument("--producer", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.producer:
+        _producer(args.producer)
+        return
+    if args.http:
+        run_http(args.http, args.count, args.batch)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "inbox.sqlite3")
+        if args.kill:
+            sys.exit(0 if run_kill(path, 1.0) else 1)
+        run_direct(args.count, args.batch, path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# inbox_queue.py → Durable leased work queue for mcp_server_inbox.py
+# Role: sqlite (WAL) backed FIFO with visibility-timeout leases, ack/nack,
+# dead-lettering, batched dequeue and a pending-size cap for backpressure.
+
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_VISIBILITY_TIMEOUT = 300.0   # seconds a leased task stays hidden before redelivery
+DEFAULT_MAX_ATTEMPTS = 5             # deliveries before a task is dead-lettered
+DEFAULT_MAX_PENDING = 10000          # ready + leased tasks; enqueue is refused beyond this
+
+READY, LEASED, DEAD = 0, 1, 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    body        TEXT    NOT NULL,
+    state       INTEGER NOT NULL DEFAULT 0,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    visible_at  REAL    NOT NULL,
+    lease_token TEXT,
+    enqueued_at REAL    NOT NULL,
+    last_error  TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks (state, visible_at, id);
+"""
+
+
+class QueueFull(Exception):
+    """Raised by enqueue when the pending cap is reached; retry after consumers catch up"""
+
+
+@dataclass
+class Lease:
+    id: int
+    task: str
+    attempts: int
+    lease_token: str
+    visible_at: float
+
+    def to_dict(self) -> Dict:
+        return {"id": self.id, "task": self.task, "attempts": self.attempts,
+                "lease_token": self.lease_token, "lease_expires_at": self.visible_at}
+
+
+class DurableQueue:
+    """
+    At-least-once task queue in a single sqlite file
+
+    Every enqueue is committed before it returns (WAL, synchronous=NORMAL:
+    committed tasks survive a killed process; an OS crash may lose the last
+    few). A leased task is hidden for the visibility timeout and delivered
+    again if it is not acked in time; nack makes it visible again (optionally
+    after a delay). After max_attempts deliveries it is moved to the dead
+    letter state instead of being redelivered.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, max_pending: int = DEFAULT_MAX_PENDING):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared by the HTTP thread and the MCP loop, serialized by a lock
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._pending = self._db.execute("SELECT COUNT(*) FROM tasks WHERE state < ?", (DEAD,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # ─── producers ───────────────────────────────────────────────
+
+    def enqueue(self, task: str, delay: float = 0.0) -> int:
+        return self.enqueue_many([task], delay)[0]
+
+    def enqueue_many(self, tasks: Iterable[str], delay: float = 0.0) -> List[int]:
+        """Append tasks in one transaction; all or none are accepted"""
+        tasks = list(tasks)
+        now = time.time()
+        with self._lock:
+            if self._pending + len(tasks) > self.max_pending:
+                raise QueueFull(f"inbox has {self._pending} pending tasks (limit {self.max_pending})")
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [self._db.execute(
+                    "INSERT INTO tasks (body, visible_at, enqueued_at) VALUES (?, ?, ?)",
+                    (task, now + delay, now)).lastrowid for task in tasks]
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._pending += len(ids)
+        return ids
+
+    # ─── consumers ───────────────────────────────────────────────
+
+    def lease(self, limit: int = 1, visibility_timeout: Optional[float] = None) -> List[Lease]:
+        """Oldest visible tasks, hidden from other consumers until acked or the lease expires"""
+        now = time.time()
+        expires = now + (self.visibility_timeout if visibility_timeout is None else visibility_timeout)
+        token = secrets.token_hex(8)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases that already used every attempt go to the dead letters
+                dead = self._db.execute(
+                    "UPDATE tasks SET state = ?, lease_token = NULL, "
+                    "last_error = COALESCE(last_error, 'lease expired') "
+                    "WHERE state = ? AND visible_at <= ? AND attempts >= ?",
+                    (DEAD, LEASED, now, self.max_attempts)).rowcount
+                rows = self._db.execute(
+                    "UPDATE tasks SET state = ?, attempts = attempts + 1, visible_at = ?, lease_token = ? "
+                    "WHERE id IN (SELECT id FROM tasks WHERE state < ? AND visible_at <= ? ORDER BY id LIMIT ?) "
+                    "RETURNING id, body, attempts",
+                    (LEASED, expires, token, DEAD, now, max(0, limit))).fetchall()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._pending -= dead
+        return [Lease(id=r[0], task=r[1], attempts=r[2], lease_token=token, visible_at=expires)
+                for r in sorted(rows)]
+
+    def ack(self, task_id: int, lease_token: str) -> bool:
+        """Delete a leased task; False if the lease expired and the task was redelivered"""
+        with self._lock:
+            done = self._db.execute("DELETE FROM tasks WHERE id = ? AND state = ? AND lease_token = ?",
+                                    (task_id, LEASED, lease_token)).rowcount
+            self._pending -= done
+        return bool(done)
+
+    def nack(self, task_id: int, lease_token: str, delay: float = 0.0, error: str = None) -> bool:
+        """Give a leased task back (visible after delay), or dead-letter it if out of attempts"""
+        with self._lock:
+            row = self._db.execute("SELECT attempts FROM tasks WHERE id = ? AND state = ? AND lease_token = ?",
+                                   (task_id, LEASED, lease_token)).fetchone()
+            if row is None:
+                return False
+            state = DEAD if row[0] >= self.max_attempts else READY
+            self._db.execute(
+                "UPDATE tasks SET state = ?, visible_at = ?, lease_token = NULL, last_error = ? WHERE id = ?",
+                (state, time.time() + delay, error, task_id))
+            self._pending -= state == DEAD
+        return True
+
+    def take(self) -> Optional[str]:
+        """Lease and ack the next task in one step (at-most-once, for the fetch_task tool)"""
+        leases = self.lease(1)
+        if not leases:
+            return None
+        self.ack(leases[0].id, leases[0].lease_token)
+        return leases[0].task
+
+    # ─── inspection / maintenance ────────────────────────────────
+
+    def peek(self, limit: int = 10) -> List[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT body FROM tasks WHERE state < ? ORDER BY id LIMIT ?",
+                                    (DEAD, max(0, limit))).fetchall()
+        return [r[0] for r in rows]
+
+    def dead_letters(self, limit: int = 50) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, body, attempts, last_error FROM tasks WHERE state = ? ORDER BY id LIMIT ?",
+                (DEAD, max(0, limit))).fetchall()
+        return [{"id": r[0], "task": r[1], "attempts": r[2], "error": r[3]} for r in rows]
+
+    def requeue_dead(self, task_ids: Optional[List[int]] = None) -> int:
+        """Make dead-lettered tasks (all, or the given ids) ready again with fresh attempts"""
+        if task_ids is not None and not task_ids:
+            return 0
+        with self._lock:
+            query = "UPDATE tasks SET state = ?, attempts = 0, visible_at = ?, last_error = NULL WHERE state = ?"
+            params = [READY, time.time(), DEAD]
+            if task_ids is not None:
+                query += f" AND id IN ({','.join('?' * len(task_ids))})"
+                params += list(task_ids)
+            count = self._db.execute(query, params).rowcount
+            self._pending += count
+        return count
+
+    def clear(self) -> int:
+        with self._lock:
+            count = self._db.execute("DELETE FROM tasks").rowcount
+            self._pending = 0
+        return count
+
+    def stats(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            ready, leased, dead = self._db.execute(
+                "SELECT COALESCE(SUM(state < ? AND visible_at <= ?), 0), "
+                "COALESCE(SUM(state = ? AND visible_at > ?), 0), COALESCE(SUM(state = ?), 0) FROM tasks",
+                (DEAD, now, LEASED, now, DEAD)).fetchone()
+        return {"ready": ready, "leased": leased, "dead": dead, "pending": self._pending,
+                "max_pending": self.max_pending}
@@ -13,6 +13,7 @@ from pathlib import Path
 import requests
 from markitdown import MarkItDown
 import time
+from modules.vector_index import AdaptiveIndex
 from models import AddInput, AddOutput, SqrtInput, SqrtOutput, StringsToIntsInput, StringsToIntsOutput, ExpSumInput, ExpSumOutput, PythonCodeInput, PythonCodeOutput, UrlInput, FilePathInput, MarkdownInput, MarkdownOutput, ChunkListOutput
 from tqdm import tqdm
 import hashlib
@@ -107,6 +108,8 @@ def search_documents(query: str) -> list[str]:
         D, I = index.search(query_vec, k=5)
         results = []
         for idx in I[0]:
+            if idx < 0:  # ANN tiers pad with -1 when fewer than k hits
+                continue
             data = metadata[idx]
             results.append(f"{data['chunk']}\n[Source: {data['doc']}, ID: {data['chunk_id']}]")
         return results
@@ -317,7 +320,7 @@ def process_documents():
 
     CACHE_META = json.loads(CACHE_FILE.read_text()) if CACHE_FILE.exists() else {}
     metadata = json.loads(METADATA_FILE.read_text()) if METADATA_FILE.exists() else []
-    index = faiss.read_index(str(INDEX_FILE)) if INDEX_FILE.exists() else None
+    index = AdaptiveIndex.load(INDEX_FILE) if INDEX_FILE.exists() else AdaptiveIndex()
 
     for file in DOC_PATH.glob("*.*"):
         fhash = file_hash(file)
@@ -368,9 +371,6 @@ def process_documents():
                 })
 
             if embeddings_for_file:
-                if index is None:
-                    dim = len(embeddings_for_file[0])
-                    index = faiss.IndexFlatL2(dim)
                 index.add(np.stack(embeddings_for_file))
                 metadata.extend(new_metadata)
                 CACHE_META[file.name] = fhash
@@ -378,12 +378,18 @@ def process_documents():
                 # ✅ Immediately save index and metadata
                 CACHE_FILE.write_text(json.dumps(CACHE_META, indent=2))
                 METADATA_FILE.write_text(json.dumps(metadata, indent=2))
-                faiss.write_index(index, str(INDEX_FILE))
+                index.save(INDEX_FILE)
                 mcp_log("SAVE", f"Saved FAISS index and metadata after processing {file.name}")
 
         except Exception as e:
             mcp_log("ERROR", f"Failed to process {file.name}: {e}")
 
+    # A tier migration may still be running; persist the final index once it lands
+    if index.ntotal:
+        index.wait_for_rebuild()
+        index.save(INDEX_FILE)
+        mcp_log("INFO", f"Index tier: {index.tier} ({index.ntotal} vectors)")
+
 
 
 def ensure_faiss_ready():
@@ -6,12 +6,10 @@ from dataclasses import dataclass
 import urllib.parse
 import sys
 import traceback
-import asyncio
-from datetime import datetime, timedelta
-import time
-import re
 import os
 
+from web_fetch import HttpPool, RateLimiter, ResponseCache, fetch_text, MAX_CONTENT_CHARS
+
 
 @dataclass
 class SearchResult:
@@ -21,36 +19,15 @@ class SearchResult:
     position: int
 
 
-class RateLimiter:
-    def __init__(self, requests_per_minute: int = 30):
-        self.requests_per_minute = requests_per_minute
-        self.requests = []
-
-    async def acquire(self):
-        now = datetime.now()
-        # Remove requests older than 1 minute
-        self.requests = [
-            req for req in self.requests if now - req < timedelta(minutes=1)
-        ]
-
-        if len(self.requests) >= self.requests_per_minute:
-            # Wait until we can make another request
-            wait_time = 60 - (now - self.requests[0]).total_seconds()
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-
-        self.requests.append(now)
-
-
 class DuckDuckGoSearcher:
     BASE_URL = "https://html.duckduckgo.com/html"
     HEADERS = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
     }
 
-    def __init__(self):
+    def __init__(self, pool: HttpPool):
         self.rate_limiter = RateLimiter()
-        self._verify_ssl = not (os.getenv("INSECURE_SSL", "0") in ("1", "true", "TRUE"))
+        self.pool = pool
 
     def format_results_for_llm(self, results: List[SearchResult]) -> str:
         """Format results in a natural language style that's easier for LLMs to process"""
@@ -84,11 +61,11 @@ class DuckDuckGoSearcher:
 
             await ctx.info(f"Searching DuckDuckGo for: {query}")
 
-            async with httpx.AsyncClient(verify=self._verify_ssl) as client:
-                response = await client.post(
+            async with self.pool.host_slot(self.BASE_URL):
+                response = await self.pool.client.post(
                     self.BASE_URL, data=data, headers=self.HEADERS, timeout=30.0
                 )
-                response.raise_for_status()
+            response.raise_for_status()
 
             # Parse HTML response
             soup = BeautifulSoup(response.text, "html.parser")
@@ -148,9 +125,16 @@ class DuckDuckGoSearcher:
 
 
 class WebContentFetcher:
-    def __init__(self):
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    }
+
+    def __init__(self, pool: HttpPool, cache: Optional[ResponseCache] = None,
+                 max_chars: int = MAX_CONTENT_CHARS):
         self.rate_limiter = RateLimiter(requests_per_minute=20)
-        self._verify_ssl = not (os.getenv("INSECURE_SSL", "0") in ("1", "true", "TRUE"))
+        self.pool = pool
+        self.cache = cache
+        self.max_chars = max_chars
 
     async def fetch_and_parse(self, url: str, ctx: Context) -> str:
         """Fetch and parse content from a webpage"""
@@ -159,41 +143,12 @@ class WebContentFetcher:
 
             await ctx.info(f"Fetching content from: {url}")
 
-            async with httpx.AsyncClient(verify=self._verify_ssl) as client:
-                response = await client.get(
-                    url,
-                    headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                    },
-                    follow_redirects=True,
-                    timeout=30.0,
-                )
-                response.raise_for_status()
-
-            # Parse the HTML
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Remove script and style elements
-            for element in soup(["script", "style", "nav", "header", "footer"]):
-                element.decompose()
-
-            # Get the text content
-            text = soup.get_text()
-
-            # Clean up the text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = " ".join(chunk for chunk in chunks if chunk)
-
-            # Remove extra whitespace
-            text = re.sub(r"\s+", " ", text).strip()
-
-            # Truncate if too long
-            if len(text) > 8000:
-                text = text[:8000] + "... [content truncated]"
+            # Streams the page and stops once max_chars of text are extracted;
+            # an unchanged page (304 on a conditional GET) comes from the disk cache
+            text, source = await fetch_text(self.pool, url, self.HEADERS, self.cache, self.max_chars)
 
             await ctx.info(
-                f"Successfully fetched and parsed content ({len(text)} characters)"
+                f"Successfully fetched and parsed content ({len(text)} characters, from {source})"
             )
             return text
 
@@ -210,8 +165,11 @@ class WebContentFetcher:
 
 # Initialize FastMCP server
 mcp = FastMCP("ddg-search")
-searcher = DuckDuckGoSearcher()
-fetcher = WebContentFetcher()
+http_pool = HttpPool(verify=not (os.getenv("INSECURE_SSL", "0") in ("1", "true", "TRUE")))
+searcher = DuckDuckGoSearcher(http_pool)
+fetcher = WebContentFetcher(
+    http_pool, None if os.getenv("WEB_CACHE", "1") in ("0", "false", "FALSE") else ResponseCache()
+)
 
 
 @mcp.tool()
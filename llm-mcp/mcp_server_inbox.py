@@ -1,18 +1,22 @@
 import os
 import json
 import threading
-import asyncio
-from typing import Optional, List
-from collections import deque
+from typing import Optional
 
 from mcp.server.fastmcp import FastMCP, Context
 from dotenv import load_dotenv
 
+from inbox_queue import DurableQueue, QueueFull
+
 load_dotenv()
 
-# Simple in-memory queue with thread-safe access
-_queue: deque[str] = deque()
-_lock = asyncio.Lock()
+# Durable sqlite-backed queue shared by the HTTP enqueue thread and the MCP tools
+_queue = DurableQueue(
+    os.getenv("INBOX_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "inbox_store", "inbox.sqlite3")),
+    visibility_timeout=float(os.getenv("INBOX_VISIBILITY_TIMEOUT", "300")),
+    max_attempts=int(os.getenv("INBOX_MAX_ATTEMPTS", "5")),
+    max_pending=int(os.getenv("INBOX_MAX_PENDING", "10000")),
+)
 
 mcp = FastMCP("local-inbox")
 
@@ -23,12 +27,43 @@ async def fetch_task(ctx: Context) -> str:
     Fetch and remove the next task from the inbox queue.
     Returns 'NONE' if queue is empty.
     """
-    async with _lock:
-        if not _queue:
-            return "NONE"
-        task = _queue.popleft()
-        await ctx.info("Fetched one task from inbox")
-        return task
+    task = _queue.take()
+    if task is None:
+        return "NONE"
+    await ctx.info("Fetched one task from inbox")
+    return task
+
+
+@mcp.tool()
+async def lease_tasks(limit: int = 1, visibility_timeout: Optional[float] = None, ctx: Context = None) -> str:
+    """
+    Lease up to 'limit' tasks without removing them. Each must be acked with
+    ack_task(id, lease_token) once done, or it is delivered again after the
+    visibility timeout (seconds). Returns a JSON list of
+    {id, task, attempts, lease_token, lease_expires_at}.
+    """
+    leases = _queue.lease(limit, visibility_timeout)
+    if ctx:
+        await ctx.info(f"Leased {len(leases)} tasks")
+    return json.dumps([lease.to_dict() for lease in leases])
+
+
+@mcp.tool()
+async def ack_task(task_id: int, lease_token: str) -> str:
+    """
+    Mark a leased task as done and remove it. Returns 'OK', or 'EXPIRED' if the
+    lease ran out and the task may have been handed to another consumer.
+    """
+    return "OK" if _queue.ack(task_id, lease_token) else "EXPIRED"
+
+
+@mcp.tool()
+async def nack_task(task_id: int, lease_token: str, delay_seconds: float = 0.0, error: str = "") -> str:
+    """
+    Give a leased task back to the queue (visible again after delay_seconds).
+    Tasks that have used all their attempts go to the dead letters instead.
+    """
+    return "OK" if _queue.nack(task_id, lease_token, delay_seconds, error or None) else "EXPIRED"
 
 
 @mcp.tool()
@@ -36,20 +71,37 @@ async def peek_tasks(limit: int = 10, ctx: Context = None) -> list[str]:
     """
     Peek at up to 'limit' tasks without removing them.
     """
-    async with _lock:
-        items = list(_queue)[:max(0, limit)]
+    items = _queue.peek(limit)
     if ctx:
         await ctx.info(f"Peeked {len(items)} tasks")
     return items
 
 
+@mcp.tool()
+async def dead_letter_tasks(limit: int = 50, requeue: bool = False) -> str:
+    """
+    List tasks that failed every delivery attempt (JSON list of {id, task, attempts, error}).
+    With requeue=True they are made ready again instead.
+    """
+    if requeue:
+        return json.dumps({"requeued": _queue.requeue_dead()})
+    return json.dumps(_queue.dead_letters(limit))
+
+
+@mcp.tool()
+async def inbox_stats() -> str:
+    """
+    Queue sizes as JSON: ready, leased, dead, pending and the pending limit.
+    """
+    return json.dumps(_queue.stats())
+
+
 @mcp.tool()
 async def clear_tasks(ctx: Context) -> str:
     """
     Clear all tasks from the inbox.
     """
-    async with _lock:
-        _queue.clear()
+    _queue.clear()
     await ctx.info("Cleared inbox")
     return "OK"
 
@@ -71,16 +123,26 @@ def start_http_api(host: str, port: int, path: str):
             data = await request.json()
         except Exception:
             return JSONResponse({"error": "invalid JSON"}, status_code=400)
-        task = data.get("task")
-        if not task or not isinstance(task, str):
-            return JSONResponse({"error": "task (string) required"}, status_code=400)
-        async with _lock:
-            _queue.append(task)
-        return JSONResponse({"status": "enqueued", "size": len(_queue)})
+        if not isinstance(data, dict):
+            return JSONResponse({"error": "JSON object required"}, status_code=400)
+        # {"task": "..."} or a batch {"tasks": ["...", ...]} (one commit for the batch)
+        tasks = data.get("tasks") if "tasks" in data else [data.get("task")]
+        if not tasks or not isinstance(tasks, list) or not all(t and isinstance(t, str) for t in tasks):
+            return JSONResponse({"error": "task (string) or tasks (list of strings) required"}, status_code=400)
+        try:
+            ids = _queue.enqueue_many(tasks)
+        except QueueFull as e:
+            # Backpressure: producers should slow down until consumers catch up
+            return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": "1"})
+        return JSONResponse({"status": "enqueued", "ids": ids, "size": _queue.pending})
+
+    async def stats(_: Request):
+        return JSONResponse(_queue.stats())
 
     routes = [
         Route("/health", health, methods=["GET"]),
         Route("/enqueue", enqueue, methods=["POST"]),
+        Route("/stats", stats, methods=["GET"]),
     ]
 
     app = Starlette(routes=routes)
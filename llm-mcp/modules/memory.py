@@ -7,11 +7,13 @@
 
 # Use local embedding server (e.g., Ollama) to vectorize input
 
-# Filter memory based on type/tags/session
+# Filter memory based on type/tags/session inside the vector search (per-partition id lists)
+
+# Persist the index and items so memory survives restarts without re-embedding
 
 # Dependencies:
 
-# faiss, requests, pydantic
+# faiss (via vector_index), requests, pydantic
 
 # Used by: context.py, loop.py
 
@@ -21,12 +23,18 @@
 
 # modules/memory.py
 
-from typing import List, Optional, Literal
+import json
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Literal
 from pydantic import BaseModel
 from datetime import datetime
 import requests
 import numpy as np
-import faiss
+from modules.vector_index import AdaptiveIndex
+
+EMBED_BATCH_SIZE = 64
+SAVE_EVERY = 32  # single adds between index checkpoints; items are appended immediately
 
 
 class MemoryItem(BaseModel):
@@ -40,12 +48,35 @@ class MemoryItem(BaseModel):
 
 
 class MemoryManager:
-    def __init__(self, embedding_model_url: str, model_name: str = "nomic-embed-text"):
+    def __init__(
+        self,
+        embedding_model_url: str,
+        model_name: str = "nomic-embed-text",
+        persist_dir: Optional[str] = None
+    ):
         self.embedding_model_url = embedding_model_url
         self.model_name = model_name
-        self.index: Optional[faiss.IndexFlatL2] = None
+        self.index = AdaptiveIndex()
         self.data: List[MemoryItem] = []
-        self.embeddings: List[np.ndarray] = []
+
+        # Partitions: metadata value -> row ids, so filters become FAISS id selectors
+        self._by_type: Dict[str, List[int]] = defaultdict(list)
+        self._by_session: Dict[str, List[int]] = defaultdict(list)
+        self._by_tag: Dict[str, List[int]] = defaultdict(list)
+
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self._unsaved = 0
+        if self.persist_dir:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    @property
+    def _index_path(self) -> Path:
+        return self.persist_dir / "memory.index"
+
+    @property
+    def _items_path(self) -> Path:
+        return self.persist_dir / "memory_items.jsonl"
 
     def _get_embedding(self, text: str) -> np.ndarray:
         response = requests.post(
@@ -55,15 +86,67 @@ class MemoryManager:
         response.raise_for_status()
         return np.array(response.json()["embedding"], dtype=np.float32)
 
-    def add(self, item: MemoryItem):
-        embedding = self._get_embedding(item.text)
-        self.embeddings.append(embedding)
+    def _get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts per request via Ollama's /api/embed; falls back to one by one."""
+        if self.embedding_model_url.endswith("/api/embeddings"):
+            batch_url = self.embedding_model_url[:-len("embeddings")] + "embed"
+            try:
+                vectors = []
+                for start in range(0, len(texts), EMBED_BATCH_SIZE):
+                    response = requests.post(
+                        batch_url,
+                        json={"model": self.model_name, "input": texts[start:start + EMBED_BATCH_SIZE]}
+                    )
+                    response.raise_for_status()
+                    vectors.extend(response.json()["embeddings"])
+                return np.array(vectors, dtype=np.float32)
+            except (requests.RequestException, KeyError):
+                pass  # older Ollama without /api/embed
+        return np.stack([self._get_embedding(text) for text in texts])
+
+    def _register(self, item: MemoryItem) -> None:
+        row = len(self.data)
         self.data.append(item)
+        self._by_type[item.type].append(row)
+        if item.session_id:
+            self._by_session[item.session_id].append(row)
+        for tag in set(item.tags):
+            self._by_tag[tag].append(row)
 
-        # Init or add to index
-        if self.index is None:
-            self.index = faiss.IndexFlatL2(len(embedding))
+    def add(self, item: MemoryItem):
+        embedding = self._get_embedding(item.text)
         self.index.add(np.stack([embedding]))
+        self._register(item)
+        self._persist_items([item])
+
+    def bulk_add(self, items: List[MemoryItem]):
+        if not items:
+            return
+        self.index.add(self._get_embeddings([item.text for item in items]))
+        for item in items:
+            self._register(item)
+        self._persist_items(items, checkpoint=True)
+
+    def _allowed_rows(
+        self,
+        type_filter: Optional[str],
+        tag_filter: Optional[List[str]],
+        session_filter: Optional[str]
+    ) -> Optional[np.ndarray]:
+        """Row ids matching every filter, or None when unfiltered."""
+        partitions = []
+        if type_filter:
+            partitions.append(set(self._by_type.get(type_filter, ())))
+        if session_filter:
+            partitions.append(set(self._by_session.get(session_filter, ())))
+        if tag_filter:
+            partitions.append({row for tag in tag_filter for row in self._by_tag.get(tag, ())})
+        if not partitions:
+            return None
+        # Intersect smallest-first so the common single-session case stays cheap
+        partitions.sort(key=len)
+        rows = partitions[0].intersection(*partitions[1:])
+        return np.fromiter(sorted(rows), dtype=np.int64, count=len(rows))
 
     def retrieve(
         self,
@@ -73,31 +156,57 @@ class MemoryManager:
         tag_filter: Optional[List[str]] = None,
         session_filter: Optional[str] = None
     ) -> List[MemoryItem]:
-        if not self.index or len(self.data) == 0:
+        if self.index.ntotal == 0 or len(self.data) == 0:
             return []
 
-        query_vec = self._get_embedding(query).reshape(1, -1)
-        D, I = self.index.search(query_vec, top_k * 2)  # overfetch for filtering
-
-        results = []
-        for idx in I[0]:
-            if idx >= len(self.data):
-                continue
-            item = self.data[idx]
-
-            if type_filter and item.type != type_filter:
-                continue
-            if tag_filter and not any(tag in item.tags for tag in tag_filter):
-                continue
-            if session_filter and item.session_id != session_filter:
-                continue
-
-            results.append(item)
-            if len(results) >= top_k:
-                break
-
-        return results
+        allowed = self._allowed_rows(type_filter, tag_filter, session_filter)
+        if allowed is not None and not len(allowed):
+            return []
 
-    def bulk_add(self, items: List[MemoryItem]):
+        query_vec = self._get_embedding(query).reshape(1, -1)
+        D, I = self.index.search(query_vec, top_k, ids=allowed)
+        return [self.data[idx] for idx in I[0] if 0 <= idx < len(self.data)]
+
+    # ---------- persistence ----------
+
+    def _persist_items(self, items: List[MemoryItem], checkpoint: bool = False) -> None:
+        if not self.persist_dir:
+            return
+        # Items are append-only, so a crash loses at most the index checkpoint, not the text
+        with open(self._items_path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(item.model_dump_json() + "\n")
+        self._unsaved += len(items)
+        if checkpoint or self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def save(self) -> None:
+        """Checkpoint the FAISS index (items are already on disk)."""
+        if not self.persist_dir or self.index.ntotal == 0:
+            return
+        self.index.save(self._index_path)
+        self._unsaved = 0
+
+    def _load(self) -> None:
+        if not self._items_path.exists():
+            return
+        items = []
+        with open(self._items_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    items.append(MemoryItem(**json.loads(line)))
+
+        if self._index_path.exists():
+            self.index = AdaptiveIndex.load(self._index_path)
+        indexed = self.index.ntotal
+        if indexed > len(items):
+            # Index is ahead of the item log (should not happen): rebuild from the log
+            self.index, indexed = AdaptiveIndex(), 0
         for item in items:
-            self.add(item)
+            self._register(item)
+
+        missing = items[indexed:]
+        if missing:
+            # Only items written after the last checkpoint need embedding again
+            self.index.add(self._get_embeddings([item.text for item in missing]))
+            self.save()
@@ -0,0 +1,102 @@
+# test_inbox_queue.py → Tests for inbox_queue.py (leases, dead letters, backpressure, durability)
+# Run with: pytest test_inbox_queue.py
+
+import sys
+import os
+import subprocess
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inbox_queue import DurableQueue, QueueFull
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "inbox.sqlite3")
+
+
+def test_fifo_take_and_peek(db_path):
+    queue = DurableQueue(db_path)
+    queue.enqueue_many(["a", "b", "c"])
+    assert queue.peek(2) == ["a", "b"]
+    assert [queue.take() for _ in range(4)] == ["a", "b", "c", None]
+    assert queue.pending == 0
+
+
+def test_lease_hides_until_ack_or_timeout(db_path):
+    queue = DurableQueue(db_path)
+    queue.enqueue_many(["a", "b", "c"])
+    first = queue.lease(2, visibility_timeout=0.2)
+    assert [l.task for l in first] == ["a", "b"]
+    assert [l.task for l in queue.lease(5)] == ["c"]
+    assert queue.ack(first[0].id, first[0].lease_token)
+
+    time.sleep(0.25)
+    again = queue.lease(5)
+    assert [(l.task, l.attempts) for l in again] == [("b", 2)]
+    # The stale lease on "b" can no longer ack it
+    assert not queue.ack(first[1].id, first[1].lease_token)
+    assert queue.ack(again[0].id, again[0].lease_token)
+
+
+def test_nack_delay_and_dead_letter(db_path):
+    queue = DurableQueue(db_path, max_attempts=2)
+    queue.enqueue("flaky")
+    lease = queue.lease()[0]
+    assert queue.nack(lease.id, lease.lease_token, delay=0.2, error="boom")
+    assert queue.lease() == []
+    time.sleep(0.25)
+    lease = queue.lease()[0]
+    assert lease.attempts == 2
+    assert queue.nack(lease.id, lease.lease_token, error="boom again")
+
+    assert queue.lease() == []
+    assert queue.dead_letters() == [{"id": lease.id, "task": "flaky", "attempts": 2, "error": "boom again"}]
+    assert queue.stats()["dead"] == 1 and queue.pending == 0
+    assert queue.requeue_dead([]) == 0
+    assert queue.requeue_dead([lease.id + 1]) == 0
+    assert queue.requeue_dead() == 1
+    assert queue.take() == "flaky"
+
+
+def test_expired_lease_out_of_attempts_is_dead_lettered(db_path):
+    queue = DurableQueue(db_path, max_attempts=1)
+    queue.enqueue("crashes consumer")
+    queue.lease(visibility_timeout=0.0)
+    assert queue.lease() == []
+    assert queue.dead_letters()[0]["error"] == "lease expired"
+
+
+def test_backpressure(db_path):
+    queue = DurableQueue(db_path, max_pending=3)
+    queue.enqueue_many(["a", "b"])
+    with pytest.raises(QueueFull):
+        queue.enqueue_many(["c", "d"])
+    assert queue.pending == 2  # rejected batch is all-or-nothing
+    queue.enqueue("c")
+    queue.take()
+    queue.enqueue("d")
+    assert queue.peek() == ["b", "c", "d"]
+
+
+def test_reopen_keeps_tasks_and_leases(db_path):
+    queue = DurableQueue(db_path)
+    queue.enqueue_many(["a", "b"])
+    lease = queue.lease(1)[0]
+    queue.close()
+
+    reopened = DurableQueue(db_path)
+    assert reopened.pending == 2
+    assert [l.task for l in reopened.lease(5)] == ["b"]
+    assert reopened.ack(lease.id, lease.lease_token)
+
+
+def test_producer_killed_mid_burst_loses_nothing_acknowledged(db_path):
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inbox_load_test.py")
+    result = subprocess.run([sys.executable, script, "--kill", "--db", db_path],
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert " 0 acknowledged tasks lost" in result.stdout
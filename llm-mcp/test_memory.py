@@ -0,0 +1,69 @@
+# test_memory.py → Tests for modules/memory.py (filtered search + persistence)
+# Run with: pytest test_memory.py
+
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from modules.memory import MemoryManager, MemoryItem
+
+
+class StubMemory(MemoryManager):
+    """Deterministic bag-of-letters embeddings instead of an Ollama server."""
+
+    def __init__(self, *args, **kwargs):
+        self.embedded = 0
+        super().__init__("http://stub/api/embeddings", *args, **kwargs)
+
+    def _get_embedding(self, text):
+        self.embedded += 1
+        vec = np.zeros(26, dtype=np.float32)
+        for ch in text.lower():
+            if "a" <= ch <= "z":
+                vec[ord(ch) - 97] += 1
+        return vec
+
+    def _get_embeddings(self, texts):
+        return np.stack([self._get_embedding(t) for t in texts])
+
+
+def _items():
+    items = []
+    for i in range(40):
+        items.append(MemoryItem(
+            text=f"note {i} about {'cats' if i % 2 else 'dogs'}",
+            type="tool_output" if i % 4 == 0 else "fact",
+            tags=["pets"] if i % 5 == 0 else [],
+            session_id=f"s{i % 3}",
+        ))
+    return items
+
+
+def test_filtered_retrieve_returns_top_k():
+    memory = StubMemory()
+    memory.bulk_add(_items())
+
+    results = memory.retrieve("dogs", top_k=3, type_filter="tool_output", session_filter="s0")
+    assert len(results) == 3
+    assert all(r.type == "tool_output" and r.session_id == "s0" for r in results)
+
+    tagged = memory.retrieve("cats", top_k=10, tag_filter=["pets"])
+    assert len(tagged) == 8 and all("pets" in r.tags for r in tagged)
+
+    assert memory.retrieve("cats", top_k=3, session_filter="missing") == []
+
+
+def test_persistence_survives_restart_without_reembedding(tmp_path):
+    directory = tmp_path / "store"
+    memory = StubMemory(persist_dir=str(directory))
+    memory.bulk_add(_items())
+    memory.add(MemoryItem(text="late fact", session_id="s9"))  # not yet checkpointed
+
+    restored = StubMemory(persist_dir=str(directory))
+    assert len(restored.data) == 41
+    assert restored.index.ntotal == 41
+    assert restored.embedded == 1  # only the item after the last checkpoint
+    assert restored.retrieve("late fact", top_k=1, session_filter="s9")[0].text == "late fact"
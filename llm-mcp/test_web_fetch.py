@@ -0,0 +1,194 @@
+# test_web_fetch.py → Tests for web_fetch.py against a local HTTP fixture server
+# Run with: pytest test_web_fetch.py
+
+import sys
+import os
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+httpx = pytest.importorskip("httpx")
+
+from web_fetch import HttpPool, RateLimiter, ResponseCache, TextExtractor, extract_text, fetch_text
+
+PAGE = ("<html><head><title>Fixture</title><style>p {color: red}</style></head><body>"
+        "<nav>Home | About</nav><header>Site header</header>"
+        "<p>Hello   <b>world</b>&amp; friends</p>\n<script>var x = '<p>not text</p>';</script>"
+        "<div>Second\n\n block</div><footer>Footer text</footer></body></html>")
+BIG_CHUNK = b"<p>" + b"lorem ipsum " * 80 + b"</p>\n"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    stats = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _count(self, key, amount=1):
+        with self.server.lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def do_GET(self):
+        self._count(self.path)
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            body = PAGE.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/big":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()
+            try:
+                for _ in range(20000):  # ~19 MB if read to the end
+                    self.wfile.write(BIG_CHUNK)
+                    self._count("big_bytes", len(BIG_CHUNK))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        elif self.path.startswith("/slow"):
+            self._count("active")
+            with self.server.lock:
+                self.stats["peak"] = max(self.stats.get("peak", 0), self.stats["active"])
+            time.sleep(0.1)
+            self._count("active", -1)
+            body = b"<p>slow</p>"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+
+@pytest.fixture
+def server():
+    FixtureHandler.stats = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    httpd.lock = threading.Lock()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}", FixtureHandler.stats
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_extract_text_skips_chrome_and_collapses_whitespace():
+    assert extract_text(PAGE) == "FixtureHello world& friends Second block"
+
+
+def test_extract_text_matches_previous_soup_pipeline():
+    bs4 = pytest.importorskip("bs4")
+    import re
+
+    soup = bs4.BeautifulSoup(PAGE, "html.parser")
+    for element in soup(["script", "style", "nav", "header", "footer"]):
+        element.decompose()
+    lines = (line.strip() for line in soup.get_text().splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    expected = re.sub(r"\s+", " ", " ".join(chunk for chunk in chunks if chunk)).strip()
+    assert extract_text(PAGE) == expected
+
+
+def test_extractor_stops_at_budget():
+    extractor = TextExtractor(limit=100)
+    fed = 0
+    for _ in range(1000):
+        extractor.feed(BIG_CHUNK.decode())
+        fed += 1
+        if extractor.done:
+            break
+    text, truncated = extractor.text()
+    assert fed == 1 and truncated
+    assert text.endswith("... [content truncated]") and len(text) == 100 + len("... [content truncated]")
+
+
+def test_conditional_get_served_from_cache(server, tmp_path):
+    base, stats = server
+    cache = ResponseCache(str(tmp_path))
+
+    async def run():
+        pool = HttpPool()
+        try:
+            first = await fetch_text(pool, base + "/page", {}, cache)
+            second = await fetch_text(pool, base + "/page", {}, cache)
+        finally:
+            await pool.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == ("FixtureHello world& friends Second block", "network")
+    assert second == (first[0], "cache")
+    assert stats["/page"] == 2
+
+
+def test_large_page_download_stops_early(server):
+    base, stats = server
+
+    async def run():
+        pool = HttpPool()
+        try:
+            return await fetch_text(pool, base + "/big", {}, None, limit=2000)
+        finally:
+            await pool.aclose()
+
+    text, source = asyncio.run(run())
+    assert source == "network" and text.endswith("[content truncated]")
+    time.sleep(0.2)  # let the server notice the closed connection
+    assert stats["big_bytes"] < 20000 * len(BIG_CHUNK) // 10
+
+
+def test_per_host_concurrency_limit(server):
+    base, stats = server
+
+    async def run():
+        pool = HttpPool(per_host=2)
+        try:
+            return await asyncio.gather(*(fetch_text(pool, f"{base}/slow{i}", {}) for i in range(6)))
+        finally:
+            await pool.aclose()
+
+    results = asyncio.run(run())
+    assert [text for text, _ in results] == ["slow"] * 6
+    assert stats["peak"] == 2
+
+
+def test_http_errors_raise(server):
+    base, _ = server
+
+    async def run():
+        pool = HttpPool()
+        try:
+            await fetch_text(pool, base + "/missing", {})
+        finally:
+            await pool.aclose()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+
+
+def test_rate_limiter_window():
+    limiter = RateLimiter(requests_per_minute=3, window=0.2)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(7):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert 0.4 <= elapsed < 0.6
@@ -0,0 +1,248 @@
+# web_fetch.py → Pooled, cached, streaming page fetcher for mcp_server_3.py
+# Role: one shared httpx client with per-host concurrency limits, a conditional-GET
+# (ETag/Last-Modified) disk cache of extracted text, and HTML text extraction
+# that stops reading the response once the character budget is met.
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import urllib.parse
+from collections import deque
+from html.parser import HTMLParser
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+MAX_CONTENT_CHARS = 8000        # extracted text returned per page
+TRUNCATED_SUFFIX = "... [content truncated]"
+PER_HOST_CONCURRENCY = 4        # simultaneous requests to one host
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE = 16
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web_cache")
+CACHE_MAX_ENTRIES = 500
+
+# Content of these elements is never part of the page text
+SKIPPED_TAGS = frozenset(["script", "style", "nav", "header", "footer"])
+
+_WS_RE = re.compile(r"\s+")
+
+
+class RateLimiter:
+    """Sliding one-minute window; waiting callers re-check after the oldest request ages out"""
+
+    def __init__(self, requests_per_minute: int = 30, window: float = 60.0):
+        self.requests_per_minute = requests_per_minute
+        self.window = window
+        self.requests = deque()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            while self.requests and now - self.requests[0] >= self.window:
+                self.requests.popleft()
+            if len(self.requests) < self.requests_per_minute:
+                self.requests.append(now)
+                return
+            await asyncio.sleep(self.window - (now - self.requests[0]))
+
+
+class TextExtractor(HTMLParser):
+    """
+    Visible page text, fed chunk by chunk; `done` once limit characters are collected
+
+    Whitespace is collapsed as it arrives, so the collected length is the final
+    length and the caller can stop reading the response as soon as `done` is set.
+    """
+
+    def __init__(self, limit: int = MAX_CONTENT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.parts = []
+        self.length = 0
+        self.done = False
+        self._skip_depth = 0
+        self._space = False  # whitespace pending between the last part and the next
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self._skip_depth or self.done:
+            return
+        if data[:1].isspace():
+            self._space = True
+        text = _WS_RE.sub(" ", data).strip()
+        if text:
+            if self._space and self.length:
+                self.parts.append(" ")
+                self.length += 1
+            self.parts.append(text)
+            self.length += len(text)
+            self._space = False
+            self.done = self.length > self.limit
+        if data[-1:].isspace():
+            self._space = True
+
+    def text(self) -> Tuple[str, bool]:
+        """(text, truncated) with the same truncation marker as before"""
+        text = "".join(self.parts)
+        if len(text) > self.limit:
+            return text[:self.limit] + TRUNCATED_SUFFIX, True
+        return text, False
+
+
+def extract_text(html: str, limit: int = MAX_CONTENT_CHARS) -> str:
+    extractor = TextExtractor(limit)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()[0]
+
+
+class ResponseCache:
+    """
+    Extracted text per URL on disk, with the validators needed to revalidate it
+
+    Only responses carrying an ETag or Last-Modified (and no Cache-Control:
+    no-store) are kept; a later fetch sends If-None-Match/If-Modified-Since and
+    reuses the text on 304 without downloading or parsing the page again.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_entries: int = CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _path(self, url: str, limit: int) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(f"{limit}:{url}".encode()).hexdigest() + ".json")
+
+    def get(self, url: str, limit: int) -> Optional[Dict]:
+        try:
+            with open(self._path(url, limit), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    @staticmethod
+    def validators(entry: Optional[Dict]) -> Dict[str, str]:
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url: str, limit: int, response: httpx.Response, text: str) -> bool:
+        etag, last_modified = response.headers.get("etag"), response.headers.get("last-modified")
+        if not (etag or last_modified) or "no-store" in response.headers.get("cache-control", "").lower():
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(url, limit)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified,
+                       "text": text, "stored_at": time.time()}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._prune()
+        return True
+
+    def touch(self, url: str, limit: int):
+        try:
+            os.utime(self._path(url, limit))
+        except OSError:
+            pass
+
+    def _prune(self):
+        """Drop least recently used entries beyond max_entries"""
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(".json")]
+        except OSError:
+            return
+        if len(names) <= self.max_entries:
+            return
+        paths = sorted((os.path.join(self.cache_dir, n) for n in names), key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class HttpPool:
+    """
+    One keep-alive httpx.AsyncClient for all requests, created on first use
+
+    Requests to the same host are capped at per_host concurrent (on top of the
+    client's overall connection limit), so one slow site cannot take every slot.
+    """
+
+    def __init__(self, verify: bool = True, per_host: int = PER_HOST_CONCURRENCY,
+                 max_connections: int = MAX_CONNECTIONS, timeout: float = 30.0):
+        self.verify = verify
+        self.per_host = per_host
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                verify=self.verify,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=min(MAX_KEEPALIVE, self.max_connections)),
+            )
+        return self._client
+
+    def host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        slot = self._hosts.get(host)
+        if slot is None:
+            slot = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        return slot
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+async def fetch_text(pool: HttpPool, url: str, headers: Dict[str, str], cache: Optional[ResponseCache] = None,
+                     limit: int = MAX_CONTENT_CHARS) -> Tuple[str, str]:
+    """
+    (text, source) for url, source being "network" or "cache"
+
+    The body is streamed into a TextExtractor and the download stops once the
+    extractor has limit characters. Raises httpx errors like response.raise_for_status.
+    """
+    cached = cache.get(url, limit) if cache else None
+    request_headers = dict(headers, **ResponseCache.validators(cached))
+
+    async with pool.host_slot(url):
+        async with pool.client.stream("GET", url, headers=request_headers, follow_redirects=True) as response:
+            if response.status_code == 304 and cached is not None:
+                cache.touch(url, limit)
+                return cached["text"], "cache"
+            response.raise_for_status()
+
+            extractor = TextExtractor(limit)
+            async for chunk in response.aiter_text():
+                extractor.feed(chunk)
+                if extractor.done:
+                    break  # leaving the block closes the stream; the rest is never downloaded
+            else:
+                extractor.close()
+            text, _ = extractor.text()
+
+    if cache is not None:
+        cache.put(url, limit, response, text)
+    return text, "network"
@@ -2,56 +2,142 @@ import os
 import json
 from pathlib import Path
 from typing import List, Dict
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+import numpy as np
+
+
+INDEX_VERSION = 1
+
+# Loaded indexes shared by every MemorySearch in the process, keyed by logs path
+_INDEXES: Dict[str, "SessionLogIndex"] = {}
+
+
+class SessionLogIndex:
+    """
+    Persistent index of extracted query/summary entries, one record per session file.
+
+    Each record remembers the file's mtime and size; refresh() only re-parses
+    files whose stat changed and drops files that disappeared, so search cost
+    no longer grows with the total history that has to be JSON-parsed.
+    """
+
+    def __init__(self, logs_path: Path, index_path: Path):
+        self.logs_path = logs_path
+        self.index_path = index_path
+        self.files: Dict[str, Dict] = {}
+        self._arrays = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            self.files = {}
+
+    def _save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    def refresh(self, parse_file) -> int:
+        """Re-parse changed files with parse_file(path) -> entries. Returns files re-parsed."""
+        seen = set()
+        changed = 0
+        for file in self.logs_path.rglob("*.json"):
+            key = file.relative_to(self.logs_path).as_posix()
+            seen.add(key)
+            stat = file.stat()
+            record = self.files.get(key)
+            if record and record["mtime_ns"] == stat.st_mtime_ns and record["size"] == stat.st_size:
+                continue
+            self.files[key] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "entries": parse_file(file)}
+            changed += 1
+
+        removed = set(self.files) - seen
+        for key in removed:
+            del self.files[key]
+
+        if changed or removed:
+            self._arrays = None
+            self._save()
+        return changed
+
+    @property
+    def entries(self) -> List[Dict]:
+        return self.arrays[0]
+
+    @property
+    def arrays(self):
+        """(entries, lowercased queries, lowercased summaries, length penalties), built once per change."""
+        if self._arrays is None:
+            entries = [e for key in sorted(self.files) for e in self.files[key]["entries"]]
+            self._arrays = (
+                entries,
+                [e["query"].lower() for e in entries],
+                [e["solution_summary"].lower() for e in entries],
+                np.array([len(e["solution_summary"]) / 100 for e in entries], dtype=np.float32),
+            )
+        return self._arrays
 
 
 class MemorySearch:
     def __init__(self, logs_path: str = "memory/session_logs"):
         self.logs_path = Path(logs_path)
+        key = str(self.logs_path.resolve())
+        if key not in _INDEXES:
+            _INDEXES[key] = SessionLogIndex(self.logs_path, self.logs_path.parent / "session_query_index.json")
+        self.index = _INDEXES[key]
 
     def search_memory(self, user_query: str, top_k: int = 3) -> List[Dict]:
-        memory_entries = self._load_queries()
-        scored_results = []
-
-        for entry in memory_entries:
-            query_score = fuzz.partial_ratio(user_query.lower(), entry["query"].lower())
-            summary_score = fuzz.partial_ratio(user_query.lower(), entry["solution_summary"].lower())
-            length_penalty = len(entry["solution_summary"]) / 100
-            score = 0.5 * query_score + 0.4 * summary_score - 0.05 * length_penalty
-            scored_results.append((score, entry))
-
-        top_matches = sorted(scored_results, key=lambda x: x[0], reverse=True)[:top_k]
-        return [match[1] for match in top_matches]
+        memory_entries, queries, summaries, length_penalty = self._load_arrays()
+        if not memory_entries:
+            return []
+
+        # Score every entry in one batched rapidfuzz call per field
+        q = user_query.lower()
+        query_score = process.cdist([q], queries, scorer=fuzz.partial_ratio, dtype=np.float32, workers=-1)[0]
+        summary_score = process.cdist([q], summaries, scorer=fuzz.partial_ratio, dtype=np.float32, workers=-1)[0]
+        score = 0.5 * query_score + 0.4 * summary_score - 0.05 * length_penalty
+
+        # Stable sort keeps file order on ties, as sorted(..., reverse=True) did
+        top = np.argsort(-score, kind="stable")[:top_k]
+        return [memory_entries[i] for i in top]
+
+    def _load_arrays(self):
+        changed = self.index.refresh(self._parse_file)
+        if changed:
+            print(f"🔍 Re-indexed {changed} session file(s) in '{self.logs_path}'")
+        print(f"📦 Total usable memory entries collected: {len(self.index.entries)}\n")
+        return self.index.arrays
 
     def _load_queries(self) -> List[Dict]:
+        return self._load_arrays()[0]
+
+    def _parse_file(self, file: Path) -> List[Dict]:
         memory_entries = []
-        all_json_files = list(self.logs_path.rglob("*.json"))
-        print(f"🔍 Found {len(all_json_files)} JSON file(s) in '{self.logs_path}'")
-
-        for file in all_json_files:
-            count_before = len(memory_entries)
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = json.load(f)
-
-                if isinstance(content, list):  # FORMAT 1
-                    for session in content:
-                        self._extract_entry(session, file.name, memory_entries)
-                elif isinstance(content, dict) and "session_id" in content:  # FORMAT 2
-                    self._extract_entry(content, file.name, memory_entries)
-                elif isinstance(content, dict) and "turns" in content:  # FORMAT 3
-                    for turn in content["turns"]:
-                        self._extract_entry(turn, file.name, memory_entries)
-
-            except Exception as e:
-                print(f"⚠️ Skipping '{file}': {e}")
-                continue
+        try:
+            with open(file, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+
+            if isinstance(content, list):  # FORMAT 1
+                for session in content:
+                    self._extract_entry(session, file.name, memory_entries)
+            elif isinstance(content, dict) and "session_id" in content:  # FORMAT 2
+                self._extract_entry(content, file.name, memory_entries)
+            elif isinstance(content, dict) and "turns" in content:  # FORMAT 3
+                for turn in content["turns"]:
+                    self._extract_entry(turn, file.name, memory_entries)
 
-            count_after = len(memory_entries)
-            if count_after > count_before:
-                print(f"✅ {file.name}: {count_after - count_before} matching entries")
+        except Exception as e:
+            print(f"⚠️ Skipping '{file}': {e}")
 
-        print(f"📦 Total usable memory entries collected: {len(memory_entries)}\n")
+        if memory_entries:
+            print(f"✅ {file.name}: {len(memory_entries)} matching entries")
         return memory_entries
 
     def _extract_entry(self, obj: dict, file_name: str, memory_entries: List[Dict]):